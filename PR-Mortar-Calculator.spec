@@ -19,6 +19,13 @@ import os
 # Get the repository root directory (directory containing this spec file)
 root_dir = os.path.abspath(os.getcwd())
 
+# Refresh the prebuilt map index so the bundled server never scans map
+# directories at startup (see calculator/map_index.py)
+import sys
+sys.path.insert(0, root_dir)
+from calculator.map_index import save_map_index
+save_map_index(os.path.join(root_dir, 'processed_maps'))
+
 # Collect all Flask templates and static files
 d = []
 # Include UI templates and static assets
@@ -56,7 +63,6 @@ a = Analysis(
         'matplotlib',
         'scipy',
         'pandas',
-        'numpy',
         'pytest',
         'setuptools',
     ],
@@ -86,8 +92,8 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],  # Don't exclude any files from UPX compression
+    upx=False,  # UPX-packed binaries are decompressed (and often AV-scanned) on every launch
+    upx_exclude=[],
     console=True,  # Show console for server logs
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -103,7 +109,7 @@ coll = COLLECT(
     a.zipfiles,
     a.datas,
     strip=False,
-    upx=True,
-    upx_exclude=[],  # Compress all binaries with UPX
+    upx=False,  # Faster cold start; see EXE above
+    upx_exclude=[],
     name='PR-Mortar-Calculator'
 )
@@ -0,0 +1,6 @@
+"""
+Project Reality Mortar Calculator - server-side package.
+
+Contains the Flask server plus NumPy ports of the browser calculation
+modules (ballistics, coordinates, heightmap) used by batch endpoints.
+"""
@@ -0,0 +1,200 @@
+"""
+Ballistics Calculation Engine (Python port of static/js/ballistics.js)
+
+Vectorised with NumPy so that whole arrays of mortar/target pairs are solved
+in one call. Every formula, constant and status code mirrors the browser
+engine exactly - firing solutions must not depend on where they are computed.
+
+CRITICAL CONSTANTS - DO NOT MODIFY (see ballistics.js):
+- Gravity: 14.86 m/s² (Project Reality engine value, NOT Earth's 9.8)
+- Projectile Velocity: 148.64 m/s
+- Maximum elevation angle: 89°
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+# Project Reality physics constants (must match PR_PHYSICS in ballistics.js)
+GRAVITY = 14.86
+PROJECTILE_VELOCITY = 148.64
+MAX_ELEVATION_ANGLE = 89 * np.pi / 180
+MILS_PER_CIRCLE = 6400
+DEGREES_PER_CIRCLE = 360
+RADIANS_PER_CIRCLE = 2 * np.pi
+
+# Height difference (meters) above which a valid shot is flagged EXTREME_ELEVATION
+EXTREME_ELEVATION_THRESHOLD = 200
+
+# Status codes stored in the integer ``status`` array. Index into STATUS_NAMES
+# for the same strings calculateFiringSolution() reports in the browser.
+STATUS_OK = 0
+STATUS_EXTREME_ELEVATION = 1
+STATUS_TOO_CLOSE = 2
+STATUS_UNREACHABLE = 3
+STATUS_NAMES = ('OK', 'EXTREME_ELEVATION', 'TOO_CLOSE', 'UNREACHABLE')
+
+
+def calculate_distance(x1, y1, x2, y2) -> np.ndarray:
+    """Horizontal (X-Y plane) distance in meters between point arrays."""
+    return np.hypot(np.subtract(x2, x1), np.subtract(y2, y1))
+
+
+def calculate_azimuth(x1, y1, x2, y2) -> np.ndarray:
+    """Compass azimuth in degrees (0 = North, clockwise) from mortar to target.
+
+    Y increases downward (south) in PR, so North is the -Y direction.
+    """
+    dx = np.subtract(x2, x1, dtype=np.float64)
+    dy = np.subtract(y2, y1, dtype=np.float64)
+    azimuth = np.degrees(np.arctan2(dx, -dy))
+    return np.where(azimuth < 0, azimuth + 360, azimuth)
+
+
+def _discriminant(distance, height_diff) -> np.ndarray:
+    """v⁴ - g(gD² + 2v²ΔZ); negative means the shot is physically impossible."""
+    v2 = PROJECTILE_VELOCITY * PROJECTILE_VELOCITY
+    g = GRAVITY
+    return v2 * v2 - g * (g * distance * distance + 2 * v2 * height_diff)
+
+
+def calculate_elevation_angle(distance, height_diff) -> np.ndarray:
+    """High-angle elevation in radians, NaN where no valid solution exists.
+
+    Same rules as calculateElevationAngle(): distance < 1m, negative
+    discriminant and angles above MAX_ELEVATION_ANGLE have no solution.
+    """
+    distance = np.asarray(distance, dtype=np.float64)
+    height_diff = np.asarray(height_diff, dtype=np.float64)
+    disc = _discriminant(distance, height_diff)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        numerator = PROJECTILE_VELOCITY * PROJECTILE_VELOCITY + np.sqrt(disc)
+        angle = np.arctan(numerator / (GRAVITY * distance))
+
+    bad = (distance < 1) | (disc < 0) | (angle < 0) | (angle > MAX_ELEVATION_ANGLE)
+    return np.where(bad, np.nan, angle)
+
+
+def calculate_time_of_flight(distance, elevation_angle, height_diff) -> np.ndarray:
+    """Time of flight in seconds, matching calculateTimeOfFlight().
+
+    The horizontal time D / (v·cos φ) is preferred; the vertical root is used
+    for near-vertical shots and averaged in when both agree within 1e-6 s.
+    """
+    distance = np.asarray(distance, dtype=np.float64)
+    phi = np.asarray(elevation_angle, dtype=np.float64)
+    height_diff = np.asarray(height_diff, dtype=np.float64)
+
+    cos_phi = np.cos(phi)
+    v_sin = PROJECTILE_VELOCITY * np.sin(phi)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        horizontal = np.where(np.abs(cos_phi) > 1e-12,
+                              distance / (PROJECTILE_VELOCITY * cos_phi), np.inf)
+        disc = v_sin * v_sin - 2 * GRAVITY * height_diff
+        sqrt_disc = np.sqrt(disc)
+        vertical = np.maximum((v_sin - sqrt_disc) / GRAVITY,
+                              (v_sin + sqrt_disc) / GRAVITY)
+
+        agree = np.abs(horizontal - vertical) <= 1e-6
+        tof = np.where(~np.isfinite(horizontal), vertical,
+                       np.where(agree, 0.5 * (horizontal + vertical), horizontal))
+    return np.where(disc < 0, np.nan, tof)
+
+
+def radians_to_mils(radians) -> np.ndarray:
+    """Convert radians to NATO mils (6400 per circle)."""
+    return np.multiply(radians, MILS_PER_CIRCLE / RADIANS_PER_CIRCLE)
+
+
+def radians_to_degrees(radians) -> np.ndarray:
+    """Convert radians to degrees."""
+    return np.multiply(radians, DEGREES_PER_CIRCLE / RADIANS_PER_CIRCLE)
+
+
+def calculate_firing_solutions(mortar_x, mortar_y, mortar_z,
+                               target_x, target_y, target_z) -> Dict[str, np.ndarray]:
+    """Solve every mortar/target pair in one vectorised pass.
+
+    Inputs are broadcast against each other, so passing mortars shaped (M, 1)
+    and targets shaped (1, T) yields the full M×T solution matrix.
+
+    Args:
+        mortar_x, mortar_y, mortar_z: Mortar position(s) in meters
+        target_x, target_y, target_z: Target position(s) in meters
+
+    Returns:
+        Dictionary of arrays: ``distance``, ``azimuth``, ``height_delta``,
+        ``elevation_radians``, ``elevation_mils``, ``elevation_degrees``,
+        ``time_of_flight`` (NaN where invalid), ``valid`` (bool) and
+        ``status`` (int codes, see STATUS_NAMES).
+    """
+    distance = calculate_distance(mortar_x, mortar_y, target_x, target_y)
+    azimuth = calculate_azimuth(mortar_x, mortar_y, target_x, target_y)
+    height_delta = np.subtract(target_z, mortar_z, dtype=np.float64)
+    distance, azimuth, height_delta = np.broadcast_arrays(distance, azimuth, height_delta)
+
+    elevation = calculate_elevation_angle(distance, height_delta)
+    valid = ~np.isnan(elevation)
+    tof = np.where(valid, calculate_time_of_flight(distance, elevation, height_delta), np.nan)
+
+    status = np.full(distance.shape, STATUS_OK, dtype=np.int8)
+    status[valid & (np.abs(height_delta) > EXTREME_ELEVATION_THRESHOLD)] = STATUS_EXTREME_ELEVATION
+    status[~valid] = STATUS_UNREACHABLE
+    status[distance < 1] = STATUS_TOO_CLOSE
+
+    return {
+        'distance': distance,
+        'azimuth': azimuth,
+        'height_delta': height_delta,
+        'elevation_radians': elevation,
+        'elevation_mils': radians_to_mils(elevation),
+        'elevation_degrees': radians_to_degrees(elevation),
+        'time_of_flight': tof,
+        'valid': valid,
+        'status': status,
+    }
+
+
+def status_message(status: int, distance: float, height_delta: float) -> str:
+    """Human-readable message for one solution (same text as ballistics.js)."""
+    if status == STATUS_TOO_CLOSE:
+        return 'ERROR - Mortar and target positions too close (< 1m)'
+    if status == STATUS_UNREACHABLE:
+        if _discriminant(distance, height_delta) < 0:
+            return 'TARGET UNREACHABLE - Reduce distance or elevation difference'
+        return 'TARGET UNREACHABLE - Shot geometry impossible'
+    if status == STATUS_EXTREME_ELEVATION:
+        return (f'WARNING - Extreme elevation difference ({round(height_delta)}m) '
+                'may reduce accuracy')
+    return 'Firing solution valid'
+
+
+def _optional(value) -> Optional[float]:
+    """Convert NaN to None so solutions serialise like the JS nulls."""
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def solution_to_dict(solutions: Dict[str, np.ndarray], index) -> dict:
+    """Extract one solution as a JSON-ready dict.
+
+    Field names match the object returned by calculateFiringSolution() in
+    ballistics.js so clients can use server results interchangeably.
+    """
+    status = int(solutions['status'][index])
+    distance = float(solutions['distance'][index])
+    height_delta = float(solutions['height_delta'][index])
+    return {
+        'distance': distance,
+        'azimuth': float(solutions['azimuth'][index]),
+        'heightDelta': height_delta,
+        'elevationRadians': _optional(solutions['elevation_radians'][index]),
+        'elevationMils': _optional(solutions['elevation_mils'][index]),
+        'elevationDegrees': _optional(solutions['elevation_degrees'][index]),
+        'timeOfFlight': _optional(solutions['time_of_flight'][index]),
+        'valid': bool(solutions['valid'][index]),
+        'status': STATUS_NAMES[status],
+        'message': status_message(status, distance, height_delta),
+    }
@@ -0,0 +1,75 @@
+"""
+Content-Addressed Blob Store for Processed Map Files
+
+Map variants (e.g. dovre / dovre_winter) often ship identical heightmaps or
+minimaps. processor/dedup_blobs.py moves such payloads into a shared store
+and records the reference in the map's metadata.json:
+
+    processed_maps/_blobs/<sha256>
+    processed_maps/<map>/metadata.json -> "blobs": {"minimap.png": "<sha256>", ...}
+
+A per-map file on disk always wins over a blob reference, so maps that were
+never deduplicated keep working unchanged.
+"""
+
+import gzip
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+BLOBS_DIRNAME = '_blobs'
+
+_DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def is_digest(value: str) -> bool:
+    """True if value looks like a SHA-256 hex digest (safe to use as a filename)."""
+    return bool(_DIGEST_PATTERN.match(value))
+
+
+def content_digest(data: bytes, filename: str) -> str:
+    """SHA-256 of a payload.
+
+    Gzip files are hashed by their decompressed content: the gzip header
+    carries a timestamp, so identical heightmaps compressed at different
+    times would otherwise never match.
+    """
+    if filename.endswith('.gz'):
+        data = gzip.decompress(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def blob_path(processed_dir: Path, digest: str) -> Path:
+    """Location of a blob in the store under processed_dir."""
+    return Path(processed_dir) / BLOBS_DIRNAME / digest
+
+
+def blob_references(map_dir: Path) -> Dict[str, str]:
+    """Filename -> digest references from a map's metadata.json (empty if none)."""
+    try:
+        with open(Path(map_dir) / 'metadata.json', 'r', encoding='utf-8') as f:
+            references = json.load(f).get('blobs') or {}
+    except (OSError, ValueError):
+        return {}
+    return {name: digest for name, digest in references.items() if is_digest(digest)}
+
+
+def resolve_map_file(map_dir: Path, filename: str) -> Optional[Path]:
+    """Path holding a map's file: the per-map copy, else its shared blob.
+
+    Returns:
+        Existing file path, or None if the map has no such file
+    """
+    map_dir = Path(map_dir)
+    local = map_dir / filename
+    if local.is_file():
+        return local
+
+    digest = blob_references(map_dir).get(filename)
+    if digest:
+        shared = blob_path(map_dir.parent, digest)
+        if shared.is_file():
+            return shared
+    return None
@@ -0,0 +1,320 @@
+"""
+Coordinate Conversion Module (Python port of static/js/coordinates.js)
+
+Converts PR grid references (e.g. "D6-7", "D6-7-3") to world XY meters and
+back, one at a time or in bulk.
+
+Grid System:
+- Columns: A-M (13 columns, A=West), Rows: 1-13 (1=North)
+- Keypad: 1-9 in phone layout (7 8 9 / 4 5 6 / 1 2 3)
+- Origin (0,0) at top-left, X increases East, Y increases South
+"""
+
+import math
+import re
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+GRID_COLUMNS = 'ABCDEFGHIJKLM'
+
+# Keypad position offsets as fractions of the square (see KEYPAD_OFFSETS in JS)
+KEYPAD_OFFSETS = {
+    7: (0.0, 0.0), 8: (0.5, 0.0), 9: (1.0, 0.0),
+    4: (0.0, 0.5), 5: (0.5, 0.5), 6: (1.0, 0.5),
+    1: (0.0, 1.0), 2: (0.5, 1.0), 3: (1.0, 1.0),
+}
+
+NATO_COLUMN_WORDS = {
+    'alpha': 'A', 'bravo': 'B', 'charlie': 'C', 'delta': 'D', 'echo': 'E',
+    'foxtrot': 'F', 'golf': 'G', 'hotel': 'H', 'india': 'I', 'juliet': 'J',
+    'kilo': 'K', 'lima': 'L', 'mike': 'M',
+}
+
+# Same pattern as parseGridReference(): letter or NATO word, row, optional kpad prefix, keypad;
+# plus an optional sub-keypad ("C5-3-7") that the JS parser does not support
+_GRID_REF_PATTERN = re.compile(
+    r'^((?:alpha|bravo|charlie|delta|echo|foxtrot|golf|hotel|india|juliet|kilo|lima|mike|[A-Ma-m]))'
+    r'\s*(\d{1,2})[-\s]*(?:kpad\s*)?(\d)(?:[-\s]+(\d))?$',
+    re.IGNORECASE,
+)
+
+# Maximum length of a canonical reference ("M13-9-9"), see parse_grid_references()
+_CANONICAL_MAX_LENGTH = 7
+
+
+class GridReference(NamedTuple):
+    """Parsed grid reference components (subkeypad is None for keypad refs)."""
+    column: str
+    row: int
+    keypad: int
+    subkeypad: Optional[int] = None
+
+
+class ParsedGridReferences(NamedTuple):
+    """Bulk-parsed grid references; invalid entries have valid=False and zeros."""
+    column_index: np.ndarray  # 0-12 (A-M)
+    row: np.ndarray           # 1-13
+    keypad: np.ndarray        # 1-9
+    subkeypad: np.ndarray     # 1-9, or 0 for keypad-only references
+    valid: np.ndarray
+
+
+def parse_grid_reference(grid_ref: str) -> Optional[GridReference]:
+    """Parse "D6-7", "D6-kpad7", "Delta 6-7" etc. Returns None if invalid."""
+    if not grid_ref or not isinstance(grid_ref, str):
+        return None
+
+    match = _GRID_REF_PATTERN.match(grid_ref.strip())
+    if not match:
+        return None
+
+    column_key = match.group(1)
+    column = NATO_COLUMN_WORDS.get(column_key.lower(), column_key.upper())
+    row = int(match.group(2))
+    keypad = int(match.group(3))
+    subkeypad = int(match.group(4)) if match.group(4) else None
+
+    if column not in GRID_COLUMNS or not 1 <= row <= 13 or not 1 <= keypad <= 9:
+        return None
+    if subkeypad is not None and not 1 <= subkeypad <= 9:
+        return None
+    return GridReference(column, row, keypad, subkeypad)
+
+
+def calculate_grid_scale(map_size: float) -> float:
+    """Size of one grid square in meters (PR uses a 13×13 grid)."""
+    return map_size / 13
+
+
+def grid_to_xy(column: str, row: int, keypad: int, grid_scale: float) -> Tuple[float, float]:
+    """Convert grid components to world XY meters.
+
+    Raises:
+        ValueError: If any component is out of range
+    """
+    if column not in GRID_COLUMNS or len(column) != 1:
+        raise ValueError(f'Invalid column: {column}. Must be A-M.')
+    if not 1 <= row <= 13:
+        raise ValueError(f'Invalid row: {row}. Must be 1-13.')
+    if keypad not in KEYPAD_OFFSETS:
+        raise ValueError(f'Invalid keypad: {keypad}. Must be 1-9.')
+    if grid_scale <= 0:
+        raise ValueError(f'Invalid grid scale: {grid_scale}. Must be positive.')
+
+    offset_x, offset_y = KEYPAD_OFFSETS[keypad]
+    x = GRID_COLUMNS.index(column) * grid_scale + offset_x * grid_scale
+    y = (row - 1) * grid_scale + offset_y * grid_scale
+    return x, y
+
+
+def subkeypad_to_xy(column: str, row: int, keypad: int, subkeypad: int,
+                    grid_scale: float) -> Tuple[float, float]:
+    """Centre of a sub-keypad cell in world XY meters.
+
+    Keypad references keep gridToXY()'s 0/½/1 offsets; a sub-keypad names
+    one ninth of the keypad's third of the square, so "C5-3-5" is the centre
+    of the south-east third of C5.
+
+    Raises:
+        ValueError: If any component is out of range
+    """
+    if subkeypad not in KEYPAD_OFFSETS:
+        raise ValueError(f'Invalid sub-keypad: {subkeypad}. Must be 1-9.')
+    grid_to_xy(column, row, keypad, grid_scale)  # validates the other components
+
+    kx, ky = KEYPAD_OFFSETS[keypad]
+    sx, sy = KEYPAD_OFFSETS[subkeypad]
+    ninth = grid_scale / 9
+    x = GRID_COLUMNS.index(column) * grid_scale + (kx * 6 + sx * 2 + 0.5) * ninth
+    y = (row - 1) * grid_scale + (ky * 6 + sy * 2 + 0.5) * ninth
+    return x, y
+
+
+def grid_ref_to_xy(grid_ref: str, grid_scale: float) -> Optional[Tuple[float, float]]:
+    """Parse a grid reference string and convert it to XY (None if invalid).
+
+    Accepts keypad ("D6-7") and sub-keypad ("D6-7-3") references.
+    """
+    parsed = parse_grid_reference(grid_ref)
+    if parsed is None:
+        return None
+    if parsed.subkeypad is not None:
+        return subkeypad_to_xy(parsed.column, parsed.row, parsed.keypad, parsed.subkeypad, grid_scale)
+    return grid_to_xy(parsed.column, parsed.row, parsed.keypad, grid_scale)
+
+
+def resolve_positions(items: Sequence, grid_scale: float) -> np.ndarray:
+    """Convert a list of grid reference strings and/or {"x", "y"} objects to XY.
+
+    Used by the batch endpoints, which accept either form for each position.
+    XY outside the map is kept as given (elevations are sampled at the
+    nearest map edge), but NaN and infinite coordinates are rejected.
+
+    Returns:
+        Float array of shape (N, 2)
+
+    Raises:
+        ValueError: Naming the first item that cannot be converted
+    """
+    positions = np.empty((len(items), 2), dtype=np.float64)
+    for i, item in enumerate(items):
+        if isinstance(item, str):
+            xy = grid_ref_to_xy(item, grid_scale)
+            if xy is None:
+                raise ValueError(f'Invalid grid reference at index {i}: {item!r}')
+        elif isinstance(item, dict) and 'x' in item and 'y' in item:
+            try:
+                xy = (float(item['x']), float(item['y']))
+            except (TypeError, ValueError):
+                raise ValueError(f'Invalid coordinates at index {i}: {item!r}') from None
+            if not (math.isfinite(xy[0]) and math.isfinite(xy[1])):
+                raise ValueError(f'Coordinates at index {i} must be finite: {item!r}')
+        else:
+            raise ValueError(f'Position at index {i} must be a grid reference or {{"x", "y"}}')
+        positions[i] = xy
+    return positions
+
+
+def resolve_grid_scale(metadata: Optional[dict] = None, grid_scale: Optional[float] = None,
+                       map_size: Optional[float] = None) -> float:
+    """Grid square size from explicit overrides or map metadata.
+
+    Precedence: grid_scale override, map_size override (/13), metadata
+    grid_scale, metadata map_size (/13).
+
+    Raises:
+        ValueError: If no positive scale can be determined
+    """
+    metadata = metadata or {}
+    if grid_scale is not None:
+        scale = grid_scale
+    elif map_size is not None:
+        scale = map_size / 13 if isinstance(map_size, (int, float)) else map_size
+    else:
+        scale = metadata.get('grid_scale') or calculate_grid_scale(metadata.get('map_size') or 0)
+
+    if isinstance(scale, bool) or not isinstance(scale, (int, float)):
+        raise ValueError(f'Invalid grid scale: {scale!r}')
+    if not 0 < scale < float('inf'):
+        raise ValueError(f'Invalid grid scale: {scale}. Must be positive.')
+    return float(scale)
+
+
+def parse_grid_references(grid_refs: Sequence) -> ParsedGridReferences:
+    """Parse many grid references at once.
+
+    Canonical references ("C5-3", "c10-3-7") are decoded from a byte matrix
+    with NumPy; anything else (NATO words, "kpad", inner spaces) falls back
+    to parse_grid_reference(). Non-string entries are invalid.
+    """
+    count = len(grid_refs)
+    text = np.array([ref.strip().upper() if isinstance(ref, str) else '' for ref in grid_refs] or [''],
+                    dtype=str)[:count]
+    encoded = np.char.encode(text, 'ascii', 'replace')
+    lengths = np.char.str_len(encoded)
+
+    # One row of ASCII codes per reference, zero padded
+    width = max(_CANONICAL_MAX_LENGTH + 1, encoded.dtype.itemsize)
+    chars = np.zeros((count, width), dtype=np.uint8)
+    if count:
+        raw = np.frombuffer(encoded.tobytes(), dtype=np.uint8).reshape(count, encoded.dtype.itemsize)
+        chars[:, :raw.shape[1]] = raw
+    index = np.arange(count)
+
+    def digit_at(position):
+        values = chars[index, np.minimum(position, width - 1)].astype(np.int16) - ord('0')
+        return values, (values >= 0) & (values <= 9)
+
+    column_index = chars[:, 0].astype(np.int16) - ord('A')
+    first, first_ok = digit_at(np.ones(count, dtype=np.intp))
+    second, two_digits = digit_at(np.full(count, 2, dtype=np.intp))
+    row = np.where(two_digits, first * 10 + second, first)
+    dash = np.where(two_digits, 3, 2)
+    keypad, keypad_ok = digit_at(dash + 1)
+    subkeypad, subkeypad_ok = digit_at(dash + 3)
+    has_sub = lengths == dash + 4
+
+    valid = ((column_index >= 0) & (column_index < len(GRID_COLUMNS)) & first_ok
+             & (row >= 1) & (row <= 13)
+             & (chars[index, dash] == ord('-')) & keypad_ok & (keypad >= 1)
+             & ((lengths == dash + 2)
+                | (has_sub & (chars[index, np.minimum(dash + 2, width - 1)] == ord('-'))
+                   & subkeypad_ok & (subkeypad >= 1))))
+    subkeypad = np.where(has_sub, subkeypad, 0)
+
+    # Regex fallback for non-canonical spellings
+    for i in np.flatnonzero(~valid):
+        parsed = parse_grid_reference(grid_refs[i]) if isinstance(grid_refs[i], str) else None
+        if parsed is not None:
+            column_index[i] = GRID_COLUMNS.index(parsed.column)
+            row[i] = parsed.row
+            keypad[i] = parsed.keypad
+            subkeypad[i] = parsed.subkeypad or 0
+            valid[i] = True
+
+    return ParsedGridReferences(
+        column_index=np.where(valid, column_index, 0).astype(np.int16),
+        row=np.where(valid, row, 0).astype(np.int16),
+        keypad=np.where(valid, keypad, 0).astype(np.int8),
+        subkeypad=np.where(valid, subkeypad, 0).astype(np.int8),
+        valid=valid,
+    )
+
+
+# Keypad number -> (x, y) third of the square (index 0 unused, for "no sub-keypad")
+_KEYPAD_X = np.array([0] + [int(KEYPAD_OFFSETS[k][0] * 2) for k in range(1, 10)], dtype=np.int16)
+_KEYPAD_Y = np.array([0] + [int(KEYPAD_OFFSETS[k][1] * 2) for k in range(1, 10)], dtype=np.int16)
+# [y third][x third] -> keypad number
+_KEYPAD_GRID = np.array([[7, 8, 9], [4, 5, 6], [1, 2, 3]], dtype=np.int8)
+
+
+def grid_refs_to_xy(grid_refs: Sequence, grid_scale: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert many grid references to world XY (same positions as grid_ref_to_xy).
+
+    Returns:
+        (XY array of shape (N, 2) with NaN rows for invalid references, valid mask)
+    """
+    parsed = parse_grid_references(grid_refs)
+    kx = _KEYPAD_X[parsed.keypad]
+    ky = _KEYPAD_Y[parsed.keypad]
+    has_sub = parsed.subkeypad > 0
+
+    offset_x = np.where(has_sub, (kx * 3 + _KEYPAD_X[parsed.subkeypad] + 0.5) / 9, kx / 2)
+    offset_y = np.where(has_sub, (ky * 3 + _KEYPAD_Y[parsed.subkeypad] + 0.5) / 9, ky / 2)
+    xy = np.empty((len(parsed.valid), 2), dtype=np.float64)
+    xy[:, 0] = (parsed.column_index + offset_x) * grid_scale
+    xy[:, 1] = (parsed.row - 1 + offset_y) * grid_scale
+    xy[~parsed.valid] = np.nan
+    return xy, parsed.valid
+
+
+def xy_to_grid_refs(xy, grid_scale: float, subkeypad: bool = False) -> List[Optional[str]]:
+    """Convert many world XY positions to grid references.
+
+    Keypads use the 0.33 / 0.67 thresholds of xyToGrid() so results match
+    the UI. With subkeypad=True the square is split into exact ninths, so
+    the references round-trip through grid_refs_to_xy().
+
+    Returns:
+        Grid references, None for positions outside the 13×13 grid
+    """
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    squares = np.floor(xy / grid_scale)
+    inside = np.all((squares >= 0) & (squares < 13), axis=1)
+    squares = np.where(inside[:, None], squares, 0).astype(np.intp)
+    in_square = xy / grid_scale - squares
+
+    if subkeypad:
+        ninths = np.clip(np.floor(in_square * 9), 0, 8).astype(np.intp)
+        keypads = _KEYPAD_GRID[ninths[:, 1] // 3, ninths[:, 0] // 3].tolist()
+        suffixes = [f'-{k}' for k in _KEYPAD_GRID[ninths[:, 1] % 3, ninths[:, 0] % 3].tolist()]
+    else:
+        thirds = (in_square >= 0.33).astype(np.intp) + (in_square >= 0.67)
+        keypads = _KEYPAD_GRID[thirds[:, 1], thirds[:, 0]].tolist()
+        suffixes = [''] * len(keypads)
+
+    return [
+        f'{GRID_COLUMNS[column]}{row + 1}-{keypad}{suffix}' if ok else None
+        for (column, row), keypad, suffix, ok in zip(squares.tolist(), keypads, suffixes, inside.tolist())
+    ]
@@ -0,0 +1,338 @@
+"""
+Local Solver Daemon (Unix domain socket)
+
+Keeps maps resident and answers elevation / firing-solution requests for
+local tools (overlays, voice helpers) without an HTTP round trip:
+
+    python -m calculator.daemon --preload muttrah_city_2 kashan_desert
+    python -m calculator.daemon --bench muttrah_city_2     # latency p50/p99
+
+Framing is chosen per connection from the first byte:
+    - '{' (or whitespace): newline-delimited JSON, one request per line
+    - anything else:       4-byte big-endian length prefix + UTF-8 JSON
+
+Requests (responses echo "id" and carry "result" or "error"):
+    {"id": 1, "op": "solve", "map": "muttrah_city_2", "mortar": "D6-7", "target": {"x": 1200, "y": 950}}
+    {"id": 2, "op": "solve", "map": "muttrah_city_2", "mortar": "D6-7", "targets": ["E5-3", "E6-1"]}
+    {"id": 3, "op": "elevation", "map": "adak", "position": "C5-3"}
+    {"id": 4, "op": "elevation", "map": "adak", "positions": [{"x": 10, "y": 20}, "C5-3"]}
+    {"id": 5, "op": "load", "map": "adak"}
+    {"op": "maps"} / {"op": "ping"}
+
+Clients may pipeline: requests are answered in order on each connection,
+and connections are served concurrently. Solutions use the same fields
+as calculateFiringSolution() in ballistics.js, and the same elevations as
+calculator.solve: keypad table values for grid references, heightmap
+interpolation elsewhere.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable
+
+import numpy as np
+
+from calculator.ballistics import solution_to_dict
+from calculator.heightmap import MapData, has_heightmap
+from calculator.solve import DEFAULT_MAPS_DIR, Solver
+
+DEFAULT_SOCKET_PATH = Path(tempfile.gettempdir()) / 'pr-mortar-solver.sock'
+
+# Upper bound for one length-prefixed frame (batch requests included)
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+# Upper bound for positions/targets in one batch request
+MAX_BATCH = 100_000
+
+# Larger requests are decoded and answered in a worker thread, as are
+# requests that load a map, so the event loop keeps serving other clients
+INLINE_REQUEST_SIZE = 16 * 1024
+
+_LENGTH = struct.Struct('>I')
+_MAP_NAME_PATTERN = re.compile(r'^[\w-]+$')
+
+
+class RequestError(ValueError):
+    """Invalid request; reported to the client without closing the connection."""
+
+
+class SolverDaemon:
+    """Map cache plus request dispatch, independent of the transport."""
+
+    def __init__(self, maps_dir: Path = DEFAULT_MAPS_DIR):
+        self.maps_dir = Path(maps_dir)
+        self._solvers: Dict[str, Solver] = {}
+        self._load_lock = threading.Lock()
+
+    def solver(self, map_name) -> Solver:
+        """Solver for a map, loading it on first use.
+
+        Raises:
+            RequestError: If the map name is invalid or the map is not processed
+        """
+        if not isinstance(map_name, str):
+            raise RequestError(f'Invalid map name: {map_name!r}')
+        solver = self._solvers.get(map_name)
+        if solver is not None:
+            return solver
+        if not _MAP_NAME_PATTERN.match(map_name):
+            raise RequestError(f'Invalid map name: {map_name!r}')
+        map_dir = self.maps_dir / map_name
+        if not (map_dir / 'metadata.json').is_file() or not has_heightmap(map_dir):
+            raise RequestError(f"Map '{map_name}' not found")
+        with self._load_lock:
+            if map_name not in self._solvers:
+                self._solvers[map_name] = Solver(MapData(map_dir))
+        return self._solvers[map_name]
+
+    def _loads_map(self, request) -> bool:
+        """True if answering request would load a map (slow: decodes the heightmap)."""
+        if not isinstance(request, dict) or request.get('op', 'solve') not in ('load', 'elevation', 'solve'):
+            return False
+        map_name = request.get('map')
+        return isinstance(map_name, str) and map_name not in self._solvers
+
+    def handle(self, request) -> dict:
+        """Answer one decoded request (never raises for bad input)."""
+        if not isinstance(request, dict):
+            return {'error': 'Request must be a JSON object'}
+        response = {'id': request['id']} if 'id' in request else {}
+        try:
+            response['result'] = self._dispatch(request)
+        except (RequestError, ValueError) as e:
+            response['error'] = str(e)
+        except (OSError, KeyError) as e:
+            response['error'] = f'Could not load map: {e}'
+        return response
+
+    def _dispatch(self, request: dict):
+        op = request.get('op', 'solve')
+        if op == 'ping':
+            return 'pong'
+        if op == 'maps':
+            return sorted(self._solvers)
+        if op == 'load':
+            self.solver(request.get('map'))
+            return sorted(self._solvers)
+        if op == 'elevation':
+            return self._elevation(request)
+        if op == 'solve':
+            return self._solve(request)
+        raise RequestError(f'Unknown op: {op!r}')
+
+    @staticmethod
+    def _batch(request: dict, key: str) -> list:
+        items = request[key]
+        if not isinstance(items, list) or not items:
+            raise RequestError(f"'{key}' must be a non-empty list")
+        if len(items) > MAX_BATCH:
+            raise RequestError(f"Too many {key} (max {MAX_BATCH})")
+        return items
+
+    def _elevation(self, request: dict):
+        solver = self.solver(request.get('map'))
+        if 'positions' in request:
+            xy = np.array([solver.position(p) for p in self._batch(request, 'positions')])
+            return solver.elevation_at(xy[:, 0], xy[:, 1]).tolist()
+        x, y = solver.position(request.get('position'))
+        return {'x': x, 'y': y, 'elevation': float(solver.elevation_at(x, y))}
+
+    def _solve(self, request: dict):
+        solver = self.solver(request.get('map'))
+        mx, my = solver.position(request.get('mortar'))
+        if 'targets' in request:
+            xy = np.array([solver.position(t) for t in self._batch(request, 'targets')])
+            solutions = solver.solve_positions(mx, my, xy[:, 0], xy[:, 1])
+            return [solution_to_dict(solutions, i) for i in range(len(xy))]
+        tx, ty = solver.position(request.get('target'))
+        return solution_to_dict(solver.solve_positions(mx, my, tx, ty), ())
+
+    def respond(self, data: bytes, encode: Callable[[dict], bytes]) -> bytes:
+        """Decode, answer and encode one request."""
+        try:
+            request = json.loads(data)
+        except ValueError as e:
+            return encode({'error': f'Invalid JSON: {e}'})
+        return encode(self.handle(request))
+
+    async def _respond(self, data: bytes, encode: Callable[[dict], bytes]) -> bytes:
+        """respond() on the event loop for small requests on loaded maps, else in a thread."""
+        if len(data) <= INLINE_REQUEST_SIZE:
+            try:
+                request = json.loads(data)
+            except ValueError as e:
+                return encode({'error': f'Invalid JSON: {e}'})
+            if not self._loads_map(request):
+                return encode(self.handle(request))
+        return await asyncio.get_running_loop().run_in_executor(None, self.respond, data, encode)
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one connection until EOF, answering requests in order."""
+        try:
+            first = await reader.read(1)
+            if not first:
+                return
+            if first in b'{ \t\r\n':
+                await self._serve_lines(first, reader, writer)
+            else:
+                await self._serve_frames(first, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_lines(self, first: bytes, reader, writer) -> None:
+        try:
+            line = first + await reader.readline()
+            while line:
+                if line.strip():
+                    writer.write(await self._respond(line, _line))
+                    # Only wait for the socket when the client is not reading
+                    await writer.drain()
+                line = await reader.readline()
+        except ValueError:
+            # Line longer than the stream limit; the rest of it cannot be resynchronised
+            writer.write(_line({'error': f'Request line too long (max {MAX_FRAME_SIZE} bytes)'}))
+            await writer.drain()
+
+    async def _serve_frames(self, first: bytes, reader, writer) -> None:
+        header = first + await reader.readexactly(_LENGTH.size - 1)
+        while True:
+            (size,) = _LENGTH.unpack(header)
+            if size > MAX_FRAME_SIZE:
+                writer.write(_frame({'error': f'Frame too large ({size} bytes)'}))
+                await writer.drain()
+                return
+            writer.write(await self._respond(await reader.readexactly(size), _frame))
+            await writer.drain()
+            header = await reader.read(_LENGTH.size)
+            if not header:
+                return
+            if len(header) < _LENGTH.size:
+                header += await reader.readexactly(_LENGTH.size - len(header))
+
+
+def _frame(response: dict) -> bytes:
+    payload = json.dumps(response).encode()
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def _line(response: dict) -> bytes:
+    return json.dumps(response).encode() + b'\n'
+
+
+async def start_server(daemon: SolverDaemon, socket_path: Path) -> asyncio.AbstractServer:
+    """Listen on a Unix socket (owner-only), replacing a stale socket file.
+
+    Raises:
+        RuntimeError: If Unix sockets are unsupported or another daemon is listening
+    """
+    if not hasattr(asyncio, 'start_unix_server'):
+        raise RuntimeError('Unix domain sockets are not supported on this platform')
+    socket_path = Path(socket_path)
+    if socket_path.exists():
+        try:
+            _, probe = await asyncio.open_unix_connection(str(socket_path))
+        except OSError:
+            socket_path.unlink()
+        else:
+            probe.close()
+            raise RuntimeError(f'A daemon is already listening on {socket_path}')
+    # Stream limit: NDJSON batch requests may be as long as a frame
+    server = await asyncio.start_unix_server(daemon.serve_client, path=str(socket_path), limit=MAX_FRAME_SIZE)
+    os.chmod(socket_path, 0o600)
+    return server
+
+
+async def run_benchmark(daemon: SolverDaemon, socket_path: Path, map_name: str,
+                        requests: int = 5000) -> dict:
+    """Round-trip latency of single solve requests over the socket (warm map).
+
+    Returns:
+        Dict with requests, p50_ms, p95_ms, p99_ms, max_ms
+    """
+    daemon.solver(map_name)
+    server = await start_server(daemon, socket_path)
+    try:
+        reader, writer = await asyncio.open_unix_connection(str(socket_path))
+        rng = np.random.default_rng(0)
+        map_size = daemon.solver(map_name).map_data.map_size
+        points = rng.uniform(0, map_size, (requests, 4)).tolist()
+        latencies = []
+        for i, (mx, my, tx, ty) in enumerate(points):
+            line = json.dumps({'id': i, 'op': 'solve', 'map': map_name,
+                               'mortar': {'x': mx, 'y': my}, 'target': {'x': tx, 'y': ty}})
+            start = time.perf_counter()
+            writer.write(line.encode() + b'\n')
+            await reader.readline()
+            latencies.append(time.perf_counter() - start)
+        writer.close()
+        await writer.wait_closed()
+        await asyncio.sleep(0.01)  # let the handler see EOF before shutdown
+    finally:
+        server.close()
+        await server.wait_closed()
+        Path(socket_path).unlink(missing_ok=True)
+
+    ms = np.array(latencies) * 1000
+    return {
+        'requests': requests,
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(ms.max()),
+    }
+
+
+async def _serve_forever(daemon: SolverDaemon, socket_path: Path, preload: Iterable[str]) -> None:
+    for map_name in preload:
+        daemon.solver(map_name)
+        print(f"[OK] Loaded {map_name}")
+    server = await start_server(daemon, socket_path)
+    print(f"[OK] Solver daemon listening on {socket_path}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        Path(socket_path).unlink(missing_ok=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m calculator.daemon',
+                                     description='Low-latency solver daemon on a Unix domain socket')
+    parser.add_argument('--socket', type=Path, default=DEFAULT_SOCKET_PATH,
+                        help=f'Socket path (default: {DEFAULT_SOCKET_PATH})')
+    parser.add_argument('--preload', nargs='*', default=[], metavar='MAP',
+                        help='Maps to load before accepting connections')
+    parser.add_argument('--maps-dir', type=Path, default=DEFAULT_MAPS_DIR,
+                        help='processed_maps directory (default: next to the calculator package)')
+    parser.add_argument('--bench', metavar='MAP',
+                        help='Measure request latency against MAP on a temporary socket and exit')
+    args = parser.parse_args(argv)
+
+    daemon = SolverDaemon(args.maps_dir)
+    try:
+        if args.bench:
+            socket_path = args.socket.with_name(f'{args.socket.name}.bench{os.getpid()}')
+            print(json.dumps(asyncio.run(run_benchmark(daemon, socket_path, args.bench)), indent=2))
+        else:
+            asyncio.run(_serve_forever(daemon, args.socket, args.preload))
+    except (RuntimeError, RequestError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("\nSolver daemon stopped.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Monte Carlo Dispersion Estimator
+
+Mortar rounds in PR do not land exactly where the ideal firing solution
+says. This module samples many perturbed shots for one mortar/target pair
+in a single NumPy batch: elevation, azimuth and muzzle velocity are drawn
+from normal distributions around the ideal solution, each trajectory is
+intersected with the real heightmap, and the resulting impact cloud is
+summarised as a CEP and a hit-probability heatmap for a splash radius.
+
+Terrain intersection only marches the descending branch of each flight,
+from the moment the shell drops below the highest point of the map until
+it passes the lowest (high-angle fire clears terrain on the way up - the
+same assumption the firing solution makes). With the map's terrain
+acceleration structures (calculator/terrain.py) those bounds narrow to the
+terrain under the rounds' descent instead of the whole map, which skips
+most of the march. Coarse steps find the first sample below ground, then a
+few bisection passes refine every round at once.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from calculator.ballistics import (GRAVITY, PROJECTILE_VELOCITY, calculate_firing_solutions,
+                                   solution_to_dict)
+from calculator.heightmap import MapData
+from calculator.terrain import TerrainAccel
+
+# Default spread (one standard deviation); tuned to match in-game groupings
+DEFAULT_ELEVATION_SIGMA_MILS = 2.0
+DEFAULT_AZIMUTH_SIGMA_MILS = 3.0
+DEFAULT_VELOCITY_SIGMA = 0.002  # fraction of PROJECTILE_VELOCITY
+DEFAULT_SPLASH_RADIUS = 20.0    # meters
+DEFAULT_ROUNDS = 10000
+MAX_ROUNDS = 100000
+
+# Path length between coarse terrain samples, and bisection passes after that
+COARSE_STEP_METERS = 8.0
+REFINE_ITERATIONS = 8
+
+HEATMAP_CELLS = 41
+MILS_TO_RADIANS = 2 * np.pi / 6400
+
+
+def _position(start, azimuth, elevation, velocity, t):
+    """World XYZ after t seconds of flight (azimuth/elevation in radians)."""
+    horizontal = velocity * np.cos(elevation) * t
+    x = start[0] + horizontal * np.sin(azimuth)
+    y = start[1] - horizontal * np.cos(azimuth)  # North is -Y
+    z = start[2] + velocity * np.sin(elevation) * t - 0.5 * GRAVITY * t * t
+    return x, y, z
+
+
+def _descent_time(elevation, velocity, height_diff):
+    """Time at which the descending shell passes height_diff above the start."""
+    v_sin = velocity * np.sin(elevation)
+    disc = np.maximum(v_sin * v_sin - 2 * GRAVITY * height_diff, 0.0)
+    return (v_sin + np.sqrt(disc)) / GRAVITY
+
+
+def _descent_bounds(terrain: TerrainAccel, mortar_xyz, azimuth, elevation, velocity) -> Tuple[float, float]:
+    """Terrain (min, max) in meters under every round's possible impact path.
+
+    Between the map's highest and lowest points x and y are linear in t, so
+    each path lies in the box spanned by its two ends; the pyramid bounds
+    the terrain under the box of all rounds in O(1).
+    """
+    scale = terrain.height_scale / 65535.0
+    xs, ys = [], []
+    for height in (terrain.stats['max'] * scale, terrain.stats['min'] * scale - 1.0):
+        x, y, _ = _position(mortar_xyz, azimuth, elevation, velocity,
+                            _descent_time(elevation, velocity, height - mortar_xyz[2]))
+        xs.append(x)
+        ys.append(y)
+    x, y = np.concatenate(xs), np.concatenate(ys)
+    return terrain.region_min_max(float(x.min()), float(y.min()), float(x.max()), float(y.max()))
+
+
+def simulate_impacts(map_data: MapData, mortar_xyz, azimuth, elevation, velocity,
+                     terrain: Optional[TerrainAccel] = None) -> np.ndarray:
+    """Intersect a batch of trajectories with the terrain.
+
+    Args:
+        map_data: Map to fire on
+        mortar_xyz: (x, y, z) firing position in meters
+        azimuth, elevation: (N,) launch angles in radians
+        velocity: (N,) muzzle velocities in m/s
+        terrain: The map's acceleration structures, to bound the march by
+            the terrain under the rounds instead of the whole heightmap
+
+    Returns:
+        (N, 3) impact positions in meters
+    """
+    if terrain is not None:
+        ground_low, ground_high = _descent_bounds(terrain, mortar_xyz, azimuth, elevation, velocity)
+    else:
+        scale = map_data.height_scale / 65535.0
+        ground_low = float(map_data.heightmap.min()) * scale
+        ground_high = float(map_data.heightmap.max()) * scale
+    top = ground_high - mortar_xyz[2]
+    bottom = ground_low - mortar_xyz[2]
+
+    # Rounds cannot touch the ground before t_start and must have by t_end
+    t_start = _descent_time(elevation, velocity, top)
+    t_end = _descent_time(elevation, velocity, bottom - 1.0)
+    dt = COARSE_STEP_METERS / velocity
+
+    low = t_start.copy()          # last time known above ground
+    high = t_end.copy()           # first time known at/below ground
+    pending = np.ones(len(low), dtype=bool)
+    t = t_start.copy()
+    while pending.any():
+        index = np.flatnonzero(pending)
+        t[index] = np.minimum(t[index] + dt[index], t_end[index])
+        x, y, z = _position(mortar_xyz, azimuth[index], elevation[index], velocity[index], t[index])
+        hit = (z <= map_data.elevation_at(x, y)) | (t[index] >= t_end[index])
+        high[index[hit]] = t[index[hit]]
+        low[index[~hit]] = t[index[~hit]]
+        pending[index[hit]] = False
+
+    for _ in range(REFINE_ITERATIONS):
+        mid = 0.5 * (low + high)
+        x, y, z = _position(mortar_xyz, azimuth, elevation, velocity, mid)
+        below = z <= map_data.elevation_at(x, y)
+        high = np.where(below, mid, high)
+        low = np.where(below, low, mid)
+
+    x, y, _ = _position(mortar_xyz, azimuth, elevation, velocity, high)
+    return np.column_stack([x, y, map_data.elevation_at(x, y)])
+
+
+def hit_probability_grid(impacts: np.ndarray, center, splash_radius: float,
+                         cells: int = HEATMAP_CELLS) -> Dict[str, object]:
+    """Probability that a round lands within splash_radius of each cell centre.
+
+    The impact cloud is binned into a square grid centred on ``center`` and
+    convolved (FFT) with a disc of the splash radius, so the cost does not
+    depend on the number of rounds beyond the histogram.
+    """
+    offsets = impacts[:, :2] - np.asarray(center, dtype=np.float64)
+    reach = float(np.percentile(np.hypot(offsets[:, 0], offsets[:, 1]), 99)) if len(offsets) else 0.0
+    half_width = reach + splash_radius
+    cell_size = 2 * half_width / cells
+
+    edges = np.linspace(-half_width, half_width, cells + 1)
+    counts, _, _ = np.histogram2d(offsets[:, 1], offsets[:, 0], bins=(edges, edges))
+
+    radius_cells = int(np.ceil(splash_radius / cell_size))
+    kernel_axis = np.arange(-radius_cells, radius_cells + 1) * cell_size
+    kernel = (np.hypot(kernel_axis[:, None], kernel_axis[None, :]) <= splash_radius).astype(np.float64)
+
+    size = cells + 2 * radius_cells
+    spectrum = np.fft.rfft2(counts, (size, size)) * np.fft.rfft2(kernel, (size, size))
+    convolved = np.fft.irfft2(spectrum, (size, size))[radius_cells:radius_cells + cells,
+                                                      radius_cells:radius_cells + cells]
+    probability = np.clip(np.rint(convolved) / max(len(impacts), 1), 0.0, 1.0)
+    return {
+        'origin': [float(center[0] - half_width), float(center[1] - half_width)],
+        'cell_size': cell_size,
+        'cells': cells,
+        'probability': probability,
+    }
+
+
+def estimate_dispersion(map_data: MapData, mortar_xy, target_xy, rounds: int = DEFAULT_ROUNDS,
+                        elevation_sigma_mils: float = DEFAULT_ELEVATION_SIGMA_MILS,
+                        azimuth_sigma_mils: float = DEFAULT_AZIMUTH_SIGMA_MILS,
+                        velocity_sigma: float = DEFAULT_VELOCITY_SIGMA,
+                        splash_radius: float = DEFAULT_SPLASH_RADIUS,
+                        seed: Optional[int] = None,
+                        terrain: Optional[TerrainAccel] = None) -> Dict[str, object]:
+    """Simulate ``rounds`` perturbed shots at one target (terrain: see simulate_impacts()).
+
+    Returns:
+        Dict with the ideal ``solution`` (as solution_to_dict()), the
+        ``impacts`` array (N, 3), ``miss`` distances from the target, ``cep``
+        (50% radius), ``r90``, ``mean_point_of_impact``, ``hit_probability``
+        at the target and the ``heatmap`` (see hit_probability_grid())
+
+    Raises:
+        ValueError: If the target cannot be reached or a parameter is out of range
+    """
+    if not 1 <= rounds <= MAX_ROUNDS:
+        raise ValueError(f'rounds must be 1-{MAX_ROUNDS}')
+    if min(elevation_sigma_mils, azimuth_sigma_mils, velocity_sigma) < 0 or splash_radius <= 0:
+        raise ValueError('Spread must be non-negative and splash_radius positive')
+
+    mortar_z = float(map_data.elevation_at(mortar_xy[0], mortar_xy[1]))
+    target_z = float(map_data.elevation_at(target_xy[0], target_xy[1]))
+    solutions = calculate_firing_solutions(mortar_xy[0], mortar_xy[1], mortar_z,
+                                           target_xy[0], target_xy[1], target_z)
+    solution = solution_to_dict(solutions, ())
+    if not solution['valid']:
+        raise ValueError(solution['message'])
+
+    rng = np.random.default_rng(seed)
+    elevation = solution['elevationRadians'] + rng.normal(0, elevation_sigma_mils * MILS_TO_RADIANS, rounds)
+    azimuth = np.radians(solution['azimuth']) + rng.normal(0, azimuth_sigma_mils * MILS_TO_RADIANS, rounds)
+    velocity = PROJECTILE_VELOCITY * (1 + rng.normal(0, velocity_sigma, rounds))
+
+    impacts = simulate_impacts(map_data, (float(mortar_xy[0]), float(mortar_xy[1]), mortar_z),
+                               azimuth, elevation, velocity, terrain)
+    miss = np.hypot(impacts[:, 0] - target_xy[0], impacts[:, 1] - target_xy[1])
+    return {
+        'solution': solution,
+        'impacts': impacts,
+        'miss': miss,
+        'cep': float(np.median(miss)),
+        'r90': float(np.percentile(miss, 90)),
+        'mean_point_of_impact': [float(impacts[:, 0].mean()), float(impacts[:, 1].mean())],
+        'hit_probability': float(np.count_nonzero(miss <= splash_radius) / rounds),
+        'heatmap': hit_probability_grid(impacts, target_xy, splash_radius),
+    }
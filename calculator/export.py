@@ -0,0 +1,342 @@
+"""
+Bulk Solution Export (columnar NumPy archives)
+
+Computes firing-solution grids for chosen mortar positions across one or
+many maps for offline analysis:
+
+    python -m calculator.export muttrah_city_2 kashan_desert --mortars D6-5 E7-3 -o exports/
+    python -m calculator.export --positions campaign.json --spacing 10 --jobs 4 -o exports/
+
+Every mortar is solved against the centres of a square target grid
+(--spacing meters) covering the map. Each map is written as one
+compressed .npz archive (<map>.npz) with one array per column, one row
+per mortar/target pair:
+
+    mortar          uint16   index into mortar_xy / mortar_z / metadata.mortars
+    target_x/y/z    float32  target position and terrain elevation (m)
+    distance        float32  (m)
+    azimuth         float32  (degrees)
+    height_delta    float32  target minus mortar elevation (m)
+    elevation_mils  float32  NaN when unreachable
+    time_of_flight  float32  (s), NaN when unreachable
+    valid           bool
+    status          uint8    index into ballistics.STATUS_NAMES
+    mortar_xy       float64  (M, 2), mortar_z float32 (M,)
+    metadata        JSON text (map, map_size, grid_scale, spacing, mortars, ...)
+
+--positions takes a JSON object mapping map names to mortar positions
+(grid references or {"x", "y"}). Maps are solved in --jobs worker
+processes. load_export() opens an archive lazily: columns are read only
+when used, and then memory-mapped (see SolutionExport).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from calculator.ballistics import STATUS_NAMES
+from calculator.coordinates import resolve_positions
+from calculator.fire_plan import solution_matrix
+from calculator.heightmap import MapData
+from calculator.solve import DEFAULT_MAPS_DIR
+
+FORMAT_VERSION = 1
+DEFAULT_SPACING = 25.0
+
+# Targets solved per vectorised batch (bounds memory for fine grids)
+TARGET_CHUNK = 65536
+
+# Per-row columns in archive order, with their stored dtypes
+COLUMNS = (
+    ('mortar', np.uint16),
+    ('target_x', np.float32),
+    ('target_y', np.float32),
+    ('target_z', np.float32),
+    ('distance', np.float32),
+    ('azimuth', np.float32),
+    ('height_delta', np.float32),
+    ('elevation_mils', np.float32),
+    ('time_of_flight', np.float32),
+    ('valid', np.bool_),
+    ('status', np.uint8),
+)
+
+# Uncompressed copies of compressed archive columns, memory-mapped on load
+EXPORT_CACHE_DIR = Path(tempfile.gettempdir()) / 'pr_mortar_calculator' / 'exports'
+
+
+def target_grid(map_size: float, spacing: float) -> np.ndarray:
+    """Centres of square cells of spacing meters covering the map, shape (N, 2)."""
+    axis = np.arange(spacing / 2, map_size, spacing)
+    xs, ys = np.meshgrid(axis, axis)
+    return np.column_stack([xs.ravel(), ys.ravel()])
+
+
+def solve_map(map_dir: Path, mortars: Sequence, spacing: float = DEFAULT_SPACING) -> Dict[str, np.ndarray]:
+    """Solution columns (see COLUMNS) plus mortar tables and metadata for one map.
+
+    Raises:
+        ValueError: If a mortar position cannot be resolved
+    """
+    map_data = MapData(map_dir)
+    mortars_xy = resolve_positions(list(mortars), map_data.grid_scale)
+    mortar_z = map_data.elevation_at(mortars_xy[:, 0], mortars_xy[:, 1])
+    targets_xy = target_grid(map_data.map_size, spacing)
+    target_z = map_data.elevation_at(targets_xy[:, 0], targets_xy[:, 1]).astype(np.float32)
+
+    rows = len(mortars_xy) * len(targets_xy)
+    columns = {name: np.empty(rows, dtype=dtype) for name, dtype in COLUMNS}
+    columns['mortar'] = np.repeat(np.arange(len(mortars_xy), dtype=np.uint16), len(targets_xy))
+    columns['target_x'] = np.tile(targets_xy[:, 0].astype(np.float32), len(mortars_xy))
+    columns['target_y'] = np.tile(targets_xy[:, 1].astype(np.float32), len(mortars_xy))
+    columns['target_z'] = np.tile(target_z, len(mortars_xy))
+
+    for start in range(0, len(targets_xy), TARGET_CHUNK):
+        chunk = slice(start, start + TARGET_CHUNK)
+        solutions = solution_matrix(map_data, mortars_xy, targets_xy[chunk])
+        for i in range(len(mortars_xy)):
+            rows_out = slice(i * len(targets_xy) + start, i * len(targets_xy) + start + solutions['valid'].shape[1])
+            for name in ('distance', 'azimuth', 'height_delta', 'elevation_mils', 'time_of_flight',
+                         'valid', 'status'):
+                columns[name][rows_out] = solutions[name][i]
+
+    metadata = {
+        'format_version': FORMAT_VERSION,
+        'map': map_data.name,
+        'map_size': map_data.map_size,
+        'grid_scale': map_data.grid_scale,
+        'spacing': spacing,
+        'targets_per_mortar': len(targets_xy),
+        'mortars': [m if isinstance(m, str) else {'x': float(x), 'y': float(y)}
+                    for m, (x, y) in zip(mortars, mortars_xy.tolist())],
+        'status_names': list(STATUS_NAMES),
+        'created': time.time(),
+    }
+    columns['mortar_xy'] = mortars_xy
+    columns['mortar_z'] = mortar_z.astype(np.float32)
+    columns['metadata'] = np.array(json.dumps(metadata))
+    return columns
+
+
+def write_export(path: Path, columns: Dict[str, np.ndarray], compress: bool = True) -> None:
+    """Write columns to path as a .npz archive (atomically, via a temp file)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique temp file: concurrent writers of the same path must not share one
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'{path.stem}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            (np.savez_compressed if compress else np.savez)(f, **columns)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def export_map(map_dir: Path, mortars: Sequence, out_path: Path, spacing: float = DEFAULT_SPACING,
+               compress: bool = True) -> Tuple[str, int, int, float]:
+    """Solve and write one map (worker entry point).
+
+    Returns:
+        (map name, rows, archive size in bytes, seconds)
+    """
+    start = time.perf_counter()
+    columns = solve_map(map_dir, mortars, spacing)
+    write_export(out_path, columns, compress)
+    return Path(map_dir).name, len(columns['mortar']), Path(out_path).stat().st_size, time.perf_counter() - start
+
+
+class SolutionExport:
+    """Lazily loaded export archive; columns by name (export['elevation_mils']).
+
+    Columns stored uncompressed are memory-mapped straight from the archive.
+    Compressed columns are decompressed once into cache_dir as .npy files
+    (keyed by the archive's path, size and mtime) and memory-mapped from
+    there. Without a cache_dir they are read into memory on first use.
+    """
+
+    def __init__(self, path: Path, cache_dir: Optional[Path] = EXPORT_CACHE_DIR):
+        self.path = Path(path)
+        self._zip = zipfile.ZipFile(self.path)
+        self._members = {Path(info.filename).stem: info for info in self._zip.infolist()}
+        self._arrays: Dict[str, np.ndarray] = {}
+        stat = self.path.stat()
+        key = hashlib.sha256(f'{self.path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()[:16]
+        self._cache_dir = Path(cache_dir) / f'{self.path.stem}-{key}' if cache_dir is not None else None
+        with self._zip.open(self._members['metadata']) as f:
+            self.metadata = json.loads(str(np.lib.format.read_array(f)))
+
+    def __enter__(self) -> 'SolutionExport':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._zip.close()
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._members)
+
+    def __len__(self) -> int:
+        return self.metadata['targets_per_mortar'] * len(self.metadata['mortars'])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self._arrays:
+            if name not in self._members:
+                raise KeyError(name)
+            self._arrays[name] = self._load(self._members[name])
+        return self._arrays[name]
+
+    def _load(self, info: zipfile.ZipInfo) -> np.ndarray:
+        if info.compress_type == zipfile.ZIP_STORED:
+            array = self._map_stored(info)
+            if array is not None:
+                return array
+        if self._cache_dir is None:
+            with self._zip.open(info) as f:
+                return np.lib.format.read_array(f)
+        cached = self._cache_dir / info.filename
+        if not cached.is_file():
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            # Unique temp file: two threads may unpack the same column at once
+            fd, tmp = tempfile.mkstemp(dir=self._cache_dir, prefix=f'{cached.stem}.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as dst, self._zip.open(info) as src:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+                os.replace(tmp, cached)
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+        return np.load(cached, mmap_mode='r')
+
+    def _map_stored(self, info: zipfile.ZipInfo) -> Optional[np.ndarray]:
+        """Memory-map an uncompressed .npy member in place (None if not mappable)."""
+        with open(self.path, 'rb') as f:
+            f.seek(info.header_offset)
+            local = f.read(30)
+            if local[:4] != b'PK\x03\x04':
+                return None
+            name_length = int.from_bytes(local[26:28], 'little')
+            extra_length = int.from_bytes(local[28:30], 'little')
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+        if dtype.hasobject:
+            return None
+        return np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                         order='F' if fortran_order else 'C')
+
+
+def load_export(path: Path, cache_dir: Optional[Path] = EXPORT_CACHE_DIR) -> SolutionExport:
+    """Open an export archive written by this module (see SolutionExport).
+
+    Raises:
+        ValueError: If the archive is from a newer export format
+    """
+    export = SolutionExport(path, cache_dir)
+    if export.metadata.get('format_version', 0) > FORMAT_VERSION:
+        export.close()
+        raise ValueError(f"{path} uses export format {export.metadata['format_version']}; "
+                         f"this version reads up to {FORMAT_VERSION}")
+    return export
+
+
+def _read_positions(path: Path) -> Dict[str, List]:
+    """Mortar positions per map from a JSON file ({"map": [positions...]})."""
+    with open(path, 'r', encoding='utf-8') as f:
+        positions = json.load(f)
+    if not isinstance(positions, dict) or not all(isinstance(v, list) and v for v in positions.values()):
+        raise ValueError('positions file must map map names to non-empty lists of positions')
+    return positions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m calculator.export',
+        description='Export firing-solution grids for mortar positions to compressed .npz archives')
+    parser.add_argument('maps', nargs='*', help='Processed map names (used with --mortars)')
+    parser.add_argument('--mortars', nargs='+', default=[],
+                        help='Mortar grid references, solved on every listed map')
+    parser.add_argument('--positions', type=Path,
+                        help='JSON file mapping map names to mortar positions (instead of maps/--mortars)')
+    parser.add_argument('-o', '--output-dir', type=Path, default=Path('exports'),
+                        help='Directory for <map>.npz archives (default: ./exports)')
+    parser.add_argument('--spacing', type=float, default=DEFAULT_SPACING,
+                        help=f'Target grid spacing in meters (default: {DEFAULT_SPACING:g})')
+    parser.add_argument('--store', action='store_true',
+                        help='Write uncompressed archives, memory-mapped in place when loaded')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help=f'Maps solved in parallel (default: {os.cpu_count()})')
+    parser.add_argument('--maps-dir', type=Path, default=DEFAULT_MAPS_DIR,
+                        help='processed_maps directory (default: next to the calculator package)')
+    args = parser.parse_args(argv)
+
+    if args.positions is not None:
+        if args.maps or args.mortars:
+            parser.error('use either --positions or maps with --mortars')
+        try:
+            work = _read_positions(args.positions)
+        except (OSError, ValueError) as e:
+            parser.error(f'could not read {args.positions}: {e}')
+    else:
+        if not args.maps or not args.mortars:
+            parser.error('give map names and --mortars, or --positions')
+        work = {name: args.mortars for name in args.maps}
+    if not args.spacing > 0:
+        parser.error('--spacing must be positive')
+    missing = [name for name in work if not (args.maps_dir / name / 'metadata.json').is_file()]
+    if missing:
+        parser.error(f"unknown map(s): {', '.join(missing)}")
+
+    print("=" * 80)
+    print(f"Exporting solution grids for {len(work)} map(s) to {args.output_dir} "
+          f"(spacing {args.spacing:g} m, {args.jobs} job(s))")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    total_rows = total_bytes = 0
+    failed = []
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(work)))) as executor:
+        futures = {
+            executor.submit(export_map, args.maps_dir / name, mortars, args.output_dir / f'{name}.npz',
+                            args.spacing, not args.store): name
+            for name, mortars in work.items()
+        }
+        for future, name in futures.items():
+            try:
+                _, rows, size, seconds = future.result()
+            except (OSError, ValueError) as e:
+                print(f"  ✗ {name}: {e}")
+                failed.append(name)
+                continue
+            total_rows += rows
+            total_bytes += size
+            print(f"  ✓ {name}: {rows:,} rows, {size / 1024 / 1024:.1f} MB in {seconds:.1f}s")
+
+    elapsed = time.perf_counter() - start
+    print("=" * 80)
+    print(f"{total_rows:,} rows, {total_bytes / 1024 / 1024:.1f} MB in {elapsed:.1f}s"
+          + (f"; failed: {', '.join(failed)}" if failed else ''))
+    print("=" * 80)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
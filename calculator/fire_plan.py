@@ -0,0 +1,235 @@
+"""
+Multi-Mortar Fire Plan Optimizer
+
+Given several mortar positions and a list of targets on one map, computes the
+full mortars × targets solution matrix in a single vectorised pass and assigns
+each target to one mortar so that either the total or the maximum time of
+flight is minimised. Only range-valid solutions are ever assigned.
+
+By default the assignment is limited only by range, so every target some
+mortar can reach is assigned. An optional ``capacity`` caps the targets per
+mortar to spread the barrage across all tubes. Within a mortar, targets are
+ordered longest flight first so impacts land close together.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from calculator.ballistics import calculate_firing_solutions, solution_to_dict
+from calculator.heightmap import MapData
+
+OBJECTIVES = ('total', 'max')
+
+# Request size limits (squad leads plan 3-6 tubes and 20-50 targets)
+MAX_MORTARS = 16
+MAX_TARGETS = 200
+
+
+def solution_matrix(map_data: MapData, mortars_xy: np.ndarray,
+                    targets_xy: np.ndarray) -> Dict[str, np.ndarray]:
+    """Firing solutions for every mortar/target pair, each array shaped (M, T).
+
+    Elevations are sampled from the heightmap for all positions at once.
+    """
+    mortar_z = map_data.elevation_at(mortars_xy[:, 0], mortars_xy[:, 1])
+    target_z = map_data.elevation_at(targets_xy[:, 0], targets_xy[:, 1])
+    return calculate_firing_solutions(
+        mortars_xy[:, 0, None], mortars_xy[:, 1, None], mortar_z[:, None],
+        targets_xy[None, :, 0], targets_xy[None, :, 1], target_z[None, :],
+    )
+
+
+def _linear_sum_assignment(cost: np.ndarray) -> np.ndarray:
+    """Minimum-cost assignment of every row to a distinct column (rows <= cols).
+
+    Hungarian algorithm with potentials, O(rows² × cols), with the inner
+    column scan vectorised.
+
+    Returns:
+        Array of length rows holding the assigned column for each row
+    """
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.intp)    # p[j]: row (1-based) owning column j
+    way = np.zeros(m + 1, dtype=np.intp)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free[1:] & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+
+            candidates = np.where(free, minv, np.inf)
+            j1 = int(np.argmin(candidates))
+            delta = candidates[j1]
+
+            used_cols = np.flatnonzero(used)
+            u[p[used_cols]] += delta
+            v[used_cols] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    assignment = np.empty(n, dtype=np.intp)
+    for j in range(1, m + 1):
+        if p[j]:
+            assignment[p[j] - 1] = j - 1
+    return assignment
+
+
+def _assign(cost: np.ndarray, allowed: np.ndarray, capacity: int) -> np.ndarray:
+    """Assign targets to mortars minimising cost over allowed pairs.
+
+    The number of assigned targets is maximised first, then the summed cost.
+
+    Args:
+        cost: (M, T) cost per mortar/target pair
+        allowed: (M, T) bool mask of assignable pairs
+        capacity: Maximum targets per mortar
+
+    Returns:
+        (T,) mortar index per target, -1 where unassigned
+    """
+    num_mortars, num_targets = cost.shape
+    # Any unassigned target must cost more than all assigned ones combined
+    penalty = float(np.nansum(np.where(allowed, cost, 0))) + 1.0
+
+    # Rows are targets; columns are `capacity` slots per mortar plus one
+    # "unassigned" column per target so a full assignment always exists.
+    slots = np.where(allowed, cost, penalty).T          # (T, M)
+    matrix = np.concatenate([np.repeat(slots, capacity, axis=1),
+                             np.full((num_targets, num_targets), penalty)], axis=1)
+    columns = _linear_sum_assignment(matrix)
+
+    mortar = columns // capacity
+    assigned = columns < num_mortars * capacity
+    assigned[assigned] = allowed[mortar[assigned], np.flatnonzero(assigned)]
+    return np.where(assigned, mortar, -1)
+
+
+def _max_coverage(allowed: np.ndarray, capacity: int) -> int:
+    """Largest number of targets coverable using only allowed pairs.
+
+    Capacitated bipartite matching by augmenting paths (Kuhn's algorithm).
+    """
+    num_mortars, num_targets = allowed.shape
+    options = [np.flatnonzero(allowed[:, t]) for t in range(num_targets)]
+    owned: List[List[int]] = [[] for _ in range(num_mortars)]
+
+    def augment(target: int, visited: set) -> bool:
+        for m in options[target]:
+            if m in visited:
+                continue
+            visited.add(m)
+            if len(owned[m]) < capacity:
+                owned[m].append(target)
+                return True
+            for k, other in enumerate(owned[m]):
+                if augment(other, visited):
+                    owned[m][k] = target
+                    return True
+        return False
+
+    return sum(augment(t, set()) for t in range(num_targets))
+
+
+def assign_targets(time_of_flight: np.ndarray, valid: np.ndarray,
+                   objective: str = 'total', capacity: Optional[int] = None) -> np.ndarray:
+    """Choose a mortar for every target.
+
+    Args:
+        time_of_flight: (M, T) flight times in seconds
+        valid: (M, T) bool mask of range-valid solutions
+        objective: 'total' minimises the summed time of flight, 'max'
+            minimises the longest single flight (ties broken by total)
+        capacity: Maximum targets per mortar, default no limit
+
+    Returns:
+        (T,) mortar index per target, -1 for targets that cannot be covered
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Invalid objective: {objective}. Must be one of {', '.join(OBJECTIVES)}.")
+
+    num_mortars, num_targets = time_of_flight.shape
+    if num_mortars == 0 or num_targets == 0:
+        return np.full(num_targets, -1, dtype=np.intp)
+    # No mortar can take more targets than it can reach
+    reachable = int(np.count_nonzero(valid, axis=1).max())
+    capacity = max(1, min(reachable if capacity is None else int(capacity), reachable))
+
+    assignment = _assign(time_of_flight, valid, capacity)
+    if objective == 'total':
+        return assignment
+
+    # Bottleneck: smallest flight-time limit that still covers as many targets
+    covered = np.count_nonzero(assignment >= 0)
+    limits = np.unique(time_of_flight[valid])
+    low, high = 0, len(limits) - 1
+    while low < high:
+        mid = (low + high) // 2
+        within = valid & (time_of_flight <= limits[mid])
+        if _max_coverage(within, capacity) == covered:
+            high = mid
+        else:
+            low = mid + 1
+    if len(limits):
+        assignment = _assign(time_of_flight, valid & (time_of_flight <= limits[low]), capacity)
+    return assignment
+
+
+def plan_fire_missions(map_data: MapData, mortars_xy: np.ndarray, targets_xy: np.ndarray,
+                       objective: str = 'total', capacity: Optional[int] = None) -> dict:
+    """Build a complete fire plan: assignment plus per-mortar fire order.
+
+    Returns:
+        JSON-ready dict with a ``mortars`` list (each holding its ordered
+        ``fire_order``), the indices of ``unassigned`` targets and a ``summary``
+    """
+    solutions = solution_matrix(map_data, mortars_xy, targets_xy)
+    tof = solutions['time_of_flight']
+    num_mortars, num_targets = tof.shape
+    assignment = assign_targets(tof, solutions['valid'], objective, capacity)
+
+    mortars: List[dict] = []
+    for m in range(num_mortars):
+        targets = np.flatnonzero(assignment == m)
+        targets = targets[np.argsort(-tof[m, targets], kind='stable')]
+        fire_order = [{'target': int(t), 'solution': solution_to_dict(solutions, (m, t))}
+                      for t in targets]
+        mortars.append({
+            'mortar': m,
+            'x': float(mortars_xy[m, 0]),
+            'y': float(mortars_xy[m, 1]),
+            'fire_order': fire_order,
+            'total_time_of_flight': float(tof[m, targets].sum()),
+        })
+
+    assigned = assignment >= 0
+    flight_times = tof[assignment[assigned], np.flatnonzero(assigned)]
+    return {
+        'objective': objective,
+        'capacity': capacity,
+        'mortars': mortars,
+        'unassigned': [int(t) for t in np.flatnonzero(~assigned)],
+        'summary': {
+            'targets': num_targets,
+            'assigned': int(assigned.sum()),
+            'total_time_of_flight': float(flight_times.sum()),
+            'max_time_of_flight': float(flight_times.max()) if flight_times.size else None,
+        },
+    }
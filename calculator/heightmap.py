@@ -0,0 +1,167 @@
+"""
+Heightmap Sampling Module (Python port of static/js/heightmap.js)
+
+Loads processed map data from processed_maps/<map>/ and samples terrain
+elevation with bilinear interpolation, vectorised over arrays of positions.
+
+Height Formula:
+    elevation_meters = (pixel_value / 65535) × height_scale
+"""
+
+import gzip
+import json
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+from calculator.blobs import resolve_map_file
+from calculator.heightmap_codec import CODEC_FILENAME, decode_heightmap
+
+# Caches for loaded data to avoid re-reading files (keyed by map directory)
+_heightmap_cache: Dict[str, np.ndarray] = {}
+_metadata_cache: Dict[str, dict] = {}
+
+
+def has_heightmap(map_dir: Path) -> bool:
+    """True if the map has a heightmap in either supported format."""
+    return (resolve_map_file(map_dir, CODEC_FILENAME) is not None
+            or resolve_map_file(map_dir, 'heightmap.json.gz') is not None)
+
+
+def load_heightmap(map_dir: Path) -> np.ndarray:
+    """Load a heightmap as a 2D uint16 array (rows = Y, columns = X).
+
+    Prefers the compact heightmap.bin codec file when present and falls
+    back to heightmap.json.gz. Either may live in the shared blob store.
+
+    Args:
+        map_dir: Processed map directory (e.g. processed_maps/muttrah_city_2)
+
+    Returns:
+        Array of shape (resolution, resolution), dtype uint16
+
+    Raises:
+        FileNotFoundError: If the heightmap file is missing
+        ValueError: If the file is malformed
+    """
+    key = str(map_dir)
+    if key in _heightmap_cache:
+        return _heightmap_cache[key]
+
+    codec_path = resolve_map_file(map_dir, CODEC_FILENAME)
+    if codec_path is not None:
+        heightmap = decode_heightmap(codec_path.read_bytes())
+        _heightmap_cache[key] = heightmap
+        return heightmap
+
+    json_path = resolve_map_file(map_dir, 'heightmap.json.gz')
+    if json_path is None:
+        raise FileNotFoundError(f'No heightmap found in {map_dir}')
+    with gzip.open(json_path, 'rb') as f:
+        heightmap_data = json.load(f)
+
+    if not heightmap_data.get('resolution') or not isinstance(heightmap_data.get('data'), list):
+        raise ValueError('Invalid heightmap format: missing required fields')
+
+    resolution = heightmap_data['resolution']
+    heightmap = np.array(heightmap_data['data'], dtype=np.uint16).reshape(resolution, resolution)
+    _heightmap_cache[key] = heightmap
+    return heightmap
+
+
+def load_metadata(map_dir: Path) -> dict:
+    """Load metadata.json for a processed map.
+
+    Raises:
+        FileNotFoundError: If metadata.json is missing
+        ValueError: If map_size or height_scale is missing
+    """
+    key = str(map_dir)
+    if key in _metadata_cache:
+        return _metadata_cache[key]
+
+    with open(Path(map_dir) / 'metadata.json', 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+
+    if not metadata.get('map_size') or not metadata.get('height_scale'):
+        raise ValueError('Invalid metadata format: missing required fields')
+
+    _metadata_cache[key] = metadata
+    return metadata
+
+
+def clear_cache(map_dir: Path = None) -> None:
+    """Clear cached heightmaps/metadata for one map, or all maps if omitted."""
+    if map_dir is None:
+        _heightmap_cache.clear()
+        _metadata_cache.clear()
+    else:
+        _heightmap_cache.pop(str(map_dir), None)
+        _metadata_cache.pop(str(map_dir), None)
+
+
+def world_to_pixel(x, y, map_size: float, resolution: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert world meters to fractional pixel coordinates (+1 border aware)."""
+    pixels_per_meter = (resolution - 1) / map_size
+    return (np.multiply(x, pixels_per_meter, dtype=np.float64),
+            np.multiply(y, pixels_per_meter, dtype=np.float64))
+
+
+def bilinear_interpolation(heightmap: np.ndarray, pixel_x, pixel_y) -> np.ndarray:
+    """Bilinearly interpolate raw height values (0-65535) at pixel positions.
+
+    Pixel coordinates must already be inside the heightmap; neighbours past
+    the last row/column are clamped exactly like bilinearInterpolation().
+    """
+    height, width = heightmap.shape
+    x0 = np.floor(pixel_x).astype(np.intp)
+    y0 = np.floor(pixel_y).astype(np.intp)
+    x1 = np.minimum(x0 + 1, width - 1)
+    y1 = np.minimum(y0 + 1, height - 1)
+    fx = pixel_x - x0
+    fy = pixel_y - y0
+
+    top_left = heightmap[y0, x0].astype(np.float64)
+    top_right = heightmap[y0, x1]
+    bottom_left = heightmap[y1, x0].astype(np.float64)
+    bottom_right = heightmap[y1, x1]
+
+    top = top_left + fx * (top_right - top_left)
+    bottom = bottom_left + fx * (bottom_right - bottom_left)
+    return top + fy * (bottom - top)
+
+
+def get_elevation(x, y, heightmap: np.ndarray, height_scale: float, map_size: float) -> np.ndarray:
+    """Elevation in meters at world XY positions (clamped to map bounds)."""
+    x = np.clip(np.asarray(x, dtype=np.float64), 0, map_size)
+    y = np.clip(np.asarray(y, dtype=np.float64), 0, map_size)
+    pixel_x, pixel_y = world_to_pixel(x, y, map_size, heightmap.shape[0])
+    raw_value = bilinear_interpolation(heightmap, pixel_x, pixel_y)
+    return (raw_value / 65535.0) * height_scale
+
+
+class MapData:
+    """Heightmap plus metadata for one processed map (see loadMapData())."""
+
+    def __init__(self, map_dir: Path):
+        self.map_dir = Path(map_dir)
+        self.name = self.map_dir.name
+        self.metadata = load_metadata(self.map_dir)
+        self.heightmap = load_heightmap(self.map_dir)
+
+    @property
+    def map_size(self) -> float:
+        return self.metadata['map_size']
+
+    @property
+    def height_scale(self) -> float:
+        return self.metadata['height_scale']
+
+    @property
+    def grid_scale(self) -> float:
+        return self.metadata.get('grid_scale') or self.map_size / 13
+
+    def elevation_at(self, x, y) -> np.ndarray:
+        """Terrain elevation in meters at world XY position(s)."""
+        return get_elevation(x, y, self.heightmap, self.height_scale, self.map_size)
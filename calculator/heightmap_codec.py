@@ -0,0 +1,162 @@
+"""
+Lossless Predictive Heightmap Codec (heightmap.bin)
+
+Terrain is smooth, so each sample is predicted from already-decoded
+neighbours and only the small prediction error is stored:
+
+1. Prediction (a = left, b = up, c = up-left; 0 outside the map):
+   - up:       b
+   - gradient: a + b - c  (inverse is a 2D prefix sum, fully vectorisable)
+   - paeth:    PNG Paeth predictor (decoded along anti-diagonals)
+2. Residuals (x - prediction mod 2^16, as int16) are zigzag-mapped to
+   uint16 so small negative and positive errors both become small numbers.
+3. Entropy stage: low-byte plane followed by high-byte plane, compressed
+   with zlib. Browsers inflate this natively (DecompressionStream('deflate')),
+   so the JavaScript decoder in heightmap.js is just step 1-2 in reverse.
+
+File layout (little-endian):
+    0  4s  magic b'PRHM'
+    4  B   format version (1)
+    5  B   predictor id (0 = up, 1 = gradient, 2 = paeth)
+    6  H   reserved (0)
+    8  I   width
+    12 I   height
+    16 ... zlib stream of 2 * width * height bytes
+"""
+
+import struct
+import zlib
+from typing import Optional, Tuple
+
+import numpy as np
+
+CODEC_FILENAME = 'heightmap.bin'
+MAGIC = b'PRHM'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sBBHII')
+
+PREDICTORS = ('up', 'gradient', 'paeth')
+
+
+def _neighbours(heightmap: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Left, up and up-left neighbours (int32), zero outside the map."""
+    padded = np.zeros((heightmap.shape[0] + 1, heightmap.shape[1] + 1), dtype=np.int32)
+    padded[1:, 1:] = heightmap
+    return padded[1:, :-1], padded[:-1, 1:], padded[:-1, :-1]
+
+
+def _paeth(a, b, c):
+    """PNG Paeth predictor: whichever of a, b, c is closest to a + b - c."""
+    p = a + b - c
+    pa, pb, pc = np.abs(p - a), np.abs(p - b), np.abs(p - c)
+    return np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+
+
+def predict(heightmap: np.ndarray, predictor: str) -> np.ndarray:
+    """Prediction for every sample from its (original) neighbours."""
+    a, b, c = _neighbours(heightmap)
+    if predictor == 'up':
+        return b
+    if predictor == 'gradient':
+        return a + b - c
+    if predictor == 'paeth':
+        return _paeth(a, b, c)
+    raise ValueError(f"Unknown predictor: {predictor}. Must be one of {', '.join(PREDICTORS)}.")
+
+
+def zigzag_encode(residuals: np.ndarray) -> np.ndarray:
+    """Map int16 residuals 0, -1, 1, -2, ... to uint16 0, 1, 2, 3, ..."""
+    r = residuals.astype(np.int32)
+    return ((r << 1) ^ (r >> 31)).astype(np.uint16)
+
+
+def zigzag_decode(values: np.ndarray) -> np.ndarray:
+    """Inverse of zigzag_encode, returning int32 residuals."""
+    v = values.astype(np.int32)
+    return (v >> 1) ^ -(v & 1)
+
+
+def encode_heightmap(heightmap: np.ndarray, predictor: Optional[str] = None, level: int = 9) -> bytes:
+    """Encode a 2D uint16 heightmap.
+
+    Args:
+        heightmap: Array of shape (height, width), dtype uint16
+        predictor: One of PREDICTORS, or None to try all and keep the smallest
+        level: zlib compression level
+
+    Returns:
+        Encoded bytes (header + zlib stream)
+    """
+    if predictor is None:
+        return min((encode_heightmap(heightmap, p, level) for p in PREDICTORS), key=len)
+
+    heightmap = np.asarray(heightmap, dtype=np.uint16)
+    residuals = ((heightmap.astype(np.int32) - predict(heightmap, predictor)) & 0xFFFF).astype(np.uint16)
+    zz = zigzag_encode(residuals.view(np.int16))
+    planes = np.concatenate([(zz & 0xFF).astype(np.uint8).ravel(), (zz >> 8).astype(np.uint8).ravel()])
+
+    height, width = heightmap.shape
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, PREDICTORS.index(predictor), 0, width, height)
+    return header + zlib.compress(planes.tobytes(), level)
+
+
+def read_header(data: bytes) -> Tuple[str, int, int]:
+    """Validate the header and return (predictor, width, height).
+
+    Raises:
+        ValueError: If the data is not a supported heightmap.bin file
+    """
+    if len(data) < HEADER.size:
+        raise ValueError('Invalid heightmap codec data: truncated header')
+    magic, version, predictor_id, _, width, height = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Invalid heightmap codec data: bad magic')
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Unsupported heightmap codec version: {version}')
+    if predictor_id >= len(PREDICTORS):
+        raise ValueError(f'Unknown heightmap predictor id: {predictor_id}')
+    return PREDICTORS[predictor_id], width, height
+
+
+def _decode_paeth(residuals: np.ndarray) -> np.ndarray:
+    """Undo Paeth prediction one anti-diagonal at a time.
+
+    Every sample on diagonal i + j = d depends only on diagonals d-1 and d-2,
+    so each diagonal is reconstructed with a single vectorised step.
+    """
+    height, width = residuals.shape
+    out = np.zeros((height + 1, width + 1), dtype=np.int32)
+    for d in range(height + width - 1):
+        rows = np.arange(max(0, d - width + 1), min(d, height - 1) + 1)
+        cols = d - rows
+        a = out[rows + 1, cols]
+        b = out[rows, cols + 1]
+        c = out[rows, cols]
+        out[rows + 1, cols + 1] = (_paeth(a, b, c) + residuals[rows, cols]) & 0xFFFF
+    return out[1:, 1:]
+
+
+def decode_heightmap(data: bytes) -> np.ndarray:
+    """Decode heightmap.bin bytes to a 2D uint16 array.
+
+    Raises:
+        ValueError: If the data is malformed
+    """
+    predictor, width, height = read_header(data)
+    try:
+        planes = np.frombuffer(zlib.decompress(data[HEADER.size:]), dtype=np.uint8)
+    except zlib.error as e:
+        raise ValueError(f'Invalid heightmap codec data: {e}') from None
+    if planes.size != 2 * width * height:
+        raise ValueError('Invalid heightmap codec data: wrong payload size')
+
+    zz = planes[:width * height].astype(np.uint16) | (planes[width * height:].astype(np.uint16) << 8)
+    residuals = zigzag_decode(zz).reshape(height, width).astype(np.int64)
+
+    if predictor == 'up':
+        heightmap = np.cumsum(residuals, axis=0)
+    elif predictor == 'gradient':
+        heightmap = np.cumsum(np.cumsum(residuals, axis=0), axis=1)
+    else:
+        heightmap = _decode_paeth(residuals)
+    return (heightmap & 0xFFFF).astype(np.uint16)
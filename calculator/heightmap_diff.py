@@ -0,0 +1,184 @@
+"""
+Heightmap Version Diffing
+
+Compares two versions of a map's heightmap so a patched map only has the
+pieces that actually changed rebuilt, and clients only drop the cached
+pieces that changed:
+
+- changed_blocks(): BLOCK_SIZE×BLOCK_SIZE pixel blocks containing a changed
+  sample (one vectorised comparison over the whole heightmap)
+- block_regions(): connected groups of changed blocks as pixel rectangles,
+  the unit processor/patch_map.py rebuilds derived files for
+- summarize_changes() / describe(): height change per grid square in
+  meters, e.g. "terrain raised in F7 (up to 4.20 m over 12% of the square)"
+
+build_change_record() combines these into the changes.json written next to
+the patched map's files.
+"""
+
+from collections import deque
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from calculator.coordinates import GRID_COLUMNS
+from calculator.terrain import heightmap_checksum
+
+CHANGES_FILENAME = 'changes.json'
+FORMAT_VERSION = 1
+
+# Pixel edge of the comparison blocks (a 1025 heightmap has 17×17 blocks)
+BLOCK_SIZE = 64
+
+GRID_SIZE = len(GRID_COLUMNS)
+
+# Height changes smaller than this (meters) are not called raised/lowered
+MIN_REPORTED_METERS = 0.05
+
+
+def changed_blocks(old: np.ndarray, new: np.ndarray, block_size: int = BLOCK_SIZE) -> np.ndarray:
+    """Boolean (block rows, block columns) mask of blocks with any changed sample.
+
+    Raises:
+        ValueError: If the heightmaps differ in shape (no block diff possible)
+    """
+    if old.shape != new.shape:
+        raise ValueError(f'Heightmap resolution changed ({old.shape[0]} -> {new.shape[0]}); '
+                         f'a full rebuild is needed')
+    rows, cols = old.shape
+    block_rows, block_cols = -(-rows // block_size), -(-cols // block_size)
+    changed = np.zeros((block_rows * block_size, block_cols * block_size), dtype=bool)
+    np.not_equal(old, new, out=changed[:rows, :cols])
+    return changed.reshape(block_rows, block_size, block_cols, block_size).any(axis=(1, 3))
+
+
+def block_regions(mask: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """Bounding boxes (row0, col0, row1, col1), end-exclusive, of 8-connected changed blocks."""
+    seen = np.zeros_like(mask, dtype=bool)
+    regions = []
+    for start in zip(*np.nonzero(mask)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        queue = deque([start])
+        row0, col0, row1, col1 = start[0], start[1], start[0] + 1, start[1] + 1
+        while queue:
+            r, c = queue.popleft()
+            row0, col0, row1, col1 = min(row0, r), min(col0, c), max(row1, r + 1), max(col1, c + 1)
+            for nr in range(max(r - 1, 0), min(r + 2, mask.shape[0])):
+                for nc in range(max(c - 1, 0), min(c + 2, mask.shape[1])):
+                    if mask[nr, nc] and not seen[nr, nc]:
+                        seen[nr, nc] = True
+                        queue.append((nr, nc))
+        regions.append((int(row0), int(col0), int(row1), int(col1)))
+    return regions
+
+
+def region_pixels(region: Tuple[int, int, int, int], shape: Tuple[int, int],
+                  block_size: int = BLOCK_SIZE) -> Tuple[int, int, int, int]:
+    """Pixel rectangle (row0, col0, row1, col1), end-exclusive, of a block region."""
+    row0, col0, row1, col1 = region
+    return (row0 * block_size, col0 * block_size,
+            min(row1 * block_size, shape[0]), min(col1 * block_size, shape[1]))
+
+
+def summarize_changes(old: np.ndarray, new: np.ndarray, metadata: dict) -> List[Dict[str, object]]:
+    """Height change per grid square, largest change first.
+
+    Returns:
+        [{'square': 'F7', 'pixels': changed samples, 'fraction': of the
+          square's samples, 'raised_m': max rise, 'lowered_m': max drop,
+          'mean_m': mean change of the changed samples}]
+    """
+    delta = new.astype(np.int32) - old.astype(np.int32)
+    rows, cols = np.nonzero(delta)
+    if rows.size == 0:
+        return []
+
+    resolution = old.shape[0]
+    map_size = metadata['map_size']
+    grid_scale = metadata.get('grid_scale') or map_size / GRID_SIZE
+    meters_per_pixel = metadata.get('meters_per_pixel') or map_size / (resolution - 1)
+    axis_square = np.minimum((np.arange(resolution) * meters_per_pixel // grid_scale).astype(np.intp),
+                             GRID_SIZE - 1)
+    samples_per_axis = np.bincount(axis_square, minlength=GRID_SIZE)
+
+    squares = axis_square[rows] * GRID_SIZE + axis_square[cols]
+    meters = delta[rows, cols] * (metadata['height_scale'] / 65535.0)
+    order = np.argsort(squares, kind='stable')
+    squares, meters = squares[order], meters[order]
+    starts = np.flatnonzero(np.r_[True, squares[1:] != squares[:-1]])
+    counts = np.diff(np.r_[starts, squares.size])
+
+    summary = []
+    for square, count, high, low, total in zip(squares[starts], counts, np.maximum.reduceat(meters, starts),
+                                               np.minimum.reduceat(meters, starts),
+                                               np.add.reduceat(meters, starts)):
+        row, col = divmod(int(square), GRID_SIZE)
+        summary.append({
+            'square': f'{GRID_COLUMNS[col]}{row + 1}',
+            'pixels': int(count),
+            'fraction': round(float(count / (samples_per_axis[row] * samples_per_axis[col])), 4),
+            'raised_m': round(max(float(high), 0.0), 2),
+            'lowered_m': round(max(-float(low), 0.0), 2),
+            'mean_m': round(float(total / count), 2),
+        })
+    summary.sort(key=lambda item: (-max(item['raised_m'], item['lowered_m']), item['square']))
+    return summary
+
+
+def describe(summary: List[Dict[str, object]]) -> List[str]:
+    """One human-readable line per summarize_changes() entry."""
+    lines = []
+    for item in summary:
+        share = f"{item['fraction']:.0%}" if item['fraction'] >= 0.01 else 'under 1%'
+        extent = f"{share} of the square"
+        raised = item['raised_m'] >= MIN_REPORTED_METERS
+        lowered = item['lowered_m'] >= MIN_REPORTED_METERS
+        if raised and lowered:
+            lines.append(f"terrain reshaped in {item['square']} "
+                         f"(+{item['raised_m']:.2f} m / -{item['lowered_m']:.2f} m over {extent})")
+        elif raised:
+            lines.append(f"terrain raised in {item['square']} (up to {item['raised_m']:.2f} m over {extent})")
+        elif lowered:
+            lines.append(f"terrain lowered in {item['square']} (up to {item['lowered_m']:.2f} m over {extent})")
+        else:
+            lines.append(f"terrain adjusted in {item['square']} "
+                         f"(under {MIN_REPORTED_METERS:.2f} m over {extent})")
+    return lines
+
+
+def build_change_record(old: np.ndarray, new: np.ndarray, metadata: dict,
+                        block_size: int = BLOCK_SIZE) -> dict:
+    """Everything known about a heightmap change, in the changes.json layout.
+
+    Raises:
+        ValueError: If the heightmaps differ in shape
+    """
+    mask = changed_blocks(old, new, block_size)
+    map_size = metadata['map_size']
+    meters_per_pixel = metadata.get('meters_per_pixel') or map_size / (old.shape[0] - 1)
+    regions = []
+    for region in block_regions(mask):
+        row0, col0, row1, col1 = region_pixels(region, old.shape, block_size)
+        regions.append({
+            'blocks': list(region),
+            'pixels': [row0, col0, row1, col1],
+            # World meters (x0, y0, x1, y1) of the samples in the region
+            'bounds': [round(col0 * meters_per_pixel, 2), round(row0 * meters_per_pixel, 2),
+                       round(min((col1 - 1) * meters_per_pixel, map_size), 2),
+                       round(min((row1 - 1) * meters_per_pixel, map_size), 2)],
+        })
+    squares = summarize_changes(old, new, metadata)
+    return {
+        'format_version': FORMAT_VERSION,
+        'from_crc32': heightmap_checksum(old),
+        'to_crc32': heightmap_checksum(new),
+        'resolution': int(old.shape[0]),
+        'block_size': block_size,
+        'changed_pixels': int(sum(item['pixels'] for item in squares)),
+        'blocks': [[int(r), int(c)] for r, c in zip(*np.nonzero(mask))],
+        'regions': regions,
+        'squares': squares,
+        'summary': describe(squares),
+    }
@@ -0,0 +1,184 @@
+"""
+Heightmap Tiles
+
+Serves a heightmap as fixed-size tiles so the UI fetches only the area a
+mortar can reach (the range circle) instead of the whole map.
+
+Tile (i, j) covers heightmap cells [i·TILE_SIZE, (i+1)·TILE_SIZE) in rows
+(north to south) and [j·TILE_SIZE, (j+1)·TILE_SIZE) in columns (west to
+east). It holds the samples at both ends, TILE_SIZE + 1 per axis (fewer in
+the last row/column of tiles), so neighbouring tiles share an edge and
+bilinear interpolation never needs a second tile.
+
+Each tile is sent in the heightmap.bin format (see heightmap_codec.py):
+the browser decodes it with the same decodeHeightmapCodec().
+
+Tiles are cut from a memory-mapped .npy copy of the heightmap kept in a
+cache directory and named by the content hash of the map's heightmap file,
+so after the first use a server (re)start opens the map without decoding
+it, and cutting a tile reads only the rows it needs.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from calculator.blobs import resolve_map_file
+from calculator.heightmap import load_heightmap
+from calculator.heightmap_codec import CODEC_FILENAME, encode_heightmap
+
+# Cells per tile edge; a 2049 heightmap has 8×8 tiles of 257×257 samples
+TILE_SIZE = 256
+
+# Codec settings for tiles: encoded on demand, so favour speed over the
+# last few percent (~3 ms and ~20 KB per tile)
+TILE_PREDICTOR = 'gradient'
+TILE_COMPRESS_LEVEL = 6
+
+# Encoded tiles kept in memory per map
+ENCODED_TILES_CACHED = 128
+
+_store_cache: Dict[str, 'TileStore'] = {}
+_store_lock = threading.Lock()
+
+
+def tile_grid(resolution: int, tile_size: int = TILE_SIZE) -> int:
+    """Tiles per axis for a heightmap of resolution samples."""
+    return max(-(-(resolution - 1) // tile_size), 1)
+
+
+def tile_bounds(resolution: int, i: int, j: int, tile_size: int = TILE_SIZE) -> Tuple[int, int, int, int]:
+    """Sample rectangle (row0, col0, row1, col1), end-exclusive, of tile (i, j).
+
+    Raises:
+        ValueError: If the tile is outside the map
+    """
+    count = tile_grid(resolution, tile_size)
+    if not (0 <= i < count and 0 <= j < count):
+        raise ValueError(f'Tile ({i}, {j}) outside the {count}x{count} tile grid')
+    row0, col0 = i * tile_size, j * tile_size
+    return row0, col0, min(row0 + tile_size + 1, resolution), min(col0 + tile_size + 1, resolution)
+
+
+def heightmap_source(map_dir: Path) -> Path:
+    """The file the map's heightmap is decoded from (heightmap.bin preferred).
+
+    Raises:
+        FileNotFoundError: If the map has no heightmap
+    """
+    for filename in (CODEC_FILENAME, 'heightmap.json.gz'):
+        path = resolve_map_file(map_dir, filename)
+        if path is not None:
+            return path
+    raise FileNotFoundError(f'No heightmap found in {map_dir}')
+
+
+class TileStore:
+    """Tiles of one map, cut from a (memory-mapped) heightmap array."""
+
+    def __init__(self, samples: np.ndarray, version: str, tile_size: int = TILE_SIZE):
+        self.samples = samples
+        self.version = version
+        self.tile_size = tile_size
+        self.resolution = samples.shape[0]
+        self.tiles_per_axis = tile_grid(self.resolution, tile_size)
+        self._encoded: 'OrderedDict[Tuple[int, int], bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def index(self) -> dict:
+        """Tile layout for clients (GET /maps/<map>/heightmap/tiles)."""
+        return {
+            'resolution': self.resolution,
+            'tile_size': self.tile_size,
+            'tiles': self.tiles_per_axis,
+            'version': self.version,
+        }
+
+    def tile(self, i: int, j: int) -> np.ndarray:
+        """Samples of tile (i, j) (a view; see tile_bounds())."""
+        row0, col0, row1, col1 = tile_bounds(self.resolution, i, j, self.tile_size)
+        return self.samples[row0:row1, col0:col1]
+
+    def encoded_tile(self, i: int, j: int) -> bytes:
+        """Tile (i, j) in the heightmap.bin format, encoded once and cached."""
+        key = (i, j)
+        with self._lock:
+            if key in self._encoded:
+                self._encoded.move_to_end(key)
+                return self._encoded[key]
+        data = encode_heightmap(np.ascontiguousarray(self.tile(i, j)), TILE_PREDICTOR, TILE_COMPRESS_LEVEL)
+        with self._lock:
+            self._encoded[key] = data
+            while len(self._encoded) > ENCODED_TILES_CACHED:
+                self._encoded.popitem(last=False)
+        return data
+
+
+def _write_tile_array(map_dir: Path, path: Path) -> None:
+    """Decode the heightmap into path (.npy), replacing older versions of the map."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique temp file: the warm-up thread and a request may build the same map at once
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'{path.stem}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, np.ascontiguousarray(load_heightmap(map_dir), dtype='<u2'))
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    prefix = path.stem.rsplit('-', 1)[0]
+    for stale in path.parent.glob(f'{prefix}-*.npy'):
+        if stale != path and stale.stem.rsplit('-', 1)[0] == prefix:
+            try:
+                stale.unlink()
+            except OSError:
+                pass  # in use by another server process (Windows)
+
+
+def open_tile_store(map_dir: Path, cache_dir: Optional[Path] = None) -> TileStore:
+    """Tile store for a processed map, cached per directory.
+
+    The version is a hash of the heightmap file, so a reprocessed or patched
+    map gets new tiles (and tile URLs) automatically. Without a (writable)
+    cache_dir the decoded heightmap is used from memory instead.
+
+    Raises:
+        FileNotFoundError: If the map has no heightmap
+    """
+    key = str(map_dir)
+    with _store_lock:
+        if key in _store_cache:
+            return _store_cache[key]
+
+    source = heightmap_source(Path(map_dir))
+    version = hashlib.sha256(source.read_bytes()).hexdigest()[:16]
+    samples = None
+    if cache_dir is not None:
+        path = Path(cache_dir) / f'{Path(map_dir).name}-{version}.npy'
+        try:
+            if not path.is_file():
+                _write_tile_array(Path(map_dir), path)
+            samples = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            samples = None
+    if samples is None:
+        samples = load_heightmap(Path(map_dir))
+
+    store = TileStore(samples, version)
+    with _store_lock:
+        return _store_cache.setdefault(key, store)
+
+
+def clear_cache(map_dir: Path = None) -> None:
+    """Drop cached tile stores for one map, or all maps."""
+    with _store_lock:
+        if map_dir is None:
+            _store_cache.clear()
+        else:
+            _store_cache.pop(str(map_dir), None)
@@ -0,0 +1,309 @@
+"""
+Background Compute Jobs
+
+Heavy queries (fire-plan optimisation, Monte Carlo dispersion) run in a
+pool of worker processes rather than in Flask request threads. Static
+files and light endpoints stay responsive while the math runs.
+
+- Bounded queue: at most max_workers jobs run and max_queued wait. Further
+  submissions raise QueueFullError (HTTP 429).
+- Deduplication: a job with the same kind, map and parameters as one that
+  is queued or running is not started again; the existing job is returned.
+- Result cache: finished results are kept for result_ttl seconds (at most
+  max_finished jobs), and identical submissions are answered from them.
+- Cancellation: a queued job is dropped. A running job is marked cancelled
+  and its result discarded; the worker finishes the computation, which
+  cannot be interrupted.
+
+Job kinds are registered in JOB_KINDS: a module-level function
+run(map_dir, params) -> JSON-serialisable dict, executed in a worker
+process. params must be JSON-serialisable too (resolved XY positions,
+not grid references), since they also form the deduplication key.
+Workers load each map once; calculator.heightmap caches it per process.
+"""
+
+import hashlib
+import json
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+from typing import Callable, Deque, Dict, Optional
+
+import numpy as np
+
+from calculator.heightmap import MapData
+
+MAX_QUEUED = 32
+
+# Finished jobs (results) kept for lookup and as the result cache
+RESULT_TTL = 600.0
+MAX_FINISHED = 256
+
+FINISHED = ('done', 'failed', 'cancelled')
+
+
+class QueueFullError(Exception):
+    """All workers are busy and max_queued jobs are waiting."""
+
+
+def run_fire_plan(map_dir: Path, params: dict) -> dict:
+    """Fire-plan job: params mortars/targets ([[x, y], ...]), objective, capacity."""
+    from calculator.fire_plan import plan_fire_missions
+
+    return plan_fire_missions(MapData(map_dir), np.asarray(params['mortars'], dtype=np.float64),
+                              np.asarray(params['targets'], dtype=np.float64),
+                              params['objective'], params['capacity'])
+
+
+def run_dispersion(map_dir: Path, params: dict) -> dict:
+    """Dispersion job: params mortar/target ([x, y]), options, cloud_points."""
+    from calculator.dispersion import estimate_dispersion
+    from calculator.terrain import load_terrain_accel
+
+    map_data = MapData(map_dir)
+    terrain = load_terrain_accel(map_data.map_dir, map_data.heightmap, map_data.metadata)
+    result = estimate_dispersion(map_data, np.asarray(params['mortar'], dtype=np.float64),
+                                 np.asarray(params['target'], dtype=np.float64), terrain=terrain,
+                                 **params['options'])
+    heatmap = result['heatmap']
+    return {
+        'solution': result['solution'],
+        'rounds': len(result['miss']),
+        'cep': result['cep'],
+        'r90': result['r90'],
+        'mean_point_of_impact': result['mean_point_of_impact'],
+        'hit_probability': result['hit_probability'],
+        'heatmap': {**heatmap, 'probability': heatmap['probability'].round(4).tolist()},
+        'cloud': result['impacts'][:params['cloud_points'], :2].round(2).tolist(),
+    }
+
+
+JOB_KINDS: Dict[str, Callable[[Path, dict], dict]] = {
+    'fire-plan': run_fire_plan,
+    'dispersion': run_dispersion,
+}
+
+
+def job_key(kind: str, map_dir: Path, params: dict) -> str:
+    """Deduplication key: identical for identical work."""
+    payload = json.dumps([kind, str(map_dir), params], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Job:
+    """One submitted computation and its outcome."""
+
+    def __init__(self, job_id: str, kind: str, map_dir: Path, params: dict, key: str):
+        self.id = job_id
+        self.kind = kind
+        self.map_dir = Path(map_dir)
+        self.params = params
+        self.key = key
+        self.status = 'queued'
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        # True when the parameters were rejected by the computation (HTTP 400)
+        self.invalid = False
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.future: Optional[Future] = None
+        self.version = 0
+        self._cond = threading.Condition()
+
+    @property
+    def map_name(self) -> str:
+        return self.map_dir.name
+
+    def _set_status(self, status: str) -> None:
+        with self._cond:
+            self.status = status
+            if status == 'running':
+                self.started = time.time()
+            elif status in FINISHED:
+                self.finished = time.time()
+            self.version += 1
+            self._cond.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job is finished; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.status in FINISHED, timeout)
+
+    def wait_for_change(self, since: int, timeout: float) -> bool:
+        """Block until version > since; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.version > since, timeout)
+
+    def to_dict(self) -> dict:
+        """Public state; includes the result once done."""
+        state = {
+            'id': self.id,
+            'kind': self.kind,
+            'map': self.map_name,
+            'status': self.status,
+            'version': self.version,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+        if self.status == 'done':
+            state['result'] = self.result
+        elif self.status == 'failed':
+            state['error'] = self.error
+        return state
+
+
+class JobScheduler:
+    """Runs jobs in a process pool behind a bounded, deduplicating queue (thread-safe)."""
+
+    def __init__(self, max_workers: int, max_queued: int = MAX_QUEUED,
+                 result_ttl: float = RESULT_TTL, max_finished: int = MAX_FINISHED,
+                 executor_factory: Optional[Callable[[int], object]] = None):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.max_finished = max_finished
+        self._executor_factory = executor_factory or (lambda n: ProcessPoolExecutor(max_workers=n))
+        self._executor = None
+        # Reentrant: a future that is already done runs its callback inside submit()
+        self._lock = threading.RLock()
+        self._jobs: Dict[str, Job] = {}
+        self._by_key: Dict[str, Job] = {}
+        self._queue: Deque[Job] = deque()
+        self._running = 0
+        self.counters = dict.fromkeys(('submitted', 'deduplicated', 'cached', 'rejected',
+                                       'done', 'failed', 'cancelled'), 0)
+
+    def submit(self, kind: str, map_dir: Path, params: dict) -> Job:
+        """Queue a job, or return the identical queued, running or cached one.
+
+        Raises:
+            ValueError: If kind is unknown
+            QueueFullError: If all workers are busy and the queue is full
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"kind must be one of: {', '.join(JOB_KINDS)}")
+        key = job_key(kind, map_dir, params)
+        with self._lock:
+            self._prune()
+            existing = self._by_key.get(key)
+            if existing is not None:
+                self.counters['cached' if existing.status == 'done' else 'deduplicated'] += 1
+                return existing
+            if self._running >= self.max_workers and len(self._queue) >= self.max_queued:
+                self.counters['rejected'] += 1
+                raise QueueFullError(f'Server busy: {self._running} jobs running and '
+                                     f'{len(self._queue)} queued; retry shortly')
+            job = Job(secrets.token_urlsafe(9), kind, map_dir, params, key)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+            self._queue.append(job)
+            self.counters['submitted'] += 1
+            self._dispatch()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; finished jobs are left as they are.
+
+        Returns:
+            The job, or None if unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            if job.status == 'queued':
+                self._queue.remove(job)
+            elif job.future is not None:
+                job.future.cancel()  # only succeeds if no worker has picked it up yet
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+            self.counters['cancelled'] += 1
+            job._set_status('cancelled')
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._prune()
+            return {
+                'workers': self.max_workers,
+                'running': self._running,
+                'queued': len(self._queue),
+                'max_queued': self.max_queued,
+                'finished': sum(1 for job in self._jobs.values() if job.status in FINISHED),
+                **self.counters,
+            }
+
+    def shutdown(self) -> None:
+        """Stop the worker processes (queued jobs are abandoned)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._queue.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _dispatch(self) -> None:
+        """Start queued jobs while workers are free (lock held)."""
+        while self._running < self.max_workers and self._queue:
+            job = self._queue.popleft()
+            if self._executor is None:
+                self._executor = self._executor_factory(self.max_workers)
+            job._set_status('running')
+            self._running += 1
+            try:
+                job.future = self._executor.submit(JOB_KINDS[job.kind], job.map_dir, job.params)
+            except (BrokenProcessPool, RuntimeError) as e:
+                self._executor = None
+                future = Future()
+                future.set_exception(e)
+                job.future = future
+            job.future.add_done_callback(partial(self._finished, job))
+
+    def _finished(self, job: Job, future: Future) -> None:
+        result, error, invalid, broken = None, None, False, False
+        if not future.cancelled():
+            try:
+                result = future.result()
+            except ValueError as e:
+                error, invalid = str(e), True
+            except BrokenProcessPool:
+                error, broken = 'Worker process crashed', True
+            except Exception as e:  # reported to the client, the server keeps running
+                error = f'{type(e).__name__}: {e}'
+
+        with self._lock:
+            self._running -= 1
+            if broken:
+                self._executor = None  # a new pool is started for the next job
+            if job.status != 'cancelled':
+                job.result, job.error, job.invalid = result, error, invalid
+                if error is not None and self._by_key.get(job.key) is job:
+                    del self._by_key[job.key]  # failures are retried, not cached
+                status = 'failed' if error is not None else 'done'
+                self.counters[status] += 1
+                job._set_status(status)
+            self._dispatch()
+
+    def _prune(self) -> None:
+        """Forget finished jobs past result_ttl, then the oldest past max_finished (lock held)."""
+        now = time.time()
+        finished = sorted((job for job in self._jobs.values() if job.status in FINISHED),
+                          key=lambda job: job.finished)
+        fresh = [job for job in finished if now - job.finished <= self.result_ttl]
+        expired = [job for job in finished if now - job.finished > self.result_ttl]
+        expired += fresh[:max(len(fresh) - self.max_finished, 0)]
+        for job in expired:
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
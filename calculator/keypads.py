@@ -0,0 +1,303 @@
+"""
+Keypad / Sub-Keypad Elevation Lookup Tables
+
+Grid references land on a fixed lattice, so their elevations can be
+precomputed once per map instead of re-interpolating the heightmap:
+
+- points:     elevation at every position gridRefToXY() can return
+              (keypad offsets 0, ½, 1 of a square: a (2·13+1)² lattice)
+- keypads:    the 3×3 keypad cells of every square (39×39): elevation at
+              the cell centre plus min/max inside the cell
+- subkeypads: the 3×3 sub-keypad cells of every keypad (117×117), same fields
+
+Tables are indexed [row, column] with row 0 at the north edge, all values in
+meters. Min/max come from the heightmap samples covering a cell, which
+bound the interpolated surface inside it.
+
+Built by processor/build_keypad_tables.py into
+processed_maps/<map>/keypads.json.gz. The server loads it lazily and rebuilds
+in memory if it is missing or stale (heightmap CRC32 or grid_scale changed).
+"""
+
+import gzip
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from calculator.coordinates import GRID_COLUMNS, KEYPAD_OFFSETS
+from calculator.heightmap import get_elevation, world_to_pixel
+from calculator.terrain import heightmap_checksum
+
+KEYPADS_FILENAME = 'keypads.json.gz'
+FORMAT_VERSION = 1
+GRID_SIZE = len(GRID_COLUMNS)
+
+# Elevations are rounded to this many decimals in the file (heightmap
+# precision is ~0.005 m for a 300 m height scale)
+DECIMALS = 2
+
+# Lattice index distance still treated as on the lattice (float error of gridRefToXY)
+LATTICE_TOLERANCE = 1e-6
+
+# (column, row) of each keypad / sub-keypad cell inside its parent, phone layout
+KEYPAD_CELLS = {key: (int(ox * 2), int(oy * 2)) for key, (ox, oy) in KEYPAD_OFFSETS.items()}
+
+_table_cache: Dict[str, 'KeypadTable'] = {}
+
+
+def _cell_pixel_ranges(resolution: int, map_size: float, cell_size: float, cells: int):
+    """Pixel [start, stop) of the samples covering each cell along one axis."""
+    edges = np.arange(cells + 1) * cell_size
+    pixel_edges, _ = world_to_pixel(np.clip(edges, 0, map_size), 0, map_size, resolution)
+    starts = np.floor(pixel_edges[:-1]).astype(np.intp)
+    stops = np.minimum(np.ceil(pixel_edges[1:]).astype(np.intp), resolution - 1) + 1
+    starts = np.minimum(starts, stops - 1)
+    return starts, stops
+
+
+def _cell_min_max(heightmap: np.ndarray, map_size: float, cell_size: float, cells: int):
+    """Raw min/max of the heightmap samples covering each cell of a cells×cells grid."""
+    starts, stops = _cell_pixel_ranges(heightmap.shape[0], map_size, cell_size, cells)
+
+    # Reduce columns first, then rows: two passes of `cells` slices each
+    column_min = np.stack([heightmap[:, a:b].min(axis=1) for a, b in zip(starts, stops)], axis=1)
+    column_max = np.stack([heightmap[:, a:b].max(axis=1) for a, b in zip(starts, stops)], axis=1)
+    cell_min = np.stack([column_min[a:b].min(axis=0) for a, b in zip(starts, stops)])
+    cell_max = np.stack([column_max[a:b].max(axis=0) for a, b in zip(starts, stops)])
+    return cell_min, cell_max
+
+
+def _level_tables(heightmap: np.ndarray, metadata: dict, cell_size: float, cells: int) -> dict:
+    map_size = metadata['map_size']
+    height_scale = metadata['height_scale']
+    centers = (np.arange(cells) + 0.5) * cell_size
+    xx, yy = np.meshgrid(centers, centers)
+    cell_min, cell_max = _cell_min_max(heightmap, map_size, cell_size, cells)
+    return {
+        'size': cells,
+        'cell_size': cell_size,
+        'center': get_elevation(xx, yy, heightmap, height_scale, map_size),
+        'min': cell_min / 65535.0 * height_scale,
+        'max': cell_max / 65535.0 * height_scale,
+    }
+
+
+def build_keypad_tables(heightmap: np.ndarray, metadata: dict) -> dict:
+    """Compute the lookup tables for a map.
+
+    Returns:
+        Dict with format_version, heightmap_crc32, grid_scale, map_size and
+        'points' / 'keypads' / 'subkeypads' tables (NumPy arrays in meters)
+    """
+    map_size = metadata['map_size']
+    grid_scale = metadata.get('grid_scale') or map_size / GRID_SIZE
+    lattice = np.arange(2 * GRID_SIZE + 1) * (grid_scale / 2)
+    xx, yy = np.meshgrid(lattice, lattice)
+    return {
+        'format_version': FORMAT_VERSION,
+        'heightmap_crc32': heightmap_checksum(heightmap),
+        'grid_scale': grid_scale,
+        'map_size': map_size,
+        'points': {
+            'size': len(lattice),
+            'spacing': grid_scale / 2,
+            'elevation': get_elevation(xx, yy, heightmap, metadata['height_scale'], map_size),
+        },
+        'keypads': _level_tables(heightmap, metadata, grid_scale / 3, GRID_SIZE * 3),
+        'subkeypads': _level_tables(heightmap, metadata, grid_scale / 9, GRID_SIZE * 9),
+    }
+
+
+def update_keypad_tables(tables: dict, heightmap: np.ndarray, metadata: dict,
+                         bounds: List[Tuple[int, int, int, int]]) -> dict:
+    """Bring build_keypad_tables() output up to date after local heightmap edits.
+
+    Cell min/max are recomputed only for cells whose samples intersect a
+    changed rectangle; the interpolated lattices (points and cell centres)
+    are cheap and recomputed whole. The result equals a full rebuild.
+
+    Args:
+        tables: Tables for the previous heightmap (as built or as loaded
+            from keypads.json.gz)
+        heightmap: New heightmap, same resolution
+        metadata: Map metadata
+        bounds: (row0, col0, row1, col1) pixel rectangles, end-exclusive,
+            covering every changed sample
+
+    Returns:
+        Updated tables (NumPy arrays in meters)
+    """
+    map_size = metadata['map_size']
+    height_scale = metadata['height_scale']
+    grid_scale = tables['grid_scale']
+    lattice = np.arange(2 * GRID_SIZE + 1) * (grid_scale / 2)
+    xx, yy = np.meshgrid(lattice, lattice)
+    updated = dict(tables,
+                   heightmap_crc32=heightmap_checksum(heightmap),
+                   points=dict(tables['points'], elevation=get_elevation(xx, yy, heightmap, height_scale, map_size)))
+
+    for level, cell_size in (('keypads', grid_scale / 3), ('subkeypads', grid_scale / 9)):
+        table = tables[level]
+        cells = table['size']
+        centers = (np.arange(cells) + 0.5) * cell_size
+        xx, yy = np.meshgrid(centers, centers)
+        cell_min = np.array(table['min'], dtype=np.float64)
+        cell_max = np.array(table['max'], dtype=np.float64)
+        starts, stops = _cell_pixel_ranges(heightmap.shape[0], map_size, cell_size, cells)
+        for row0, col0, row1, col1 in bounds:
+            for r in np.flatnonzero((starts < row1) & (stops > row0)):
+                for c in np.flatnonzero((starts < col1) & (stops > col0)):
+                    samples = heightmap[starts[r]:stops[r], starts[c]:stops[c]]
+                    cell_min[r, c] = samples.min() / 65535.0 * height_scale
+                    cell_max[r, c] = samples.max() / 65535.0 * height_scale
+        updated[level] = dict(table, center=get_elevation(xx, yy, heightmap, height_scale, map_size),
+                              min=cell_min, max=cell_max)
+    return updated
+
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return np.round(value, DECIMALS).tolist()
+    if isinstance(value, dict):
+        return {key: _to_json(item) for key, item in value.items()}
+    return value
+
+
+def save_keypad_tables(path: Path, tables: dict) -> None:
+    """Write tables as gzipped JSON (also directly usable by the browser)."""
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=9) as f:
+        json.dump(_to_json(tables), f, separators=(',', ':'))
+
+
+def _on_lattice(index: np.ndarray, size: int) -> np.ndarray:
+    """Whether fractional lattice indices are whole numbers in [0, size)."""
+    nearest = np.rint(index)
+    return (np.abs(index - nearest) < LATTICE_TOLERANCE) & (nearest >= 0) & (nearest < size)
+
+
+class KeypadTable:
+    """Lookup of precomputed keypad elevations for one map."""
+
+    def __init__(self, tables: dict):
+        self.tables = tables
+        self.grid_scale = tables['grid_scale']
+        self._json: Optional[dict] = None
+        self._points = np.asarray(tables['points']['elevation'], dtype=np.float64)
+        self._levels = {
+            level: {field: np.asarray(tables[level][field], dtype=np.float64) for field in ('center', 'min', 'max')}
+            for level in ('keypads', 'subkeypads')
+        }
+
+    def to_json(self) -> dict:
+        """Tables as JSON-ready lists (rounded like the file; built once)."""
+        if self._json is None:
+            self._json = _to_json(self.tables)
+        return self._json
+
+    def lookup(self, column: str, row: int, keypad: int, subkeypad: Optional[int] = None) -> dict:
+        """Elevation data for a keypad (or sub-keypad) reference.
+
+        Returns:
+            Dict with the gridRefToXY position ('x', 'y', 'elevation'; keypad
+            references only) and the 'cell' it names: center/min/max elevation
+            and its bounds in meters
+
+        Raises:
+            ValueError: If a component is out of range
+        """
+        if column not in GRID_COLUMNS or len(column) != 1:
+            raise ValueError(f'Invalid column: {column}. Must be A-M.')
+        if not 1 <= row <= GRID_SIZE:
+            raise ValueError(f'Invalid row: {row}. Must be 1-{GRID_SIZE}.')
+        if keypad not in KEYPAD_CELLS:
+            raise ValueError(f'Invalid keypad: {keypad}. Must be 1-9.')
+        if subkeypad is not None and subkeypad not in KEYPAD_CELLS:
+            raise ValueError(f'Invalid sub-keypad: {subkeypad}. Must be 1-9.')
+
+        col_index = GRID_COLUMNS.index(column)
+        kx, ky = KEYPAD_CELLS[keypad]
+        cell_x = col_index * 3 + kx
+        cell_y = (row - 1) * 3 + ky
+        result = {}
+        if subkeypad is None:
+            level, size = 'keypads', self.grid_scale / 3
+            px, py = col_index * 2 + kx, (row - 1) * 2 + ky
+            result.update(x=px * self.grid_scale / 2, y=py * self.grid_scale / 2,
+                          elevation=float(self._points[py, px]))
+        else:
+            sx, sy = KEYPAD_CELLS[subkeypad]
+            level, size = 'subkeypads', self.grid_scale / 9
+            cell_x, cell_y = cell_x * 3 + sx, cell_y * 3 + sy
+
+        table = self._levels[level]
+        result['cell'] = {
+            'center': float(table['center'][cell_y, cell_x]),
+            'min': float(table['min'][cell_y, cell_x]),
+            'max': float(table['max'][cell_y, cell_x]),
+            'bounds': [cell_x * size, cell_y * size, (cell_x + 1) * size, (cell_y + 1) * size],
+        }
+        return result
+
+    def lattice_elevation(self, x, y) -> np.ndarray:
+        """Table elevation at world XY that grid references resolve to, else NaN.
+
+        Keypad references (gridRefToXY()) land on the points lattice and
+        sub-keypad references on sub-keypad cell centres; any other position
+        gives NaN, for the caller to interpolate from the heightmap.
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        result = np.full(x.shape, np.nan)
+
+        size = self._levels['subkeypads']['center'].shape[0]
+        cx, cy = x / (self.grid_scale / 9) - 0.5, y / (self.grid_scale / 9) - 0.5
+        on_center = _on_lattice(cx, size) & _on_lattice(cy, size)
+        result[on_center] = self._levels['subkeypads']['center'][
+            np.rint(cy[on_center]).astype(np.intp), np.rint(cx[on_center]).astype(np.intp)]
+
+        size = self._points.shape[0]
+        px, py = x / (self.grid_scale / 2), y / (self.grid_scale / 2)
+        on_point = _on_lattice(px, size) & _on_lattice(py, size)
+        result[on_point] = self._points[np.rint(py[on_point]).astype(np.intp), np.rint(px[on_point]).astype(np.intp)]
+        return result
+
+    def point_elevations(self) -> np.ndarray:
+        """Elevations on the gridRefToXY lattice, shape (27, 27)."""
+        return self._points
+
+
+def load_keypad_table(map_dir: Path, heightmap: np.ndarray, metadata: dict) -> KeypadTable:
+    """Load (or build) a map's keypad table, cached per directory.
+
+    keypads.json.gz is used when its heightmap checksum and grid_scale match
+    the current map; otherwise the tables are built in memory.
+    """
+    key = str(map_dir)
+    if key in _table_cache:
+        return _table_cache[key]
+
+    tables: Optional[dict] = None
+    path = Path(map_dir) / KEYPADS_FILENAME
+    grid_scale = metadata.get('grid_scale') or metadata['map_size'] / GRID_SIZE
+    if path.is_file():
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            stored = json.load(f)
+        if (stored.get('format_version') == FORMAT_VERSION
+                and stored.get('heightmap_crc32') == heightmap_checksum(heightmap)
+                and stored.get('grid_scale') == grid_scale):
+            tables = stored
+    if tables is None:
+        tables = build_keypad_tables(heightmap, metadata)
+
+    table = KeypadTable(tables)
+    _table_cache[key] = table
+    return table
+
+
+def clear_cache(map_dir: Path = None) -> None:
+    """Drop cached tables for one map, or all maps."""
+    if map_dir is None:
+        _table_cache.clear()
+    else:
+        _table_cache.pop(str(map_dir), None)
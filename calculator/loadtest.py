@@ -0,0 +1,326 @@
+"""
+Map Server Load Test
+
+Replays a realistic mix of requests against the Flask server and reports
+throughput, latency percentiles and error rates as JSON:
+
+    python -m calculator.loadtest                                  # in-process (Flask test client)
+    python -m calculator.loadtest --url http://localhost:8080 --concurrency 32 --duration 30
+    python -m calculator.loadtest --mix dispersion=0,heightmap=30 -o before.json
+
+The default mix approximates an event night: page loads and static JS,
+map list, metadata/heightmap/minimap downloads for a handful of maps, and
+the JSON APIs (terrain, keypads, grid-refs, fire-plan, dispersion). Each
+scenario has a weight; --mix overrides weights by name.
+
+In-process mode drives the app through Flask's test client on worker
+threads, which measures request handling without the network stack. URL
+mode uses one keep-alive HTTP connection per worker against a running
+server, so serving modes (threaded dev server, waitress, ...) and caching
+changes can be compared with the same command.
+"""
+
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_REQUESTS = 2000
+DEFAULT_MAPS = 4
+
+# Scenario name -> relative weight in the default mix
+DEFAULT_MIX = {
+    'index': 4,
+    'static': 16,
+    'map_list': 4,
+    'metadata': 12,
+    'heightmap': 10,
+    'minimap': 10,
+    'terrain': 4,
+    'keypads': 4,
+    'grid_refs': 6,
+    'fire_plan': 4,
+    'dispersion': 2,
+}
+
+STATIC_FILES = ('js/app.js', 'js/ballistics.js', 'js/coordinates.js', 'js/heightmap.js', 'css/styles.css')
+
+
+class Request(NamedTuple):
+    scenario: str
+    method: str
+    path: str
+    body: Optional[dict] = None
+    optional: bool = False   # 404 is a normal answer (e.g. maps without a minimap)
+
+
+class Result(NamedTuple):
+    scenario: str
+    status: int       # 0 for connection errors
+    seconds: float
+    size: int
+    error: bool
+
+
+def build_requests(scenario: str, map_name: str, rng: np.random.Generator) -> Request:
+    """One concrete request for a scenario against map_name."""
+    # Mortar first, then targets within two grid squares so shots are in range
+    columns = np.clip(rng.integers(2, 11) + rng.integers(-2, 3, 4), 0, 12)
+    rows = np.clip(rng.integers(3, 12) + rng.integers(-2, 3, 4), 1, 13)
+    refs = [f"{'ABCDEFGHIJKLM'[c]}{r}-{k}" for c, r, k in
+            zip(columns.tolist(), rows.tolist(), rng.integers(1, 10, 4).tolist())]
+    if scenario == 'index':
+        return Request(scenario, 'GET', '/')
+    if scenario == 'static':
+        return Request(scenario, 'GET', f'/static/{STATIC_FILES[rng.integers(len(STATIC_FILES))]}')
+    if scenario == 'map_list':
+        return Request(scenario, 'GET', '/maps/list')
+    if scenario == 'metadata':
+        return Request(scenario, 'GET', f'/maps/{map_name}/metadata.json')
+    if scenario == 'heightmap':
+        return Request(scenario, 'GET', f'/maps/{map_name}/heightmap.json.gz')
+    if scenario == 'minimap':
+        return Request(scenario, 'GET', f'/maps/{map_name}/minimap.png', optional=True)
+    if scenario == 'terrain':
+        return Request(scenario, 'GET', f'/maps/{map_name}/terrain')
+    if scenario == 'keypads':
+        return Request(scenario, 'GET', f'/maps/{map_name}/keypads?ref={refs[0]}')
+    if scenario == 'grid_refs':
+        return Request(scenario, 'POST', f'/maps/{map_name}/grid-refs', {'refs': refs * 25})
+    if scenario == 'fire_plan':
+        return Request(scenario, 'POST', f'/maps/{map_name}/fire-plan',
+                       {'mortars': refs[:2], 'targets': refs[2:]})
+    if scenario == 'dispersion':
+        return Request(scenario, 'POST', f'/maps/{map_name}/dispersion',
+                       {'mortar': refs[0], 'target': refs[1], 'rounds': 2000, 'cloud_points': 0})
+    raise ValueError(f'Unknown scenario: {scenario}')
+
+
+def plan_requests(mix: Dict[str, float], maps: Sequence[str], count: int, seed: int = 0) -> List[Request]:
+    """Draw count requests from the weighted mix, spread across maps."""
+    names = [name for name, weight in mix.items() if weight > 0]
+    if not names:
+        raise ValueError('The request mix is empty')
+    weights = np.array([mix[name] for name in names], dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    scenarios = rng.choice(len(names), count, p=weights / weights.sum())
+    map_choice = rng.integers(0, len(maps), count)
+    return [build_requests(names[s], maps[m], rng) for s, m in zip(scenarios.tolist(), map_choice.tolist())]
+
+
+def in_process_sender() -> Callable[[Request], Tuple[int, int]]:
+    """Send requests through the Flask test client (one client per thread)."""
+    from calculator import server
+
+    local = threading.local()
+
+    def send(request: Request) -> Tuple[int, int]:
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = server.app.test_client()
+        response = client.open(request.path, method=request.method, json=request.body)
+        size = len(response.get_data())
+        response.close()
+        return response.status_code, size
+
+    return send
+
+
+def http_sender(base_url: str, timeout: float = 30.0) -> Callable[[Request], Tuple[int, int]]:
+    """Send requests over one keep-alive connection per thread."""
+    parts = urlsplit(base_url)
+    if parts.scheme != 'http' or not parts.hostname:
+        raise ValueError(f'Unsupported URL: {base_url} (expected http://host:port)')
+    prefix = parts.path.rstrip('/')
+    local = threading.local()
+
+    def send(request: Request) -> Tuple[int, int]:
+        connection = getattr(local, 'connection', None)
+        if connection is None:
+            connection = local.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80,
+                                                                       timeout=timeout)
+        body = json.dumps(request.body).encode() if request.body is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        try:
+            connection.request(request.method, prefix + request.path, body=body, headers=headers)
+            response = connection.getresponse()
+            size = len(response.read())
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            raise
+        return response.status, size
+
+    return send
+
+
+def fetch_map_names(base_url: Optional[str] = None) -> List[str]:
+    """Maps advertised by /maps/list on the target server."""
+    if base_url is None:
+        from calculator import server
+        data = server.app.test_client().get('/maps/list').get_json()
+    else:
+        from urllib.request import urlopen
+        with urlopen(base_url.rstrip('/') + '/maps/list', timeout=10) as response:
+            data = json.loads(response.read().decode('utf-8'))
+    return [entry['name'] for entry in (data or {}).get('maps', [])]
+
+
+def _percentiles(seconds: np.ndarray) -> Dict[str, float]:
+    if not seconds.size:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    ms = seconds * 1000
+    return {
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(ms.max()),
+    }
+
+
+def summarise(results: Sequence[Result], elapsed: float) -> Dict[str, object]:
+    """Throughput, latency percentiles and error rates, overall and per scenario."""
+    def block(items: Sequence[Result]) -> Dict[str, object]:
+        seconds = np.array([r.seconds for r in items])
+        errors = [r for r in items if r.error]
+        by_status = defaultdict(int)
+        for r in errors:
+            by_status[str(r.status) if r.status else 'connection'] += 1
+        return {
+            'requests': len(items),
+            'errors': len(errors),
+            'error_rate': len(errors) / len(items) if items else 0.0,
+            'errors_by_status': dict(by_status),
+            'bytes': int(sum(r.size for r in items)),
+            **_percentiles(seconds),
+        }
+
+    scenarios = defaultdict(list)
+    for r in results:
+        scenarios[r.scenario].append(r)
+    return {
+        **block(results),
+        'elapsed_seconds': elapsed,
+        'requests_per_second': len(results) / elapsed if elapsed > 0 else 0.0,
+        'megabytes_per_second': sum(r.size for r in results) / 1e6 / elapsed if elapsed > 0 else 0.0,
+        'scenarios': {name: block(items) for name, items in sorted(scenarios.items())},
+    }
+
+
+def run_load(send: Callable[[Request], Tuple[int, int]], requests: Sequence[Request],
+             concurrency: int = DEFAULT_CONCURRENCY,
+             duration: Optional[float] = None) -> Dict[str, object]:
+    """Replay requests on concurrency worker threads.
+
+    With duration set, workers keep cycling through the request list until
+    the time is up; otherwise every request is sent once.
+    """
+    results: List[Result] = []
+    lock = threading.Lock()
+    position = [0]
+    deadline = None if duration is None else time.perf_counter() + duration
+
+    def next_request() -> Optional[Request]:
+        with lock:
+            index = position[0]
+            if deadline is None and index >= len(requests):
+                return None
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            position[0] += 1
+        return requests[index % len(requests)]
+
+    def worker() -> None:
+        local_results = []
+        while True:
+            request = next_request()
+            if request is None:
+                break
+            start = time.perf_counter()
+            try:
+                status, size = send(request)
+            except (OSError, http.client.HTTPException):
+                status, size = 0, 0
+            error = status == 0 or (status >= 400 and not (request.optional and status == 404))
+            local_results.append(Result(request.scenario, status, time.perf_counter() - start, size, error))
+        with lock:
+            results.extend(local_results)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return summarise(results, time.perf_counter() - start)
+
+
+def parse_mix(overrides: Optional[str]) -> Dict[str, float]:
+    """DEFAULT_MIX with "name=weight,..." overrides applied."""
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, (overrides or '').split(',')):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in mix:
+            raise ValueError(f"Unknown scenario '{name}' (choose from: {', '.join(mix)})")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise ValueError(f"Invalid weight for '{name}': {weight!r}") from None
+    return mix
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Load-test the map server with a realistic request mix.')
+    parser.add_argument('--url', help='Target a running server (default: in-process test client)')
+    parser.add_argument('--concurrency', '-c', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Concurrent workers (default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--requests', '-n', type=int, default=DEFAULT_REQUESTS,
+                        help=f'Requests to send (default: {DEFAULT_REQUESTS})')
+    parser.add_argument('--duration', type=float, help='Run for this many seconds instead of --requests')
+    parser.add_argument('--maps', help='Comma-separated maps to request (default: first few listed)')
+    parser.add_argument('--mix', help='Scenario weight overrides, e.g. "dispersion=0,heightmap=30"')
+    parser.add_argument('--warmup', type=int, default=50, help='Untimed requests sent first (default: 50)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the request plan')
+    parser.add_argument('--output', '-o', type=Path, help='Write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+        send = http_sender(args.url) if args.url else in_process_sender()
+        maps = args.maps.split(',') if args.maps else fetch_map_names(args.url)[:DEFAULT_MAPS]
+    except (ValueError, OSError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 2
+    if not maps:
+        print('Error: no processed maps available', file=sys.stderr)
+        return 2
+
+    count = args.requests if args.duration is None else max(args.requests, 10000)
+    plan = plan_requests(mix, maps, count, args.seed)
+    if args.warmup:
+        run_load(send, plan[:args.warmup], args.concurrency)
+
+    report = {
+        'mode': args.url or 'in-process',
+        'concurrency': args.concurrency,
+        'maps': maps,
+        'mix': mix,
+        **run_load(send, plan, args.concurrency, args.duration),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + '\n', encoding='utf-8')
+    print(text)
+    return 0 if report['errors'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Prebuilt Map Index
+
+processed_maps/maps_index.json lists every processed map in the same shape
+as the /maps/list response, so the server can answer it - and count maps
+at startup - without stat-ing every map directory:
+
+    {"format_version": 1, "count": 84, "maps": [{"name": "adak", "path": "adak"}, ...]}
+
+It is written by processor/build_map_index.py (and at PyInstaller build
+time). A bundled index is trusted as is; in a source checkout the map
+directory names are compared first (one directory listing, no per-map
+stat) so an index left behind after adding or removing maps is ignored.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import List, Optional
+
+MAP_INDEX_FILENAME = 'maps_index.json'
+FORMAT_VERSION = 1
+
+
+def scan_maps(processed_dir: Path) -> List[dict]:
+    """Map entries for every directory holding a metadata.json, sorted by name."""
+    processed_dir = Path(processed_dir)
+    maps = [{'name': item.name, 'path': item.name}
+            for item in processed_dir.iterdir()
+            if item.is_dir() and (item / 'metadata.json').is_file()]
+    maps.sort(key=lambda entry: entry['name'])
+    return maps
+
+
+def build_map_index(processed_dir: Path) -> dict:
+    """Index document for processed_dir (see module docstring)."""
+    maps = scan_maps(processed_dir)
+    return {'format_version': FORMAT_VERSION, 'count': len(maps), 'maps': maps}
+
+
+def save_map_index(processed_dir: Path) -> dict:
+    """Write maps_index.json atomically and return the index."""
+    index = build_map_index(processed_dir)
+    path = Path(processed_dir) / MAP_INDEX_FILENAME
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(index, indent=1) + '\n', encoding='utf-8')
+    os.replace(tmp, path)
+    return index
+
+
+def load_map_index(processed_dir: Path, verify: bool = True) -> Optional[List[dict]]:
+    """Map entries from maps_index.json, or None if missing, invalid or stale.
+
+    Args:
+        verify: Check that the indexed names match the map directories
+            (skip for read-only bundles, which cannot change)
+    """
+    processed_dir = Path(processed_dir)
+    try:
+        index = json.loads((processed_dir / MAP_INDEX_FILENAME).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get('format_version') != FORMAT_VERSION:
+        return None
+    maps = index.get('maps')
+    if not isinstance(maps, list):
+        return None
+
+    if verify:
+        with os.scandir(processed_dir) as entries:
+            directories = {entry.name for entry in entries
+                           if entry.is_dir() and not entry.name.startswith(('_', '.'))}
+        if directories != {entry.get('name') for entry in maps}:
+            return None
+    return maps
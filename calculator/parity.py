@@ -0,0 +1,409 @@
+"""
+Cross-Engine Parity Harness
+
+Checks that the NumPy engines (ballistics.py, heightmap.py, coordinates.py)
+agree with the browser modules they port. Randomised cases are generated
+in bulk, solved by the Python engine in one vectorised pass and by the JS
+modules under Node (calculator/tests/parity_worker.js), then compared:
+
+    python -m calculator.parity                      # 1,000,000 cases
+    python -m calculator.parity --cases 5000000 --map muttrah_city_2
+    python -m calculator.parity --json report.json
+
+Ballistics cases mix uniform random shots with edge cases: distances at
+the 1 m TOO_CLOSE limit, shots on the discriminant = 0 range boundary,
+elevations around MAX_ELEVATION_ANGLE, height differences around the
+200 m warning threshold, plus in_game_vectors.json positions. Heightmap
+cases sample exact pixel edges and the last row/column as well as random
+fractional positions.
+
+The report gives, per section, the maximum divergence, the number of
+status mismatches and the throughput of each engine. Shots within rounding
+error of a status threshold may flip between engines; they are reported
+as boundary flips rather than failures. The exit code is 1
+when any divergence exceeds its tolerance.
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from calculator import ballistics
+from calculator.coordinates import GRID_COLUMNS, NATO_COLUMN_WORDS, grid_refs_to_xy
+from calculator.heightmap import MapData, bilinear_interpolation
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+WORKER = REPO_ROOT / 'calculator' / 'tests' / 'parity_worker.js'
+IN_GAME_VECTORS = REPO_ROOT / 'calculator' / 'tests' / 'in_game_vectors.json'
+DEFAULT_MAPS_DIR = REPO_ROOT / 'processed_maps'
+
+DEFAULT_CASES = 1_000_000
+
+# Status strings reported by calculateFiringSolution(), indexed as in parity_worker.js
+JS_STATUSES = ('OK', 'EXTREME_ELEVATION', 'TOO_CLOSE', 'UNREACHABLE', 'ANGLE_TOO_HIGH')
+
+# Maximum absolute divergence accepted per field. Inputs agree to a few ulps;
+# elevation and time of flight get more room because sqrt(discriminant)
+# amplifies a one-ulp distance difference (np.hypot vs Math.sqrt) on shots
+# at the very edge of range - still far below the 0.1 mil the UI displays.
+TOLERANCES = {
+    'distance': 1e-9,
+    'azimuth': 1e-9,
+    'elevation_mils': 1e-4,
+    'time_of_flight': 1e-6,
+    'height': 1e-9,
+    'grid_ref_xy': 1e-9,
+}
+
+
+def _boundary_distance(height_diff, rng):
+    """Distances just inside / outside the discriminant = 0 range limit."""
+    v2 = ballistics.PROJECTILE_VELOCITY ** 2
+    g = ballistics.GRAVITY
+    limit = np.sqrt(np.maximum(v2 * v2 - 2 * g * v2 * height_diff, 0)) / g
+    return limit * (1 + rng.choice([-1, 1], len(height_diff)) * 10.0 ** rng.uniform(-15, -3, len(height_diff)))
+
+
+def _max_angle_distance(height_diff, rng):
+    """Distances whose high-angle solution is close to MAX_ELEVATION_ANGLE.
+
+    Solves ΔZ = D·tanφ - gD²/(2v²cos²φ) for D at φ = 89° and perturbs it.
+    """
+    phi = ballistics.MAX_ELEVATION_ANGLE
+    a = ballistics.GRAVITY / (2 * ballistics.PROJECTILE_VELOCITY ** 2 * np.cos(phi) ** 2)
+    disc = np.maximum(np.tan(phi) ** 2 - 4 * a * height_diff, 0)
+    roots = np.where(rng.random(len(height_diff)) < 0.5,
+                     (np.tan(phi) - np.sqrt(disc)) / (2 * a), (np.tan(phi) + np.sqrt(disc)) / (2 * a))
+    return roots * (1 + rng.choice([-1, 1], len(height_diff)) * 10.0 ** rng.uniform(-14, -2, len(height_diff)))
+
+
+def in_game_cases(maps_dir: Path = DEFAULT_MAPS_DIR) -> np.ndarray:
+    """Mortar/target XYZ rows for in_game_vectors.json entries on processed maps."""
+    from calculator.coordinates import grid_ref_to_xy
+    from calculator.heightmap import has_heightmap
+
+    try:
+        vectors = json.loads(IN_GAME_VECTORS.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return np.empty((0, 6))
+
+    rows = []
+    for vector in vectors:
+        map_dir = Path(maps_dir) / vector.get('mapName', '')
+        if not (map_dir / 'metadata.json').is_file() or not has_heightmap(map_dir):
+            continue
+        map_data = MapData(map_dir)
+        mortar = grid_ref_to_xy(vector['mortarGridRef'], map_data.grid_scale)
+        target = grid_ref_to_xy(vector['targetGridRef'], map_data.grid_scale)
+        if mortar is None or target is None:
+            continue
+        rows.append([*mortar, float(map_data.elevation_at(*mortar)),
+                     *target, float(map_data.elevation_at(*target))])
+    return np.array(rows, dtype=np.float64).reshape(-1, 6)
+
+
+def generate_ballistics_cases(count: int, rng: np.random.Generator,
+                              extra: Optional[np.ndarray] = None) -> np.ndarray:
+    """(N, 6) mortar x, y, z and target x, y, z rows; about a third are edge cases."""
+    kinds = rng.integers(0, 8, count)
+    height_diff = rng.uniform(-500, 500, count)
+    distance = rng.uniform(0, 1800, count)
+
+    near_one = kinds == 1
+    distance[near_one] = 1 + rng.uniform(-1e-3, 1e-3, near_one.sum())
+    boundary = kinds == 2
+    distance[boundary] = _boundary_distance(height_diff[boundary], rng)
+    steep = kinds == 3
+    distance[steep] = _max_angle_distance(height_diff[steep], rng)
+    warning = kinds == 4
+    height_diff[warning] = rng.choice([-200, 200], warning.sum()) + rng.uniform(-1e-6, 1e-6, warning.sum())
+    zero = kinds == 5
+    distance[zero] = rng.choice([0.0, 1e-9, 0.5], zero.sum())
+    # Remaining kinds (0, 6, 7) stay uniform
+
+    bearing = rng.uniform(0, 2 * np.pi, count)
+    # Snap some bearings to the compass points (azimuth wrap-around at 0/360)
+    cardinal = rng.random(count) < 0.05
+    bearing[cardinal] = rng.integers(0, 4, cardinal.sum()) * (np.pi / 2)
+
+    mortar = rng.uniform(0, 4096, (count, 2))
+    mortar_z = rng.uniform(0, 600, count)
+    cases = np.column_stack([
+        mortar[:, 0], mortar[:, 1], mortar_z,
+        mortar[:, 0] + distance * np.sin(bearing), mortar[:, 1] - distance * np.cos(bearing),
+        mortar_z + height_diff,
+    ])
+    if extra is not None and len(extra):
+        cases = np.concatenate([extra, cases])
+    return cases
+
+
+def generate_samples(count: int, width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    """(M, 2) pixel positions: random fractions, exact pixel edges and the last row/column."""
+    samples = np.column_stack([rng.uniform(0, width - 1, count), rng.uniform(0, height - 1, count)])
+    kinds = rng.integers(0, 4, count)
+    on_edge = kinds == 1
+    samples[on_edge] = np.floor(samples[on_edge])
+    just_below = kinds == 2
+    samples[just_below] = np.nextafter(np.ceil(samples[just_below]), 0)
+    last = np.flatnonzero(kinds == 3)
+    axis = rng.integers(0, 2, len(last))
+    samples[last, axis] = np.array([width - 1, height - 1])[axis]
+    return samples
+
+
+def generate_grid_refs(count: int, rng: np.random.Generator) -> list:
+    """Keypad references in the spellings both parsers accept, plus junk."""
+    nato = list(NATO_COLUMN_WORDS)
+    refs = []
+    for column, row, keypad, style in zip(rng.integers(0, 14, count).tolist(), rng.integers(0, 15, count).tolist(),
+                                          rng.integers(0, 11, count).tolist(), rng.integers(0, 5, count).tolist()):
+        letter = (GRID_COLUMNS + 'N')[column]
+        if style == 0:
+            refs.append(f'{letter}{row}-{keypad}')
+        elif style == 1:
+            refs.append(f'{letter.lower()}{row}kpad{keypad}')
+        elif style == 2:
+            refs.append(f'{nato[column % 13].title()} {row} {keypad}')
+        elif style == 3:
+            refs.append(f' {letter}{row}-{keypad} ')
+        else:
+            refs.append(f'{letter}{row}')
+    return refs
+
+
+def python_ballistics(cases: np.ndarray) -> np.ndarray:
+    """(N, 5) distance, azimuth, elevation, time of flight, JS status index."""
+    solutions = ballistics.calculate_firing_solutions(*cases.T)
+    status = np.array([JS_STATUSES.index(name) for name in ballistics.STATUS_NAMES])[solutions['status']]
+    return np.column_stack([solutions['distance'], solutions['azimuth'], solutions['elevation_radians'],
+                            solutions['time_of_flight'], status])
+
+
+def _max_divergence(python: np.ndarray, js: np.ndarray) -> Dict[str, object]:
+    """Largest absolute difference, plus where one side is NaN and the other not."""
+    both = ~np.isnan(python) & ~np.isnan(js)
+    diff = np.abs(python[both] - js[both])
+    worst = int(np.flatnonzero(both)[np.argmax(diff)]) if diff.size else None
+    return {
+        'max': float(diff.max()) if diff.size else 0.0,
+        'index': worst,
+        'nan_mismatches': int(np.count_nonzero(np.isnan(python) != np.isnan(js))),
+    }
+
+
+def on_decision_boundary(cases: np.ndarray) -> np.ndarray:
+    """Cases within rounding error of a status threshold.
+
+    A one-ulp difference between np.arctan and Math.atan (or np.hypot and
+    Math.sqrt) can legitimately flip these between valid and invalid.
+    """
+    distance = ballistics.calculate_distance(cases[:, 0], cases[:, 1], cases[:, 3], cases[:, 4])
+    height_diff = cases[:, 5] - cases[:, 2]
+    v4 = ballistics.PROJECTILE_VELOCITY ** 4
+    with np.errstate(invalid='ignore', divide='ignore'):
+        disc = ballistics._discriminant(distance, height_diff)
+        angle = np.arctan((ballistics.PROJECTILE_VELOCITY ** 2 + np.sqrt(np.maximum(disc, 0)))
+                          / (ballistics.GRAVITY * distance))
+    return ((np.abs(distance - 1) < 1e-12) | (np.abs(disc) < 1e-12 * v4)
+            | (np.abs(angle - ballistics.MAX_ELEVATION_ANGLE) < 1e-12)
+            | (np.abs(np.abs(height_diff) - ballistics.EXTREME_ELEVATION_THRESHOLD) < 1e-9))
+
+
+def compare_ballistics(cases: np.ndarray, python: np.ndarray, js: np.ndarray) -> Dict[str, object]:
+    """Divergence per field on cases both engines solved, plus status mismatches.
+
+    Status flips on a decision boundary (see on_decision_boundary()) are
+    counted separately as ``boundary_flips`` and left out of the field checks.
+    """
+    mismatch = python[:, 4] != js[:, 4]
+    flips = mismatch & on_decision_boundary(cases)
+    keep = ~flips
+    python, js, cases = python[keep], js[keep], cases[keep]
+
+    azimuth_diff = np.abs(python[:, 1] - js[:, 1])
+    azimuth = np.column_stack([python[:, 1], js[:, 1] + np.where(azimuth_diff > 180, np.sign(
+        python[:, 1] - js[:, 1]) * 360, 0)])
+    mils = ballistics.MILS_PER_CIRCLE / ballistics.RADIANS_PER_CIRCLE
+
+    mismatched = np.flatnonzero(python[:, 4] != js[:, 4])
+    return {
+        'fields': {
+            'distance': _max_divergence(python[:, 0], js[:, 0]),
+            'azimuth': _max_divergence(azimuth[:, 0], azimuth[:, 1]),
+            'elevation_mils': _max_divergence(python[:, 2] * mils, js[:, 2] * mils),
+            'time_of_flight': _max_divergence(python[:, 3], js[:, 3]),
+        },
+        'boundary_flips': int(np.count_nonzero(flips)),
+        'status_mismatches': int(mismatched.size),
+        'status_mismatch_examples': [
+            {'case': cases[i].tolist(), 'python': JS_STATUSES[int(python[i, 4])],
+             'js': JS_STATUSES[int(js[i, 4])] if js[i, 4] >= 0 else None}
+            for i in mismatched[:5]
+        ],
+    }
+
+
+def run_node(directory: Path, node: str = 'node') -> Dict[str, float]:
+    """Run the JS worker over the files in directory; returns its timings."""
+    result = subprocess.run([node, str(WORKER), str(directory)], capture_output=True, text=True,
+                            cwd=REPO_ROOT, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(f'Node worker failed: {result.stderr.strip()}')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def _throughput(count: int, seconds: float) -> float:
+    return count / seconds if seconds > 0 else float('inf')
+
+
+def run_parity(cases: int = DEFAULT_CASES, samples: Optional[int] = None, refs: Optional[int] = None,
+               map_data: Optional[MapData] = None, seed: int = 0, node: str = 'node',
+               maps_dir: Path = DEFAULT_MAPS_DIR) -> Dict[str, object]:
+    """Generate cases, run both engines and compare.
+
+    Args:
+        cases: Random ballistics cases (in-game vectors are added on top)
+        samples: Heightmap samples (default: same as cases)
+        refs: Grid references (default: cases / 10)
+        map_data: Heightmap to sample (default: synthetic 1025×1025 noise)
+
+    Returns:
+        JSON-ready report with per-section divergence, counts, throughput and ``passed``
+    """
+    rng = np.random.default_rng(seed)
+    samples = cases if samples is None else samples
+    refs = max(cases // 10, 1) if refs is None else refs
+
+    ballistic_cases = generate_ballistics_cases(cases, rng, in_game_cases(maps_dir))
+    heightmap = (map_data.heightmap if map_data is not None
+                 else rng.integers(0, 65536, (1025, 1025), dtype=np.uint16))
+    height, width = heightmap.shape
+    pixel_samples = generate_samples(samples, width, height, rng)
+    grid_refs = generate_grid_refs(refs, rng)
+    grid_scale = map_data.grid_scale if map_data is not None else 4096 / 13
+
+    with tempfile.TemporaryDirectory(prefix='parity-') as tmp:
+        directory = Path(tmp)
+        ballistic_cases.astype('<f8').tofile(directory / 'cases.f64')
+        pixel_samples.astype('<f8').tofile(directory / 'samples.f64')
+        np.ascontiguousarray(heightmap, dtype='<u2').tofile(directory / 'heightmap.u16')
+        (directory / 'meta.json').write_text(json.dumps({'width': width, 'height': height}))
+        (directory / 'refs.json').write_text(json.dumps({'gridScale': grid_scale, 'refs': grid_refs}))
+
+        js_seconds = run_node(directory, node)
+        js_solutions = np.fromfile(directory / 'solutions.f64', dtype='<f8').reshape(-1, 5)
+        js_heights = np.fromfile(directory / 'samples_out.f64', dtype='<f8')
+        js_refs = np.fromfile(directory / 'refs_out.f64', dtype='<f8').reshape(-1, 2)
+
+    py_solutions, py_ballistics_seconds = _timed(python_ballistics, ballistic_cases)
+    py_heights, py_sampling_seconds = _timed(bilinear_interpolation, heightmap,
+                                             pixel_samples[:, 0], pixel_samples[:, 1])
+    (py_refs, _), py_refs_seconds = _timed(grid_refs_to_xy, grid_refs, grid_scale)
+
+    sections = {
+        'ballistics': {
+            'count': len(ballistic_cases),
+            **compare_ballistics(ballistic_cases, py_solutions, js_solutions),
+            'python_seconds': py_ballistics_seconds,
+            'js_seconds': js_seconds['ballistics'],
+        },
+        'heightmap': {
+            'count': len(pixel_samples),
+            'fields': {'height': _max_divergence(py_heights, js_heights)},
+            'python_seconds': py_sampling_seconds,
+            'js_seconds': js_seconds['sampling'],
+        },
+        'grid_refs': {
+            'count': len(grid_refs),
+            'fields': {'grid_ref_xy': _max_divergence(py_refs.ravel(), js_refs.ravel())},
+            'python_seconds': py_refs_seconds,
+            'js_seconds': js_seconds['refs'],
+        },
+    }
+
+    passed = True
+    for section in sections.values():
+        section['python_per_second'] = _throughput(section['count'], section['python_seconds'])
+        section['js_per_second'] = _throughput(section['count'], section['js_seconds'])
+        for name, divergence in section['fields'].items():
+            divergence['tolerance'] = TOLERANCES[name]
+            divergence['passed'] = divergence['max'] <= TOLERANCES[name] and not divergence['nan_mismatches']
+            passed &= divergence['passed']
+        passed &= not section.get('status_mismatches', 0)
+
+    return {'seed': seed, 'map': map_data.name if map_data is not None else None,
+            'sections': sections, 'passed': bool(passed)}
+
+
+def print_report(report: Dict[str, object]) -> None:
+    """Human-readable summary of a run_parity() report."""
+    print('=' * 80)
+    print(f"Cross-engine parity (seed {report['seed']}, map: {report['map'] or 'synthetic'})")
+    print('=' * 80)
+    for name, section in report['sections'].items():
+        print(f"\n{name}: {section['count']:,} cases")
+        print(f"  Python: {section['python_per_second']:>14,.0f} /s")
+        print(f"  JS:     {section['js_per_second']:>14,.0f} /s")
+        for field, divergence in section['fields'].items():
+            mark = '✓' if divergence['passed'] else '✗'
+            print(f"  {mark} {field:<16} max |Δ| = {divergence['max']:.3e}"
+                  f"  (tolerance {divergence['tolerance']:.0e}, NaN mismatches {divergence['nan_mismatches']})")
+        if 'status_mismatches' in section:
+            mark = '✓' if not section['status_mismatches'] else '✗'
+            print(f"  {mark} status mismatches: {section['status_mismatches']}"
+                  f"  (boundary flips: {section['boundary_flips']})")
+            for example in section['status_mismatch_examples']:
+                print(f"      {example}")
+    print('\n' + '=' * 80)
+    print('PASSED' if report['passed'] else 'FAILED')
+    print('=' * 80)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Compare the Python and JavaScript engines on random cases.')
+    parser.add_argument('--cases', type=int, default=DEFAULT_CASES, help='Ballistics cases (default: 1000000)')
+    parser.add_argument('--samples', type=int, help='Heightmap samples (default: same as --cases)')
+    parser.add_argument('--refs', type=int, help='Grid references (default: cases / 10)')
+    parser.add_argument('--map', help='Sample this processed map instead of a synthetic heightmap')
+    parser.add_argument('--maps-dir', type=Path, default=DEFAULT_MAPS_DIR, help='Processed maps directory')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--node', default='node', help='Node.js executable')
+    parser.add_argument('--json', type=Path, help='Also write the report to this file')
+    args = parser.parse_args(argv)
+
+    if shutil.which(args.node) is None:
+        print(f'Error: Node.js not found ({args.node})', file=sys.stderr)
+        return 2
+
+    map_data = None
+    if args.map:
+        map_dir = args.maps_dir / args.map
+        if not (map_dir / 'metadata.json').is_file():
+            print(f"Error: map '{args.map}' not found in {args.maps_dir}", file=sys.stderr)
+            return 2
+        map_data = MapData(map_dir)
+
+    report = run_parity(args.cases, args.samples, args.refs, map_data, args.seed, args.node, args.maps_dir)
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    return 0 if report['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Precache Manifest
+
+Lists the files the service worker (templates/sw.js, served at /sw.js)
+keeps in the browser cache so repeat visits load without the network.
+Each entry has a revision: a hash of its content. The manifest version
+hashes all entries, so any change produces a new service-worker script.
+The browser installs it, copies unchanged entries from the previous cache
+and downloads only the entries whose revision changed.
+
+Entry format: {'url': ..., 'revision': ..., 'revalidate': bool}. Revalidated
+entries (the page, map list and map JSON) are answered from the cache and
+refreshed in the background. The others are served from the cache until
+their revision changes.
+"""
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from calculator.blobs import resolve_map_file
+from calculator.heightmap import has_heightmap
+from calculator.heightmap_tiles import heightmap_source
+
+# Hex digits of SHA-256 kept as a revision
+REVISION_LENGTH = 16
+
+# Revisions by path, reused while the file's size and mtime are unchanged
+_revision_cache: Dict[str, Tuple[Tuple[int, int], str]] = {}
+_revision_lock = threading.Lock()
+
+
+def content_revision(data: bytes) -> str:
+    """Revision of in-memory content."""
+    return hashlib.sha256(data).hexdigest()[:REVISION_LENGTH]
+
+
+def file_revision(path: Path) -> str:
+    """Revision of a file's content (hashed once per size/mtime)."""
+    stat = path.stat()
+    signature = (stat.st_size, stat.st_mtime_ns)
+    key = str(path)
+    with _revision_lock:
+        cached = _revision_cache.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+    revision = content_revision(path.read_bytes())
+    with _revision_lock:
+        _revision_cache[key] = (signature, revision)
+    return revision
+
+
+def static_entries(static_dir: Path, prefix: str = '/static/') -> List[dict]:
+    """Entries for every file under the static folder, sorted by URL."""
+    static_dir = Path(static_dir)
+    entries = []
+    for path in sorted(static_dir.rglob('*')):
+        relative = path.relative_to(static_dir)
+        if not path.is_file() or any(part.startswith('.') for part in relative.parts):
+            continue
+        entries.append({'url': prefix + relative.as_posix(), 'revision': file_revision(path), 'revalidate': False})
+    return entries
+
+
+def map_entries(map_dir: Path) -> List[dict]:
+    """Entries for the files the UI fetches when opening a map.
+
+    The heightmap tile index is revisioned by the heightmap file, like the
+    tile store's version. The tiles themselves have versioned URLs and are
+    cached by the service worker as they are fetched.
+    """
+    map_dir = Path(map_dir)
+    base = f'/maps/{map_dir.name}/'
+    entries = [{'url': base + 'metadata.json', 'revision': file_revision(map_dir / 'metadata.json'),
+                'revalidate': True}]
+    minimap = resolve_map_file(map_dir, 'minimap.png')
+    if minimap is not None:
+        entries.append({'url': base + 'minimap.png', 'revision': file_revision(minimap), 'revalidate': False})
+    if has_heightmap(map_dir):
+        entries.append({'url': base + 'heightmap/tiles', 'revision': file_revision(heightmap_source(map_dir)),
+                        'revalidate': True})
+    return entries
+
+
+def build_manifest(entries: Iterable[dict]) -> dict:
+    """Manifest for the service worker: {'version', 'entries'}."""
+    entries = list(entries)
+    version = content_revision(json.dumps(entries, sort_keys=True).encode('utf-8'))
+    return {'version': version, 'entries': entries}
@@ -1,19 +1,47 @@
 #!/usr/bin/env python3
 """
-Flask Static File Server for Project Reality Mortar Calculator
-Serves HTML, CSS, JavaScript, and JSON map data files to browser.
-All calculations happen in the browser - this server only serves files.
+Flask Server for Project Reality Mortar Calculator
+Serves HTML, CSS, JavaScript, and processed map data files to the browser.
+The interactive calculator runs in the browser. The server also offers
+compute endpoints backed by the calculator.* engine modules:
+
+- /maps/<map>/terrain, /keypads, /heightmap/tiles: derived terrain data
+- /maps/<map>/grid-refs, /solutions: batch solving (streamed responses)
+- /maps/<map>/fire-plan, /dispersion: fire plans and dispersion simulation
+- /maps/<map>/jobs, /jobs/<id>: long-running work on the job scheduler
+- /maps/<map>/sessions, /sessions/<id>: shared fire-mission sessions
+- /telemetry: client load timings and map usage metrics
 """
 
+import math
+import mimetypes
 import os
 import sys
-import webbrowser
+import tempfile
 import time
 from pathlib import Path
-from flask import Flask, send_from_directory, render_template, abort, Response
 
 __version__ = "1.0.0"
 
+# When launched as a script (python calculator/server.py) the project root is
+# not on sys.path; add it so the calculator.* engine modules can be imported.
+if __package__ in (None, ''):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Launched as the application: claim the port and start the browser before
+# importing Flask, so the browser launch overlaps the imports below. Its
+# first request waits in the socket backlog until main() starts serving.
+_cold_start = None
+if __name__ == '__main__':
+    # Job worker processes of the frozen app re-run the executable; let
+    # multiprocessing take over before the port and browser are touched
+    import multiprocessing
+    multiprocessing.freeze_support()
+    from calculator.startup import ColdStart
+    _cold_start = ColdStart(open_browser='--no-browser' not in sys.argv[1:])
+
+from flask import Flask, send_from_directory, render_template, abort, make_response, redirect, Response
+
 # When running as a PyInstaller bundle the application files are extracted into
 # a temporary directory pointed to by sys._MEIPASS. Configure Flask so that
 # templates and static files are resolved from the embedded paths when frozen.
@@ -50,11 +78,118 @@ PROCESSED_MAPS_DIR = PROJECT_ROOT / 'processed_maps'
 # Configure MIME types explicitly
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # Disable caching during development
 
+# Per-map usage counts persist next to the executable when frozen (the bundle
+# directory is temporary), otherwise in the project root
+if getattr(sys, 'frozen', False):
+    USAGE_STATS_FILE = Path(sys.executable).parent / 'map_usage.json'
+else:
+    USAGE_STATS_FILE = PROJECT_ROOT / 'map_usage.json'
+
+# Number of most-used maps decoded into memory at startup
+WARM_CACHE_TOP_N = 3
+
+# Most-used maps whose files the service worker precaches (plus the last used)
+PRECACHE_TOP_MAPS = 3
+
+# Memory-mapped heightmap copies for the tile endpoint (see calculator/heightmap_tiles.py)
+TILE_CACHE_DIR = Path(tempfile.gettempdir()) / 'pr_mortar_calculator' / 'tiles'
+
+# Access counter; in-memory until main() attaches the persisted file
+usage_stats = None
+
+
+def get_usage_stats():
+    """Return the map usage counter, creating an in-memory one on first use."""
+    global usage_stats
+    if usage_stats is None:
+        from calculator.usage import MapUsageStats
+        usage_stats = MapUsageStats()
+    return usage_stats
+
 
 @app.route('/')
 def index():
-    """Serve the main calculator page."""
-    return render_template('index.html')
+    """Serve the main calculator page, preloading the last-used map's data."""
+    response = make_response(render_template('index.html'))
+    links = preload_links(get_usage_stats().last_used)
+    if links:
+        response.headers['Link'] = ', '.join(links)
+    return response
+
+
+def preload_links(map_name):
+    """
+    Link: rel=preload values for a map's metadata and heightmap tile index,
+    so the browser starts downloading them before app.js asks. Empty if the
+    map is unknown or gone.
+
+    Fetching these files does not count as opening the map (the UI reports
+    opens with POST /maps/<map>/open), so a page load alone never counts.
+    """
+    from calculator.heightmap import has_heightmap
+
+    if not map_name:
+        return []
+    map_dir = PROCESSED_MAPS_DIR / map_name
+    if not (map_dir / 'metadata.json').is_file():
+        return []
+
+    files = ['metadata.json']
+    if has_heightmap(map_dir):
+        # The UI fetches heightmap tiles for the area in use, not the whole file
+        files.append('heightmap/tiles')
+    return [f'</maps/{map_name}/{name}>; rel=preload; as=fetch; crossorigin' for name in files]
+
+
+def precache_map_names():
+    """Maps whose files the service worker precaches: last used, then most used."""
+    stats = get_usage_stats()
+    names = [stats.last_used] + stats.top(PRECACHE_TOP_MAPS)
+    selected = []
+    for name in names:
+        if name and name not in selected and (PROCESSED_MAPS_DIR / name / 'metadata.json').is_file():
+            selected.append(name)
+    return selected
+
+
+def get_precache_manifest():
+    """
+    Precache manifest (see calculator/precache.py): the page, the map list,
+    every static asset and the selected maps' files, each with a content hash.
+    """
+    import json
+    from calculator.precache import build_manifest, content_revision, file_revision, map_entries, static_entries
+
+    template_dir = Path(app.root_path) / template_folder
+    entries = [{'url': '/', 'revision': file_revision(template_dir / 'index.html'), 'revalidate': True}]
+    if PROCESSED_MAPS_DIR.is_dir():
+        maps = json.dumps(get_map_entries(), sort_keys=True).encode('utf-8')
+        entries.append({'url': '/maps/list', 'revision': content_revision(maps), 'revalidate': True})
+    entries += static_entries(Path(app.root_path) / static_folder)
+    for map_name in precache_map_names():
+        entries += map_entries(PROCESSED_MAPS_DIR / map_name)
+    return build_manifest(entries)
+
+
+@app.route('/sw.js')
+def service_worker():
+    """
+    Service worker with the current precache manifest built in. Served from
+    the root so it controls the whole site; never cached by the browser, so
+    a changed manifest is picked up on the next visit.
+    """
+    response = make_response(render_template('sw.js', manifest=get_precache_manifest()))
+    response.mimetype = 'text/javascript'
+    response.cache_control.no_cache = True
+    return response
+
+
+@app.route('/precache-manifest.json')
+def precache_manifest():
+    """The precache manifest built into /sw.js, for inspection."""
+    from flask import jsonify
+
+    return jsonify(get_precache_manifest())
 
 
 @app.route('/favicon.ico')
@@ -99,21 +234,43 @@ def serve_map_data(map_name, filename):
     # Security check: prevent directory traversal
     file_path = map_dir / filename
     if not file_path.is_file():
+        # Deduplicated payloads live in the shared blob store; redirect so
+        # variants sharing a file hit the same (browser-cached) URL
+        from calculator.blobs import blob_path, blob_references
+        digest = blob_references(map_dir).get(filename)
+        if digest and blob_path(PROCESSED_MAPS_DIR, digest).is_file():
+            return redirect(f'/blobs/{digest}/{filename}')
         abort(404, description=f"File '{filename}' not found in map '{map_name}'")
     
-    # Serve with correct MIME type and encoding
-    if filename.endswith('.json.gz'):
-        # Serve gzipped JSON with proper headers
-        return send_from_directory(
-            map_dir, 
-            filename, 
-            mimetype='application/json',
-            as_attachment=False
-        )
-    elif filename.endswith('.json'):
-        return send_from_directory(map_dir, filename, mimetype='application/json')
-    else:
-        return send_from_directory(map_dir, filename)
+    return send_map_file(map_dir, filename, filename)
+
+
+def send_map_file(directory, stored_name, filename):
+    """
+    Send a map data file with the MIME type for its logical filename.
+    Gzipped JSON is sent as application/json; the client decompresses it.
+    """
+    if filename.endswith('.json.gz') or filename.endswith('.json'):
+        return send_from_directory(directory, stored_name, mimetype='application/json', as_attachment=False)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    return send_from_directory(directory, stored_name, mimetype=mimetype)
+
+
+@app.route('/blobs/<digest>/<filename>')
+def serve_blob(digest, filename):
+    """
+    Serve a shared payload from processed_maps/_blobs/ (see calculator/blobs.py).
+    Blobs are content-addressed, so they can be cached forever.
+    """
+    from calculator.blobs import BLOBS_DIRNAME, blob_path, is_digest
+
+    if not is_digest(digest) or not blob_path(PROCESSED_MAPS_DIR, digest).is_file():
+        abort(404, description=f"Blob '{digest}' not found")
+    response = send_map_file(PROCESSED_MAPS_DIR / BLOBS_DIRNAME, digest, filename)
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response
 
 
 @app.route('/processed_maps/<map_name>/<filename>')
@@ -141,30 +298,866 @@ def list_maps():
             'maps': []
         }), 404
     
-    # Scan for maps (directories containing metadata.json)
-    maps = []
-    for item in PROCESSED_MAPS_DIR.iterdir():
-        if item.is_dir() and (item / 'metadata.json').is_file():
-            maps.append({
-                'name': item.name,
-                'path': item.name
-            })
-    
-    # Sort alphabetically
-    maps.sort(key=lambda x: x['name'])
-    
+    maps = get_map_entries()
     return jsonify({
         'maps': maps,
         'count': len(maps)
     })
 
 
+# Map list from the prebuilt index; the bundle cannot change, so it is cached
+_bundled_map_entries = None
+
+
+def get_map_entries():
+    """
+    Processed maps as /maps/list entries, sorted by name.
+    Uses processed_maps/maps_index.json when present and current, otherwise
+    scans the map directories.
+    """
+    global _bundled_map_entries
+    from calculator.map_index import load_map_index, scan_maps
+
+    frozen = getattr(sys, 'frozen', False)
+    if frozen and _bundled_map_entries is not None:
+        return _bundled_map_entries
+    maps = load_map_index(PROCESSED_MAPS_DIR, verify=not frozen)
+    if maps is None:
+        maps = scan_maps(PROCESSED_MAPS_DIR)
+    if frozen:
+        _bundled_map_entries = maps
+    return maps
+
+
+def get_map_data(map_name):
+    """
+    Load heightmap + metadata for a processed map, or abort with 404.
+    Results are cached by calculator.heightmap, so repeat calls are cheap.
+    """
+    from calculator.heightmap import MapData, has_heightmap
+
+    map_dir = PROCESSED_MAPS_DIR / map_name
+    if not (map_dir / 'metadata.json').is_file() or not has_heightmap(map_dir):
+        abort(404, description=f"Map '{map_name}' not found")
+    return MapData(map_dir)
+
+
+def get_terrain(map_name):
+    """
+    Lazily load terrain acceleration structures (terrain.npz) for a map.
+    Falls back to building them in memory if the file is missing or stale.
+    """
+    from calculator.terrain import load_terrain_accel
+
+    map_data = get_map_data(map_name)
+    return load_terrain_accel(map_data.map_dir, map_data.heightmap, map_data.metadata)
+
+
+@app.route('/maps/<map_name>/open', methods=['POST'])
+def record_map_open(map_name):
+    """
+    Count one use of a map (see calculator/usage.py). Sent by the UI when
+    the player loads a map, so preloaded and precached downloads of its
+    files never count.
+    """
+    if not (PROCESSED_MAPS_DIR / map_name / 'metadata.json').is_file():
+        abort(404, description=f"Map '{map_name}' not found")
+    get_usage_stats().record(map_name)
+    return '', 204
+
+
+@app.route('/maps/<map_name>/terrain')
+def terrain_summary(map_name):
+    """
+    Return precomputed terrain statistics for a map as JSON.
+    Saves clients from scanning the whole heightmap (getHeightmapStats).
+    """
+    from flask import jsonify
+
+    summary = get_terrain(map_name).summary()
+    summary['map'] = map_name
+    return jsonify(summary)
+
+
+def get_keypad_table(map_name):
+    """
+    Lazily load keypad lookup tables (keypads.json.gz) for a map.
+    Falls back to building them in memory if the file is missing or stale.
+    """
+    from calculator.keypads import load_keypad_table
+
+    map_data = get_map_data(map_name)
+    return load_keypad_table(map_data.map_dir, map_data.heightmap, map_data.metadata)
+
+
+@app.route('/maps/<map_name>/keypads')
+def map_keypads(map_name):
+    """
+    Precomputed keypad / sub-keypad elevations (see calculator/keypads.py).
+    With ?ref=D6-7 (or a sub-keypad, D6-7-3) returns the lookup for that
+    reference only, otherwise the full tables.
+    """
+    from flask import jsonify, request
+    from calculator.coordinates import parse_grid_reference
+
+    table = get_keypad_table(map_name)
+    grid_ref = request.args.get('ref')
+    if grid_ref is None:
+        return jsonify({'map': map_name, **table.to_json()})
+
+    parsed = parse_grid_reference(grid_ref)
+    if parsed is None:
+        abort(400, description=f'Invalid grid reference: {grid_ref!r}')
+    return jsonify({'map': map_name, 'ref': grid_ref,
+                    **table.lookup(parsed.column, parsed.row, parsed.keypad, parsed.subkeypad)})
+
+
+def get_tile_store(map_name):
+    """
+    Heightmap tile store for a map (see calculator/heightmap_tiles.py), or abort with 404.
+    Opening it does not decode the heightmap once its memory-mapped copy exists.
+    """
+    from calculator.heightmap import has_heightmap
+    from calculator.heightmap_tiles import open_tile_store
+
+    map_dir = PROCESSED_MAPS_DIR / map_name
+    if not (map_dir / 'metadata.json').is_file() or not has_heightmap(map_dir):
+        abort(404, description=f"Map '{map_name}' not found")
+    return open_tile_store(map_dir, TILE_CACHE_DIR)
+
+
+@app.route('/maps/<map_name>/heightmap/tiles')
+def heightmap_tile_index(map_name):
+    """
+    Tile layout of a map's heightmap: resolution, tile_size, tiles per axis
+    and a version to append to tile URLs (?v=...) so they can be cached forever.
+    """
+    from flask import jsonify
+
+    return jsonify({'map': map_name, **get_tile_store(map_name).index()})
+
+
+@app.route('/maps/<map_name>/heightmap/tile/<int:i>/<int:j>')
+def heightmap_tile(map_name, i, j):
+    """
+    One heightmap tile (row i from the north, column j from the west) in the
+    heightmap.bin format. Tiles requested with the current ?v= version are
+    immutable; others are revalidated with their ETag.
+    """
+    from flask import request
+
+    store = get_tile_store(map_name)
+    if not (0 <= i < store.tiles_per_axis and 0 <= j < store.tiles_per_axis):
+        abort(404, description=f"Tile ({i}, {j}) not found in map '{map_name}'")
+
+    response = make_response(store.encoded_tile(i, j))
+    response.mimetype = 'application/octet-stream'
+    response.set_etag(f'{store.version}-{i}-{j}')
+    response.cache_control.public = True
+    if request.args.get('v') == store.version:
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+OVERLAY_LAYERS = ('hillshade', 'contours')
+
+
+@app.route('/maps/<map_name>/overlays/<layer>/<filename>')
+def map_overlay_tile(map_name, layer, filename):
+    """
+    One prebuilt overlay tile (processor/build_overlays.py), e.g.
+    /maps/muttrah_city_2/overlays/hillshade/1_2.png for row 1, column 2.
+    """
+    if layer not in OVERLAY_LAYERS:
+        abort(404, description=f"Overlay '{layer}' not found")
+    overlay_dir = PROCESSED_MAPS_DIR / map_name / 'overlays' / layer
+    if not filename.endswith('.png') or not (overlay_dir / filename).is_file():
+        abort(404, description=f"Overlay tile '{layer}/{filename}' not found in map '{map_name}'")
+    return send_from_directory(overlay_dir, filename, mimetype='image/png')
+
+
+MAX_GRID_REFS = 100000
+
+# Rows per chunk of a streamed batch response
+STREAM_CHUNK_ROWS = 4096
+
+# Frame columns of /grid-refs (refs) and /solutions (see calculator/streaming.py)
+GRID_REF_COLUMNS = (('x', 'f'), ('y', 'f'), ('valid', 'B'))
+SOLUTION_COLUMNS = (('distance', 'f'), ('azimuth', 'f'), ('height_delta', 'f'), ('elevation_mils', 'f'),
+                    ('time_of_flight', 'f'), ('valid', 'B'), ('status', 'B'))
+
+
+def stream_chunks(count):
+    """Row slices covering count rows, STREAM_CHUNK_ROWS at a time."""
+    return (slice(start, start + STREAM_CHUNK_ROWS) for start in range(0, count, STREAM_CHUNK_ROWS))
+
+
+def negotiate_batch_format(supported=None):
+    """Response format for a batch endpoint from the Accept header, or abort with 406."""
+    from flask import request
+    from calculator import streaming
+
+    fmt = streaming.negotiate(request.accept_mimetypes, supported or streaming.FORMATS)
+    if fmt is None:
+        abort(406, description=f"Accept one of: {', '.join(supported or streaming.FORMATS)}")
+    return fmt
+
+
+def batch_response(body, mimetype):
+    """Response sent chunk by chunk as its generator produces them."""
+    response = Response(body, mimetype=mimetype)
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/maps/<map_name>/grid-refs', methods=['POST'])
+def grid_refs(map_name):
+    """
+    Convert grid references to XY, or XY to grid references, in bulk.
+
+    Request body (JSON), one of:
+    - refs: list of grid references ("C5-3", "C5-3-7"); returns positions
+      ({"x", "y"} or null) and the indices of invalid references
+    - positions: list of {"x": .., "y": ..} objects; returns refs (null
+      outside the grid), with "subkeypad": true for sub-keypad precision
+    Optional grid_scale / map_size override the map's metadata.
+
+    With Accept: application/x-ndjson the results are streamed one per line
+    instead; refs can also be streamed as frames (x, y, valid).
+    """
+    import json
+    import numpy as np
+    from flask import jsonify, request
+    from calculator import streaming
+    from calculator.coordinates import grid_refs_to_xy, resolve_grid_scale, xy_to_grid_refs
+
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400, description='Request body must be a JSON object')
+
+    refs = body.get('refs')
+    positions = body.get('positions')
+    if (refs is None) == (positions is None):
+        abort(400, description='Request body must contain either refs or positions')
+    items = refs if refs is not None else positions
+    if not isinstance(items, list) or len(items) > MAX_GRID_REFS:
+        abort(400, description=f'{"refs" if refs is not None else "positions"} must be a list '
+                               f'of at most {MAX_GRID_REFS} items')
+    fmt = negotiate_batch_format(None if refs is not None else (streaming.JSON, streaming.NDJSON))
+
+    map_data = get_map_data(map_name)
+    try:
+        grid_scale = resolve_grid_scale(map_data.metadata, body.get('grid_scale'), body.get('map_size'))
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    result = {'map': map_name, 'grid_scale': grid_scale}
+    if refs is not None:
+        xy, valid = grid_refs_to_xy(refs, grid_scale)
+        if fmt == streaming.FRAMES:
+            chunks = ({'x': xy[rows, 0], 'y': xy[rows, 1], 'valid': valid[rows]} for rows in stream_chunks(len(xy)))
+            return batch_response(streaming.frame_stream(GRID_REF_COLUMNS, chunks), streaming.FRAMES)
+        if fmt == streaming.NDJSON:
+            chunks = ([f'{{"x": {x}, "y": {y}}}' if ok else 'null'
+                       for (x, y), ok in zip(xy[rows].tolist(), valid[rows].tolist())]
+                      for rows in stream_chunks(len(xy)))
+            return batch_response(streaming.ndjson_lines(chunks), streaming.NDJSON)
+        result['positions'] = [{'x': x, 'y': y} if ok else None
+                               for (x, y), ok in zip(xy.tolist(), valid.tolist())]
+        result['invalid'] = np.flatnonzero(~valid).tolist()
+    else:
+        try:
+            xy = [(float(p['x']), float(p['y'])) for p in positions]
+        except (TypeError, KeyError, ValueError):
+            abort(400, description='positions must be {"x": .., "y": ..} objects')
+        result['refs'] = xy_to_grid_refs(np.array(xy, dtype=np.float64).reshape(-1, 2), grid_scale,
+                                         subkeypad=bool(body.get('subkeypad')))
+        if fmt == streaming.NDJSON:
+            chunks = ([json.dumps(ref) for ref in result['refs'][rows]] for rows in stream_chunks(len(xy)))
+            return batch_response(streaming.ndjson_lines(chunks), streaming.NDJSON)
+    return jsonify(result)
+
+
+MAX_BATCH_SOLUTIONS = 100000
+
+
+@app.route('/maps/<map_name>/solutions', methods=['POST'])
+def batch_solutions(map_name):
+    """
+    Firing solutions from one mortar to many targets, streamed as they are solved.
+
+    Request body (JSON):
+    - mortar: grid reference ("C5-7") or {"x": .., "y": ..} object
+    - targets: list of positions in the same format (at most MAX_BATCH_SOLUTIONS)
+    - decimals: optional rounding of JSON numbers (smaller and faster)
+
+    The Accept header picks the format (see calculator/streaming.py): one
+    JSON document {"map", "mortar", "count", "solutions": [...]} (default),
+    NDJSON with one solution per line, or frames of SOLUTION_COLUMNS.
+    Solutions have the fields of calculateFiringSolution() in ballistics.js.
+    """
+    from flask import request
+    from calculator import streaming
+    from calculator.coordinates import resolve_positions
+    from calculator.solve import Solver
+
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400, description='Request body must be a JSON object')
+    targets = body.get('targets')
+    decimals = body.get('decimals')
+    if not isinstance(targets, list) or not 1 <= len(targets) <= MAX_BATCH_SOLUTIONS:
+        abort(400, description=f'targets must be a list of 1-{MAX_BATCH_SOLUTIONS} positions')
+    if decimals is not None and (isinstance(decimals, bool) or not isinstance(decimals, int)
+                                 or not 0 <= decimals <= 10):
+        abort(400, description='decimals must be an integer 0-10')
+    fmt = negotiate_batch_format()
+
+    map_data = get_map_data(map_name)
+    try:
+        (mortar_xy,) = resolve_positions([body.get('mortar')], map_data.grid_scale)
+        targets_xy = resolve_positions(targets, map_data.grid_scale)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    solver = Solver(map_data, decimals)
+    mx, my = mortar_xy
+
+    def solved():
+        for rows in stream_chunks(len(targets_xy)):
+            yield solver.solve_positions(mx, my, targets_xy[rows, 0], targets_xy[rows, 1])
+
+    if fmt == streaming.FRAMES:
+        return batch_response(streaming.frame_stream(SOLUTION_COLUMNS, solved()), streaming.FRAMES)
+    rows = (solver.solution_json(solutions) for solutions in solved())
+    if fmt == streaming.NDJSON:
+        return batch_response(streaming.ndjson_lines(rows), streaming.NDJSON)
+    head = {'map': map_name, 'mortar': {'x': float(mx), 'y': float(my)}, 'count': len(targets_xy)}
+    return batch_response(streaming.json_document(head, 'solutions', rows), streaming.JSON)
+
+
+def get_grid_scale(map_name):
+    """
+    Grid square size of a processed map, or abort with 404. Reads only the
+    metadata: job parameters are validated without loading the heightmap.
+    """
+    from calculator.heightmap import has_heightmap, load_metadata
+
+    map_dir = PROCESSED_MAPS_DIR / map_name
+    if not (map_dir / 'metadata.json').is_file() or not has_heightmap(map_dir):
+        abort(404, description=f"Map '{map_name}' not found")
+    metadata = load_metadata(map_dir)
+    return metadata.get('grid_scale') or metadata['map_size'] / 13
+
+
+def fire_plan_params(body, grid_scale):
+    """
+    Validate a fire-plan request body and return the job parameters.
+
+    Request body (JSON):
+    - mortars: list of grid references ("C5-7") or {"x": .., "y": ..} objects
+    - targets: list in the same format
+    - objective: "total" (minimise summed time of flight, default) or
+      "max" (minimise the longest time of flight)
+    - capacity: optional maximum targets per mortar (default: no limit)
+    """
+    from calculator import fire_plan as planner
+    from calculator.coordinates import resolve_positions
+
+    mortars = body.get('mortars')
+    targets = body.get('targets')
+    objective = body.get('objective', 'total')
+    capacity = body.get('capacity')
+    if not isinstance(mortars, list) or not 1 <= len(mortars) <= planner.MAX_MORTARS:
+        abort(400, description=f'mortars must be a list of 1-{planner.MAX_MORTARS} positions')
+    if not isinstance(targets, list) or not 1 <= len(targets) <= planner.MAX_TARGETS:
+        abort(400, description=f'targets must be a list of 1-{planner.MAX_TARGETS} positions')
+    if objective not in planner.OBJECTIVES:
+        abort(400, description=f"objective must be one of: {', '.join(planner.OBJECTIVES)}")
+    if capacity is not None and (isinstance(capacity, bool) or not isinstance(capacity, int) or capacity < 1):
+        abort(400, description='capacity must be a positive integer')
+
+    try:
+        mortars_xy = resolve_positions(mortars, grid_scale)
+        targets_xy = resolve_positions(targets, grid_scale)
+    except ValueError as e:
+        abort(400, description=str(e))
+    return {'mortars': mortars_xy.tolist(), 'targets': targets_xy.tolist(),
+            'objective': objective, 'capacity': capacity}
+
+
+MAX_CLOUD_POINTS = 5000
+
+
+def dispersion_params(body, grid_scale):
+    """
+    Validate a dispersion request body and return the job parameters.
+
+    Request body (JSON):
+    - mortar, target: grid reference ("C5-7") or {"x": .., "y": ..} object
+    - rounds: simulated shots (default 10000)
+    - elevation_sigma_mils, azimuth_sigma_mils, velocity_sigma: spread overrides
+    - splash_radius: meters (default 20)
+    - seed: optional, for repeatable results
+    - cloud_points: impact points to return (default 500)
+    """
+    from calculator.coordinates import resolve_positions
+
+    options = {}
+    for name, kind in (('rounds', int), ('elevation_sigma_mils', float), ('azimuth_sigma_mils', float),
+                       ('velocity_sigma', float), ('splash_radius', float), ('seed', int)):
+        value = body.get(name)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or (kind is int and value != int(value)):
+            abort(400, description=f'{name} must be a number')
+        options[name] = kind(value)
+    cloud_points = body.get('cloud_points', 500)
+    if not isinstance(cloud_points, int) or not 0 <= cloud_points <= MAX_CLOUD_POINTS:
+        abort(400, description=f'cloud_points must be an integer 0-{MAX_CLOUD_POINTS}')
+
+    try:
+        mortar_xy, target_xy = resolve_positions([body.get('mortar'), body.get('target')], grid_scale)
+    except ValueError as e:
+        abort(400, description=str(e))
+    return {'mortar': mortar_xy.tolist(), 'target': target_xy.tolist(),
+            'options': options, 'cloud_points': cloud_points}
+
+
+# Request validators per job kind (see calculator/jobs.py for the computations)
+JOB_PARAMS = {
+    'fire-plan': fire_plan_params,
+    'dispersion': dispersion_params,
+}
+
+
+# Background compute jobs; the worker pool starts with the first job
+job_scheduler = None
+
+# Worker processes for jobs: leave a core for serving requests
+JOB_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# Jobs waiting for a worker before new ones are refused with 429
+JOB_QUEUE_LIMIT = 32
+
+# How long the synchronous endpoints wait before answering 202 with the job
+JOB_SYNC_TIMEOUT = 60.0
+
+# Longest long-poll wait (?wait=) on a job, and SSE heartbeat interval
+JOB_LONG_POLL_MAX = 30.0
+JOB_HEARTBEAT_SECONDS = 15.0
+
+# Suggested client back-off when the queue is full (Retry-After)
+JOB_RETRY_AFTER_SECONDS = 2
+
+
+def get_job_scheduler():
+    """Return the job scheduler, creating it on first use."""
+    global job_scheduler
+    if job_scheduler is None:
+        import atexit
+        from calculator.jobs import JobScheduler
+        job_scheduler = JobScheduler(JOB_WORKERS, JOB_QUEUE_LIMIT)
+        atexit.register(job_scheduler.shutdown)
+    return job_scheduler
+
+
+def submit_job(kind, map_name, body):
+    """Validate a request body for a job kind and submit it (429 when the queue is full)."""
+    from calculator.jobs import QueueFullError
+
+    if not isinstance(body, dict):
+        abort(400, description='Request body must be a JSON object')
+    params = JOB_PARAMS[kind](body, get_grid_scale(map_name))
+    try:
+        return get_job_scheduler().submit(kind, PROCESSED_MAPS_DIR / map_name, params)
+    except QueueFullError as e:
+        abort(429, description=str(e))
+
+
+def get_job(job_id):
+    """Look up a job, or abort with 404."""
+    job = get_job_scheduler().get(job_id)
+    if job is None:
+        abort(404, description=f"Job '{job_id}' not found")
+    return job
+
+
+def job_state_response(job):
+    """Job state as JSON: 200 once finished, 202 while queued or running."""
+    from flask import jsonify
+
+    response = jsonify(job.to_dict())
+    response.status_code = 200 if job.finished is not None else 202
+    response.headers['Location'] = f'/jobs/{job.id}'
+    return response
+
+
+def job_result_response(job, map_name):
+    """
+    Wait for a job and answer like an inline computation would. If it takes
+    longer than JOB_SYNC_TIMEOUT, answer 202 with the job to poll instead.
+    """
+    from flask import jsonify
+
+    if not job.wait(JOB_SYNC_TIMEOUT):
+        return job_state_response(job)
+    if job.status == 'failed':
+        abort(400 if job.invalid else 500, description=job.error)
+    if job.status == 'cancelled':
+        abort(409, description=f"Job '{job.id}' was cancelled")
+    return jsonify({'map': map_name, **job.result})
+
+
+@app.route('/maps/<map_name>/fire-plan', methods=['POST'])
+def fire_plan(map_name):
+    """
+    Assign targets to several mortars and return a per-mortar fire order.
+    See fire_plan_params() for the request body. Runs as a background job;
+    the response is sent when it finishes.
+    """
+    from flask import request
+
+    return job_result_response(submit_job('fire-plan', map_name, request.get_json(silent=True)), map_name)
+
+
+@app.route('/maps/<map_name>/dispersion', methods=['POST'])
+def dispersion(map_name):
+    """
+    Monte Carlo dispersion for one mortar/target pair (see calculator/dispersion.py).
+    See dispersion_params() for the request body. Runs as a background job;
+    the response is sent when it finishes.
+    """
+    from flask import request
+
+    return job_result_response(submit_job('dispersion', map_name, request.get_json(silent=True)), map_name)
+
+
+@app.route('/maps/<map_name>/jobs', methods=['POST'])
+def create_job(map_name):
+    """
+    Submit a background job and return at once (202, Location: /jobs/<id>).
+
+    Request body (JSON): {"kind": "fire-plan" | "dispersion", ...} with the
+    same fields as the matching endpoint. Identical jobs share one id, and
+    recently finished ones are answered from the result cache (200).
+    """
+    from flask import request
+
+    body = request.get_json(silent=True)
+    kind = body.get('kind') if isinstance(body, dict) else None
+    if kind not in JOB_PARAMS:
+        abort(400, description=f"kind must be one of: {', '.join(JOB_PARAMS)}")
+    return job_state_response(submit_job(kind, map_name, body))
+
+
+@app.route('/jobs')
+def job_stats():
+    """Scheduler load: workers, running and queued jobs, counters."""
+    from flask import jsonify
+
+    return jsonify(get_job_scheduler().stats())
+
+
+def long_poll_wait(default, maximum):
+    """The request's ?wait= in seconds, clamped to [0, maximum] (400 if not a finite number)."""
+    from flask import request
+
+    wait = request.args.get('wait', default, type=float)
+    if not math.isfinite(wait):
+        abort(400, description='wait must be a finite number of seconds')
+    return min(max(wait, 0.0), maximum)
+
+
+@app.route('/jobs/<job_id>')
+def job_state(job_id):
+    """
+    Job state, with the result once done. Long-poll with ?wait=<seconds>:
+    answers as soon as the job finishes, or with its current state after wait.
+    """
+    job = get_job(job_id)
+    wait = long_poll_wait(0.0, JOB_LONG_POLL_MAX)
+    if wait:
+        job.wait(wait)
+    return job_state_response(job)
+
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """
+    Server-Sent Events stream of a job's state (event: state, id: version),
+    one event per change; the stream ends after the finished state.
+    """
+    from flask import request
+
+    job = get_job(job_id)
+    last_seen = request.headers.get('Last-Event-ID', type=int)
+
+    def stream():
+        import json
+        since = -1 if last_seen is None else last_seen
+        yield 'retry: 2000\n\n'
+        while True:
+            if job.version <= since and not job.wait_for_change(since, JOB_HEARTBEAT_SECONDS):
+                yield ': keepalive\n\n'
+                continue
+            state = job.to_dict()
+            since = state['version']
+            yield f"id: {since}\nevent: state\ndata: {json.dumps(state)}\n\n"
+            if job.finished is not None:
+                return
+
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job; finished jobs are returned unchanged."""
+    job = get_job_scheduler().cancel(job_id)
+    if job is None:
+        abort(404, description=f"Job '{job_id}' not found")
+    return job_state_response(job)
+
+
+# Shared fire-mission sessions; created on first use (in memory only)
+session_registry = None
+
+# Heartbeat interval for event streams (also how soon a gone client is noticed)
+SESSION_HEARTBEAT_SECONDS = 15.0
+
+# Longest long-poll wait (?wait=) in seconds
+SESSION_LONG_POLL_MAX = 30.0
+
+
+def get_session_registry():
+    """Return the fire-mission session registry, creating it on first use."""
+    global session_registry
+    if session_registry is None:
+        from calculator.sessions import SessionRegistry
+        session_registry = SessionRegistry()
+    return session_registry
+
+
+def get_session(session_id):
+    """Look up a fire-mission session, or abort with 404."""
+    session = get_session_registry().get(session_id)
+    if session is None:
+        abort(404, description=f"Session '{session_id}' not found")
+    return session
+
+
+def session_state_response(session, status=200):
+    """The session's current state (shared JSON string, computed once per version)."""
+    version, payload = session.snapshot()
+    response = Response(payload, status=status, mimetype='application/json')
+    response.headers['ETag'] = f'"{session.id}-{version}"'
+    response.cache_control.no_cache = True
+    return response
+
+
+@app.route('/maps/<map_name>/sessions', methods=['POST'])
+def create_session(map_name):
+    """
+    Start a shared fire-mission session on a map (see calculator/sessions.py).
+
+    Request body (JSON, optional):
+    - ops: initial operations (set_mortar, add_target, ...)
+
+    Returns the session state (201) with its id; share /sessions/<id>.
+    """
+    from flask import request
+    from calculator.sessions import SessionLimitError
+
+    body = request.get_json(silent=True)
+    if body is None and request.content_length:
+        abort(400, description='Request body must be a JSON object')
+    body = body or {}
+    if not isinstance(body, dict):
+        abort(400, description='Request body must be a JSON object')
+
+    map_data = get_map_data(map_name)
+    try:
+        session = get_session_registry().create(map_name, map_data)
+    except SessionLimitError as e:
+        abort(503, description=str(e))
+    if body.get('ops'):
+        try:
+            session.apply(body['ops'])
+        except ValueError as e:
+            get_session_registry().close(session.id)
+            abort(400, description=str(e))
+
+    response = session_state_response(session, status=201)
+    response.headers['Location'] = f'/sessions/{session.id}'
+    return response
+
+
+@app.route('/sessions/<session_id>')
+def session_state(session_id):
+    """
+    Current session state. Long-poll with ?since=<version>&wait=<seconds>:
+    answers as soon as the version is newer than since, or 204 after wait.
+    """
+    from flask import request
+
+    session = get_session(session_id)
+    since = request.args.get('since', type=int)
+    if since is not None:
+        wait = long_poll_wait(SESSION_LONG_POLL_MAX, SESSION_LONG_POLL_MAX)
+        if not session.wait_for_change(since, wait):
+            return Response(status=204)
+    return session_state_response(session)
+
+
+@app.route('/sessions/<session_id>/ops', methods=['POST'])
+def session_ops(session_id):
+    """
+    Apply a batch of operations atomically (one new version for all subscribers).
+
+    Request body (JSON): {"ops": [{"op": "add_target", "position": "D6-7"}, ...]}
+    """
+    from flask import jsonify, request
+
+    session = get_session(session_id)
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400, description='Request body must be a JSON object')
+    try:
+        version = session.apply(body.get('ops'))
+    except ValueError as e:
+        abort(400, description=str(e))
+    return jsonify({'id': session.id, 'version': version})
+
+
+@app.route('/sessions/<session_id>/events')
+def session_events(session_id):
+    """
+    Server-Sent Events stream of session states. Each event carries the full
+    state (event: state, id: version); bursts of changes arrive as one event.
+    Resumes after Last-Event-ID; ends with event: closed when the session is.
+    """
+    from flask import request
+    from calculator.sessions import COALESCE_SECONDS, SessionLimitError
+
+    session = get_session(session_id)
+    last_seen = request.headers.get('Last-Event-ID', type=int)
+    try:
+        session.subscribe()
+    except SessionLimitError as e:
+        abort(503, description=str(e))
+
+    def stream():
+        since = -1 if last_seen is None else last_seen
+        yield 'retry: 2000\n\n'
+        while True:
+            if session.version <= since and not session.wait_for_change(since, SESSION_HEARTBEAT_SECONDS):
+                if session.closed:
+                    yield 'event: closed\ndata: {}\n\n'
+                    return
+                yield ': keepalive\n\n'
+                continue
+            time.sleep(COALESCE_SECONDS)
+            version, payload = session.snapshot()
+            since = version
+            yield f'id: {version}\nevent: state\ndata: {payload}\n\n'
+
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    # Runs when the client disconnects, even if the stream never started
+    response.call_on_close(session.unsubscribe)
+    return response
+
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def close_session(session_id):
+    """End a session; subscribers receive event: closed."""
+    if not get_session_registry().close(session_id):
+        abort(404, description=f"Session '{session_id}' not found")
+    return Response(status=204)
+
+
+# Largest accepted beacon batch (bytes); the UI sends a few KB at most
+MAX_TELEMETRY_BYTES = 64 * 1024
+
+# Client load-timing aggregates; created on first use (in memory only)
+telemetry_store = None
+
+# Startup phase timer, set by main()
+startup_timer = None
+
+
+def get_telemetry_store():
+    """Return the client telemetry store, creating it on first use."""
+    global telemetry_store
+    if telemetry_store is None:
+        from calculator.telemetry import TelemetryStore
+        telemetry_store = TelemetryStore()
+    return telemetry_store
+
+
+@app.route('/telemetry', methods=['POST'])
+def record_telemetry():
+    """
+    Accept a batch of client map-load timing beacons (see calculator/telemetry.py).
+    Sent with navigator.sendBeacon, so any content type is accepted. Beacons
+    for maps that are not installed are dropped.
+    """
+    from flask import jsonify, request
+    from calculator.telemetry import parse_beacons
+
+    if request.content_length is not None and request.content_length > MAX_TELEMETRY_BYTES:
+        abort(400, description=f'Telemetry batch larger than {MAX_TELEMETRY_BYTES} bytes')
+    try:
+        beacons = parse_beacons(request.get_json(force=True, silent=True))
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    known = [beacon for beacon in beacons if (PROCESSED_MAPS_DIR / beacon.map / 'metadata.json').is_file()]
+    get_telemetry_store().record(known)
+    return jsonify({'accepted': len(known), 'dropped': len(beacons) - len(known)}), 202
+
+
+@app.route('/telemetry')
+def telemetry_summary():
+    """
+    Per-map client load percentiles (?map= for one map), alongside the
+    server-side metrics: map open counts and startup phase timings.
+    """
+    from flask import jsonify, request
+
+    return jsonify({
+        'maps': get_telemetry_store().summary(request.args.get('map')),
+        'server': {
+            'map_opens': get_usage_stats().ranked(),
+            'startup': startup_timer.report() if startup_timer is not None else None,
+        },
+    })
+
+
+@app.errorhandler(400)
+def bad_request(error):
+    """Handle 400 errors (invalid API input) with JSON response."""
+    from flask import jsonify
+
+    return jsonify({
+        'error': '400 Bad Request',
+        'message': str(error.description)
+    }), 400
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors with JSON response."""
     from flask import jsonify, request
     
-    if request.path.startswith('/maps/'):
+    if request.path.startswith(('/maps/', '/sessions/', '/jobs/')):
         return jsonify({
             'error': '404 Not Found',
             'message': str(error.description)
@@ -176,6 +1169,53 @@ def not_found(error):
     }), 404
 
 
+@app.errorhandler(406)
+def not_acceptable(error):
+    """Handle 406 errors (unsupported Accept format) with JSON response."""
+    from flask import jsonify
+
+    return jsonify({
+        'error': '406 Not Acceptable',
+        'message': str(error.description)
+    }), 406
+
+
+@app.errorhandler(409)
+def conflict(error):
+    """Handle 409 errors (e.g. a cancelled job) with JSON response."""
+    from flask import jsonify
+
+    return jsonify({
+        'error': '409 Conflict',
+        'message': str(error.description)
+    }), 409
+
+
+@app.errorhandler(429)
+def too_many_requests(error):
+    """Handle 429 errors (job queue full) with JSON response and Retry-After."""
+    from flask import jsonify
+
+    response = jsonify({
+        'error': '429 Too Many Requests',
+        'message': str(error.description)
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(JOB_RETRY_AFTER_SECONDS)
+    return response
+
+
+@app.errorhandler(503)
+def service_unavailable(error):
+    """Handle 503 errors (server at capacity) with JSON response."""
+    from flask import jsonify
+
+    return jsonify({
+        'error': '503 Service Unavailable',
+        'message': str(error.description)
+    }), 503
+
+
 @app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors with JSON response."""
@@ -187,52 +1227,6 @@ def internal_error(error):
     }), 500
 
 
-def find_available_port(start_port=8080, max_attempts=10):
-    """
-    Find an available port starting from start_port.
-    Tries ports 8080-8089 by default.
-    """
-    import socket
-    
-    for port_offset in range(max_attempts):
-        port = start_port + port_offset
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(1)
-        
-        try:
-            sock.bind(('127.0.0.1', port))
-            sock.close()
-            return port
-        except OSError:
-            # Port is in use, try next one
-            continue
-        finally:
-            sock.close()
-    
-    # No available port found
-    return None
-
-
-def open_browser(url, delay=1.5):
-    """
-    Open default browser to the calculator URL.
-    Runs in a separate thread after a small delay to let server start.
-    """
-    import threading
-    
-    def _open():
-        time.sleep(delay)
-        try:
-            webbrowser.open(url)
-            print(f"[OK] Browser opened automatically")
-        except Exception as e:
-            print(f"[WARNING] Browser did not open automatically: {e}")
-            print(f"  Please open manually: {url}")
-    
-    thread = threading.Thread(target=_open, daemon=True)
-    thread.start()
-
-
 def print_banner(port):
     """Display startup banner with server information."""
     print("\n" + "="*60)
@@ -253,45 +1247,115 @@ def check_processed_maps():
         print("  Calculator will run but no maps will be available.")
         print()
     else:
-        # Count available maps
-        map_count = sum(1 for item in PROCESSED_MAPS_DIR.iterdir() 
-                       if item.is_dir() and (item / 'metadata.json').is_file())
-        print(f"[OK] Found {map_count} processed maps")
+        # Count available maps (from the prebuilt index when available)
+        print(f"[OK] Found {len(get_map_entries())} processed maps")
+
 
+def warm_cache(map_names):
+    """
+    Decode heightmaps and terrain structures for the given maps and read
+    their payload files once, so the first request after a restart is as
+    fast as a warm one.
+    """
+    from calculator.blobs import resolve_map_file
+    from calculator.heightmap import MapData, has_heightmap
+    from calculator.heightmap_tiles import open_tile_store
+    from calculator.keypads import load_keypad_table
+    from calculator.terrain import load_terrain_accel
 
-def main():
+    for map_name in map_names:
+        map_dir = PROCESSED_MAPS_DIR / map_name
+        if not (map_dir / 'metadata.json').is_file() or not has_heightmap(map_dir):
+            continue
+        start = time.perf_counter()
+        try:
+            map_data = MapData(map_dir)
+            load_terrain_accel(map_dir, map_data.heightmap, map_data.metadata)
+            load_keypad_table(map_dir, map_data.heightmap, map_data.metadata)
+            open_tile_store(map_dir, TILE_CACHE_DIR)
+            for filename in ('heightmap.bin', 'heightmap.json.gz', 'minimap.png'):
+                path = resolve_map_file(map_dir, filename)
+                if path is not None:
+                    path.read_bytes()  # pull into the OS page cache
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Could not pre-warm {map_name}: {e}")
+            continue
+        print(f"[OK] Pre-warmed {map_name} ({time.perf_counter() - start:.2f}s)")
+
+
+def start_cache_warming(top_n=WARM_CACHE_TOP_N):
+    """
+    Attach the persisted usage counts and pre-warm the most-used maps in a
+    background thread (startup and the browser launch are not delayed).
+    """
+    import atexit
+    import threading
+    from calculator.usage import MapUsageStats
+
+    global usage_stats
+    usage_stats = MapUsageStats(USAGE_STATS_FILE)
+    atexit.register(usage_stats.save)
+
+    popular = usage_stats.top(top_n)
+    if popular:
+        threading.Thread(target=warm_cache, args=(popular,), daemon=True).start()
+
+
+def main(argv=None):
     """Main entry point - start Flask server with auto-browser launch."""
-    
-    # Find available port
-    port = find_available_port()
-    if port is None:
+    import argparse
+    from werkzeug.serving import make_server
+    from calculator.startup import ColdStart
+
+    parser = argparse.ArgumentParser(description='Project Reality Mortar Calculator server')
+    parser.add_argument('--timing', action='store_true',
+                        help='Print how long each startup phase took once the first page is served')
+    parser.add_argument('--no-browser', action='store_true', help='Do not open the browser')
+    args = parser.parse_args(argv)
+    show_timing = args.timing or bool(os.environ.get('PR_MORTAR_TIMING'))
+
+    # Port and browser are normally handled before the Flask import (see top)
+    global startup_timer
+    cold_start = _cold_start or ColdStart(open_browser=not args.no_browser)
+    timer = startup_timer = cold_start.timer
+    timer.mark('imports')
+    if cold_start.sock is None:
         print("ERROR: Could not find an available port (tried 8080-8089)")
         print("Please close other applications using these ports and try again.")
         sys.exit(1)
-    
+    port = cold_start.port
+
     # Check for processed maps
     check_processed_maps()
-    
+    timer.mark('map index')
+
+    # Load usage counts and pre-warm the most popular maps (background thread)
+    start_cache_warming()
+
+    @app.after_request
+    def _first_request_served(response):
+        if timer.mark_once('first request'):
+            print(f"[OK] First page served {timer.total():.2f}s after launch")
+            if show_timing:
+                timer.print_report()
+        return response
+
     # Display startup banner
     print_banner(port)
-    
-    # Open browser automatically
-    server_url = f"http://localhost:{port}"
-    open_browser(server_url)
-    
-    # Start Flask server
+
+    # Serve on the socket bound at launch (the browser may already be waiting)
+    server = make_server('127.0.0.1', port, app, threaded=True, fd=cold_start.sock.fileno())
+    cold_start.sock.close()
+    timer.mark('server ready')
     try:
-        app.run(
-            host='127.0.0.1',  # Only accessible from localhost
-            port=port,
-            debug=False,       # Disable debug mode for production
-            use_reloader=False # Disable auto-reload to prevent double browser open
-        )
+        server.serve_forever()
     except KeyboardInterrupt:
         print("\n\n" + "="*60)
         print("  Server stopped. You can close this window.")
         print("="*60 + "\n")
         sys.exit(0)
+    finally:
+        server.server_close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,263 @@
+"""
+Shared Fire-Mission Sessions
+
+A session holds one map, a set of named mortars and an ordered target
+queue. Any client may change it; every change bumps the session version
+and wakes all subscribers (Server-Sent Events or long-poll), which then
+receive the complete state including the firing solution of every
+mortar/target pair.
+
+Solutions are computed once per version, in one vectorised pass
+(fire_plan.solution_matrix), and the serialised state is shared by all
+subscribers, so fan-out to dozens of listeners costs one JSON string.
+Changes are coalesced: a batch of operations is applied atomically as one
+version, and a subscriber that wakes up waits COALESCE_SECONDS before
+reading, so a burst of edits reaches clients as a single update.
+
+Operations (POST /sessions/<id>/ops, {"ops": [...]}):
+    {"op": "set_mortar", "name": "M1", "position": "D6-7-5"}
+    {"op": "remove_mortar", "name": "M1"}
+    {"op": "add_target", "position": {"x": 812.5, "y": 1210.0}, "label": "Bunker"}
+    {"op": "move_target", "id": 3, "position": "E7-1"}
+    {"op": "remove_target", "id": 3}
+    {"op": "clear_targets"}
+
+Positions are grid references or {"x", "y"} objects in meters, as for the
+fire-plan endpoint. Sessions live in memory and expire after SESSION_TTL
+seconds without changes or subscribers.
+"""
+
+import json
+import secrets
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from calculator.ballistics import solution_to_dict
+from calculator.coordinates import resolve_positions, xy_to_grid_refs
+from calculator.fire_plan import MAX_MORTARS, MAX_TARGETS, solution_matrix
+from calculator.heightmap import MapData
+
+MAX_SESSIONS = 64
+MAX_SUBSCRIBERS = 100
+MAX_OPS_PER_BATCH = 200
+MAX_NAME_LENGTH = 24
+MAX_LABEL_LENGTH = 40
+
+# Idle sessions (no changes, no subscribers) are dropped after this long
+SESSION_TTL = 6 * 3600.0
+
+# Delay between a subscriber waking up and reading the state, so bursts of
+# updates are delivered as one event
+COALESCE_SECONDS = 0.05
+
+OPERATIONS = ('set_mortar', 'remove_mortar', 'add_target', 'move_target', 'remove_target', 'clear_targets')
+
+
+class SessionLimitError(Exception):
+    """Too many sessions, or too many subscribers on one session."""
+
+
+class FireMissionSession:
+    """One shared session: map, mortars and target queue (thread-safe)."""
+
+    def __init__(self, session_id: str, map_name: str, map_data: MapData):
+        self.id = session_id
+        self.map_name = map_name
+        self.map_data = map_data
+        self.version = 0
+        self.closed = False
+        self.subscribers = 0
+        self.computations = 0
+        self.last_activity = time.monotonic()
+        self.mortars: Dict[str, Tuple[float, float]] = {}
+        self.targets: List[dict] = []
+        self._next_target_id = 1
+        self._cond = threading.Condition()
+        self._snapshot_lock = threading.Lock()
+        self._snapshot: Optional[Tuple[int, str]] = None
+
+    def _position(self, op: dict, i: int) -> Tuple[float, float]:
+        try:
+            x, y = resolve_positions([op.get('position')], self.map_data.grid_scale)[0]
+        except ValueError:
+            raise ValueError(f'ops[{i}]: position must be a grid reference or finite {{"x", "y"}}') from None
+        return float(x), float(y)
+
+    def apply(self, ops: list) -> int:
+        """Apply a batch of operations atomically as one new version.
+
+        Returns:
+            The new version
+
+        Raises:
+            ValueError: If any operation is invalid (nothing is applied)
+        """
+        if not isinstance(ops, list) or not 1 <= len(ops) <= MAX_OPS_PER_BATCH:
+            raise ValueError(f'ops must be a list of 1-{MAX_OPS_PER_BATCH} operations')
+        with self._cond:
+            if self.closed:
+                raise ValueError('Session is closed')
+            mortars = dict(self.mortars)
+            targets = [dict(target) for target in self.targets]
+            next_id = self._next_target_id
+
+            for i, op in enumerate(ops):
+                kind = op.get('op') if isinstance(op, dict) else None
+                if kind not in OPERATIONS:
+                    raise ValueError(f"ops[{i}]: op must be one of: {', '.join(OPERATIONS)}")
+                if kind in ('set_mortar', 'remove_mortar'):
+                    name = op.get('name')
+                    if not isinstance(name, str) or not 1 <= len(name) <= MAX_NAME_LENGTH:
+                        raise ValueError(f'ops[{i}]: name must be a string of 1-{MAX_NAME_LENGTH} characters')
+                    if kind == 'remove_mortar':
+                        mortars.pop(name, None)
+                        continue
+                    if name not in mortars and len(mortars) >= MAX_MORTARS:
+                        raise ValueError(f'At most {MAX_MORTARS} mortars per session')
+                    mortars[name] = self._position(op, i)
+                elif kind == 'clear_targets':
+                    targets = []
+                elif kind == 'add_target':
+                    label = op.get('label')
+                    if label is not None and (not isinstance(label, str) or len(label) > MAX_LABEL_LENGTH):
+                        raise ValueError(f'ops[{i}]: label must be a string of at most {MAX_LABEL_LENGTH} characters')
+                    if len(targets) >= MAX_TARGETS:
+                        raise ValueError(f'At most {MAX_TARGETS} targets per session')
+                    x, y = self._position(op, i)
+                    targets.append({'id': next_id, 'label': label, 'x': x, 'y': y})
+                    next_id += 1
+                else:
+                    target_id = op.get('id')
+                    matches = [t for t in targets if t['id'] == target_id and not isinstance(target_id, bool)]
+                    if not matches:
+                        raise ValueError(f'ops[{i}]: no target with id {target_id!r}')
+                    if kind == 'remove_target':
+                        targets.remove(matches[0])
+                    else:
+                        matches[0]['x'], matches[0]['y'] = self._position(op, i)
+
+            self.mortars = mortars
+            self.targets = targets
+            self._next_target_id = next_id
+            self.version += 1
+            self.last_activity = time.monotonic()
+            self._cond.notify_all()
+            return self.version
+
+    def snapshot(self) -> Tuple[int, str]:
+        """(version, JSON state) for the current version, computed at most once."""
+        with self._snapshot_lock:
+            with self._cond:
+                version = self.version
+                if self._snapshot is not None and self._snapshot[0] == version:
+                    return self._snapshot
+                mortars = list(self.mortars.items())
+                targets = [dict(target) for target in self.targets]
+            state = self._build_state(version, mortars, targets)
+            self.computations += 1
+            self._snapshot = (version, json.dumps(state, separators=(',', ':')))
+            return self._snapshot
+
+    def _build_state(self, version: int, mortars: list, targets: List[dict]) -> dict:
+        grid_scale = self.map_data.grid_scale
+        mortars_xy = np.array([xy for _, xy in mortars], dtype=np.float64).reshape(-1, 2)
+        targets_xy = np.array([(t['x'], t['y']) for t in targets], dtype=np.float64).reshape(-1, 2)
+        mortar_refs = xy_to_grid_refs(mortars_xy, grid_scale, subkeypad=True)
+        target_refs = xy_to_grid_refs(targets_xy, grid_scale, subkeypad=True)
+
+        solutions = None
+        if mortars and targets:
+            solutions = solution_matrix(self.map_data, mortars_xy, targets_xy)
+        for t, target in enumerate(targets):
+            target['grid_ref'] = target_refs[t]
+            target['solutions'] = {name: solution_to_dict(solutions, (m, t))
+                                   for m, (name, _) in enumerate(mortars)} if solutions else {}
+        return {
+            'id': self.id,
+            'map': self.map_name,
+            'version': version,
+            'mortars': [{'name': name, 'x': xy[0], 'y': xy[1], 'grid_ref': mortar_refs[m]}
+                        for m, (name, xy) in enumerate(mortars)],
+            'targets': targets,
+        }
+
+    def wait_for_change(self, since: int, timeout: float) -> bool:
+        """Block until the version is newer than since (True), or timeout / close (False)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > since or self.closed, timeout)
+            return self.version > since
+
+    def subscribe(self) -> None:
+        """Count a listener (pair with unsubscribe()).
+
+        Raises:
+            SessionLimitError: If MAX_SUBSCRIBERS are already listening
+        """
+        with self._cond:
+            if self.subscribers >= MAX_SUBSCRIBERS:
+                raise SessionLimitError(f'At most {MAX_SUBSCRIBERS} subscribers per session')
+            self.subscribers += 1
+
+    def unsubscribe(self) -> None:
+        with self._cond:
+            self.subscribers -= 1
+            self.last_activity = time.monotonic()
+
+    def close(self) -> None:
+        """Mark the session closed and wake every subscriber."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def idle_for(self) -> float:
+        """Seconds since the last change or unsubscribe (0 while anyone listens)."""
+        with self._cond:
+            return 0.0 if self.subscribers else time.monotonic() - self.last_activity
+
+
+class SessionRegistry:
+    """In-memory set of sessions, keyed by an unguessable id."""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, ttl: float = SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: Dict[str, FireMissionSession] = {}
+        self._lock = threading.Lock()
+
+    def create(self, map_name: str, map_data: MapData) -> FireMissionSession:
+        """Start a new, empty session (expired sessions are pruned first).
+
+        Raises:
+            SessionLimitError: If max_sessions are active
+        """
+        with self._lock:
+            for session_id, session in list(self._sessions.items()):
+                if session.idle_for() > self.ttl:
+                    session.close()
+                    del self._sessions[session_id]
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimitError(f'At most {self.max_sessions} active sessions')
+            session_id = secrets.token_urlsafe(9)
+            session = FireMissionSession(session_id, map_name, map_data)
+            self._sessions[session_id] = session
+            return session
+
+    def get(self, session_id: str) -> Optional[FireMissionSession]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def close(self, session_id: str) -> bool:
+        """Remove a session and disconnect its subscribers; False if unknown."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
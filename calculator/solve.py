@@ -0,0 +1,345 @@
+"""
+Headless Streaming Solver
+
+Solves mortar/target pairs without the browser:
+
+    python -m calculator.solve muttrah_city_2 shots.jsonl -o solutions.jsonl
+    cat shots.jsonl | python -m calculator.solve kashan_desert
+
+The map's heightmap and metadata are loaded once, then input is read as
+JSON Lines and processed in vectorised chunks. Positions are grid
+references or {"x", "y"} objects, as in the fire-plan endpoint:
+
+    {"id": 1, "mortar": "D6-7", "target": {"x": 1200, "y": 950.5}}
+
+Grid references take their elevations from the map's keypad tables
+(calculator/keypads.py); other positions interpolate the heightmap.
+
+Each input line produces one output line, in order, with the same fields
+as calculateFiringSolution() in ballistics.js (plus "id" when given):
+
+    {"id": 1, "distance": 912.4, "azimuth": 131.2, ..., "status": "OK", "message": "..."}
+    {"id": 2, "error": "Invalid grid reference: 'Z99'"}
+
+There is one output line per non-blank input line; invalid lines do not
+stop the stream. --jobs N solves chunks in N worker processes (output
+order is preserved). A throughput summary is written to stderr on exit.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+from calculator.ballistics import STATUS_NAMES, STATUS_OK, calculate_firing_solutions, status_message
+from calculator.coordinates import grid_ref_to_xy
+from calculator.heightmap import MapData
+from calculator.keypads import load_keypad_table
+
+DEFAULT_CHUNK_SIZE = 8192
+DEFAULT_MAPS_DIR = Path(__file__).resolve().parent.parent / 'processed_maps'
+
+# Pre-serialised JSON fragments for the fixed parts of each output line
+_STATUS_JSON = tuple(json.dumps(name) for name in STATUS_NAMES)
+_OK_MESSAGE_JSON = json.dumps(status_message(STATUS_OK, 0.0, 0.0))
+
+# Line decoding (see Solver.parse_lines); JSON allows only these whitespace characters
+_raw_decode = json.JSONDecoder().raw_decode
+_JSON_WHITESPACE = ' \t\n\r'
+
+
+def _json_column(values: np.ndarray) -> List[str]:
+    """JSON text of every element (NaN as null), formatted by the C encoder."""
+    text = json.dumps(values.tolist())
+    if 'NaN' in text:
+        text = text.replace('NaN', 'null')
+    return text[1:-1].split(', ') if values.size else []
+
+
+def _id_prefix(request_id) -> str:
+    """JSON fragment echoing a request id before the solution fields."""
+    if type(request_id) is int:
+        return f'"id": {request_id}, '
+    return f'"id": {json.dumps(request_id)}, '
+
+
+class Solver:
+    """Resolves positions and formats solutions for one loaded map."""
+
+    def __init__(self, map_data: MapData, decimals: Optional[int] = None):
+        """
+        Args:
+            map_data: Loaded map
+            decimals: Round output numbers to this many decimals (None = full
+                precision, like the JS solution object). Shorter numbers are
+                also considerably faster to format.
+        """
+        self.map_data = map_data
+        self.decimals = decimals
+        self.keypads = load_keypad_table(map_data.map_dir, map_data.heightmap, map_data.metadata)
+        self._grid_cache: Dict[str, Optional[Tuple[float, float]]] = {}
+        self._message_cache: Dict[str, str] = {}
+
+    def position(self, item) -> Tuple[float, float]:
+        """World XY for a grid reference or {"x", "y"} object.
+
+        Raises:
+            ValueError: If the position cannot be converted
+        """
+        if isinstance(item, str):
+            if item not in self._grid_cache:
+                self._grid_cache[item] = grid_ref_to_xy(item, self.map_data.grid_scale)
+            xy = self._grid_cache[item]
+            if xy is None:
+                raise ValueError(f'Invalid grid reference: {item!r}')
+            return xy
+        if isinstance(item, dict) and 'x' in item and 'y' in item:
+            try:
+                x, y = float(item['x']), float(item['y'])
+            except (TypeError, ValueError):
+                raise ValueError(f'Invalid coordinates: {item!r}') from None
+            if not (math.isfinite(x) and math.isfinite(y)):
+                raise ValueError(f'Coordinates must be finite: {item!r}')
+            return x, y
+        raise ValueError('Position must be a grid reference or {"x", "y"}')
+
+    def parse_request(self, request) -> Tuple[str, Optional[Tuple[float, float, float, float]], Optional[str]]:
+        """Validate one decoded input line.
+
+        Returns:
+            (id JSON prefix, (mx, my, tx, ty) or None, error message or None)
+        """
+        if not isinstance(request, dict):
+            return '', None, 'Each line must be a JSON object'
+        prefix = _id_prefix(request['id']) if 'id' in request else ''
+        try:
+            mx, my = self.position(request.get('mortar'))
+            tx, ty = self.position(request.get('target'))
+        except ValueError as e:
+            return prefix, None, str(e)
+        return prefix, (mx, my, tx, ty), None
+
+    def parse_lines(self, lines: List[str]) -> List[Tuple]:
+        """Decode and validate a chunk of input lines.
+
+        Each line must hold exactly one JSON value: '{...},{...}' is one
+        invalid line, not two requests. Lines are decoded with
+        JSONDecoder.raw_decode(), which skips the per-call overhead of
+        json.loads(); only lines it rejects are decoded again by json.loads()
+        for the error message.
+        """
+        parsed = []
+        for line in lines:
+            text = line.strip(_JSON_WHITESPACE)
+            try:
+                request, end = _raw_decode(text)
+                if end != len(text):
+                    raise ValueError('Extra data')
+            except ValueError:
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    parsed.append(('', None, f'Invalid JSON: {e}'))
+                    continue
+            parsed.append(self.parse_request(request))
+        return parsed
+
+    def solve_lines(self, lines: List[str]) -> Tuple[List[str], int]:
+        """Solve a chunk of input lines.
+
+        Returns:
+            (output lines without newlines, number of error lines)
+        """
+        parsed = self.parse_lines(lines)
+        valid = [coords for _, coords, _ in parsed if coords is not None]
+
+        rows = iter(())
+        if valid:
+            rows = iter(self._format_solutions(self.solve_positions(*np.array(valid, dtype=np.float64).T)))
+
+        output = []
+        errors = 0
+        for prefix, coords, error in parsed:
+            if coords is None:
+                errors += 1
+                output.append(f'{{{prefix}"error": {json.dumps(error)}}}')
+            else:
+                output.append(f'{{{prefix}{next(rows)}')
+        return output, errors
+
+    def solve_positions(self, mx, my, tx, ty) -> Dict[str, np.ndarray]:
+        """Solutions for mortar/target XY arrays (broadcast), with terrain elevations."""
+        return calculate_firing_solutions(mx, my, self.elevation_at(mx, my), tx, ty, self.elevation_at(tx, ty))
+
+    def elevation_at(self, x, y) -> np.ndarray:
+        """Terrain elevation at world XY: keypad table values for grid-reference
+        positions, heightmap interpolation elsewhere."""
+        z = self.keypads.lattice_elevation(x, y)
+        off_lattice = np.isnan(z)
+        if off_lattice.any():
+            x, y = np.broadcast_arrays(x, y)
+            z[off_lattice] = self.map_data.elevation_at(x[off_lattice], y[off_lattice])
+        return z
+
+    def solution_json(self, solutions: Dict[str, np.ndarray]) -> List[str]:
+        """JSON object text of every solution (fields as solution_to_dict)."""
+        return ['{' + row for row in self._format_solutions(solutions)]
+
+    def _message(self, status: int, distance: float, height_delta: float) -> str:
+        """JSON string of the status message (cached; only a few distinct texts occur)."""
+        message = status_message(status, distance, height_delta)
+        if message not in self._message_cache:
+            self._message_cache[message] = json.dumps(message)
+        return self._message_cache[message]
+
+    def _format_solutions(self, solutions: Dict[str, np.ndarray]) -> List[str]:
+        """Serialise solutions (fields as solution_to_dict) without a dict per row."""
+        status = solutions['status'].tolist()
+        distance = solutions['distance'].tolist()
+        height_delta = solutions['height_delta'].tolist()
+        column = _json_column if self.decimals is None else (
+            lambda values: _json_column(np.round(values, self.decimals)))
+        messages = [_OK_MESSAGE_JSON if st == STATUS_OK else self._message(st, d, dh)
+                    for st, d, dh in zip(status, distance, height_delta)]
+        columns = zip(
+            column(solutions['distance']),
+            column(solutions['azimuth']),
+            column(solutions['height_delta']),
+            column(solutions['elevation_radians']),
+            column(solutions['elevation_mils']),
+            column(solutions['elevation_degrees']),
+            column(solutions['time_of_flight']),
+            ['true' if v else 'false' for v in solutions['valid'].tolist()],
+            [_STATUS_JSON[st] for st in status],
+            messages,
+        )
+        return [
+            f'"distance": {d}, "azimuth": {az}, "heightDelta": {dh}, "elevationRadians": {rad}, '
+            f'"elevationMils": {mils}, "elevationDegrees": {deg}, "timeOfFlight": {tof}, '
+            f'"valid": {valid}, "status": {st}, "message": {msg}}}'
+            for d, az, dh, rad, mils, deg, tof, valid, st, msg in columns
+        ]
+
+
+# Per-process solver for --jobs workers (loaded once by the pool initializer)
+_worker_solver: Optional[Solver] = None
+
+
+def _init_worker(map_dir: Path, decimals: Optional[int]) -> None:
+    global _worker_solver
+    _worker_solver = Solver(MapData(map_dir), decimals)
+
+
+def _solve_in_worker(lines: List[str]) -> Tuple[List[str], int]:
+    return _worker_solver.solve_lines(lines)
+
+
+def _chunks(source: TextIO, chunk_size: int) -> Iterator[List[str]]:
+    """Non-blank input lines in lists of up to chunk_size."""
+    lines = (line for line in source if line.strip())
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def solve_stream(solver: Solver, source: TextIO, sink: TextIO,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, jobs: int = 1) -> Tuple[int, int]:
+    """Solve every non-blank line of source, writing JSONL to sink in input order.
+
+    Args:
+        solver: Solver for the loaded map (used directly when jobs == 1)
+        source: Input JSON Lines
+        sink: Output stream
+        chunk_size: Lines per vectorised batch
+        jobs: Worker processes; chunks are solved in parallel with a bounded
+            number in flight, so memory stays flat on endless streams
+
+    Returns:
+        (solutions written, error lines written)
+    """
+    solved = errors = 0
+
+    def write(output: List[str], chunk_errors: int) -> None:
+        nonlocal solved, errors
+        sink.write('\n'.join(output))
+        sink.write('\n')
+        solved += len(output) - chunk_errors
+        errors += chunk_errors
+
+    if jobs <= 1:
+        for chunk in _chunks(source, chunk_size):
+            write(*solver.solve_lines(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(solver.map_data.map_dir, solver.decimals)) as executor:
+            pending = deque()
+            for chunk in _chunks(source, chunk_size):
+                pending.append(executor.submit(_solve_in_worker, chunk))
+                if len(pending) >= 2 * jobs:
+                    write(*pending.popleft().result())
+            while pending:
+                write(*pending.popleft().result())
+
+    sink.flush()
+    return solved, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m calculator.solve',
+        description='Solve mortar/target pairs from JSON Lines (stdin or file) to JSON Lines')
+    parser.add_argument('map', help='Processed map name (e.g. muttrah_city_2)')
+    parser.add_argument('input', nargs='?', default='-', help='Input .jsonl file (default: stdin)')
+    parser.add_argument('-o', '--output', default='-', help='Output .jsonl file (default: stdout)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'Lines solved per vectorised batch (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--decimals', type=int, default=None,
+                        help='Round output numbers to N decimals (default: full precision; faster when set)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help=f'Worker processes solving chunks in parallel (default: 1, this machine: {os.cpu_count()})')
+    parser.add_argument('--maps-dir', type=Path, default=DEFAULT_MAPS_DIR,
+                        help='processed_maps directory (default: next to the calculator package)')
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be positive')
+
+    load_start = time.perf_counter()
+    try:
+        solver = Solver(MapData(args.maps_dir / args.map), args.decimals)
+    except (OSError, ValueError) as e:
+        parser.error(f"could not load map '{args.map}': {e}")
+    load_time = time.perf_counter() - load_start
+
+    source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    start = time.perf_counter()
+    try:
+        solved, errors = solve_stream(solver, source, sink, args.chunk_size, args.jobs)
+    except KeyboardInterrupt:
+        solved = errors = 0
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    elapsed = time.perf_counter() - start
+
+    rate = (solved + errors) / elapsed if elapsed > 0 else 0.0
+    print(f"[solve] {args.map}: {solved} solutions, {errors} errors in {elapsed:.2f}s "
+          f"({rate:,.0f} lines/s, map loaded in {load_time:.2f}s)", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
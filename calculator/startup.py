@@ -0,0 +1,167 @@
+"""
+Cold Start Helpers
+
+Kept free of Flask and NumPy imports: server.py uses this module before
+importing Flask when it is launched as the application, so the port is
+claimed and the browser is already starting while the heavy imports run.
+The browser's first request simply waits in the listening socket's
+backlog until the server starts accepting.
+
+StartupTimer records how long each phase took, from process creation
+(which includes the PyInstaller bootloader and interpreter start-up) to
+the first request served.
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+PORT_ATTEMPTS = 10
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process was created, or None if unknown.
+
+    Covers what happens before any Python code runs: the PyInstaller
+    bootloader (unpacking / loading the bundle) and interpreter start-up.
+    """
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            creation, exit_time, kernel, user, now = (wintypes.FILETIME() for _ in range(5))
+            kernel32 = ctypes.windll.kernel32
+            if not kernel32.GetProcessTimes(kernel32.GetCurrentProcess(), ctypes.byref(creation),
+                                            ctypes.byref(exit_time), ctypes.byref(kernel), ctypes.byref(user)):
+                return None
+            kernel32.GetSystemTimeAsFileTime(ctypes.byref(now))
+
+            def ticks(filetime):
+                return (filetime.dwHighDateTime << 32) | filetime.dwLowDateTime
+
+            return (ticks(now) - ticks(creation)) / 1e7  # 100 ns units
+        if sys.platform.startswith('linux'):
+            with open('/proc/self/stat', 'rb') as f:
+                # Field 22 (starttime, in clock ticks since boot); skip past "(comm)"
+                start_ticks = int(f.read().rsplit(b')', 1)[1].split()[19])
+            with open('/proc/uptime', 'rb') as f:
+                uptime = float(f.read().split()[0])
+            return max(uptime - start_ticks / os.sysconf('SC_CLK_TCK'), 0.0)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+    return None
+
+
+class StartupTimer:
+    """Durations of consecutive startup phases.
+
+    The first phase, 'launch', is the time from process creation to the
+    timer's construction (when available).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.launch = process_age()
+        self.phases: List[Tuple[str, float]] = []
+        if self.launch is not None:
+            self.phases.append(('launch', self.launch))
+        self._last = self.started
+        self._lock = threading.Lock()
+        self._done = set()
+
+    def mark(self, phase: str) -> float:
+        """Record the time since the previous mark as ``phase``."""
+        with self._lock:
+            now = time.perf_counter()
+            duration = now - self._last
+            self._last = now
+            self.phases.append((phase, duration))
+            return duration
+
+    def mark_once(self, phase: str) -> bool:
+        """Like mark(), but only the first call per phase counts (thread-safe)."""
+        if phase in self._done:
+            return False
+        with self._lock:
+            if phase in self._done:
+                return False
+            self._done.add(phase)
+        self.mark(phase)
+        return True
+
+    def total(self) -> float:
+        """Seconds from process creation (or timer start) to the last mark."""
+        return (self._last - self.started) + (self.launch or 0.0)
+
+    def report(self) -> Dict[str, object]:
+        return {'phases': [{'phase': name, 'seconds': seconds} for name, seconds in self.phases],
+                'total_seconds': self.total()}
+
+    def print_report(self) -> None:
+        print("\n  Startup timing:")
+        for name, seconds in self.phases:
+            print(f"    {name:<16} {seconds * 1000:>8.1f} ms")
+        print(f"    {'total':<16} {self.total() * 1000:>8.1f} ms\n")
+
+
+def bind_port(host: str = DEFAULT_HOST, start_port: int = DEFAULT_PORT,
+              max_attempts: int = PORT_ATTEMPTS) -> Optional[socket.socket]:
+    """Listening socket on the first free port from start_port, or None.
+
+    Binding once and handing the socket to the server avoids a probe-then-
+    bind race (another program taking the port in between).
+    """
+    for port in range(start_port, start_port + max_attempts):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if sys.platform == 'win32':
+            sock.setsockopt(socket.SOL_SOCKET, getattr(socket, 'SO_EXCLUSIVEADDRUSE', socket.SO_REUSEADDR), 1)
+        else:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, port))
+            sock.listen(128)
+            sock.set_inheritable(True)
+            return sock
+        except OSError:
+            sock.close()
+    return None
+
+
+def open_browser_now(url: str) -> None:
+    """Start the default browser on url without blocking (the port is already listening)."""
+    def _open():
+        import webbrowser
+        try:
+            webbrowser.open(url)
+        except Exception as e:  # browser launch must never stop the server
+            print(f"[WARNING] Browser did not open automatically: {e}")
+            print(f"  Please open manually: {url}")
+
+    threading.Thread(target=_open, daemon=True).start()
+
+
+class ColdStart:
+    """Work done before Flask is imported: timer, port and browser.
+
+    Attributes:
+        timer: StartupTimer for the rest of startup
+        sock: Listening socket (None if no port was free)
+        port: Bound port, or None
+    """
+
+    def __init__(self, open_browser: bool = True):
+        self.timer = StartupTimer()
+        self.sock = bind_port()
+        self.port = self.sock.getsockname()[1] if self.sock else None
+        self.timer.mark('port')
+        if self.sock is not None:
+            print(f"Starting PR Mortar Calculator on http://localhost:{self.port} ...", flush=True)
+            if open_browser:
+                open_browser_now(f"http://localhost:{self.port}")
+        self.timer.mark('browser')
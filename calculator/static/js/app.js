@@ -10,7 +10,8 @@
 
 import { calculateFiringSolution, PR_PHYSICS } from './ballistics.js';
 import { gridToXY, formatGridReference, xyToGrid, gridRefToXY, calculateGridScale, getRowLabelCenterX } from './coordinates.js';
-import { loadMapData } from './heightmap.js';
+import { loadHeightmapStats, loadMapData, loadTiledMapData, takeLoadTimings } from './heightmap.js';
+import { recordMapLoad, reportMapOpen, installTelemetryFlush } from './telemetry.js';
 
 // ====================================
 // APPLICATION STATE
@@ -28,6 +29,9 @@ const state = {
   targetPreciseXY: null   // { x: number, y: number } in meters
 };
 
+// Approximate max range at 45° on level ground (meters), drawn as the range circle
+const RANGE_CIRCLE_RADIUS = 1485;
+
 // Overlay layers
 state.gridGroup = null;
 state.gridLabelGroup = null;
@@ -48,10 +52,27 @@ document.addEventListener('DOMContentLoaded', async () => {
   
   // Set up event listeners
   setupEventListeners();
+
+  // Send queued load-timing beacons when the page is hidden or closed
+  installTelemetryFlush();
+
+  // Cache the app and most-used maps for instant repeat loads
+  registerServiceWorker();
   
   console.log('Application ready');
 });
 
+/**
+ * Register the service worker (/sw.js, generated by server.py with a
+ * precache manifest). Failure only means repeat visits use the network.
+ */
+function registerServiceWorker() {
+  if (!('serviceWorker' in navigator)) return;
+  navigator.serviceWorker.register('/sw.js').catch((error) => {
+    console.warn('Service worker registration failed:', error);
+  });
+}
+
 // ====================================
 // MAP LOADING
 // ====================================
@@ -93,6 +114,16 @@ async function loadAvailableMaps() {
   }
 }
 
+/**
+ * Queue a telemetry beacon for the current map's heightmap load, once its
+ * timings are available (after the full heightmap or the first tiles load).
+ */
+function reportLoadTimings() {
+  if (state.currentMap) {
+    recordMapLoad(state.currentMap, takeLoadTimings(state.currentMap));
+  }
+}
+
 async function loadSelectedMap() {
   const dropdown = document.getElementById('map-dropdown');
   const mapName = dropdown.value;
@@ -106,9 +137,20 @@ async function loadSelectedMap() {
     // Show loading state
     document.getElementById('map-loading').innerHTML = '<p>Loading map data...</p>';
     
-    // Load map data
-    state.mapData = await loadMapData(mapName);
+    // Load map data: heightmap tiles on demand (only the area around the
+    // mortar), or the whole heightmap if the server has no tiles
+    try {
+      state.mapData = await loadTiledMapData(mapName);
+    } catch (tileError) {
+      console.warn('Heightmap tiles unavailable, loading the full heightmap:', tileError);
+      state.mapData = await loadMapData(mapName);
+    }
     state.currentMap = mapName;
+    reportMapOpen(mapName);
+
+    // Report heightmap load phases (sampled; null when served from cache).
+    // Tiled maps report once their first tiles have loaded.
+    reportLoadTimings();
     
     // Store original map size for override reset
     state.originalMapSize = state.mapData.metadata.map_size;
@@ -186,12 +228,24 @@ function initializeLeafletMap() {
   // Add a simple background (will be replaced with actual map imagery in future)
   const imageUrl = `/maps/${state.currentMap}/minimap.png`;
   
+  // Show a small minimap variant (a mip level from the DDS) straight away if
+  // one was generated, then swap in the full-resolution image once loaded
+  const previewUrl = getMinimapPreviewUrl(metadata);
+  const leafletMap = state.leafletMap;
+  const previewOverlay = previewUrl ? L.imageOverlay(previewUrl, bounds).addTo(leafletMap) : null;
+  
   // Try to load minimap, fallback to colored rectangle
   const img = new Image();
   img.onload = () => {
-    L.imageOverlay(imageUrl, bounds).addTo(state.leafletMap);
+    L.imageOverlay(imageUrl, bounds).addTo(leafletMap);
+    if (previewOverlay) {
+      previewOverlay.remove();
+    }
   };
   img.onerror = () => {
+    if (previewOverlay) {
+      previewOverlay.remove();
+    }
     // Fallback: Draw a simple colored rectangle
     console.warn('Minimap not found, using placeholder');
     const canvas = document.createElement('canvas');
@@ -233,6 +287,9 @@ function initializeLeafletMap() {
   
   // Add grid overlay
   addGridOverlay();
+
+  // Hillshade/contour layers, if build_overlays.py has run for this map
+  addTerrainOverlays(metadata);
   
   // Set initial grid visibility (both lines and labels hidden by default)
   if (state.gridGroup) {
@@ -253,6 +310,66 @@ function initializeLeafletMap() {
   console.log('Leaflet map initialized');
 }
 
+/**
+ * Add the prebuilt hillshade and contour tiles (metadata.overlays) as optional
+ * layers with a layer switcher. Tiles exist at one zoom level, where one tile
+ * covers mapSize / tiles meters; Leaflet scales them at other zoom levels.
+ */
+function addTerrainOverlays(metadata) {
+  const overlays = metadata.overlays;
+  if (!overlays || !overlays.tiles) return;
+
+  const mapName = state.currentMap;
+  const mapSize = metadata.map_size;
+  const version = encodeURIComponent(overlays.generated_at || '');
+  const OverlayTileLayer = L.TileLayer.extend({
+    getTileUrl(coords) {
+      // CRS.Simple tile rows count up from -tiles (north edge) to -1 (south edge)
+      const i = coords.y + overlays.tiles;
+      const j = coords.x;
+      if (i < 0 || j < 0 || i >= overlays.tiles || j >= overlays.tiles) {
+        return L.Util.emptyImageUrl;
+      }
+      return `/maps/${mapName}/overlays/${this.options.layer}/${i}_${j}.png?v=${version}`;
+    }
+  });
+
+  const labels = { hillshade: 'Hillshade', contours: `Contours (${overlays.contours.interval} m)` };
+  const layers = {};
+  for (const layer of overlays.layers) {
+    layers[labels[layer] || layer] = new OverlayTileLayer('', {
+      layer,
+      tileSize: mapSize / overlays.tiles,
+      minNativeZoom: 0,
+      maxNativeZoom: 0,
+      bounds: [[0, 0], [mapSize, mapSize]],
+      noWrap: true
+    });
+  }
+  L.control.layers(null, layers, { position: 'topright' }).addTo(state.leafletMap);
+}
+
+/**
+ * Pick a low-resolution minimap variant to show while the full image loads.
+ * Prefers WebP and the largest variant no wider than 1024px.
+ * @returns {string|null} Variant URL, or null if the map has no variants
+ */
+function getMinimapPreviewUrl(metadata) {
+  const variants = (metadata.minimap && metadata.minimap.variants) || [];
+  let best = null;
+  let bestScore = -1;
+  for (const variant of variants) {
+    const width = parseInt(variant.resolution, 10);
+    if (!(width <= 1024)) continue;
+    const score = width * 2 + (variant.file.endsWith('.webp') ? 1 : 0);
+    if (score > bestScore) {
+      best = variant;
+      bestScore = score;
+    }
+  }
+  return best ? `/maps/${state.currentMap}/${best.file}` : null;
+}
+
 /**
  * Clear any existing grid overlays (lines and labels).
  */
@@ -576,11 +693,13 @@ function setupMarkerEvents(marker, type) {
 
       // Update elevation display for this marker
       try {
+        // NaN while the heightmap tile under the marker is still loading
         const elev = state.mapData.getElevationAt(x, y);
+        const text = Number.isFinite(elev) ? `${elev.toFixed(1)}m` : '--';
         if (type === 'mortar') {
-          document.getElementById('mortar-elevation-display').textContent = `${elev.toFixed(1)}m`;
+          document.getElementById('mortar-elevation-display').textContent = text;
         } else {
-          document.getElementById('target-elevation-display').textContent = `${elev.toFixed(1)}m`;
+          document.getElementById('target-elevation-display').textContent = text;
         }
       } catch (err) {
         // ignore elevation update errors
@@ -608,7 +727,8 @@ function setupMarkerEvents(marker, type) {
     try {
       const grid = xyToGrid(x, y, metadata.grid_scale);
       const elev = state.mapData.getElevationAt(x, y);
-      marker.bindTooltip(`${grid.column}${grid.row}-${grid.keypad} ${elev.toFixed(1)}m`, { permanent: false }).openTooltip();
+      const elevText = Number.isFinite(elev) ? `${elev.toFixed(1)}m` : '--';
+      marker.bindTooltip(`${grid.column}${grid.row}-${grid.keypad} ${elevText}`, { permanent: false }).openTooltip();
     } catch (err) {
       // ignore
     }
@@ -646,16 +766,24 @@ function updatePathLine() {
 function updateRangeCircle(centerLatLng) {
   if (!centerLatLng) return;
 
-  // Remove existing circle if present
+  // Fetch the heightmap tiles the mortar can reach (tiled maps only)
+  if (state.mapData && state.mapData.loadArea) {
+    const x = centerLatLng.lng;
+    const y = state.mapData.metadata.map_size - centerLatLng.lat;
+    state.mapData.loadArea(x, y, RANGE_CIRCLE_RADIUS)
+      .then(reportLoadTimings)
+      .catch((err) => console.warn('Failed to load heightmap tiles:', err));
+  }
+
   if (state.rangeCircle) {
     state.rangeCircle.setLatLng(centerLatLng);
     // Display approximate max range on flat ground (45° optimal angle ≈ 1485m)
-    state.rangeCircle.setRadius(1485);
+    state.rangeCircle.setRadius(RANGE_CIRCLE_RADIUS);
     return;
   }
 
   state.rangeCircle = L.circle(centerLatLng, {
-    radius: 1485,  // Approximate max range at 45° on level ground
+    radius: RANGE_CIRCLE_RADIUS,
     color: '#00bcd4',
     weight: 2,
     fillColor: '#00bcd4',
@@ -761,6 +889,20 @@ function performCalculation() {
     alert('Elevation data not available for this map');
     return;
   }
+  // Tiled maps: fetch the tiles under both markers first, then calculate
+  if (state.mapData.hasElevationAt &&
+      !(state.mapData.hasElevationAt(mortarXY.x, mortarXY.y) && state.mapData.hasElevationAt(targetXY.x, targetXY.y))) {
+    state.mapData.loadPoints([mortarXY, targetXY])
+      .then(() => {
+        reportLoadTimings();
+        performCalculation();
+      })
+      .catch((err) => {
+        console.error('Failed to load heightmap tiles:', err);
+        resetResults();
+      });
+    return;
+  }
   const mortarZ = state.mapData.getElevationAt(mortarXY.x, mortarXY.y);
   const targetZBase = state.mapData.getElevationAt(targetXY.x, targetXY.y);
   
@@ -980,5 +1122,6 @@ function fixLeafletIconPaths() {
 window.prCalc = {
   state,
   performCalculation,
-  loadSelectedMap
+  loadSelectedMap,
+  heightmapStats: () => loadHeightmapStats(state.currentMap, state.mapData)
 };
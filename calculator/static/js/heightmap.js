@@ -31,8 +31,10 @@ const metadataCache = new Map();
 /**
  * Load heightmap data from JSON file.
  * 
- * Fetches heightmap.json from /maps/[mapName]/ directory (served by Flask).
- * Results are cached to avoid redundant network requests.
+ * Fetches heightmap.bin (compact predictive codec, see decodeHeightmapCodec)
+ * from /maps/[mapName]/ when metadata.json lists one (heightmap_codec), and
+ * heightmap.json.gz otherwise. Results are cached to avoid redundant network
+ * requests.
  * 
  * Performance optimization: Converts the data array to Uint16Array for:
  * - Reduced memory footprint (50% less than regular array)
@@ -61,7 +63,32 @@ export async function loadHeightmap(mapName) {
   }
   
   try {
-    // Load compressed heightmap (only .gz format is distributed)
+    // Maps without heightmap.bin would only answer 404: ask the metadata first
+    const metadata = await loadMetadata(mapName);
+
+    // Per-phase durations (ms) for client telemetry, see takeLoadTimings()
+    const phases = {};
+    const started = performance.now();
+    let mark = started;
+    const lap = (phase) => {
+      const now = performance.now();
+      phases[phase] = now - mark;
+      mark = now;
+    };
+
+    // Prefer the predictive codec file (about half the size of .json.gz)
+    const codecResponse = metadata.heightmap_codec ? await fetch(`/maps/${mapName}/heightmap.bin`) : null;
+    if (codecResponse && codecResponse.ok) {
+      const buffer = await codecResponse.arrayBuffer();
+      lap('fetch');
+      const codecData = await decodeHeightmapCodec(buffer, phases);
+      phases.total = performance.now() - started;
+      heightmapCache.set(mapName, codecData);
+      recordLoadTimings(mapName, 'bin', phases, buffer.byteLength, codecData.data.byteLength);
+      return codecData;
+    }
+
+    // Fall back to the gzipped JSON heightmap
     const url = `/maps/${mapName}/heightmap.json.gz`;
     const response = await fetch(url);
     
@@ -71,11 +98,14 @@ export async function loadHeightmap(mapName) {
     
     // Decompress gzipped response
     const blob = await response.blob();
+    lap('fetch');
     const ds = new DecompressionStream('gzip');
     const decompressedStream = blob.stream().pipeThrough(ds);
     const decompressedBlob = await new Response(decompressedStream).blob();
     const text = await decompressedBlob.text();
+    lap('decompress');
     const heightmapData = JSON.parse(text);
+    lap('parse');
     
     // Validate data structure
     if (!heightmapData.resolution || !heightmapData.data || !Array.isArray(heightmapData.data)) {
@@ -85,6 +115,8 @@ export async function loadHeightmap(mapName) {
     // Convert data array to Uint16Array for performance
     // This reduces memory usage and speeds up interpolation
     const typedData = new Uint16Array(heightmapData.data);
+    lap('copy');
+    phases.total = performance.now() - started;
     
     // Replace the data array with typed array
     const optimizedData = {
@@ -94,6 +126,7 @@ export async function loadHeightmap(mapName) {
     
     // Cache the result
     heightmapCache.set(mapName, optimizedData);
+    recordLoadTimings(mapName, 'json', phases, blob.size, typedData.byteLength);
     
     return optimizedData;
   } catch (error) {
@@ -102,6 +135,150 @@ export async function loadHeightmap(mapName) {
   }
 }
 
+/**
+ * Timings of the most recent network load of each heightmap
+ * @type {Map<string, Object>}
+ */
+const loadTimings = new Map();
+
+function recordLoadTimings(mapName, source, phases, transferBytes, heightmapBytes) {
+  for (const phase of Object.keys(phases)) {
+    phases[phase] = Math.round(phases[phase] * 10) / 10;
+  }
+  loadTimings.set(mapName, { source, phases, transferBytes, heightmapBytes });
+}
+
+/**
+ * Phase timings of the last time loadHeightmap fetched a map, returned
+ * once (cache hits are not timed, so a reload reports nothing).
+ * Phases in milliseconds:
+ * - heightmap.bin: fetch, decompress, reconstruct, total
+ * - heightmap.json.gz: fetch, decompress, parse, copy, total
+ * - tiles: index (tile layout and metadata), fetch (slowest tile of the
+ *   first batch), decode (all tiles of the batch), total; recorded when
+ *   the first batch of tiles has loaded (see TiledHeightmap.loadTiles)
+ * 
+ * @param {string} mapName - Name of the map
+ * @returns {Object|null} { source: 'bin'|'json'|'tiles', phases, transferBytes, heightmapBytes }, or null
+ */
+export function takeLoadTimings(mapName) {
+  const timings = loadTimings.get(mapName) ?? null;
+  loadTimings.delete(mapName);
+  return timings;
+}
+
+/**
+ * Predictor ids used in the heightmap.bin header (see calculator/heightmap_codec.py)
+ * @type {string[]}
+ */
+const HEIGHTMAP_PREDICTORS = ['up', 'gradient', 'paeth'];
+
+/**
+ * Size of the heightmap.bin header in bytes
+ * @type {number}
+ */
+const HEIGHTMAP_CODEC_HEADER_SIZE = 16;
+
+/**
+ * Rebuild heightmap samples from zigzag-encoded prediction residuals.
+ * 
+ * Each sample is predicted from already-decoded neighbours (a = left,
+ * b = up, c = up-left; 0 outside the map) and the stored residual is added
+ * modulo 2^16.
+ * 
+ * @param {Uint8Array} planes - Low-byte plane followed by high-byte plane
+ * @param {number} width - Heightmap width in pixels
+ * @param {number} height - Heightmap height in pixels
+ * @param {string} predictor - "up", "gradient" or "paeth"
+ * @returns {Uint16Array} Decoded height values (row-major)
+ */
+export function reconstructHeightmap(planes, width, height, predictor) {
+  const count = width * height;
+  const out = new Uint16Array(count);
+
+  for (let i = 0; i < count; i++) {
+    const x = i % width;
+    const zigzag = planes[i] | (planes[count + i] << 8);
+    const residual = (zigzag >>> 1) ^ -(zigzag & 1);
+
+    const a = x > 0 ? out[i - 1] : 0;
+    const b = i >= width ? out[i - width] : 0;
+    const c = x > 0 && i >= width ? out[i - width - 1] : 0;
+
+    let prediction;
+    if (predictor === 'up') {
+      prediction = b;
+    } else if (predictor === 'gradient') {
+      prediction = a + b - c;
+    } else {
+      const p = a + b - c;
+      const pa = Math.abs(p - a);
+      const pb = Math.abs(p - b);
+      const pc = Math.abs(p - c);
+      prediction = (pa <= pb && pa <= pc) ? a : (pb <= pc ? b : c);
+    }
+
+    out[i] = (prediction + residual) & 0xFFFF;
+  }
+
+  return out;
+}
+
+/**
+ * Decode a heightmap.bin file.
+ * 
+ * Layout (little-endian): magic "PRHM", version, predictor id, reserved u16,
+ * width u32, height u32, then a zlib stream of residual byte planes.
+ * 
+ * @param {ArrayBuffer} buffer - Raw heightmap.bin contents
+ * @param {Object} [phases] - If given, receives decompress and reconstruct durations (ms)
+ * @returns {Promise<Object>} Heightmap data object (same shape as loadHeightmap)
+ * @throws {Error} If the header is invalid
+ */
+export async function decodeHeightmapCodec(buffer, phases) {
+  if (buffer.byteLength < HEIGHTMAP_CODEC_HEADER_SIZE) {
+    throw new Error('Invalid heightmap codec format: too short');
+  }
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== 'PRHM' || view.getUint8(4) !== 1) {
+    throw new Error('Invalid heightmap codec format');
+  }
+
+  const predictor = HEIGHTMAP_PREDICTORS[view.getUint8(5)];
+  const width = view.getUint32(8, true);
+  const height = view.getUint32(12, true);
+  if (!predictor) {
+    throw new Error('Invalid heightmap codec format: unknown predictor');
+  }
+
+  let mark = performance.now();
+  const payload = new Blob([buffer.slice(HEIGHTMAP_CODEC_HEADER_SIZE)]);
+  const inflated = payload.stream().pipeThrough(new DecompressionStream('deflate'));
+  const planes = new Uint8Array(await new Response(inflated).arrayBuffer());
+  if (planes.length !== 2 * width * height) {
+    throw new Error('Invalid heightmap codec format: wrong payload size');
+  }
+  if (phases) {
+    const now = performance.now();
+    phases.decompress = now - mark;
+    mark = now;
+  }
+
+  const data = reconstructHeightmap(planes, width, height, predictor);
+  if (phases) {
+    phases.reconstruct = performance.now() - mark;
+  }
+
+  return {
+    resolution: width,
+    width,
+    height,
+    format: 'uint16',
+    data
+  };
+}
+
 /**
  * Load map metadata from JSON file.
  * 
@@ -323,11 +500,9 @@ export function getElevation(x, y, heightmapData, heightScale, mapSize, resoluti
  * console.log(elevation); // 150.5 meters
  */
 export async function loadMapData(mapName) {
-  // Load both heightmap and metadata in parallel
-  const [heightmap, metadata] = await Promise.all([
-    loadHeightmap(mapName),
-    loadMetadata(mapName)
-  ]);
+  // loadHeightmap() reads the (cached) metadata to pick the heightmap file
+  const metadata = await loadMetadata(mapName);
+  const heightmap = await loadHeightmap(mapName);
   
   // Create convenience function for getting elevation
   const getElevationAt = (x, y) => {
@@ -348,6 +523,279 @@ export async function loadMapData(mapName) {
   };
 }
 
+/**
+ * Tiled heightmaps by map name (tiles already fetched are kept)
+ * @type {Map<string, TiledHeightmap>}
+ */
+const tiledCache = new Map();
+
+/**
+ * Load the tile layout of a map's heightmap.
+ *
+ * @param {string} mapName - Name of the map
+ * @returns {Promise<Object>} { resolution, tile_size, tiles (per axis), version }
+ * @throws {Error} If the server has no tiles for the map
+ */
+export async function loadTileIndex(mapName) {
+  const response = await fetch(`/maps/${mapName}/heightmap/tiles`);
+  if (!response.ok) {
+    throw new Error(`Failed to load heightmap tiles: ${response.status} ${response.statusText}`);
+  }
+  return response.json();
+}
+
+/**
+ * Heightmap fetched tile by tile, for the area actually in use.
+ *
+ * Tile (i, j) covers cells [i·tileSize, (i+1)·tileSize) in rows (north to
+ * south) and columns (west to east), including the samples on both edges,
+ * so interpolation inside a cell needs exactly one tile. Samples match the
+ * full heightmap, so sample() equals bilinearInterpolation() on it.
+ */
+export class TiledHeightmap {
+  /**
+   * @param {string} mapName - Name of the map
+   * @param {Object} index - loadTileIndex() result
+   * @param {number} [indexMs=0] - Time taken to load the index (for load timings)
+   */
+  constructor(mapName, index, indexMs = 0) {
+    this.mapName = mapName;
+    this.resolution = index.resolution;
+    this.tileSize = index.tile_size;
+    this.tilesPerAxis = index.tiles;
+    this.version = index.version;
+    this.tiles = new Map();
+    this.pending = new Map();
+    // Load timings, reported once for the first batch of tiles
+    this.indexMs = indexMs;
+    this.timed = false;
+    this.stats = { fetch: 0, decode: 0, transferBytes: 0, heightmapBytes: 0 };
+  }
+
+  /**
+   * Tile holding a pixel position (cells on a tile edge belong to the later tile).
+   *
+   * @param {number} pixelX - Pixel X (may be fractional)
+   * @param {number} pixelY - Pixel Y (may be fractional)
+   * @returns {{i: number, j: number}} Tile row and column
+   */
+  tileAt(pixelX, pixelY) {
+    const last = this.tilesPerAxis - 1;
+    const cell = (value) => Math.min(Math.max(Math.floor(value / this.tileSize), 0), last);
+    return { i: cell(pixelY), j: cell(pixelX) };
+  }
+
+  /**
+   * Tiles intersecting a circle, nearest to its centre first.
+   *
+   * @param {number} pixelX - Centre X in pixels
+   * @param {number} pixelY - Centre Y in pixels
+   * @param {number} pixelRadius - Radius in pixels
+   * @returns {Array<{i: number, j: number}>} Tiles to load
+   */
+  tilesInCircle(pixelX, pixelY, pixelRadius) {
+    const first = this.tileAt(pixelX - pixelRadius, pixelY - pixelRadius);
+    const last = this.tileAt(pixelX + pixelRadius, pixelY + pixelRadius);
+    const tiles = [];
+    for (let i = first.i; i <= last.i; i++) {
+      for (let j = first.j; j <= last.j; j++) {
+        // Distance from the centre to the nearest point of the tile
+        const x0 = j * this.tileSize;
+        const y0 = i * this.tileSize;
+        const dx = Math.max(x0 - pixelX, 0, pixelX - (x0 + this.tileSize));
+        const dy = Math.max(y0 - pixelY, 0, pixelY - (y0 + this.tileSize));
+        const distance = Math.hypot(dx, dy);
+        if (distance <= pixelRadius) {
+          tiles.push({ i, j, distance });
+        }
+      }
+    }
+    tiles.sort((a, b) => a.distance - b.distance);
+    return tiles.map(({ i, j }) => ({ i, j }));
+  }
+
+  /**
+   * @param {number} i - Tile row
+   * @param {number} j - Tile column
+   * @returns {boolean} True if the tile has been loaded
+   */
+  hasTile(i, j) {
+    return this.tiles.has(`${i}/${j}`);
+  }
+
+  /**
+   * Fetch and decode one tile (concurrent requests for a tile share one fetch).
+   *
+   * @param {number} i - Tile row
+   * @param {number} j - Tile column
+   * @returns {Promise<Object>} Decoded tile (decodeHeightmapCodec() result)
+   */
+  loadTile(i, j) {
+    const key = `${i}/${j}`;
+    if (this.tiles.has(key)) {
+      return Promise.resolve(this.tiles.get(key));
+    }
+    if (!this.pending.has(key)) {
+      const url = `/maps/${this.mapName}/heightmap/tile/${i}/${j}?v=${this.version}`;
+      const started = performance.now();
+      let fetched = started;
+      let transferBytes = 0;
+      const request = fetch(url)
+        .then((response) => {
+          if (!response.ok) {
+            throw new Error(`Failed to load heightmap tile ${key}: ${response.status} ${response.statusText}`);
+          }
+          return response.arrayBuffer();
+        })
+        .then((buffer) => {
+          fetched = performance.now();
+          transferBytes = buffer.byteLength;
+          return decodeHeightmapCodec(buffer);
+        })
+        .then((tile) => {
+          // Tiles are fetched in parallel: the slowest fetch, but the sum of decodes
+          this.stats.fetch = Math.max(this.stats.fetch, fetched - started);
+          this.stats.decode += performance.now() - fetched;
+          this.stats.transferBytes += transferBytes;
+          this.stats.heightmapBytes += tile.data.byteLength;
+          this.tiles.set(key, tile);
+          return tile;
+        })
+        .finally(() => this.pending.delete(key));
+      this.pending.set(key, request);
+    }
+    return this.pending.get(key);
+  }
+
+  /**
+   * Load several tiles.
+   *
+   * @param {Array<{i: number, j: number}>} tiles - Tiles to load
+   * @returns {Promise<void>}
+   */
+  async loadTiles(tiles) {
+    const started = performance.now();
+    await Promise.all(tiles.map(({ i, j }) => this.loadTile(i, j)));
+    if (!this.timed && this.tiles.size > 0) {
+      this.timed = true;
+      const { fetch, decode, transferBytes, heightmapBytes } = this.stats;
+      const total = this.indexMs + performance.now() - started;
+      recordLoadTimings(this.mapName, 'tiles', { index: this.indexMs, fetch, decode, total },
+        transferBytes, heightmapBytes);
+    }
+  }
+
+  /**
+   * Bilinearly interpolated raw height at a pixel position.
+   *
+   * @param {number} pixelX - Pixel X (may be fractional)
+   * @param {number} pixelY - Pixel Y (may be fractional)
+   * @returns {number} Raw height value (0-65535), or NaN if its tile is not loaded
+   */
+  sample(pixelX, pixelY) {
+    const { i, j } = this.tileAt(pixelX, pixelY);
+    const tile = this.tiles.get(`${i}/${j}`);
+    if (!tile) {
+      return NaN;
+    }
+    const x0 = Math.floor(pixelX);
+    const y0 = Math.floor(pixelY);
+    const fx = pixelX - x0;
+    const fy = pixelY - y0;
+    // Tile-local columns / rows of the four surrounding samples
+    const left = x0 - j * this.tileSize;
+    const top = y0 - i * this.tileSize;
+    const right = Math.min(left + 1, tile.width - 1);
+    const bottom = Math.min(top + 1, tile.height - 1);
+
+    const topLeft = getPixelValue(tile.data, left, top, tile.width);
+    const topRight = getPixelValue(tile.data, right, top, tile.width);
+    const bottomLeft = getPixelValue(tile.data, left, bottom, tile.width);
+    const bottomRight = getPixelValue(tile.data, right, bottom, tile.width);
+    const topValue = topLeft + fx * (topRight - topLeft);
+    const bottomValue = bottomLeft + fx * (bottomRight - bottomLeft);
+    return topValue + fy * (bottomValue - topValue);
+  }
+}
+
+/**
+ * Load map data without the heightmap, fetching heightmap tiles on demand.
+ *
+ * Returns the same getElevationAt(x, y) as loadMapData(), which gives NaN
+ * until the tile under (x, y) is loaded; call loadArea() for the range
+ * circle and loadPoints() before computing a solution.
+ *
+ * @param {string} mapName - Name of the map
+ * @returns {Promise<Object>} Map data
+ * @returns {null} returns.heightmap - Not loaded (see returns.tiles)
+ * @returns {TiledHeightmap} returns.tiles - Tile loader
+ * @returns {Object} returns.metadata - Map metadata
+ * @returns {Function} returns.getElevationAt - Elevation at (x, y) in meters, or NaN
+ * @returns {Function} returns.hasElevationAt - True if (x, y) can be sampled now
+ * @returns {Function} returns.loadArea - (x, y, radius) => Promise, tiles in a circle (meters)
+ * @returns {Function} returns.loadPoints - ([{x, y}]) => Promise, tiles under the points
+ * @throws {Error} If the server has no tiles for the map
+ *
+ * @example
+ * const mapData = await loadTiledMapData('kashan_desert');
+ * await mapData.loadPoints([mortar, target]);
+ * const elevation = mapData.getElevationAt(mortar.x, mortar.y);
+ */
+export async function loadTiledMapData(mapName) {
+  let tiles = tiledCache.get(mapName);
+  const started = performance.now();
+  const [index, metadata] = await Promise.all([
+    tiles ? null : loadTileIndex(mapName),
+    loadMetadata(mapName)
+  ]);
+  if (!tiles) {
+    tiles = new TiledHeightmap(mapName, index, performance.now() - started);
+    tiledCache.set(mapName, tiles);
+  }
+
+  const toPixel = (x, y) => {
+    const mapSize = metadata.map_size;
+    const clampedX = Math.max(0, Math.min(mapSize, x));
+    const clampedY = Math.max(0, Math.min(mapSize, y));
+    return worldToPixel(clampedX, clampedY, mapSize, tiles.resolution);
+  };
+
+  const hasElevationAt = (x, y) => {
+    const { pixelX, pixelY } = toPixel(x, y);
+    const { i, j } = tiles.tileAt(pixelX, pixelY);
+    return tiles.hasTile(i, j);
+  };
+
+  const getElevationAt = (x, y) => {
+    if (x < 0 || x > metadata.map_size || y < 0 || y > metadata.map_size) {
+      console.warn(`Coordinates (${x}, ${y}) outside map bounds (0-${metadata.map_size})`);
+    }
+    const { pixelX, pixelY } = toPixel(x, y);
+    return (tiles.sample(pixelX, pixelY) / 65535.0) * metadata.height_scale;
+  };
+
+  const loadArea = (x, y, radius) => {
+    const { pixelX, pixelY } = toPixel(x, y);
+    const pixelRadius = radius * (tiles.resolution - 1) / metadata.map_size;
+    return tiles.loadTiles(tiles.tilesInCircle(pixelX, pixelY, pixelRadius));
+  };
+
+  const loadPoints = (points) => tiles.loadTiles(points.map(({ x, y }) => {
+    const { pixelX, pixelY } = toPixel(x, y);
+    return tiles.tileAt(pixelX, pixelY);
+  }));
+
+  return {
+    heightmap: null,
+    tiles,
+    metadata,
+    getElevationAt,
+    hasElevationAt,
+    loadArea,
+    loadPoints
+  };
+}
+
 /**
  * Clear heightmap cache (useful for testing or memory management).
  * 
@@ -361,9 +809,11 @@ export function clearCache(mapName) {
   if (mapName) {
     heightmapCache.delete(mapName);
     metadataCache.delete(mapName);
+    tiledCache.delete(mapName);
   } else {
     heightmapCache.clear();
     metadataCache.clear();
+    tiledCache.clear();
   }
 }
 
@@ -389,7 +839,8 @@ export function isValidCoordinate(x, y, mapSize) {
 /**
  * Get heightmap data statistics (for debugging).
  * 
- * Works with both regular arrays and Uint16Array.
+ * Works with both regular arrays and Uint16Array. Scans every sample;
+ * loadHeightmapStats() gets the same numbers from the server instead.
  * 
  * @param {number[]|Uint16Array} heightmapData - Flat array of height values
  * @returns {Object} Statistics
@@ -420,3 +871,30 @@ export function getHeightmapStats(heightmapData) {
   
   return { min, max, mean };
 }
+
+/**
+ * Get heightmap statistics for a loaded map without scanning it.
+ *
+ * Uses the stats precomputed with the terrain acceleration structures
+ * (/maps/[mapName]/terrain). If the server cannot answer, falls back to
+ * getHeightmapStats() on the full heightmap; tiled maps have none.
+ *
+ * @param {string} mapName - Name of the map
+ * @param {Object} mapData - loadMapData() or loadTiledMapData() result
+ * @returns {Promise<Object>} { min, max, mean } raw heights
+ * @throws {Error} If the server has no stats and the heightmap is tiled
+ */
+export async function loadHeightmapStats(mapName, mapData) {
+  try {
+    const response = await fetch(`/maps/${mapName}/terrain`);
+    if (response.ok) {
+      return (await response.json()).stats;
+    }
+  } catch (error) {
+    // Offline: scan the heightmap below if there is one
+  }
+  if (!mapData.heightmap) {
+    throw new Error(`Heightmap stats unavailable for ${mapName}`);
+  }
+  return getHeightmapStats(mapData.heightmap.data);
+}
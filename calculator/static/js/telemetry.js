@@ -0,0 +1,143 @@
+/**
+ * Client Load-Timing Telemetry for Project Reality Mortar Calculator
+ *
+ * Sends per-phase heightmap load timings (see takeLoadTimings in
+ * heightmap.js) to the server's POST /telemetry endpoint, so slow maps and
+ * phases seen by real users show up in GET /telemetry.
+ *
+ * - Sampled: one decision per page load (TELEMETRY_SAMPLE_RATE)
+ * - Batched: beacons are queued and sent TELEMETRY_BATCH_SIZE at a time,
+ *   and when the page is hidden or closed (navigator.sendBeacon)
+ * - Never throws: telemetry must not affect the calculator
+ *
+ * Map opens are reported too (POST /maps/<map>/open, never sampled): the
+ * server's usage counts drive which maps it pre-warms and preloads.
+ *
+ * @module telemetry
+ */
+
+/**
+ * Fraction of page loads that report timings
+ * @type {number}
+ */
+export const TELEMETRY_SAMPLE_RATE = 0.25;
+
+/**
+ * Beacons queued before a batch is sent
+ * @type {number}
+ */
+export const TELEMETRY_BATCH_SIZE = 10;
+
+const TELEMETRY_ENDPOINT = '/telemetry';
+
+const config = {
+  sampled: Math.random() < TELEMETRY_SAMPLE_RATE,
+  send: sendWithBeacon
+};
+
+const queue = [];
+
+/**
+ * Override sampling or the transport (tests, or to force reporting on).
+ *
+ * @param {Object} options
+ * @param {boolean} [options.sampled] - Whether this page load reports timings
+ * @param {Function} [options.send] - (endpoint, jsonBody) => void
+ */
+export function configureTelemetry({ sampled, send } = {}) {
+  if (sampled !== undefined) config.sampled = sampled;
+  if (send !== undefined) config.send = send;
+}
+
+function sendWithBeacon(endpoint, body) {
+  const blob = new Blob([body], { type: 'application/json' });
+  if (typeof navigator !== 'undefined' && navigator.sendBeacon && navigator.sendBeacon(endpoint, blob)) {
+    return;
+  }
+  fetch(endpoint, { method: 'POST', body: blob, keepalive: true }).catch(() => {});
+}
+
+/**
+ * Build a beacon for one map load.
+ *
+ * @param {string} mapName - Name of the map
+ * @param {Object} timings - takeLoadTimings() result
+ * @returns {Object} Beacon in the POST /telemetry format
+ */
+export function buildBeacon(mapName, timings) {
+  const beacon = {
+    map: mapName,
+    source: timings.source,
+    phases: { ...timings.phases },
+    heightmapBytes: timings.heightmapBytes,
+    transferBytes: timings.transferBytes
+  };
+  // Chromium only; other browsers simply omit it
+  const memory = typeof performance !== 'undefined' ? performance.memory : undefined;
+  if (memory && Number.isFinite(memory.usedJSHeapSize)) {
+    beacon.memoryBytes = memory.usedJSHeapSize;
+  }
+  return beacon;
+}
+
+/**
+ * Queue the timings of one map load (no-op when this page load is not sampled).
+ *
+ * @param {string} mapName - Name of the map
+ * @param {Object|null} timings - takeLoadTimings() result (null for cache hits)
+ * @returns {boolean} True if a beacon was queued
+ */
+export function recordMapLoad(mapName, timings) {
+  if (!config.sampled || !timings) {
+    return false;
+  }
+  queue.push(buildBeacon(mapName, timings));
+  if (queue.length >= TELEMETRY_BATCH_SIZE) {
+    flushTelemetry();
+  }
+  return true;
+}
+
+/**
+ * Tell the server a map was opened, so it counts one use of the map.
+ * Not sampled: every open counts.
+ *
+ * @param {string} mapName - Name of the map
+ */
+export function reportMapOpen(mapName) {
+  try {
+    config.send(`/maps/${encodeURIComponent(mapName)}/open`, '{}');
+  } catch (error) {
+    console.warn('Map open not reported:', error);
+  }
+}
+
+/**
+ * Send all queued beacons as one batch.
+ *
+ * @returns {number} Number of beacons sent
+ */
+export function flushTelemetry() {
+  if (queue.length === 0) {
+    return 0;
+  }
+  const beacons = queue.splice(0, queue.length);
+  try {
+    config.send(TELEMETRY_ENDPOINT, JSON.stringify({ beacons }));
+  } catch (error) {
+    console.warn('Telemetry not sent:', error);
+  }
+  return beacons.length;
+}
+
+/**
+ * Flush queued beacons when the page is hidden or unloaded.
+ */
+export function installTelemetryFlush() {
+  document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') {
+      flushTelemetry();
+    }
+  });
+  window.addEventListener('pagehide', flushTelemetry);
+}
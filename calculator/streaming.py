@@ -0,0 +1,141 @@
+"""
+Streamed Batch Responses
+
+Batch endpoints produce their answers in chunks from generators and send
+each chunk as soon as it is ready. The first rows reach the client early,
+and the server never holds the whole serialised document. The format is
+chosen from the request's Accept header:
+
+- application/json (default): one JSON document, written piece by piece
+- application/x-ndjson: one JSON value per line, one line per item
+- application/vnd.prmortar.frames: packed little-endian columns (below)
+
+Frame stream layout (little-endian):
+    0  4s  magic b'PRSF'
+    4  B   format version (1)
+    5  B   column count C
+    6  H   reserved (0)
+    8  ... C column descriptors: B name length, ASCII name, 1s dtype
+           ('f' float32, 'H' uint16, 'B' uint8)
+    then frames: I row count N, followed by each column's N values in
+    descriptor order. A frame with N = 0 ends the stream.
+
+Invalid float values are NaN. Clients read a frame with one typed-array
+view per column, with no per-row parsing.
+"""
+
+import json
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+JSON = 'application/json'
+NDJSON = 'application/x-ndjson'
+FRAMES = 'application/vnd.prmortar.frames'
+FORMATS = (JSON, NDJSON, FRAMES)
+
+MAGIC = b'PRSF'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sBBH')
+ROW_COUNT = struct.Struct('<I')
+END_FRAME = ROW_COUNT.pack(0)
+
+DTYPES = {'f': np.dtype('<f4'), 'H': np.dtype('<u2'), 'B': np.dtype('u1')}
+
+# (name, dtype code) per column of a frame stream
+Columns = Sequence[Tuple[str, str]]
+
+
+def negotiate(accept_mimetypes, supported: Sequence[str] = FORMATS) -> Optional[str]:
+    """Best supported format for an Accept header.
+
+    Returns JSON when the client accepts anything (or sends no Accept
+    header), and None when it accepts none of the supported formats.
+    """
+    if not accept_mimetypes:
+        return JSON
+    return accept_mimetypes.best_match(supported)
+
+
+def frame_header(columns: Columns) -> bytes:
+    """Stream header describing the columns of every following frame."""
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, len(columns), 0)]
+    for name, code in columns:
+        encoded = name.encode('ascii')
+        parts.append(bytes([len(encoded)]) + encoded + code.encode('ascii'))
+    return b''.join(parts)
+
+
+def encode_frame(columns: Columns, arrays: Dict[str, np.ndarray]) -> bytes:
+    """One frame: row count, then every column packed in header order."""
+    rows = len(arrays[columns[0][0]])
+    parts = [ROW_COUNT.pack(rows)]
+    for name, code in columns:
+        parts.append(np.ascontiguousarray(arrays[name], dtype=DTYPES[code]).tobytes())
+    return b''.join(parts)
+
+
+def decode_frames(data: bytes) -> Dict[str, np.ndarray]:
+    """Read a complete frame stream back into one array per column.
+
+    Raises:
+        ValueError: If the data is not a complete frame stream
+    """
+    if len(data) < HEADER.size:
+        raise ValueError('Frame stream too short')
+    magic, version, count, _ = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError('Not a version 1 frame stream')
+    offset = HEADER.size
+    columns = []
+    for _ in range(count):
+        length = data[offset]
+        name = data[offset + 1:offset + 1 + length].decode('ascii')
+        columns.append((name, chr(data[offset + 1 + length])))
+        offset += length + 2
+
+    chunks: Dict[str, List[np.ndarray]] = {name: [] for name, _ in columns}
+    while True:
+        if offset + ROW_COUNT.size > len(data):
+            raise ValueError('Frame stream ended without an end frame')
+        (rows,) = ROW_COUNT.unpack_from(data, offset)
+        offset += ROW_COUNT.size
+        if rows == 0:
+            break
+        for name, code in columns:
+            size = rows * DTYPES[code].itemsize
+            if offset + size > len(data):
+                raise ValueError('Frame stream truncated')
+            chunks[name].append(np.frombuffer(data, DTYPES[code], rows, offset))
+            offset += size
+    return {name: np.concatenate(chunks[name]) if chunks[name] else np.empty(0, DTYPES[code])
+            for name, code in columns}
+
+
+def json_document(head: dict, key: str, rows: Iterable[List[str]]) -> Iterator[str]:
+    """A JSON object of head plus key: [rows...], from chunks of row JSON texts."""
+    prefix = json.dumps(head)[:-1]
+    yield f'{prefix}, "{key}": [' if head else f'{{"{key}": ['
+    separator = ''
+    for chunk in rows:
+        if chunk:
+            yield separator + ', '.join(chunk)
+            separator = ', '
+    yield ']}'
+
+
+def ndjson_lines(rows: Iterable[List[str]]) -> Iterator[str]:
+    """One line per row, from chunks of row JSON texts."""
+    for chunk in rows:
+        if chunk:
+            yield '\n'.join(chunk) + '\n'
+
+
+def frame_stream(columns: Columns, chunks: Iterable[Dict[str, np.ndarray]]) -> Iterator[bytes]:
+    """Header, one frame per chunk of column arrays, then the end frame."""
+    yield frame_header(columns)
+    for arrays in chunks:
+        if len(arrays[columns[0][0]]):
+            yield encode_frame(columns, arrays)
+    yield END_FRAME
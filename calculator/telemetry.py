@@ -0,0 +1,171 @@
+"""
+Client Load-Timing Telemetry
+
+Most of a map load happens in the browser (heightmap fetch, decompression,
+JSON.parse / codec reconstruction, typed-array copy), where the server
+cannot see it. The UI samples a fraction of page loads, times each phase
+of loadHeightmap (source bin / json) or of the first batch of heightmap
+tiles (source tiles) and sends batched beacons to POST /telemetry; this module
+validates them and keeps per-map percentiles for GET /telemetry.
+
+Beacon batch (JSON):
+    {"beacons": [{"map": "muttrah_city_2",
+                  "source": "bin",
+                  "phases": {"fetch": 120.5, "decompress": 40.2, "reconstruct": 35.0, "total": 196.1},
+                  "heightmapBytes": 2101250, "transferBytes": 1250312, "memoryBytes": 48234496}]}
+
+Durations are milliseconds; byte counts are optional. Aggregates are kept
+in memory only (the last SAMPLES_PER_SERIES values per map and metric), so
+a restart starts from zero.
+"""
+
+import math
+import re
+import threading
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+# Request limits (a batch is small; anything bigger is not from our UI)
+MAX_BEACONS_PER_BATCH = 50
+MAX_PHASES = 16
+MAX_DURATION_MS = 10 * 60 * 1000.0
+MAX_BYTES = 2 ** 40
+
+# Values kept per map and metric; older samples are dropped first
+SAMPLES_PER_SERIES = 1000
+
+PERCENTILES = (50, 75, 95, 99)
+
+# Optional beacon fields aggregated like phases (beacon key -> summary key)
+BYTE_FIELDS = {'heightmapBytes': 'heightmap_bytes',
+               'transferBytes': 'transfer_bytes',
+               'memoryBytes': 'memory_bytes'}
+
+SOURCES = ('bin', 'json', 'tiles')
+
+_MAP_NAME = re.compile(r'^[A-Za-z0-9_\-]{1,64}$')
+_PHASE_NAME = re.compile(r'^[a-z][a-z0-9_]{0,31}$')
+
+
+class Beacon(NamedTuple):
+    """One validated map-load timing beacon."""
+    map: str
+    source: Optional[str]
+    phases: Dict[str, float]
+    sizes: Dict[str, float]
+
+
+def _number(value, name: str, upper: float) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f'{name} must be a number')
+    if not 0 <= value <= upper:
+        raise ValueError(f'{name} out of range: {value}')
+    return float(value)
+
+
+def parse_beacon(item) -> Beacon:
+    """Validate one beacon object (see module docstring).
+
+    Raises:
+        ValueError: If a field is missing, of the wrong type or out of range
+    """
+    if not isinstance(item, dict):
+        raise ValueError('beacon must be an object')
+    map_name = item.get('map')
+    if not isinstance(map_name, str) or not _MAP_NAME.match(map_name):
+        raise ValueError(f'invalid map name: {map_name!r}')
+
+    source = item.get('source')
+    if source is not None and source not in SOURCES:
+        raise ValueError(f'invalid source: {source!r}')
+
+    phases = item.get('phases')
+    if not isinstance(phases, dict) or not phases:
+        raise ValueError('phases must be a non-empty object')
+    if len(phases) > MAX_PHASES:
+        raise ValueError(f'at most {MAX_PHASES} phases per beacon')
+    parsed_phases = {}
+    for phase, duration in phases.items():
+        if not isinstance(phase, str) or not _PHASE_NAME.match(phase):
+            raise ValueError(f'invalid phase name: {phase!r}')
+        parsed_phases[phase] = _number(duration, f'phase {phase!r}', MAX_DURATION_MS)
+
+    sizes = {summary_key: _number(item[field], field, MAX_BYTES)
+             for field, summary_key in BYTE_FIELDS.items() if item.get(field) is not None}
+    return Beacon(map_name, source, parsed_phases, sizes)
+
+
+def parse_beacons(body) -> List[Beacon]:
+    """Validate a POST /telemetry body; a single bad beacon rejects the batch.
+
+    Raises:
+        ValueError: If the body or any beacon is invalid
+    """
+    beacons = body.get('beacons') if isinstance(body, dict) else None
+    if not isinstance(beacons, list) or not beacons:
+        raise ValueError('"beacons" must be a non-empty list')
+    if len(beacons) > MAX_BEACONS_PER_BATCH:
+        raise ValueError(f'at most {MAX_BEACONS_PER_BATCH} beacons per batch')
+    return [parse_beacon(item) for item in beacons]
+
+
+def percentiles(values) -> Dict[str, float]:
+    """count, nearest-rank percentiles (PERCENTILES) and max of values."""
+    ordered = sorted(values)
+    count = len(ordered)
+    summary: Dict[str, float] = {'count': count}
+    for p in PERCENTILES:
+        summary[f'p{p}'] = round(ordered[max(math.ceil(p / 100 * count) - 1, 0)], 3)
+    summary['max'] = round(ordered[-1], 3)
+    return summary
+
+
+class TelemetryStore:
+    """Thread-safe per-map rolling samples of client load timings."""
+
+    def __init__(self, samples_per_series: int = SAMPLES_PER_SERIES):
+        self.samples_per_series = samples_per_series
+        self.beacon_counts: Dict[str, int] = {}
+        self.source_counts: Dict[str, Dict[str, int]] = {}
+        self._series: Dict[str, Dict[str, Deque[float]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, beacons: List[Beacon]) -> None:
+        """Add validated beacons to the per-map series."""
+        with self._lock:
+            for beacon in beacons:
+                self.beacon_counts[beacon.map] = self.beacon_counts.get(beacon.map, 0) + 1
+                if beacon.source:
+                    sources = self.source_counts.setdefault(beacon.map, {})
+                    sources[beacon.source] = sources.get(beacon.source, 0) + 1
+                series = self._series.setdefault(beacon.map, {})
+                for name, value in list(beacon.phases.items()) + list(beacon.sizes.items()):
+                    if name not in series:
+                        series[name] = deque(maxlen=self.samples_per_series)
+                    series[name].append(value)
+
+    def summary(self, map_name: Optional[str] = None) -> Dict[str, dict]:
+        """Per-map percentiles, slowest p95 total first.
+
+        Returns:
+            {map: {'beacons': n, 'sources': {...}, 'phases': {phase: percentiles},
+                   'heightmap_bytes': percentiles, ...}}
+        """
+        with self._lock:
+            names = [map_name] if map_name is not None else list(self._series)
+            snapshot = {name: {metric: list(values) for metric, values in self._series[name].items()}
+                        for name in names if name in self._series}
+            counts = {name: self.beacon_counts[name] for name in snapshot}
+            sources = {name: dict(self.source_counts.get(name, {})) for name in snapshot}
+
+        maps = {}
+        for name, series in snapshot.items():
+            entry = {'beacons': counts[name], 'sources': sources[name], 'phases': {}}
+            for metric, values in sorted(series.items()):
+                if metric in BYTE_FIELDS.values():
+                    entry[metric] = percentiles(values)
+                else:
+                    entry['phases'][metric] = percentiles(values)
+            maps[name] = entry
+        return dict(sorted(maps.items(),
+                           key=lambda item: (-item[1]['phases'].get('total', {}).get('p95', 0), item[0])))
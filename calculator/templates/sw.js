@@ -0,0 +1,132 @@
+/**
+ * Project Reality Mortar Calculator - Service Worker (served at /sw.js)
+ *
+ * Keeps the page, static assets and the most-used maps in the browser
+ * cache so repeat visits load instantly, even on a weak connection.
+ *
+ * MANIFEST is generated by server.py (see calculator/precache.py). When any
+ * file changes, the manifest version and therefore this script change. The
+ * browser then installs the new worker, which copies unchanged entries from
+ * the previous cache and downloads only the changed ones.
+ *
+ * - Manifest entries: served from the cache. Entries marked revalidate
+ *   (page, map list, map JSON) are also refreshed in the background.
+ * - Versioned URLs (heightmap/overlay tiles with ?v=, /blobs/) never change:
+ *   cached on first use (runtime cache).
+ * - Everything else (POST endpoints, sessions, telemetry) goes to the network.
+ */
+
+const MANIFEST = {{ manifest | tojson }};
+
+const CACHE_PREFIX = 'pr-mortar-precache-';
+const CACHE_NAME = CACHE_PREFIX + MANIFEST.version;
+const RUNTIME_CACHE = 'pr-mortar-runtime';
+const RUNTIME_MAX_ENTRIES = 500;
+
+const entriesByUrl = new Map(MANIFEST.entries.map((entry) => [entry.url, entry]));
+
+/**
+ * Cache key of a manifest entry: its URL plus revision, so a changed file
+ * never matches the copy of an older revision.
+ */
+function cacheKey(entry) {
+  const separator = entry.url.includes('?') ? '&' : '?';
+  return `${entry.url}${separator}__rev=${entry.revision}`;
+}
+
+async function precacheEntry(cache, entry) {
+  const key = cacheKey(entry);
+  if (await cache.match(key)) return;
+  // Unchanged since the previous worker: copy instead of downloading
+  const previous = await caches.match(key);
+  if (previous) {
+    await cache.put(key, previous);
+    return;
+  }
+  try {
+    const response = await fetch(entry.url, { cache: 'no-cache' });
+    if (response.ok) {
+      await cache.put(key, response);
+    }
+  } catch (error) {
+    // Offline during install: the entry is fetched normally when used
+  }
+}
+
+self.addEventListener('install', (event) => {
+  event.waitUntil((async () => {
+    const cache = await caches.open(CACHE_NAME);
+    await Promise.all(MANIFEST.entries.map((entry) => precacheEntry(cache, entry)));
+    await self.skipWaiting();
+  })());
+});
+
+self.addEventListener('activate', (event) => {
+  event.waitUntil((async () => {
+    const names = await caches.keys();
+    await Promise.all(names
+      .filter((name) => name.startsWith(CACHE_PREFIX) && name !== CACHE_NAME)
+      .map((name) => caches.delete(name)));
+    await self.clients.claim();
+  })());
+});
+
+async function cacheFirst(request, entry) {
+  const cache = await caches.open(CACHE_NAME);
+  const cached = await cache.match(cacheKey(entry));
+  if (cached) return cached;
+  const response = await fetch(request);
+  if (response.ok) {
+    await cache.put(cacheKey(entry), response.clone());
+  }
+  return response;
+}
+
+async function staleWhileRevalidate(event, entry) {
+  const cache = await caches.open(CACHE_NAME);
+  const cached = await cache.match(cacheKey(entry));
+  const refresh = fetch(event.request).then(async (response) => {
+    if (response.ok) {
+      await cache.put(cacheKey(entry), response.clone());
+    }
+    return response;
+  });
+  if (cached) {
+    event.waitUntil(refresh.catch(() => {}));
+    return cached;
+  }
+  return refresh;
+}
+
+async function runtimeCacheFirst(request) {
+  const cache = await caches.open(RUNTIME_CACHE);
+  const cached = await cache.match(request);
+  if (cached) return cached;
+  const response = await fetch(request);
+  if (response.ok) {
+    await cache.put(request, response.clone());
+    const keys = await cache.keys();
+    // Keys are in insertion order: drop the oldest
+    await Promise.all(keys.slice(0, Math.max(keys.length - RUNTIME_MAX_ENTRIES, 0)).map((key) => cache.delete(key)));
+  }
+  return response;
+}
+
+function isImmutable(url) {
+  return url.pathname.startsWith('/blobs/') ||
+    (url.pathname.startsWith('/maps/') && url.searchParams.has('v'));
+}
+
+self.addEventListener('fetch', (event) => {
+  const request = event.request;
+  if (request.method !== 'GET') return;
+  const url = new URL(request.url);
+  if (url.origin !== self.location.origin) return;
+
+  const entry = entriesByUrl.get(url.pathname + url.search);
+  if (entry) {
+    event.respondWith(entry.revalidate ? staleWhileRevalidate(event, entry) : cacheFirst(request, entry));
+  } else if (isImmutable(url)) {
+    event.respondWith(runtimeCacheFirst(request));
+  }
+});
@@ -0,0 +1,285 @@
+"""
+Terrain Acceleration Structures
+
+Precomputed per-map structures that let terrain queries skip most of the
+heightmap instead of walking every sample:
+
+- Min/max pyramid: level 0 holds the min/max of the four corner pixels of
+  every heightmap cell (which bounds the bilinear surface inside it); each
+  higher level halves the resolution, so the height range under any
+  rectangle is an O(1) lookup (dispersion.py bounds its terrain march with it).
+- Slope map: terrain slope in whole degrees (uint8) per heightmap pixel.
+- Stats: min/max/mean raw height (same as getHeightmapStats() in heightmap.js).
+
+Built by processor/build_terrain_accel.py into processed_maps/<map>/terrain.npz.
+The server loads that file lazily and rebuilds in memory if it is missing or
+no longer matches the heightmap.
+"""
+
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+ACCEL_FILENAME = 'terrain.npz'
+FORMAT_VERSION = 1
+
+# Slope is stored as round(degrees * SLOPE_STEPS_PER_DEGREE) in a uint8
+SLOPE_STEPS_PER_DEGREE = 1
+
+# Finest pyramid level written to disk; finer levels are rebuilt on load
+STORED_MIN_LEVEL = 2
+
+# Cache of loaded structures keyed by map directory
+_accel_cache: Dict[str, 'TerrainAccel'] = {}
+
+
+def heightmap_checksum(heightmap: np.ndarray) -> int:
+    """CRC32 of the raw heightmap samples, used to detect stale files."""
+    return zlib.crc32(np.ascontiguousarray(heightmap, dtype='<u2').tobytes())
+
+
+def _reduce_2x2(values: np.ndarray, func) -> np.ndarray:
+    """Combine 2×2 blocks with func (np.minimum/np.maximum), padding odd edges."""
+    rows, cols = values.shape
+    if rows % 2 or cols % 2:
+        values = np.pad(values, ((0, rows % 2), (0, cols % 2)), mode='edge')
+    return func(func(values[0::2, 0::2], values[0::2, 1::2]),
+                func(values[1::2, 0::2], values[1::2, 1::2]))
+
+
+def build_minmax_pyramid(heightmap: np.ndarray,
+                         max_level: Optional[int] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Min/max pyramid over heightmap cells, finest level first.
+
+    Level k block (i, j) covers cells [i·2^k, (i+1)·2^k) in each axis. The
+    last level is a single block holding the global min/max unless
+    max_level stops the reduction earlier.
+    """
+    corners = (heightmap[:-1, :-1], heightmap[:-1, 1:], heightmap[1:, :-1], heightmap[1:, 1:])
+    level_min = np.minimum(np.minimum(corners[0], corners[1]), np.minimum(corners[2], corners[3]))
+    level_max = np.maximum(np.maximum(corners[0], corners[1]), np.maximum(corners[2], corners[3]))
+
+    levels = [(level_min, level_max)]
+    while (level_min.shape[0] > 1 or level_min.shape[1] > 1) and (
+            max_level is None or len(levels) <= max_level):
+        level_min = _reduce_2x2(level_min, np.minimum)
+        level_max = _reduce_2x2(level_max, np.maximum)
+        levels.append((level_min, level_max))
+    return levels
+
+
+def compute_slope(heightmap: np.ndarray, height_scale: float, meters_per_pixel: float) -> np.ndarray:
+    """Terrain slope per pixel as uint8 in 1/SLOPE_STEPS_PER_DEGREE degree steps."""
+    heights = heightmap.astype(np.float32) * np.float32(height_scale / 65535.0)
+    grad_y, grad_x = np.gradient(heights, meters_per_pixel)
+    slope = np.degrees(np.arctan(np.hypot(grad_x, grad_y)))
+    return np.round(slope * SLOPE_STEPS_PER_DEGREE).astype(np.uint8)
+
+
+def compute_stats(heightmap: np.ndarray) -> Dict[str, float]:
+    """Raw height statistics, matching getHeightmapStats() in heightmap.js."""
+    if heightmap.size == 0:
+        return {'min': 0, 'max': 0, 'mean': 0}
+    return {
+        'min': int(heightmap.min()),
+        'max': int(heightmap.max()),
+        'mean': float(heightmap.mean(dtype=np.float64)),
+    }
+
+
+def build_terrain_arrays(heightmap: np.ndarray, metadata: dict) -> Dict[str, np.ndarray]:
+    """Build every acceleration structure as named arrays (the .npz layout).
+
+    Pyramid levels below STORED_MIN_LEVEL are omitted: they are cheap to
+    rebuild from the heightmap and would otherwise dominate the file size.
+    """
+    resolution = heightmap.shape[0]
+    meters_per_pixel = metadata.get('meters_per_pixel') or metadata['map_size'] / (resolution - 1)
+    stats = compute_stats(heightmap)
+
+    arrays = {
+        'format_version': np.array(FORMAT_VERSION),
+        'heightmap_crc32': np.array(heightmap_checksum(heightmap), dtype=np.uint32),
+        'stats': np.array([stats['min'], stats['max'], stats['mean']], dtype=np.float64),
+        'slope': compute_slope(heightmap, metadata['height_scale'], meters_per_pixel),
+    }
+    pyramid = build_minmax_pyramid(heightmap)
+    for level in range(STORED_MIN_LEVEL, len(pyramid)):
+        level_min, level_max = pyramid[level]
+        arrays[f'min_{level}'] = level_min
+        arrays[f'max_{level}'] = level_max
+    return arrays
+
+
+def update_terrain_arrays(arrays: Dict[str, np.ndarray], heightmap: np.ndarray, metadata: dict,
+                          bounds: List[Tuple[int, int, int, int]]) -> Dict[str, np.ndarray]:
+    """Bring build_terrain_arrays() output up to date after local heightmap edits.
+
+    Only the pyramid blocks and slope pixels that can see a changed sample
+    are recomputed; the result equals a full rebuild of the new heightmap.
+
+    Args:
+        arrays: Arrays built from the previous heightmap (updated in place)
+        heightmap: New heightmap, same resolution
+        metadata: Map metadata
+        bounds: (row0, col0, row1, col1) pixel rectangles, end-exclusive,
+            covering every changed sample
+
+    Returns:
+        The updated arrays
+    """
+    resolution = heightmap.shape[0]
+    cells = resolution - 1
+    meters_per_pixel = metadata.get('meters_per_pixel') or metadata['map_size'] / cells
+    align = 1 << STORED_MIN_LEVEL
+
+    for row0, col0, row1, col1 in bounds:
+        # Pyramid: cells touching a changed sample, widened to whole stored blocks
+        cell_row0 = max(row0 - 1, 0) // align * align
+        cell_col0 = max(col0 - 1, 0) // align * align
+        cell_row1 = min(-(-min(row1, cells) // align) * align, cells)
+        cell_col1 = min(-(-min(col1, cells) // align) * align, cells)
+        window = heightmap[cell_row0:cell_row1 + 1, cell_col0:cell_col1 + 1]
+        pyramid = build_minmax_pyramid(window, max_level=STORED_MIN_LEVEL)
+        level_min, level_max = pyramid[-1]
+
+        level = STORED_MIN_LEVEL
+        top, left = cell_row0 >> level, cell_col0 >> level
+        bottom, right = top + level_min.shape[0], left + level_min.shape[1]
+        arrays[f'min_{level}'][top:bottom, left:right] = level_min
+        arrays[f'max_{level}'][top:bottom, left:right] = level_max
+        while f'min_{level + 1}' in arrays:
+            finer_min, finer_max = arrays[f'min_{level}'], arrays[f'max_{level}']
+            top, left = top >> 1, left >> 1
+            bottom, right = ((bottom - 1) >> 1) + 1, ((right - 1) >> 1) + 1
+            level += 1
+            arrays[f'min_{level}'][top:bottom, left:right] = _reduce_2x2(
+                finer_min[2 * top:2 * bottom, 2 * left:2 * right], np.minimum)
+            arrays[f'max_{level}'][top:bottom, left:right] = _reduce_2x2(
+                finer_max[2 * top:2 * bottom, 2 * left:2 * right], np.maximum)
+
+        # Slope: central differences reach one pixel, so recompute with a margin
+        slope_row0, slope_col0 = max(row0 - 1, 0), max(col0 - 1, 0)
+        slope_row1, slope_col1 = min(row1 + 1, resolution), min(col1 + 1, resolution)
+        win_row0, win_col0 = max(slope_row0 - 1, 0), max(slope_col0 - 1, 0)
+        win_row1, win_col1 = min(slope_row1 + 1, resolution), min(slope_col1 + 1, resolution)
+        slope = compute_slope(heightmap[win_row0:win_row1, win_col0:win_col1],
+                              metadata['height_scale'], meters_per_pixel)
+        arrays['slope'][slope_row0:slope_row1, slope_col0:slope_col1] = slope[
+            slope_row0 - win_row0:slope_row1 - win_row0, slope_col0 - win_col0:slope_col1 - win_col0]
+
+    stats = compute_stats(heightmap)
+    arrays['stats'] = np.array([stats['min'], stats['max'], stats['mean']], dtype=np.float64)
+    arrays['heightmap_crc32'] = np.array(heightmap_checksum(heightmap), dtype=np.uint32)
+    return arrays
+
+
+def save_terrain_arrays(path: Path, arrays: Dict[str, np.ndarray]) -> None:
+    """Write acceleration arrays as a compressed .npz file."""
+    with open(path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+
+
+class TerrainAccel:
+    """Query interface over a map's acceleration structures.
+
+    Positions are world meters; heights are meters.
+    """
+
+    def __init__(self, heightmap: np.ndarray, metadata: dict, arrays: Dict[str, np.ndarray]):
+        self.heightmap = heightmap
+        self.map_size = metadata['map_size']
+        self.height_scale = metadata['height_scale']
+        self.resolution = heightmap.shape[0]
+        self.pixels_per_meter = (self.resolution - 1) / self.map_size
+
+        stats = arrays['stats']
+        self.stats = {'min': int(stats[0]), 'max': int(stats[1]), 'mean': float(stats[2])}
+        self.slope = arrays['slope']
+
+        self.levels = build_minmax_pyramid(heightmap, STORED_MIN_LEVEL - 1)
+        level = STORED_MIN_LEVEL
+        while f'min_{level}' in arrays:
+            self.levels.append((arrays[f'min_{level}'], arrays[f'max_{level}']))
+            level += 1
+
+    def _to_meters(self, raw) -> float:
+        return raw * self.height_scale / 65535.0
+
+    def summary(self) -> dict:
+        """JSON-ready stats: raw and metric height range, slope, pyramid depth."""
+        slope_degrees = self.slope / SLOPE_STEPS_PER_DEGREE
+        return {
+            'stats': self.stats,
+            'height_range_m': [self._to_meters(self.stats['min']), self._to_meters(self.stats['max'])],
+            'slope_degrees': {'mean': float(slope_degrees.mean()), 'max': float(slope_degrees.max())},
+            'pyramid_levels': len(self.levels),
+        }
+
+    def slope_at(self, x, y) -> np.ndarray:
+        """Terrain slope in degrees at world XY (nearest pixel)."""
+        px = np.clip(np.rint(np.multiply(x, self.pixels_per_meter)), 0, self.resolution - 1).astype(np.intp)
+        py = np.clip(np.rint(np.multiply(y, self.pixels_per_meter)), 0, self.resolution - 1).astype(np.intp)
+        return self.slope[py, px] / SLOPE_STEPS_PER_DEGREE
+
+    def _cell_range(self, lo: float, hi: float) -> Tuple[int, int]:
+        """Inclusive range of cell indices covering pixel interval [lo, hi]."""
+        last = self.resolution - 2
+        return (int(np.clip(np.floor(lo), 0, last)), int(np.clip(np.floor(hi), 0, last)))
+
+    def _block_bounds(self, cx0: int, cx1: int, cy0: int, cy1: int) -> Tuple[int, int]:
+        """Conservative raw (min, max) height over a cell rectangle.
+
+        Uses the coarsest pyramid level at which the rectangle spans at most
+        2×2 blocks, so the lookup is O(1) regardless of rectangle size.
+        """
+        level = 0
+        while level + 1 < len(self.levels) and (
+                (cx1 >> level) - (cx0 >> level) > 1 or (cy1 >> level) - (cy0 >> level) > 1):
+            level += 1
+        level_min, level_max = self.levels[level]
+        rows = slice(cy0 >> level, (cy1 >> level) + 1)
+        cols = slice(cx0 >> level, (cx1 >> level) + 1)
+        return int(level_min[rows, cols].min()), int(level_max[rows, cols].max())
+
+    def region_min_max(self, x0: float, y0: float, x1: float, y1: float) -> Tuple[float, float]:
+        """Conservative (min, max) terrain height in meters over a world rectangle."""
+        cx0, cx1 = self._cell_range(min(x0, x1) * self.pixels_per_meter, max(x0, x1) * self.pixels_per_meter)
+        cy0, cy1 = self._cell_range(min(y0, y1) * self.pixels_per_meter, max(y0, y1) * self.pixels_per_meter)
+        low, high = self._block_bounds(cx0, cx1, cy0, cy1)
+        return self._to_meters(low), self._to_meters(high)
+
+
+def load_terrain_accel(map_dir: Path, heightmap: np.ndarray, metadata: dict) -> TerrainAccel:
+    """Load (or build) acceleration structures for a map, cached per directory.
+
+    Reads terrain.npz when present and matching the heightmap checksum;
+    otherwise builds the structures in memory from the heightmap.
+    """
+    key = str(map_dir)
+    if key in _accel_cache:
+        return _accel_cache[key]
+
+    arrays: Optional[Dict[str, np.ndarray]] = None
+    accel_path = Path(map_dir) / ACCEL_FILENAME
+    if accel_path.is_file():
+        with np.load(accel_path) as npz:
+            if (int(npz['format_version']) == FORMAT_VERSION
+                    and int(npz['heightmap_crc32']) == heightmap_checksum(heightmap)):
+                arrays = {name: npz[name] for name in npz.files}
+    if arrays is None:
+        arrays = build_terrain_arrays(heightmap, metadata)
+
+    accel = TerrainAccel(heightmap, metadata, arrays)
+    _accel_cache[key] = accel
+    return accel
+
+
+def clear_cache(map_dir: Path = None) -> None:
+    """Drop cached acceleration structures for one map, or all maps."""
+    if map_dir is None:
+        _accel_cache.clear()
+    else:
+        _accel_cache.pop(str(map_dir), None)
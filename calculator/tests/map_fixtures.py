@@ -0,0 +1,21 @@
+"""Synthetic processed maps shared by the Python tests."""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from calculator.heightmap_codec import CODEC_FILENAME, encode_heightmap
+
+
+def write_hill_map(maps_dir: Path, name='hill', resolution=65) -> Path:
+    """Processed map with a smooth 300m hill on a 2048m map."""
+    coords = np.linspace(-1, 1, resolution)
+    xx, yy = np.meshgrid(coords, coords)
+    heightmap = (60000 * np.exp(-3 * (xx ** 2 + yy ** 2))).astype(np.uint16)
+    map_dir = maps_dir / name
+    map_dir.mkdir()
+    (map_dir / CODEC_FILENAME).write_bytes(encode_heightmap(heightmap))
+    (map_dir / 'metadata.json').write_text(
+        json.dumps({'map_size': 2048, 'height_scale': 300, 'grid_scale': 2048 / 13}), encoding='utf-8')
+    return map_dir
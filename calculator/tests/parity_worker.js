@@ -0,0 +1,119 @@
+/**
+ * Cross-Engine Parity Worker
+ *
+ * Runs a batch of cases generated by calculator/parity.py through the
+ * browser modules and writes the results back as raw little-endian arrays,
+ * so millions of cases cross the process boundary without JSON overhead.
+ *
+ * Input directory:
+ *   cases.f64     N × 6 (mortar x, y, z, target x, y, z)
+ *   samples.f64   M × 2 (pixel x, pixel y)
+ *   heightmap.u16 width × height raw heights (row-major)
+ *   refs.json     { gridScale, refs: [...] }
+ *   meta.json     { width, height }
+ *
+ * Output (same directory):
+ *   solutions.f64 N × 5 (distance, azimuth, elevationRadians, timeOfFlight, status index)
+ *   samples_out.f64  M interpolated raw heights
+ *   refs_out.f64  R × 2 (x, y; NaN for invalid references)
+ *
+ * Prints per-section timings as JSON on stdout.
+ *
+ * Usage:
+ *   node calculator/tests/parity_worker.js <directory>
+ */
+
+import { performance } from 'node:perf_hooks';
+import { readFileSync, writeFileSync } from 'node:fs';
+import { join } from 'node:path';
+import { calculateFiringSolution } from '../static/js/ballistics.js';
+import { bilinearInterpolation } from '../static/js/heightmap.js';
+import { gridRefToXY } from '../static/js/coordinates.js';
+
+// Must match JS_STATUSES in calculator/parity.py
+const STATUSES = ['OK', 'EXTREME_ELEVATION', 'TOO_CLOSE', 'UNREACHABLE', 'ANGLE_TOO_HIGH'];
+
+function readArray(path, ArrayType) {
+  const buffer = readFileSync(path);
+  return new ArrayType(buffer.buffer, buffer.byteOffset, buffer.byteLength / ArrayType.BYTES_PER_ELEMENT);
+}
+
+function writeArray(path, array) {
+  writeFileSync(path, Buffer.from(array.buffer, array.byteOffset, array.byteLength));
+}
+
+function runBallistics(cases) {
+  const count = cases.length / 6;
+  const out = new Float64Array(count * 5);
+  const mortar = { x: 0, y: 0, z: 0 };
+  const target = { x: 0, y: 0, z: 0 };
+
+  for (let i = 0; i < count; i++) {
+    const c = i * 6;
+    mortar.x = cases[c]; mortar.y = cases[c + 1]; mortar.z = cases[c + 2];
+    target.x = cases[c + 3]; target.y = cases[c + 4]; target.z = cases[c + 5];
+    const solution = calculateFiringSolution(mortar, target);
+
+    const o = i * 5;
+    out[o] = solution.distance;
+    out[o + 1] = solution.azimuth;
+    out[o + 2] = solution.elevationRadians ?? NaN;
+    out[o + 3] = solution.timeOfFlight ?? NaN;
+    out[o + 4] = STATUSES.indexOf(solution.status);
+  }
+  return out;
+}
+
+function runSampling(samples, heightmap, width, height) {
+  const count = samples.length / 2;
+  const out = new Float64Array(count);
+  for (let i = 0; i < count; i++) {
+    out[i] = bilinearInterpolation(heightmap, samples[i * 2], samples[i * 2 + 1], width, height);
+  }
+  return out;
+}
+
+function runGridRefs(refs, gridScale) {
+  const out = new Float64Array(refs.length * 2).fill(NaN);
+  refs.forEach((ref, i) => {
+    try {
+      const { x, y } = gridRefToXY(ref, gridScale);
+      out[i * 2] = x;
+      out[i * 2 + 1] = y;
+    } catch (err) {
+      // Invalid reference: leave NaN
+    }
+  });
+  return out;
+}
+
+function timed(fn) {
+  const start = performance.now();
+  const result = fn();
+  return [result, (performance.now() - start) / 1000];
+}
+
+const directory = process.argv[2];
+if (!directory) {
+  console.error('Usage: node calculator/tests/parity_worker.js <directory>');
+  process.exit(2);
+}
+
+const meta = JSON.parse(readFileSync(join(directory, 'meta.json'), 'utf-8'));
+const { gridScale, refs } = JSON.parse(readFileSync(join(directory, 'refs.json'), 'utf-8'));
+const cases = readArray(join(directory, 'cases.f64'), Float64Array);
+const samples = readArray(join(directory, 'samples.f64'), Float64Array);
+const heightmap = readArray(join(directory, 'heightmap.u16'), Uint16Array);
+
+const [solutions, ballisticsSeconds] = timed(() => runBallistics(cases));
+const [heights, samplingSeconds] = timed(() => runSampling(samples, heightmap, meta.width, meta.height));
+const [positions, refsSeconds] = timed(() => runGridRefs(refs, gridScale));
+
+writeArray(join(directory, 'solutions.f64'), solutions);
+writeArray(join(directory, 'samples_out.f64'), heights);
+writeArray(join(directory, 'refs_out.f64'), positions);
+console.log(JSON.stringify({
+  ballistics: ballisticsSeconds,
+  sampling: samplingSeconds,
+  refs: refsSeconds,
+}));
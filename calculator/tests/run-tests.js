@@ -1,7 +1,9 @@
 import { runBallisticsTests } from './test_ballistics.js';
 import { runCoordinatesTests } from './test_coordinates.js';
 import { runHeightmapTests } from './test_heightmap.js';
+import { runHeightmapTilesTests } from './test_heightmap_tiles.js';
 import { runIntegrationTests } from './test_integration.js';
+import { runTelemetryTests } from './test_telemetry.js';
 
 async function runAll() {
   try {
@@ -17,10 +19,18 @@ async function runAll() {
     await runHeightmapTests();
     console.log('Heightmap tests passed.\n');
 
+    console.log('Running Heightmap tile tests...');
+    await runHeightmapTilesTests();
+    console.log('Heightmap tile tests passed.\n');
+
     console.log('Running Integration tests...');
     await runIntegrationTests();
     console.log('Integration tests passed.\n');
 
+    console.log('Running Telemetry tests...');
+    await runTelemetryTests();
+    console.log('Telemetry tests passed.\n');
+
     console.log('All tests passed! 🎉');
     process.exit(0);
   } catch (err) {
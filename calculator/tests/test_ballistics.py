@@ -0,0 +1,49 @@
+import math
+import unittest
+
+import numpy as np
+
+from calculator import ballistics
+
+
+class BallisticsPortTest(unittest.TestCase):
+    """Mirror the checks in test_ballistics.js against the NumPy port."""
+
+    def test_distance_and_azimuth(self):
+        self.assertAlmostEqual(float(ballistics.calculate_distance(0, 0, 300, 400)), 500)
+        azimuths = ballistics.calculate_azimuth(0, 0, [100, 0, 0, -100], [0, 100, -100, 0])
+        np.testing.assert_allclose(azimuths, [90, 180, 0, 270])
+
+    def test_unit_conversions(self):
+        self.assertAlmostEqual(float(ballistics.radians_to_mils(math.pi / 4)), 800)
+        self.assertAlmostEqual(float(ballistics.radians_to_degrees(math.pi / 4)), 45)
+
+    def test_time_of_flight_matches_horizontal_time(self):
+        elevation = ballistics.calculate_elevation_angle(600, 0)
+        tof = ballistics.calculate_time_of_flight(600, elevation, 0)
+        horizontal = 600 / (ballistics.PROJECTILE_VELOCITY * math.cos(elevation))
+        self.assertAlmostEqual(float(tof), horizontal, places=1)
+
+    def test_status_codes(self):
+        solutions = ballistics.calculate_firing_solutions(
+            0, 0, 0, [600, 1600, 0.5, 1000], [0, 0, 0, 0], [0, 0, 0, 300])
+        names = [ballistics.STATUS_NAMES[s] for s in solutions['status']]
+        self.assertEqual(names, ['OK', 'UNREACHABLE', 'TOO_CLOSE', 'EXTREME_ELEVATION'])
+        self.assertEqual(solutions['valid'].tolist(), [True, False, False, True])
+        self.assertTrue(np.isnan(solutions['time_of_flight'][1]))
+
+    def test_solution_dict_matches_js_shape(self):
+        solutions = ballistics.calculate_firing_solutions(1000, 1000, 50, 1600, 1000, 50)
+        solution = ballistics.solution_to_dict(solutions, ())
+        self.assertAlmostEqual(solution['distance'], 600)
+        self.assertEqual(solution['status'], 'OK')
+        self.assertIn('elevationMils', solution)
+
+        unreachable = ballistics.solution_to_dict(
+            ballistics.calculate_firing_solutions(0, 0, 0, 1600, 0, 0), ())
+        self.assertIsNone(unreachable['elevationMils'])
+        self.assertIn('UNREACHABLE', unreachable['message'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+import numpy as np
+
+from calculator import coordinates, server
+
+
+class GridReferenceParsingTest(unittest.TestCase):
+    REFS = ['C5-3', 'c5-3-7', 'M13-9-9', 'A10-5', ' b2-5 ', 'Delta 6 kpad 7', 'D6-7 3',
+            'N1-1', 'A14-1', 'A1-0', 'A1-1-0', 'C5', 'C5-3-', 'A1-11', 'é1-1', '', None, 42]
+
+    def test_sub_keypad_reference(self):
+        self.assertEqual(coordinates.parse_grid_reference('C5-3-7'), ('C', 5, 3, 7))
+        self.assertIsNone(coordinates.parse_grid_reference('C5-3').subkeypad)
+        x, y = coordinates.grid_ref_to_xy('C5-3-7', 90)
+        # South-east third of C5, then the north-west ninth of that
+        self.assertAlmostEqual(x, 2 * 90 + 6.5 * 10)
+        self.assertAlmostEqual(y, 4 * 90 + 6.5 * 10)
+
+    def test_bulk_parse_matches_single(self):
+        parsed = coordinates.parse_grid_references(self.REFS)
+        for i, ref in enumerate(self.REFS):
+            single = coordinates.parse_grid_reference(ref) if isinstance(ref, str) else None
+            self.assertEqual(bool(parsed.valid[i]), single is not None, ref)
+            if single is not None:
+                self.assertEqual(coordinates.GRID_COLUMNS[parsed.column_index[i]], single.column)
+                self.assertEqual((parsed.row[i], parsed.keypad[i]), (single.row, single.keypad))
+                self.assertEqual(parsed.subkeypad[i], single.subkeypad or 0)
+
+    def test_bulk_xy_matches_single(self):
+        xy, valid = coordinates.grid_refs_to_xy(self.REFS, 123.0)
+        self.assertEqual(xy.shape, (len(self.REFS), 2))
+        for ref, point, ok in zip(self.REFS, xy, valid):
+            if ok:
+                np.testing.assert_allclose(point, coordinates.grid_ref_to_xy(ref, 123.0))
+            else:
+                self.assertTrue(np.isnan(point).all())
+        self.assertEqual(coordinates.grid_refs_to_xy([], 100.0)[0].shape, (0, 2))
+
+    def test_xy_to_grid_refs(self):
+        refs = coordinates.xy_to_grid_refs([[0, 0], [50, 50], [99, 99], [1300, 5], [-1, 3]], 100.0)
+        self.assertEqual(refs, ['A1-7', 'A1-5', 'A1-3', None, None])
+
+        points = np.random.default_rng(1).uniform(0, 1300, (500, 2))
+        refs = coordinates.xy_to_grid_refs(points, 100.0, subkeypad=True)
+        back, valid = coordinates.grid_refs_to_xy(refs, 100.0)
+        self.assertTrue(valid.all())
+        self.assertLessEqual(np.abs(back - points).max(), 100 / 18 + 1e-9)
+
+    def test_resolve_positions(self):
+        xy = coordinates.resolve_positions(['A1-7', {'x': -50, 'y': '20.5'}], 100.0)
+        np.testing.assert_allclose(xy, [coordinates.grid_ref_to_xy('A1-7', 100.0), (-50, 20.5)])
+        for bad in ('Z1-1', {'x': 1}, {'x': 'far', 'y': 0}, {'x': float('nan'), 'y': 0},
+                    {'x': 0, 'y': float('inf')}, {'x': '-inf', 'y': 0}, 7):
+            with self.assertRaises(ValueError, msg=bad):
+                coordinates.resolve_positions([bad], 100.0)
+
+    def test_resolve_grid_scale(self):
+        metadata = {'map_size': 1300, 'grid_scale': 90}
+        self.assertEqual(coordinates.resolve_grid_scale(metadata), 90)
+        self.assertEqual(coordinates.resolve_grid_scale({'map_size': 1300}), 100)
+        self.assertEqual(coordinates.resolve_grid_scale(metadata, map_size=2600), 200)
+        self.assertEqual(coordinates.resolve_grid_scale(metadata, grid_scale=50, map_size=2600), 50)
+        for bad in ({}, {'grid_scale': -1}):
+            with self.assertRaises(ValueError):
+                coordinates.resolve_grid_scale(bad)
+        with self.assertRaises(ValueError):
+            coordinates.resolve_grid_scale(metadata, grid_scale='big')
+
+
+class GridRefsEndpointTest(unittest.TestCase):
+    MAP = 'muttrah_city_2'
+
+    def setUp(self):
+        if not (server.PROCESSED_MAPS_DIR / self.MAP / 'metadata.json').is_file():
+            self.skipTest(f'{self.MAP} not processed')
+        server.app.config['TESTING'] = True
+        self.client = server.app.test_client()
+
+    def test_refs_to_positions(self):
+        rv = self.client.post(f'/maps/{self.MAP}/grid-refs',
+                              json={'refs': ['A1-7', 'B2-5-5', 'Z9'], 'grid_scale': 100})
+        self.assertEqual(rv.status_code, 200)
+        data = rv.get_json()
+        self.assertEqual(data['positions'][0], {'x': 0.0, 'y': 0.0})
+        self.assertAlmostEqual(data['positions'][1]['x'], 150.0)
+        self.assertIsNone(data['positions'][2])
+        self.assertEqual(data['invalid'], [2])
+
+    def test_positions_to_refs(self):
+        rv = self.client.post(f'/maps/{self.MAP}/grid-refs',
+                              json={'positions': [{'x': 150, 'y': 150}], 'map_size': 1300,
+                                    'subkeypad': True})
+        self.assertEqual(rv.get_json()['refs'], ['B2-5-5'])
+
+    def test_invalid_body(self):
+        for body in ({}, {'refs': 'A1-1'}, {'refs': [], 'positions': []},
+                     {'positions': [{'x': 1}]}, {'refs': [], 'grid_scale': 0}):
+            rv = self.client.post(f'/maps/{self.MAP}/grid-refs', json=body)
+            self.assertEqual(rv.status_code, 400, body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+import asyncio
+import io
+import json
+import socket
+import struct
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from calculator import daemon, keypads, solve
+from calculator.heightmap import MapData, clear_cache
+from map_fixtures import write_hill_map
+
+
+class SolverDaemonTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.addCleanup(clear_cache, write_hill_map(self.tmp))
+        self.daemon = daemon.SolverDaemon(self.tmp)
+
+    def test_solve_single_and_batch_agree(self):
+        single = self.daemon.handle({'id': 7, 'op': 'solve', 'map': 'hill',
+                                     'mortar': 'D6-7', 'target': {'x': 1100, 'y': 900}})
+        self.assertEqual(single['id'], 7)
+        self.assertIn('elevationMils', single['result'])
+
+        batch = self.daemon.handle({'op': 'solve', 'map': 'hill', 'mortar': 'D6-7',
+                                    'targets': [{'x': 1100, 'y': 900}, 'A1-1']})
+        self.assertEqual(batch['result'][0], single['result'])
+        self.assertEqual(len(batch['result']), 2)
+
+    def test_elevation(self):
+        center = self.daemon.handle({'op': 'elevation', 'map': 'hill', 'position': {'x': 1024, 'y': 1024}})
+        self.assertAlmostEqual(center['result']['elevation'], 60000 / 65535 * 300, delta=1.0)
+        batch = self.daemon.handle({'op': 'elevation', 'map': 'hill', 'positions': [{'x': 1024, 'y': 1024}, 'A1-1']})
+        self.assertEqual(len(batch['result']), 2)
+        self.assertLess(batch['result'][1], batch['result'][0])
+
+    def test_grid_refs_match_cli(self):
+        # The saved table rounds elevations, so they differ from interpolation
+        map_dir = self.tmp / 'hill'
+        map_data = MapData(map_dir)
+        tables = keypads.build_keypad_tables(map_data.heightmap, map_data.metadata)
+        keypads.save_keypad_tables(map_dir / keypads.KEYPADS_FILENAME, tables)
+        keypads.clear_cache(map_dir)
+        self.addCleanup(keypads.clear_cache, map_dir)
+
+        requests = [{'mortar': 'D6-7', 'target': 'E6-5-3'}, {'mortar': 'D6-7', 'target': {'x': 1100, 'y': 900}}]
+        input_path = self.tmp / 'in.jsonl'
+        output_path = self.tmp / 'out.jsonl'
+        input_path.write_text(''.join(json.dumps(r) + '\n' for r in requests), encoding='utf-8')
+        with unittest.mock.patch('sys.stderr', io.StringIO()):
+            self.assertEqual(solve.main(['hill', str(input_path), '-o', str(output_path),
+                                         '--maps-dir', str(self.tmp)]), 0)
+        expected = [json.loads(line) for line in output_path.read_text(encoding='utf-8').splitlines()]
+
+        for request, cli in zip(requests, expected):
+            result = self.daemon.handle({'op': 'solve', 'map': 'hill', **request})['result']
+            self.assertEqual(result, cli, request)
+        batch = self.daemon.handle({'op': 'solve', 'map': 'hill', 'mortar': 'D6-7',
+                                    'targets': [r['target'] for r in requests]})['result']
+        self.assertEqual(batch, expected)
+
+        solver = self.daemon.solver('hill')
+        mortar_z = solver.keypads.lookup('D', 6, 7)['elevation']
+        elevation = self.daemon.handle({'op': 'elevation', 'map': 'hill', 'position': 'D6-7'})['result']
+        self.assertEqual(elevation['elevation'], mortar_z)
+
+    def test_errors_do_not_raise(self):
+        cases = [
+            ({'op': 'solve', 'map': '../etc', 'mortar': 'A1-1', 'target': 'A1-2'}, 'Invalid map name'),
+            ({'op': 'solve', 'map': 'missing', 'mortar': 'A1-1', 'target': 'A1-2'}, 'not found'),
+            ({'op': 'solve', 'map': 'hill', 'mortar': 'Z99', 'target': 'A1-2'}, 'Invalid grid reference'),
+            ({'op': 'elevation', 'map': 'hill', 'positions': []}, 'non-empty list'),
+            ({'op': 'solve', 'map': ['hill'], 'mortar': 'A1-1', 'target': 'A1-2'}, 'Invalid map name'),
+            ({'op': 'explode'}, 'Unknown op'),
+            ([1, 2], 'JSON object'),
+        ]
+        for request, message in cases:
+            with self.subTest(request=request):
+                self.assertIn(message, self.daemon.handle(request)['error'])
+
+    def test_load_and_maps(self):
+        self.assertEqual(self.daemon.handle({'op': 'maps'})['result'], [])
+        self.assertEqual(self.daemon.handle({'op': 'load', 'map': 'hill'})['result'], ['hill'])
+        self.assertEqual(self.daemon.handle({'op': 'ping', 'id': 'p'}), {'id': 'p', 'result': 'pong'})
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'Unix domain sockets not supported')
+class SolverDaemonSocketTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.addCleanup(clear_cache, write_hill_map(self.tmp))
+        self.socket_path = self.tmp / 'solver.sock'
+
+    def _run(self, client):
+        async def scenario():
+            server = await daemon.start_server(daemon.SolverDaemon(self.tmp), self.socket_path)
+            try:
+                return await client()
+            finally:
+                server.close()
+                await server.wait_closed()
+        return asyncio.run(scenario())
+
+    def test_pipelined_lines_and_concurrent_clients(self):
+        async def one_client(offset):
+            reader, writer = await asyncio.open_unix_connection(str(self.socket_path))
+            for i in range(20):
+                request = {'id': offset + i, 'op': 'elevation', 'map': 'hill', 'position': {'x': i, 'y': i}}
+                writer.write(json.dumps(request).encode() + b'\n')
+            await writer.drain()
+            ids = [json.loads(await reader.readline())['id'] for _ in range(20)]
+            writer.close()
+            await writer.wait_closed()
+            return ids
+
+        async def client():
+            return await asyncio.gather(*(one_client(n * 100) for n in range(4)))
+
+        for n, ids in enumerate(self._run(client)):
+            self.assertEqual(ids, [n * 100 + i for i in range(20)])
+
+    def test_length_prefixed_frames(self):
+        async def client():
+            reader, writer = await asyncio.open_unix_connection(str(self.socket_path))
+            for request in ({'id': 1, 'op': 'ping'}, {'id': 2, 'op': 'solve', 'map': 'hill',
+                                                      'mortar': 'D6-7', 'target': 'F5-3'}):
+                payload = json.dumps(request).encode()
+                writer.write(struct.pack('>I', len(payload)) + payload)
+            responses = []
+            for _ in range(2):
+                (size,) = struct.unpack('>I', await reader.readexactly(4))
+                responses.append(json.loads(await reader.readexactly(size)))
+            writer.close()
+            await writer.wait_closed()
+            return responses
+
+        ping, solution = self._run(client)
+        self.assertEqual(ping, {'id': 1, 'result': 'pong'})
+        self.assertEqual(solution['id'], 2)
+        self.assertIn('azimuth', solution['result'])
+
+    def test_large_lines_answered_in_order(self):
+        targets = [{'x': 1000 + i % 100, 'y': 900 + i // 100} for i in range(3000)]
+
+        async def client():
+            reader, writer = await asyncio.open_unix_connection(str(self.socket_path), limit=daemon.MAX_FRAME_SIZE)
+            # Cold map load and a >64 KiB batch (both in a worker thread), then a quick ping
+            writer.write(json.dumps({'id': 1, 'op': 'solve', 'map': 'hill', 'mortar': 'D6-7',
+                                     'targets': targets}).encode() + b'\n')
+            writer.write(b'{"id": 2, "op": "ping"}\n')
+            await writer.drain()
+            responses = [json.loads(await reader.readline()) for _ in range(2)]
+            writer.close()
+            await writer.wait_closed()
+            return responses
+
+        batch, ping = self._run(client)
+        self.assertEqual(len(batch['result']), 3000)
+        self.assertEqual(ping, {'id': 2, 'result': 'pong'})
+
+    def test_overlong_line_gets_error(self):
+        async def client():
+            reader, writer = await asyncio.open_unix_connection(str(self.socket_path))
+            writer.write(b'{"op": "ping", "pad": "' + b'x' * 4096 + b'"}\n')
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            writer.close()
+            await writer.wait_closed()
+            return response
+
+        with unittest.mock.patch.object(daemon, 'MAX_FRAME_SIZE', 1024):
+            self.assertIn('too long', self._run(client)['error'])
+
+    def test_refuses_second_daemon(self):
+        async def client():
+            with self.assertRaises(RuntimeError):
+                await daemon.start_server(daemon.SolverDaemon(self.tmp), self.socket_path)
+
+        self._run(client)
+
+
+if __name__ == '__main__':
+    unittest.main()
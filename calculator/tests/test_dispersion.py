@@ -0,0 +1,107 @@
+import unittest
+
+import numpy as np
+
+from calculator import dispersion, server, terrain
+
+
+class FlatMap:
+    """Minimal MapData stand-in: flat terrain with a 50 m plateau in the east."""
+    map_size = 1300.0
+    height_scale = 100.0
+    grid_scale = 100.0
+
+    def __init__(self):
+        self.heightmap = np.zeros((131, 131), dtype=np.uint16)
+        self.heightmap[:, 80:] = 32768
+
+    def elevation_at(self, x, y):
+        from calculator.heightmap import get_elevation
+        return get_elevation(x, y, self.heightmap, self.height_scale, self.map_size)
+
+
+class DispersionTest(unittest.TestCase):
+    def setUp(self):
+        self.map = FlatMap()
+
+    def test_zero_spread_hits_target(self):
+        result = dispersion.estimate_dispersion(self.map, (300, 600), (600, 400), rounds=5,
+                                                elevation_sigma_mils=0, azimuth_sigma_mils=0,
+                                                velocity_sigma=0)
+        np.testing.assert_allclose(result['impacts'][:, :2], [[600, 400]] * 5, atol=0.1)
+        self.assertEqual(result['hit_probability'], 1.0)
+
+    def test_impacts_on_terrain(self):
+        result = dispersion.estimate_dispersion(self.map, (300, 600), (780, 600), rounds=2000,
+                                                elevation_sigma_mils=10, seed=3)
+        impacts = result['impacts']
+        np.testing.assert_allclose(impacts[:, 2], self.map.elevation_at(impacts[:, 0], impacts[:, 1]))
+
+        # Same rounds over flat ground: long ones would have flown past the cliff
+        self.map.heightmap[:] = 0
+        flat = dispersion.estimate_dispersion(self.map, (300, 600), (780, 600), rounds=2000,
+                                              elevation_sigma_mils=10, seed=3)['impacts']
+        on_plateau = impacts[:, 2] > 1
+        self.assertGreater(np.count_nonzero(on_plateau), 0)
+        self.assertTrue((impacts[on_plateau, 0] < flat[on_plateau, 0]).all())
+        self.assertLess(result['cep'], result['r90'])
+
+    def test_terrain_bounds_give_same_impacts(self):
+        metadata = {'map_size': self.map.map_size, 'height_scale': self.map.height_scale}
+        accel = terrain.TerrainAccel(self.map.heightmap, metadata,
+                                     terrain.build_terrain_arrays(self.map.heightmap, metadata))
+        for target in ((600, 400), (780, 600)):
+            plain = dispersion.estimate_dispersion(self.map, (300, 600), target, rounds=500, seed=2)
+            bounded = dispersion.estimate_dispersion(self.map, (300, 600), target, rounds=500, seed=2,
+                                                     terrain=accel)
+            np.testing.assert_allclose(bounded['impacts'], plain['impacts'], atol=0.05)
+
+    def test_heatmap_matches_direct_count(self):
+        result = dispersion.estimate_dispersion(self.map, (300, 600), (600, 400), rounds=3000,
+                                                splash_radius=10, seed=5)
+        heatmap = result['heatmap']
+        probability = heatmap['probability']
+        self.assertEqual(probability.shape, (dispersion.HEATMAP_CELLS,) * 2)
+        centre = dispersion.HEATMAP_CELLS // 2
+        self.assertAlmostEqual(probability[centre, centre], result['hit_probability'], delta=0.05)
+
+    def test_seed_is_repeatable(self):
+        first = dispersion.estimate_dispersion(self.map, (300, 600), (600, 400), rounds=100, seed=9)
+        second = dispersion.estimate_dispersion(self.map, (300, 600), (600, 400), rounds=100, seed=9)
+        np.testing.assert_array_equal(first['impacts'], second['impacts'])
+
+    def test_unreachable_target(self):
+        with self.assertRaises(ValueError):
+            dispersion.estimate_dispersion(self.map, (0, 0), (1300, 1300))
+        with self.assertRaises(ValueError):
+            dispersion.estimate_dispersion(self.map, (300, 600), (600, 400), rounds=0)
+
+
+class DispersionEndpointTest(unittest.TestCase):
+    MAP = 'muttrah_city_2'
+
+    def setUp(self):
+        if not (server.PROCESSED_MAPS_DIR / self.MAP / 'metadata.json').is_file():
+            self.skipTest(f'{self.MAP} not processed')
+        server.app.config['TESTING'] = True
+        self.client = server.app.test_client()
+
+    def test_dispersion(self):
+        rv = self.client.post(f'/maps/{self.MAP}/dispersion', json={
+            'mortar': 'D6-5', 'target': 'F6-3', 'rounds': 500, 'seed': 1, 'cloud_points': 20})
+        self.assertEqual(rv.status_code, 200)
+        data = rv.get_json()
+        self.assertEqual(data['rounds'], 500)
+        self.assertEqual(len(data['cloud']), 20)
+        self.assertEqual(len(data['heatmap']['probability']), dispersion.HEATMAP_CELLS)
+        self.assertGreater(data['cep'], 0)
+
+    def test_invalid_request(self):
+        for body in ({'mortar': 'D6-5'}, {'mortar': 'D6-5', 'target': 'F6-3', 'rounds': 'many'},
+                     {'mortar': 'D6-5', 'target': 'F6-3', 'cloud_points': -1}):
+            rv = self.client.post(f'/maps/{self.MAP}/dispersion', json=body)
+            self.assertEqual(rv.status_code, 400, body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import io
+import json
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import numpy as np
+
+from calculator import export, server
+from calculator.fire_plan import solution_matrix
+from calculator.heightmap import MapData
+
+
+class SolutionExportTest(unittest.TestCase):
+    MAP = 'muttrah_city_2'
+
+    def setUp(self):
+        self.map_dir = server.PROCESSED_MAPS_DIR / self.MAP
+        if not (self.map_dir / 'metadata.json').is_file():
+            self.skipTest(f'{self.MAP} not processed')
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+
+    def run_cli(self, *args):
+        with redirect_stdout(io.StringIO()):
+            return export.main([*args, '--maps-dir', str(server.PROCESSED_MAPS_DIR)])
+
+    def test_target_grid_covers_map(self):
+        grid = export.target_grid(100, 25)
+        self.assertEqual(grid.shape, (16, 2))
+        self.assertEqual(sorted(set(grid[:, 0].tolist())), [12.5, 37.5, 62.5, 87.5])
+
+    def test_columns_match_solver(self):
+        columns = export.solve_map(self.map_dir, ['D6-5', {'x': 900, 'y': 700}], spacing=100)
+        per_mortar = json.loads(str(columns['metadata']))['targets_per_mortar']
+        self.assertEqual(len(columns['mortar']), 2 * per_mortar)
+        self.assertEqual(columns['mortar'][per_mortar], 1)
+
+        targets = np.column_stack([columns['target_x'], columns['target_y']])[:per_mortar].astype(np.float64)
+        expected = solution_matrix(MapData(self.map_dir), columns['mortar_xy'], targets)
+        for name in ('elevation_mils', 'time_of_flight', 'azimuth'):
+            np.testing.assert_allclose(columns[name].reshape(2, -1), expected[name], rtol=1e-5, err_msg=name)
+        np.testing.assert_array_equal(columns['valid'].reshape(2, -1), expected['valid'])
+
+    def test_cli_writes_archives_loaded_lazily(self):
+        positions = self.root / 'campaign.json'
+        positions.write_text(json.dumps({self.MAP: ['D6-5', 'F6-3']}), encoding='utf-8')
+        out = self.root / 'out'
+        self.assertEqual(self.run_cli('--positions', str(positions), '--spacing', '50', '-o', str(out),
+                                      '--jobs', '2'), 0)
+        self.assertEqual(self.run_cli(self.MAP, '--mortars', 'D6-5', 'F6-3', '--spacing', '50',
+                                      '-o', str(out / 'stored'), '--store'), 0)
+
+        compressed = out / f'{self.MAP}.npz'
+        stored = out / 'stored' / f'{self.MAP}.npz'
+        self.assertLess(compressed.stat().st_size, stored.stat().st_size)
+        cache_dir = self.root / 'cache'
+        with export.load_export(compressed, cache_dir) as a, export.load_export(stored, cache_dir) as b:
+            self.assertEqual(a.metadata['mortars'], ['D6-5', 'F6-3'])
+            self.assertEqual(len(a), len(b['mortar']))
+            mils = a['elevation_mils']
+            self.assertIsInstance(mils, np.memmap)
+            self.assertIsInstance(b['elevation_mils'], np.memmap)
+            np.testing.assert_array_equal(mils, b['elevation_mils'])
+            # Only the columns used so far were unpacked
+            self.assertEqual([p.name for p in cache_dir.glob('*/*.npy')], ['elevation_mils.npy'])
+            with self.assertRaises(KeyError):
+                a['coverage']
+
+    def test_cli_rejects_bad_input(self):
+        for args in ((self.MAP,), ('--mortars', 'D6-5'), ('no_such_map', '--mortars', 'D6-5'),
+                     (self.MAP, '--mortars', 'D6-5', '--spacing', '0')):
+            with self.assertRaises(SystemExit), redirect_stdout(io.StringIO()):
+                self.run_cli(*args, '-o', str(self.root))
+        self.assertEqual(self.run_cli(self.MAP, '--mortars', 'Z99', '-o', str(self.root)), 1)
+
+
+class ExportCacheTest(unittest.TestCase):
+    def test_concurrent_loads_share_the_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            values = np.arange(200000, dtype=np.float32)
+            export.write_export(root / 'plan.npz', {'elevation_mils': values,
+                                                    'metadata': np.array(json.dumps({'format_version': 1}))})
+
+            def load(_):
+                with export.load_export(root / 'plan.npz', root / 'cache') as archive:
+                    return np.array(archive['elevation_mils'])
+
+            with ThreadPoolExecutor(8) as pool:
+                for loaded in pool.map(load, range(16)):
+                    np.testing.assert_array_equal(loaded, values)
+            self.assertEqual([p.name for p in root.rglob('*.tmp')], [])
+            self.assertEqual([p.name for p in (root / 'cache').glob('*/*')], ['elevation_mils.npy'])
+
+
+if __name__ == '__main__':
+    unittest.main()
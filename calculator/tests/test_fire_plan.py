@@ -0,0 +1,105 @@
+import unittest
+
+import numpy as np
+
+from calculator import fire_plan, server
+
+
+class AssignTargetsTest(unittest.TestCase):
+    def test_total_prefers_fastest_mortar(self):
+        tof = np.array([[10.0, 20.0], [20.0, 10.0]])
+        valid = np.ones_like(tof, dtype=bool)
+        self.assertEqual(fire_plan.assign_targets(tof, valid).tolist(), [0, 1])
+
+    def test_invalid_pairs_never_assigned(self):
+        tof = np.array([[5.0, 5.0, 5.0], [30.0, 30.0, 30.0]])
+        valid = np.array([[True, False, True], [True, True, False]])
+        assignment = fire_plan.assign_targets(tof, valid, capacity=3)
+        for target, mortar in enumerate(assignment):
+            self.assertTrue(valid[mortar, target])
+
+    def test_unreachable_target_reported(self):
+        tof = np.array([[5.0, np.nan]])
+        valid = np.array([[True, False]])
+        self.assertEqual(fire_plan.assign_targets(tof, valid).tolist(), [0, -1])
+
+    def test_max_objective_minimises_longest_flight(self):
+        # One target per mortar: 'total' takes 1 + 8 = 9 s (longest 8 s),
+        # 'max' takes 5 + 5 = 10 s (longest 5 s)
+        tof = np.array([[1.0, 5.0], [5.0, 8.0]])
+        valid = np.ones_like(tof, dtype=bool)
+        self.assertEqual(fire_plan.assign_targets(tof, valid, 'total', capacity=1).tolist(), [0, 1])
+        self.assertEqual(fire_plan.assign_targets(tof, valid, 'max', capacity=1).tolist(), [1, 0])
+
+    def test_capacity_spreads_targets(self):
+        tof = np.array([[1.0, 1.0, 1.0, 1.0], [2.0, 2.0, 2.0, 2.0]])
+        valid = np.ones_like(tof, dtype=bool)
+        self.assertEqual(np.bincount(fire_plan.assign_targets(tof, valid)).tolist(), [4])
+        assignment = fire_plan.assign_targets(tof, valid, capacity=2)
+        self.assertEqual(np.bincount(assignment).tolist(), [2, 2])
+
+    def test_uneven_reach_covers_every_reachable_target(self):
+        tof = np.array([[5.0, 6.0, 7.0, 8.0], [np.nan] * 4])
+        valid = np.array([[True] * 4, [False] * 4])
+        for objective in fire_plan.OBJECTIVES:
+            self.assertEqual(fire_plan.assign_targets(tof, valid, objective).tolist(), [0, 0, 0, 0], objective)
+        self.assertEqual(fire_plan.assign_targets(tof, valid, capacity=2).tolist(), [0, 0, -1, -1])
+
+    def test_invalid_objective(self):
+        with self.assertRaises(ValueError):
+            fire_plan.assign_targets(np.zeros((1, 1)), np.ones((1, 1), dtype=bool), 'fastest')
+
+
+class FirePlanEndpointTest(unittest.TestCase):
+    MAP = 'muttrah_city_2'
+
+    def setUp(self):
+        server.app.config['TESTING'] = True
+        self.client = server.app.test_client()
+
+    def test_plan_returns_fire_order(self):
+        if not (server.PROCESSED_MAPS_DIR / self.MAP).is_dir():
+            self.skipTest('processed map not available')
+        rv = self.client.post(f'/maps/{self.MAP}/fire-plan', json={
+            'mortars': ['D6-5', {'x': 1200, 'y': 300}],
+            'targets': ['E5-7', 'F6-3', 'C4-1'],
+            'objective': 'max',
+        })
+        self.assertEqual(rv.status_code, 200)
+        data = rv.get_json()
+        self.assertEqual(len(data['mortars']), 2)
+        self.assertEqual(data['summary']['targets'], 3)
+        orders = [f['target'] for m in data['mortars'] for f in m['fire_order']]
+        self.assertEqual(sorted(orders + data['unassigned']), [0, 1, 2])
+
+    def test_invalid_grid_reference(self):
+        if not (server.PROCESSED_MAPS_DIR / self.MAP).is_dir():
+            self.skipTest('processed map not available')
+        rv = self.client.post(f'/maps/{self.MAP}/fire-plan',
+                              json={'mortars': ['Z6-5'], 'targets': ['E5-7']})
+        self.assertEqual(rv.status_code, 400)
+        self.assertIn('error', rv.get_json())
+
+    def test_invalid_capacity(self):
+        if not (server.PROCESSED_MAPS_DIR / self.MAP).is_dir():
+            self.skipTest('processed map not available')
+        for capacity in (True, 0, 1.5):
+            rv = self.client.post(f'/maps/{self.MAP}/fire-plan',
+                                  json={'mortars': ['D6-5'], 'targets': ['E5-7'], 'capacity': capacity})
+            self.assertEqual(rv.status_code, 400, capacity)
+        rv = self.client.post(f'/maps/{self.MAP}/fire-plan', data='{"mortars": [{"x": NaN, "y": 0}], "targets": ["E5-7"]}',
+                              content_type='application/json')
+        self.assertEqual(rv.status_code, 400)
+
+    def test_missing_body(self):
+        rv = self.client.post(f'/maps/{self.MAP}/fire-plan')
+        self.assertEqual(rv.status_code, 400)
+
+    def test_unknown_map(self):
+        rv = self.client.post('/maps/this_map_does_not_exist/fire-plan',
+                              json={'mortars': ['D6-5'], 'targets': ['E5-7']})
+        self.assertEqual(rv.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
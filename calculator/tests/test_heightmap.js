@@ -1,6 +1,20 @@
 import assert from 'node:assert';
 import { assertApprox } from './assertApprox.js';
-import { bilinearInterpolation, worldToPixel, getElevation } from '../static/js/heightmap.js';
+import { gzipSync } from 'node:zlib';
+import { bilinearInterpolation, worldToPixel, getElevation, decodeHeightmapCodec, loadMapData, clearCache } from '../static/js/heightmap.js';
+
+// 5x4 heightmap encoded by calculator/heightmap_codec.py with each predictor
+const CODEC_EXPECTED = [
+  65535, 1187, 2205, 3269, 4173,
+  232, 1250, 2067, 3016, 4090,
+  85, 1262, 2273, 3001, 4149,
+  246, 1039, 2239, 3035, 0
+];
+const CODEC_FIXTURES = {
+  up: 'UFJITQEAAAAFAAAABAAAAHjaY3Sz6pp1qU7451JViTmyZU57nV0yGTgFJRUYGRiBCAhBNIMCAPnmCHw=',
+  gradient: 'UFJITQEBAAAFAAAABAAAAHjaY/T4EiBwKXji0xBVu5adU5z+V3WsZeBk52BnZGRkYGQEk0yMDAoAIMgJ/A==',
+  paeth: 'UFJITQECAAAFAAAABAAAAHjaY/T4EiBw6Yvwz6WqEnNky5z2OrtkMnCyc7AzsjMyMoAgA5BmUAAABr4IvQ=='
+};
 
 export async function runHeightmapTests() {
   // Synthetic small heightmap (3x3) with center pixel = max (65535)
@@ -52,4 +66,49 @@ export async function runHeightmapTests() {
   assert.strictEqual(valueCenter, typedValueCenter, 'Regular and typed array center values must be identical');
   assert.strictEqual(valueFraction, typedValueFraction, 'Regular and typed array fractional values must be identical');
   assert.strictEqual(elevation, typedElevation, 'Regular and typed array elevations must be identical');
+
+  // heightmap.bin decoder must match the Python encoder for every predictor
+  for (const [predictor, encoded] of Object.entries(CODEC_FIXTURES)) {
+    const bytes = Buffer.from(encoded, 'base64');
+    const buffer = bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.byteLength);
+    const decoded = await decodeHeightmapCodec(buffer);
+    assert.strictEqual(decoded.width, 5, `${predictor}: width`);
+    assert.strictEqual(decoded.height, 4, `${predictor}: height`);
+    assert.deepStrictEqual(Array.from(decoded.data), CODEC_EXPECTED, `${predictor}: decoded values`);
+  }
+
+  // Corrupt magic and buffers shorter than the header are rejected
+  await assert.rejects(decodeHeightmapCodec(new ArrayBuffer(16)), /Invalid heightmap codec format/);
+  await assert.rejects(decodeHeightmapCodec(new ArrayBuffer(2)), /Invalid heightmap codec format: too short/);
+
+  // heightmap.bin is only requested when metadata.json lists it
+  const fixture = Buffer.from(CODEC_FIXTURES.up, 'base64');
+  const document = gzipSync(JSON.stringify({ resolution: 5, width: 5, height: 4, data: CODEC_EXPECTED }));
+  const requests = [];
+  const originalFetch = globalThis.fetch;
+  globalThis.fetch = async (url) => {
+    requests.push(url);
+    const [, mapName, file] = url.match(/^\/maps\/([^/]+)\/(.+)$/);
+    if (file === 'metadata.json') {
+      const metadata = { map_size: 4, height_scale: 300 };
+      return new Response(JSON.stringify(mapName === 'codec_test' ? { ...metadata, heightmap_codec: 'up' } : metadata));
+    }
+    if (file === 'heightmap.bin' && mapName === 'codec_test') return new Response(fixture);
+    if (file === 'heightmap.json.gz') return new Response(document);
+    return new Response('not found', { status: 404 });
+  };
+  try {
+    const plain = await loadMapData('json_test');
+    assert.deepStrictEqual(Array.from(plain.heightmap.data), CODEC_EXPECTED);
+    assert.deepStrictEqual(requests, ['/maps/json_test/metadata.json', '/maps/json_test/heightmap.json.gz']);
+
+    requests.length = 0;
+    const coded = await loadMapData('codec_test');
+    assert.deepStrictEqual(Array.from(coded.heightmap.data), CODEC_EXPECTED);
+    assert.deepStrictEqual(requests, ['/maps/codec_test/metadata.json', '/maps/codec_test/heightmap.bin']);
+  } finally {
+    clearCache('json_test');
+    clearCache('codec_test');
+    globalThis.fetch = originalFetch;
+  }
 }
@@ -0,0 +1,70 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from calculator import heightmap, heightmap_codec as codec
+
+
+def _synthetic_heightmap(resolution=65):
+    """Smooth hill plus noise, covering the full uint16 range at the edges."""
+    coords = np.linspace(-1, 1, resolution)
+    xx, yy = np.meshgrid(coords, coords)
+    rng = np.random.default_rng(3)
+    hill = 40000 * np.exp(-4 * (xx ** 2 + yy ** 2)) + rng.integers(0, 50, (resolution, resolution))
+    data = hill.astype(np.uint16)
+    data[0, 0] = 65535
+    data[-1, -1] = 0
+    return data
+
+
+class HeightmapCodecTest(unittest.TestCase):
+    def test_round_trip_every_predictor(self):
+        data = _synthetic_heightmap()
+        for predictor in codec.PREDICTORS:
+            with self.subTest(predictor=predictor):
+                encoded = codec.encode_heightmap(data, predictor)
+                self.assertEqual(codec.read_header(encoded), (predictor, 65, 65))
+                np.testing.assert_array_equal(codec.decode_heightmap(encoded), data)
+
+    def test_round_trip_random_non_square(self):
+        data = np.random.default_rng(0).integers(0, 65536, (17, 29), dtype=np.uint16)
+        for predictor in codec.PREDICTORS:
+            with self.subTest(predictor=predictor):
+                np.testing.assert_array_equal(codec.decode_heightmap(codec.encode_heightmap(data, predictor)), data)
+
+    def test_auto_predictor_is_smallest(self):
+        data = _synthetic_heightmap()
+        sizes = [len(codec.encode_heightmap(data, p)) for p in codec.PREDICTORS]
+        self.assertEqual(len(codec.encode_heightmap(data)), min(sizes))
+
+    def test_zigzag(self):
+        residuals = np.array([0, -1, 1, -2, 2, -32768, 32767], dtype=np.int16)
+        encoded = codec.zigzag_encode(residuals)
+        np.testing.assert_array_equal(encoded, [0, 1, 2, 3, 4, 65535, 65534])
+        np.testing.assert_array_equal(codec.zigzag_decode(encoded), residuals)
+
+    def test_rejects_bad_data(self):
+        encoded = codec.encode_heightmap(_synthetic_heightmap(9), 'up')
+        with self.assertRaises(ValueError):
+            codec.decode_heightmap(b'XXXX' + encoded[4:])
+        with self.assertRaises(ValueError):
+            codec.decode_heightmap(encoded[:10])
+        with self.assertRaises(ValueError):
+            codec.decode_heightmap(encoded[:-4])
+
+    def test_load_heightmap_prefers_codec_file(self):
+        data = _synthetic_heightmap(9)
+        with tempfile.TemporaryDirectory() as tmp:
+            map_dir = Path(tmp)
+            (map_dir / codec.CODEC_FILENAME).write_bytes(codec.encode_heightmap(data))
+            self.assertTrue(heightmap.has_heightmap(map_dir))
+            try:
+                np.testing.assert_array_equal(heightmap.load_heightmap(map_dir), data)
+            finally:
+                heightmap.clear_cache(map_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+
+import numpy as np
+
+from calculator import keypads, terrain
+from calculator.heightmap_diff import (
+    block_regions, build_change_record, changed_blocks, describe, region_pixels, summarize_changes,
+)
+
+
+def _synthetic_map(resolution=257):
+    """Random rolling terrain on a 1300m map (100m grid squares)."""
+    rng = np.random.default_rng(7)
+    coarse = rng.integers(10000, 50000, (9, 9)).astype(np.float64)
+    coords = np.linspace(0, 8, resolution)
+    rows = np.array([np.interp(coords, np.arange(9), line) for line in coarse])
+    heightmap = np.array([np.interp(coords, np.arange(9), rows[:, c]) for c in range(resolution)]).T
+    heightmap += rng.integers(0, 50, (resolution, resolution))
+    metadata = {'map_size': 1300, 'height_scale': 300, 'grid_scale': 100}
+    return heightmap.astype(np.uint16), metadata
+
+
+def _patched(heightmap, row, col, radius, amount):
+    yy, xx = np.mgrid[0:heightmap.shape[0], 0:heightmap.shape[1]]
+    bump = np.where((yy - row) ** 2 + (xx - col) ** 2 <= radius ** 2, amount, 0)
+    return np.clip(heightmap.astype(np.int32) + bump, 0, 65535).astype(np.uint16)
+
+
+class HeightmapDiffTest(unittest.TestCase):
+    def setUp(self):
+        self.old, self.metadata = _synthetic_map()
+        # A hill raised near the middle and a pit dug in the bottom-right corner
+        self.new = _patched(_patched(self.old, 128, 130, 6, 2000), 254, 254, 3, -1500)
+
+    def test_changed_blocks_and_regions(self):
+        mask = changed_blocks(self.old, self.new, 16)
+        self.assertEqual(mask.shape, (17, 17))
+        changed = np.argwhere(self.old != self.new)
+        for r, c in changed:
+            self.assertTrue(mask[r // 16, c // 16])
+        self.assertEqual(int(mask.sum()), len({(r // 16, c // 16) for r, c in changed}))
+
+        regions = block_regions(mask)
+        self.assertEqual(len(regions), 2)
+        covered = np.zeros_like(mask)
+        for row0, col0, row1, col1 in regions:
+            covered[row0:row1, col0:col1] = True
+        self.assertTrue(np.all(covered[mask]))
+        self.assertEqual(region_pixels((16, 16, 17, 17), self.old.shape, 16), (256, 256, 257, 257))
+
+    def test_unchanged_and_resized(self):
+        self.assertFalse(changed_blocks(self.old, self.old.copy()).any())
+        self.assertEqual(build_change_record(self.old, self.old.copy(), self.metadata)['summary'], [])
+        with self.assertRaises(ValueError):
+            changed_blocks(self.old, self.old[:-1, :-1])
+
+    def test_summary_names_grid_squares(self):
+        summary = summarize_changes(self.old, self.new, self.metadata)
+        by_square = {item['square']: item for item in summary}
+        # Pixel (128, 130) is at 660m east, 650m south: square G7 (row 1 at the north edge)
+        self.assertAlmostEqual(by_square['G7']['raised_m'], 2000 / 65535 * 300, places=2)
+        self.assertEqual(by_square['G7']['lowered_m'], 0)
+        self.assertGreater(by_square['M13']['lowered_m'], 6)
+        lines = describe(summary)
+        self.assertTrue(lines[0].startswith('terrain raised in G7 (up to 9.16 m'), lines[0])
+        self.assertIn('terrain lowered in M13', ' '.join(lines))
+
+    def test_incremental_terrain_matches_full_rebuild(self):
+        for block_size in (16, 64):
+            record = build_change_record(self.old, self.new, self.metadata, block_size)
+            bounds = [region_pixels(region['blocks'], self.old.shape, block_size) for region in record['regions']]
+            arrays = terrain.build_terrain_arrays(self.old, self.metadata)
+            updated = terrain.update_terrain_arrays(arrays, self.new, self.metadata, bounds)
+            rebuilt = terrain.build_terrain_arrays(self.new, self.metadata)
+            self.assertEqual(sorted(updated), sorted(rebuilt))
+            for key, expected in rebuilt.items():
+                np.testing.assert_array_equal(updated[key], expected, err_msg=key)
+
+    def test_incremental_keypads_match_full_rebuild(self):
+        record = build_change_record(self.old, self.new, self.metadata, 16)
+        bounds = [region_pixels(region['blocks'], self.old.shape, 16) for region in record['regions']]
+        # Start from the rounded file contents, as processor/patch_map.py does
+        stored = keypads._to_json(keypads.build_keypad_tables(self.old, self.metadata))
+        updated = keypads.update_keypad_tables(stored, self.new, self.metadata, bounds)
+        self.assertEqual(keypads._to_json(updated),
+                         keypads._to_json(keypads.build_keypad_tables(self.new, self.metadata)))
+
+    def test_change_record(self):
+        record = build_change_record(self.old, self.new, self.metadata)
+        self.assertEqual(record['from_crc32'], terrain.heightmap_checksum(self.old))
+        self.assertEqual(record['to_crc32'], terrain.heightmap_checksum(self.new))
+        self.assertEqual(record['changed_pixels'], int((self.old != self.new).sum()))
+        self.assertEqual(len(record['summary']), len(record['squares']))
+
+
+if __name__ == '__main__':
+    unittest.main()
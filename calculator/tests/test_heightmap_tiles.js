@@ -0,0 +1,126 @@
+import assert from 'node:assert';
+import { deflateSync } from 'node:zlib';
+import { clearCache, getElevation, loadHeightmapStats, loadTiledMapData, takeLoadTimings } from '../static/js/heightmap.js';
+
+const RESOLUTION = 9;
+const TILE_SIZE = 4;
+const METADATA = { map_size: 80, height_scale: 300 };
+
+// heightmap.bin bytes ('up' predictor), as calculator/heightmap_codec.py writes them
+function encodeCodec(data, width, height) {
+  const count = width * height;
+  const planes = new Uint8Array(2 * count);
+  for (let i = 0; i < count; i++) {
+    const residual = (data[i] - (i >= width ? data[i - width] : 0)) << 16 >> 16;
+    const zigzag = ((residual << 1) ^ (residual >> 31)) & 0xFFFF;
+    planes[i] = zigzag & 0xFF;
+    planes[count + i] = zigzag >> 8;
+  }
+  const header = Buffer.alloc(16);
+  header.write('PRHM', 0, 'latin1');
+  header.writeUInt8(1, 4);
+  header.writeUInt8(0, 5);
+  header.writeUInt32LE(width, 8);
+  header.writeUInt32LE(height, 12);
+  const bytes = Buffer.concat([header, deflateSync(planes)]);
+  return bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.byteLength);
+}
+
+function makeHeightmap() {
+  const data = new Uint16Array(RESOLUTION * RESOLUTION);
+  for (let y = 0; y < RESOLUTION; y++) {
+    for (let x = 0; x < RESOLUTION; x++) {
+      data[y * RESOLUTION + x] = 20000 + 1500 * x - 700 * y + ((x * 7919 + y * 104729) % 613);
+    }
+  }
+  return data;
+}
+
+// Tile (i, j) with its shared edge samples, as calculator/heightmap_tiles.py cuts it
+function cutTile(data, i, j) {
+  const row0 = i * TILE_SIZE;
+  const col0 = j * TILE_SIZE;
+  const height = Math.min(row0 + TILE_SIZE + 1, RESOLUTION) - row0;
+  const width = Math.min(col0 + TILE_SIZE + 1, RESOLUTION) - col0;
+  const tile = new Uint16Array(width * height);
+  for (let r = 0; r < height; r++) {
+    for (let c = 0; c < width; c++) {
+      tile[r * width + c] = data[(row0 + r) * RESOLUTION + col0 + c];
+    }
+  }
+  return encodeCodec(tile, width, height);
+}
+
+export async function runHeightmapTilesTests() {
+  const heightmap = makeHeightmap();
+  const requests = [];
+  let terrainStats = null;
+  const originalFetch = globalThis.fetch;
+  globalThis.fetch = async (url) => {
+    requests.push(url);
+    if (url === '/maps/tiled_test/metadata.json') {
+      return new Response(JSON.stringify(METADATA));
+    }
+    if (url === '/maps/tiled_test/terrain' && terrainStats) {
+      return new Response(JSON.stringify({ map: 'tiled_test', stats: terrainStats }));
+    }
+    if (url === '/maps/tiled_test/heightmap/tiles') {
+      return new Response(JSON.stringify({ resolution: RESOLUTION, tile_size: TILE_SIZE, tiles: 2, version: 'v1' }));
+    }
+    const match = url.match(/^\/maps\/tiled_test\/heightmap\/tile\/(\d+)\/(\d+)\?v=v1$/);
+    if (match) {
+      return new Response(cutTile(heightmap, Number(match[1]), Number(match[2])));
+    }
+    return new Response('not found', { status: 404 });
+  };
+
+  try {
+    const mapData = await loadTiledMapData('tiled_test');
+    assert.strictEqual(mapData.heightmap, null);
+    assert.strictEqual(mapData.hasElevationAt(10, 10), false);
+    assert.ok(Number.isNaN(mapData.getElevationAt(10, 10)));
+
+    // Only the tile under each point is fetched; concurrent loads share a request
+    await Promise.all([mapData.loadPoints([{ x: 10, y: 10 }]), mapData.loadPoints([{ x: 30, y: 5 }])]);
+    assert.deepStrictEqual(requests.filter((url) => url.includes('/tile/')), ['/maps/tiled_test/heightmap/tile/0/0?v=v1']);
+    assert.strictEqual(mapData.hasElevationAt(10, 10), true);
+    assert.strictEqual(mapData.hasElevationAt(70, 10), false);
+
+    // The first batch of tiles is reported once to client telemetry
+    const timings = takeLoadTimings('tiled_test');
+    assert.strictEqual(timings.source, 'tiles');
+    assert.deepStrictEqual(Object.keys(timings.phases).sort(), ['decode', 'fetch', 'index', 'total']);
+    assert.strictEqual(timings.heightmapBytes, 5 * 5 * 2);
+    assert.ok(timings.transferBytes > 16);
+    assert.strictEqual(takeLoadTimings('tiled_test'), null);
+
+    // Tiles in a circle, nearest first
+    assert.deepStrictEqual(mapData.tiles.tilesInCircle(2, 2, 1), [{ i: 0, j: 0 }]);
+    assert.deepStrictEqual(mapData.tiles.tilesInCircle(6, 2, 2.5), [{ i: 0, j: 1 }, { i: 0, j: 0 }, { i: 1, j: 1 }]);
+    await mapData.loadArea(40, 40, 100);
+    assert.strictEqual(requests.filter((url) => url.includes('/tile/')).length, 4);
+    assert.strictEqual(takeLoadTimings('tiled_test'), null);
+
+    // Sampling across tile edges matches the full heightmap
+    for (let y = 0; y <= 80; y += 2.5) {
+      for (let x = 0; x <= 80; x += 3.3) {
+        const expected = getElevation(x, y, heightmap, METADATA.height_scale, METADATA.map_size, RESOLUTION);
+        assert.ok(Math.abs(mapData.getElevationAt(x, y) - expected) < 1e-9, `elevation at ${x}, ${y}`);
+      }
+    }
+
+    // Stats come from the server: a tiled map has no heightmap to scan
+    await assert.rejects(loadHeightmapStats('tiled_test', mapData));
+    terrainStats = { min: 19000, max: 33000, mean: 25000.5 };
+    assert.deepStrictEqual(await loadHeightmapStats('tiled_test', mapData), terrainStats);
+
+    // Reopening the map reuses the loaded tiles
+    const requestCount = requests.length;
+    const reopened = await loadTiledMapData('tiled_test');
+    assert.strictEqual(reopened.tiles, mapData.tiles);
+    assert.ok(requests.length - requestCount <= 1);
+  } finally {
+    clearCache('tiled_test');
+    globalThis.fetch = originalFetch;
+  }
+}
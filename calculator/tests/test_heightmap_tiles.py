@@ -0,0 +1,122 @@
+import json
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from calculator import heightmap, heightmap_tiles, server
+from calculator.heightmap_codec import decode_heightmap, encode_heightmap
+
+
+def _make_map(processed_dir: Path, resolution=21, seed=0) -> Path:
+    map_dir = processed_dir / 'tiled_map'
+    map_dir.mkdir(parents=True, exist_ok=True)
+    samples = np.random.default_rng(seed).integers(0, 65536, (resolution, resolution)).astype(np.uint16)
+    (map_dir / 'metadata.json').write_text(json.dumps({'map_size': 200, 'height_scale': 300}), encoding='utf-8')
+    (map_dir / 'heightmap.bin').write_bytes(encode_heightmap(samples))
+    return map_dir
+
+
+class TileLayoutTest(unittest.TestCase):
+    def test_tiles_share_edges_and_cover_the_map(self):
+        self.assertEqual(heightmap_tiles.tile_grid(1025), 4)
+        self.assertEqual(heightmap_tiles.tile_grid(2049), 8)
+        self.assertEqual(heightmap_tiles.tile_grid(21, 8), 3)
+        self.assertEqual(heightmap_tiles.tile_bounds(21, 0, 1, 8), (0, 8, 9, 17))
+        self.assertEqual(heightmap_tiles.tile_bounds(21, 2, 2, 8), (16, 16, 21, 21))
+        with self.assertRaises(ValueError):
+            heightmap_tiles.tile_bounds(21, 3, 0, 8)
+
+
+class TileStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.processed_dir = Path(tmp.name) / 'processed_maps'
+        self.cache_dir = Path(tmp.name) / 'tiles'
+        self.map_dir = _make_map(self.processed_dir)
+        self.addCleanup(heightmap_tiles.clear_cache)
+        self.addCleanup(heightmap.clear_cache)
+
+    def test_memory_mapped_tiles_match_heightmap(self):
+        store = heightmap_tiles.open_tile_store(self.map_dir, self.cache_dir)
+        self.assertIsInstance(store.samples, np.memmap)
+        self.assertIs(heightmap_tiles.open_tile_store(self.map_dir, self.cache_dir), store)
+
+        store = heightmap_tiles.TileStore(store.samples, store.version, tile_size=8)
+        full = heightmap.load_heightmap(self.map_dir)
+        for i in range(store.tiles_per_axis):
+            for j in range(store.tiles_per_axis):
+                row0, col0, row1, col1 = heightmap_tiles.tile_bounds(21, i, j, 8)
+                np.testing.assert_array_equal(decode_heightmap(store.encoded_tile(i, j)), full[row0:row1, col0:col1])
+        self.assertIs(store.encoded_tile(1, 1), store.encoded_tile(1, 1))
+
+    def test_new_heightmap_gets_new_version(self):
+        first = heightmap_tiles.open_tile_store(self.map_dir, self.cache_dir)
+        heightmap_tiles.clear_cache()
+        heightmap.clear_cache()
+        _make_map(self.processed_dir, seed=1)
+        second = heightmap_tiles.open_tile_store(self.map_dir, self.cache_dir)
+        self.assertNotEqual(first.version, second.version)
+        self.assertEqual([p.name for p in self.cache_dir.glob('*.npy')], [f'tiled_map-{second.version}.npy'])
+
+    def test_concurrent_builds_share_one_array(self):
+        path = self.cache_dir / 'tiled_map-0.npy'
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(lambda _: heightmap_tiles._write_tile_array(self.map_dir, path), range(8)))
+        np.testing.assert_array_equal(np.load(path), heightmap.load_heightmap(self.map_dir))
+        self.assertEqual([p.name for p in self.cache_dir.iterdir()], [path.name])
+
+    def test_without_cache_dir_uses_decoded_heightmap(self):
+        store = heightmap_tiles.open_tile_store(self.map_dir)
+        self.assertNotIsInstance(store.samples, np.memmap)
+        self.assertEqual(store.index()['resolution'], 21)
+
+
+class TileEndpointsTest(unittest.TestCase):
+    MAP = 'muttrah_city_2'
+
+    def setUp(self):
+        if not (server.PROCESSED_MAPS_DIR / self.MAP / 'metadata.json').is_file():
+            self.skipTest(f'{self.MAP} not processed')
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(server, 'TILE_CACHE_DIR', Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(heightmap_tiles.clear_cache)
+        server.app.config['TESTING'] = True
+        self.client = server.app.test_client()
+
+    def test_index_and_tiles(self):
+        index = self.client.get(f'/maps/{self.MAP}/heightmap/tiles').get_json()
+        self.assertEqual(index['tile_size'], heightmap_tiles.TILE_SIZE)
+        self.assertEqual(index['tiles'], heightmap_tiles.tile_grid(index['resolution']))
+
+        full = heightmap.load_heightmap(server.PROCESSED_MAPS_DIR / self.MAP)
+        rv = self.client.get(f"/maps/{self.MAP}/heightmap/tile/1/2?v={index['version']}")
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(rv.mimetype, 'application/octet-stream')
+        self.assertTrue(rv.cache_control.immutable)
+        row0, col0, row1, col1 = heightmap_tiles.tile_bounds(index['resolution'], 1, 2)
+        np.testing.assert_array_equal(decode_heightmap(rv.data), full[row0:row1, col0:col1])
+
+        # Unversioned requests revalidate with the ETag
+        rv = self.client.get(f'/maps/{self.MAP}/heightmap/tile/1/2')
+        self.assertTrue(rv.cache_control.no_cache)
+        rv = self.client.get(f'/maps/{self.MAP}/heightmap/tile/1/2', headers={'If-None-Match': rv.headers['ETag']})
+        self.assertEqual(rv.status_code, 304)
+
+    def test_unknown_tile_or_map(self):
+        tiles = heightmap_tiles.tile_grid(heightmap.load_metadata(server.PROCESSED_MAPS_DIR / self.MAP)
+                                          .get('heightmap_resolution', 1025))
+        self.assertEqual(self.client.get(f'/maps/{self.MAP}/heightmap/tile/{tiles}/0').status_code, 404)
+        self.assertEqual(self.client.get('/maps/no_such_map/heightmap/tiles').status_code, 404)
+        self.assertEqual(self.client.get('/maps/no_such_map/heightmap/tile/0/0').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
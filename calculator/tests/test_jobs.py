@@ -0,0 +1,127 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+from calculator import jobs, server
+
+MAP_DIR = Path('/maps/adak')
+
+
+def run_gated(map_dir, params):
+    """Test job: waits for its gate, then echoes params (or fails)."""
+    params['gate'].wait(5)
+    if params.get('fail'):
+        raise ValueError('bad parameters')
+    return {'value': params['value']}
+
+
+class JobSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(jobs.JOB_KINDS, {'gated': run_gated})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.scheduler = jobs.JobScheduler(1, max_queued=1, executor_factory=ThreadPoolExecutor)
+        self.addCleanup(self.scheduler.shutdown)
+        # Thread pool, so the gate can travel in the params (job_key is patched to ignore it)
+        self.gate = threading.Event()
+        self.addCleanup(self.gate.set)
+
+    def params(self, value, **extra):
+        return {'value': value, 'gate': self.gate, **extra}
+
+    def test_dedup_queue_limit_and_cache(self):
+        with mock.patch.object(jobs, 'job_key', lambda kind, map_dir, params: repr(params['value'])):
+            first = self.scheduler.submit('gated', MAP_DIR, self.params(1))
+            self.assertEqual(first.status, 'running')
+            self.assertIs(self.scheduler.submit('gated', MAP_DIR, self.params(1)), first)
+            queued = self.scheduler.submit('gated', MAP_DIR, self.params(2))
+            self.assertEqual(queued.status, 'queued')
+            with self.assertRaises(jobs.QueueFullError):
+                self.scheduler.submit('gated', MAP_DIR, self.params(3))
+
+            self.gate.set()
+            self.assertTrue(queued.wait(5))
+            self.assertEqual(first.to_dict()['result'], {'value': 1})
+            self.assertIs(self.scheduler.submit('gated', MAP_DIR, self.params(1)), first)
+            stats = self.scheduler.stats()
+        self.assertEqual((stats['done'], stats['deduplicated'], stats['cached'], stats['rejected']), (2, 1, 1, 1))
+
+    def test_cancel_and_failures_are_not_cached(self):
+        with mock.patch.object(jobs, 'job_key', lambda kind, map_dir, params: repr(params['value'])):
+            running = self.scheduler.submit('gated', MAP_DIR, self.params(1, fail=True))
+            queued = self.scheduler.submit('gated', MAP_DIR, self.params(2))
+            self.assertIs(self.scheduler.cancel(queued.id), queued)
+            self.assertEqual(queued.status, 'cancelled')
+            self.assertIsNone(self.scheduler.cancel('unknown'))
+
+            self.gate.set()
+            self.assertTrue(running.wait(5))
+            self.assertEqual(running.status, 'failed')
+            self.assertTrue(running.invalid)
+            retry = self.scheduler.submit('gated', MAP_DIR, self.params(1, fail=True))
+        self.assertIsNot(retry, running)
+
+    def test_finished_jobs_expire(self):
+        self.scheduler.result_ttl = 0.0
+        with mock.patch.object(jobs, 'job_key', lambda kind, map_dir, params: repr(params['value'])):
+            self.gate.set()
+            job = self.scheduler.submit('gated', MAP_DIR, self.params(1))
+            self.assertTrue(job.wait(5))
+            time.sleep(0.01)
+            self.assertIsNone(self.scheduler.get(job.id))
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.submit('coverage', MAP_DIR, {})
+
+
+class JobEndpointTest(unittest.TestCase):
+    MAP = 'muttrah_city_2'
+    BODY = {'kind': 'dispersion', 'mortar': 'D6-5', 'target': 'F6-3', 'rounds': 200, 'seed': 4,
+            'cloud_points': 5}
+
+    def setUp(self):
+        if not (server.PROCESSED_MAPS_DIR / self.MAP / 'metadata.json').is_file():
+            self.skipTest(f'{self.MAP} not processed')
+        server.app.config['TESTING'] = True
+        self.client = server.app.test_client()
+
+    def test_submit_poll_and_stream(self):
+        rv = self.client.post(f'/maps/{self.MAP}/jobs', json=self.BODY)
+        self.assertIn(rv.status_code, (200, 202))
+        job_id = rv.get_json()['id']
+        self.assertEqual(rv.headers['Location'], f'/jobs/{job_id}')
+
+        rv = self.client.get(f'/jobs/{job_id}?wait=30')
+        self.assertEqual(rv.status_code, 200)
+        data = rv.get_json()
+        self.assertEqual(data['status'], 'done')
+        self.assertEqual(data['result']['rounds'], 200)
+
+        # Identical work is answered from the result cache
+        self.assertEqual(self.client.post(f'/maps/{self.MAP}/jobs', json=self.BODY).get_json()['id'], job_id)
+        body = self.client.get(f'/jobs/{job_id}/events').get_data(as_text=True)
+        self.assertIn('event: state', body)
+        self.assertIn('"status": "done"', body)
+        self.assertEqual(self.client.delete(f'/jobs/{job_id}').get_json()['status'], 'done')
+        self.assertGreaterEqual(self.client.get('/jobs').get_json()['cached'], 1)
+
+    def test_errors(self):
+        self.assertEqual(self.client.post(f'/maps/{self.MAP}/jobs', json={'kind': 'coverage'}).status_code, 400)
+        self.assertEqual(self.client.get('/jobs/nope').status_code, 404)
+        job_id = self.client.post(f'/maps/{self.MAP}/jobs', json=self.BODY).get_json()['id']
+        for wait in ('nan', 'inf', '-inf'):
+            self.assertEqual(self.client.get(f'/jobs/{job_id}?wait={wait}').status_code, 400, wait)
+        self.assertEqual(self.client.delete('/jobs/nope').status_code, 404)
+        with mock.patch.object(server.get_job_scheduler(), 'max_queued', 0), \
+                mock.patch.object(server.get_job_scheduler(), 'max_workers', 0):
+            rv = self.client.post(f'/maps/{self.MAP}/jobs', json={**self.BODY, 'seed': 5})
+        self.assertEqual(rv.status_code, 429)
+        self.assertEqual(rv.headers['Retry-After'], str(server.JOB_RETRY_AFTER_SECONDS))
+
+
+if __name__ == '__main__':
+    unittest.main()
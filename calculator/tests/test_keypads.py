@@ -0,0 +1,118 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from calculator import keypads, server
+from calculator.coordinates import grid_to_xy, subkeypad_to_xy
+from calculator.heightmap import get_elevation
+
+
+def _synthetic_map(resolution=129):
+    """Ridge running north-south across a 1300m map (grid_scale 100m)."""
+    coords = np.linspace(-1, 1, resolution)
+    xx, yy = np.meshgrid(coords, coords)
+    heightmap = (50000 * np.exp(-8 * xx ** 2) + 2000 * yy).clip(0).astype(np.uint16)
+    metadata = {'map_size': 1300, 'height_scale': 200, 'grid_scale': 100}
+    return heightmap, metadata
+
+
+class KeypadTableTest(unittest.TestCase):
+    def setUp(self):
+        self.heightmap, self.metadata = _synthetic_map()
+        self.tables = keypads.build_keypad_tables(self.heightmap, self.metadata)
+        self.table = keypads.KeypadTable(self.tables)
+
+    def _elevation(self, x, y):
+        return get_elevation(x, y, self.heightmap, 200, 1300)
+
+    def test_table_shapes(self):
+        self.assertEqual(self.tables['points']['elevation'].shape, (27, 27))
+        self.assertEqual(self.tables['keypads']['center'].shape, (39, 39))
+        self.assertEqual(self.tables['subkeypads']['max'].shape, (117, 117))
+
+    def test_points_match_grid_ref_to_xy(self):
+        for column, row, keypad in (('A', 1, 7), ('D', 6, 7), ('G', 7, 5), ('M', 13, 3)):
+            x, y = grid_to_xy(column, row, keypad, 100)
+            result = self.table.lookup(column, row, keypad)
+            self.assertAlmostEqual(result['x'], x)
+            self.assertAlmostEqual(result['y'], y)
+            self.assertAlmostEqual(result['elevation'], float(self._elevation(x, y)))
+
+    def test_cell_min_max_bound_dense_samples(self):
+        rng = np.random.default_rng(1)
+        for level, size in (('keypads', 100 / 3), ('subkeypads', 100 / 9)):
+            table = self.tables[level]
+            for cx, cy in rng.integers(0, table['size'], (40, 2)):
+                xs = rng.uniform(cx * size, (cx + 1) * size, 100)
+                ys = rng.uniform(cy * size, (cy + 1) * size, 100)
+                samples = self._elevation(xs, ys)
+                self.assertLessEqual(table['min'][cy, cx], samples.min() + 1e-9)
+                self.assertGreaterEqual(table['max'][cy, cx], samples.max() - 1e-9)
+
+    def test_subkeypad_lookup(self):
+        keypad = self.table.lookup('G', 7, 5)
+        center = self.table.lookup('G', 7, 5, 5)
+        corner = self.table.lookup('G', 7, 5, 7)
+        # The sub-keypad 5 of keypad 5 shares its centre with the keypad cell
+        self.assertAlmostEqual(center['cell']['center'], keypad['cell']['center'])
+        self.assertNotIn('elevation', corner)
+        self.assertAlmostEqual(corner['cell']['bounds'][0], 600 + 100 / 3)
+        self.assertGreaterEqual(keypad['cell']['max'], corner['cell']['max'])
+        with self.assertRaises(ValueError):
+            self.table.lookup('G', 7, 5, 0)
+
+    def test_lattice_elevation_of_grid_ref_positions(self):
+        x, y = grid_to_xy('D', 6, 7, 100)
+        sx, sy = subkeypad_to_xy('G', 7, 5, 7, 100)
+        z = self.table.lattice_elevation([x, sx, 123.4, -50.0], [y, sy, 50.0, 0.0])
+        self.assertEqual(z[0], self.table.lookup('D', 6, 7)['elevation'])
+        self.assertEqual(z[1], self.table.lookup('G', 7, 5, 7)['cell']['center'])
+        self.assertTrue(np.isnan(z[2:]).all())
+
+    def test_saved_file_is_used_until_stale(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            map_dir = Path(tmp)
+            keypads.save_keypad_tables(map_dir / keypads.KEYPADS_FILENAME, self.tables)
+            try:
+                loaded = keypads.load_keypad_table(map_dir, self.heightmap, self.metadata)
+                self.assertIsInstance(loaded.tables['keypads']['center'], list)
+                self.assertAlmostEqual(loaded.lookup('C', 3, 9)['cell']['max'],
+                                       self.table.lookup('C', 3, 9)['cell']['max'], places=2)
+
+                keypads.clear_cache(map_dir)
+                rebuilt = keypads.load_keypad_table(map_dir, self.heightmap, {**self.metadata, 'grid_scale': 90})
+                self.assertEqual(rebuilt.grid_scale, 90)
+            finally:
+                keypads.clear_cache(map_dir)
+
+
+class KeypadEndpointTest(unittest.TestCase):
+    MAP = 'muttrah_city_2'
+
+    def setUp(self):
+        if not (server.PROCESSED_MAPS_DIR / self.MAP / 'metadata.json').is_file():
+            self.skipTest(f'{self.MAP} not processed')
+        server.app.config['TESTING'] = True
+        self.client = server.app.test_client()
+
+    def test_full_tables(self):
+        data = self.client.get(f'/maps/{self.MAP}/keypads').get_json()
+        self.assertEqual(data['map'], self.MAP)
+        self.assertEqual(len(data['subkeypads']['min']), 117)
+
+    def test_single_reference(self):
+        rv = self.client.get(f'/maps/{self.MAP}/keypads?ref=D6-7')
+        self.assertEqual(rv.status_code, 200)
+        data = rv.get_json()
+        self.assertLessEqual(data['cell']['min'], data['cell']['max'])
+        self.assertEqual(self.client.get(f'/maps/{self.MAP}/keypads?ref=Z9').status_code, 400)
+
+        sub = self.client.get(f'/maps/{self.MAP}/keypads?ref=D6-7-3').get_json()
+        self.assertNotIn('elevation', sub)
+        self.assertGreaterEqual(data['cell']['max'], sub['cell']['max'])
+
+
+if __name__ == '__main__':
+    unittest.main()
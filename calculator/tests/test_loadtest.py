@@ -0,0 +1,49 @@
+import threading
+import unittest
+
+from werkzeug.serving import make_server
+
+from calculator import loadtest, server
+
+
+class LoadTestHarnessTest(unittest.TestCase):
+    def setUp(self):
+        self.maps = loadtest.fetch_map_names()[:2]
+        if not self.maps:
+            self.skipTest('no processed maps')
+
+    def test_plan_follows_mix(self):
+        mix = loadtest.parse_mix('dispersion=0,static=0,index=0')
+        plan = loadtest.plan_requests(mix, self.maps, 300)
+        scenarios = {request.scenario for request in plan}
+        self.assertNotIn('dispersion', scenarios)
+        self.assertIn('metadata', scenarios)
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix('nonsense=1')
+
+    def test_in_process_report(self):
+        plan = loadtest.plan_requests(loadtest.parse_mix('dispersion=0'), self.maps, 60)
+        report = loadtest.run_load(loadtest.in_process_sender(), plan, concurrency=3)
+        self.assertEqual(report['requests'], 60)
+        self.assertEqual(report['errors'], 0, report['scenarios'])
+        self.assertLessEqual(report['p50_ms'], report['p99_ms'])
+        self.assertGreater(report['requests_per_second'], 0)
+
+    def test_http_mode_counts_errors(self):
+        httpd = make_server('127.0.0.1', 0, server.app, threaded=True)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        try:
+            send = loadtest.http_sender(f'http://127.0.0.1:{httpd.server_port}')
+            plan = [loadtest.Request('metadata', 'GET', f'/maps/{self.maps[0]}/metadata.json'),
+                    loadtest.Request('missing', 'GET', '/maps/no_such_map/metadata.json')] * 5
+            report = loadtest.run_load(send, plan, concurrency=2)
+        finally:
+            httpd.shutdown()
+        self.assertEqual(report['requests'], 10)
+        self.assertEqual(report['scenarios']['missing']['errors_by_status'], {'404': 5})
+        self.assertEqual(report['scenarios']['metadata']['errors'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
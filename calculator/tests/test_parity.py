@@ -0,0 +1,32 @@
+import shutil
+import unittest
+
+import numpy as np
+
+from calculator import ballistics, parity
+
+
+class ParityHarnessTest(unittest.TestCase):
+    def test_edge_cases_hit_boundaries(self):
+        cases = parity.generate_ballistics_cases(20000, np.random.default_rng(0))
+        self.assertEqual(cases.shape, (20000, 6))
+        self.assertGreater(np.count_nonzero(parity.on_decision_boundary(cases)), 100)
+
+        status = ballistics.calculate_firing_solutions(*cases.T)['status']
+        for code in range(len(ballistics.STATUS_NAMES)):
+            self.assertIn(code, status)
+
+    def test_samples_cover_last_pixel(self):
+        samples = parity.generate_samples(1000, 65, 33, np.random.default_rng(1))
+        self.assertTrue((samples[:, 0] <= 64).all() and (samples[:, 1] <= 32).all())
+        self.assertTrue(np.isin(64, samples[:, 0]) or np.isin(32, samples[:, 1]))
+
+    @unittest.skipUnless(shutil.which('node'), 'Node.js not installed')
+    def test_engines_agree(self):
+        report = parity.run_parity(cases=20000, refs=2000, seed=3)
+        self.assertTrue(report['passed'], report)
+        self.assertEqual(report['sections']['heightmap']['fields']['height']['max'], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from calculator import precache, server
+from calculator.usage import MapUsageStats
+
+
+class PrecacheManifestTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+
+    def test_file_revision_follows_content(self):
+        path = self.root / 'app.js'
+        path.write_text('one', encoding='utf-8')
+        first = precache.file_revision(path)
+        self.assertEqual(first, precache.content_revision(b'one'))
+        self.assertEqual(precache.file_revision(path), first)
+
+        path.write_text('two!', encoding='utf-8')
+        os.utime(path, ns=(1, 1))
+        self.assertEqual(precache.file_revision(path), precache.content_revision(b'two!'))
+
+    def test_static_and_map_entries(self):
+        static_dir = self.root / 'static'
+        (static_dir / 'js').mkdir(parents=True)
+        (static_dir / 'js' / 'app.js').write_text('app', encoding='utf-8')
+        (static_dir / 'css').mkdir()
+        (static_dir / 'css' / 'styles.css').write_text('css', encoding='utf-8')
+        (static_dir / '.DS_Store').write_bytes(b'x')
+        entries = precache.static_entries(static_dir)
+        self.assertEqual([e['url'] for e in entries], ['/static/css/styles.css', '/static/js/app.js'])
+        self.assertFalse(any(e['revalidate'] for e in entries))
+
+        map_dir = self.root / 'processed_maps' / 'adak'
+        map_dir.mkdir(parents=True)
+        (map_dir / 'metadata.json').write_text(json.dumps({'map_size': 1024, 'height_scale': 300}), encoding='utf-8')
+        (map_dir / 'minimap.png').write_bytes(b'PNG')
+        (map_dir / 'heightmap.bin').write_bytes(b'PRHM')
+        entries = {e['url']: e for e in precache.map_entries(map_dir)}
+        self.assertEqual(sorted(entries), ['/maps/adak/heightmap/tiles', '/maps/adak/metadata.json',
+                                           '/maps/adak/minimap.png'])
+        self.assertEqual(entries['/maps/adak/heightmap/tiles']['revision'], precache.content_revision(b'PRHM'))
+        self.assertTrue(entries['/maps/adak/metadata.json']['revalidate'])
+
+    def test_version_changes_with_any_revision(self):
+        entries = [{'url': '/static/js/app.js', 'revision': 'a', 'revalidate': False}]
+        first = precache.build_manifest(entries)
+        self.assertEqual(first['entries'], entries)
+        self.assertEqual(precache.build_manifest(entries)['version'], first['version'])
+        changed = precache.build_manifest([{**entries[0], 'revision': 'b'}])
+        self.assertNotEqual(changed['version'], first['version'])
+
+
+class ServiceWorkerEndpointTest(unittest.TestCase):
+    MAP = 'muttrah_city_2'
+
+    def setUp(self):
+        server.app.config['TESTING'] = True
+        self.client = server.app.test_client()
+        patcher = mock.patch.object(server, 'usage_stats', MapUsageStats())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_service_worker_embeds_manifest(self):
+        rv = self.client.get('/sw.js')
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(rv.mimetype, 'text/javascript')
+        self.assertTrue(rv.cache_control.no_cache)
+
+        manifest = self.client.get('/precache-manifest.json').get_json()
+        self.assertIn(f'"version": "{manifest["version"]}"', rv.get_data(as_text=True))
+        urls = [entry['url'] for entry in manifest['entries']]
+        self.assertEqual(urls[0], '/')
+        self.assertIn('/static/js/app.js', urls)
+        self.assertIn('/static/lib/leaflet.js', urls)
+        self.assertFalse(any(url.startswith('/maps/') and url != '/maps/list' for url in urls))
+
+    def test_used_maps_are_precached_without_counting_a_use(self):
+        if not (server.PROCESSED_MAPS_DIR / self.MAP / 'metadata.json').is_file():
+            self.skipTest(f'{self.MAP} not processed')
+        before = self.client.get('/precache-manifest.json').get_json()['version']
+
+        rv = self.client.get(f'/maps/{self.MAP}/heightmap/tiles')
+        rv.close()
+        self.assertEqual(server.usage_stats.counts, {})
+
+        self.client.post(f'/maps/{self.MAP}/open')
+        manifest = self.client.get('/precache-manifest.json').get_json()
+        self.assertNotEqual(manifest['version'], before)
+        urls = [entry['url'] for entry in manifest['entries']]
+        self.assertIn(f'/maps/{self.MAP}/metadata.json', urls)
+        self.assertIn(f'/maps/{self.MAP}/heightmap/tiles', urls)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,8 @@
 import json
+import tempfile
 import unittest
+from pathlib import Path
+from unittest import mock
 
 from calculator import server
 
@@ -41,6 +44,49 @@ class ServerEndpointsTest(unittest.TestCase):
         rv = self.client.get('/maps/this_map_does_not_exist/metadata.json')
         self.assertEqual(rv.status_code, 404)
 
+    def test_deduplicated_file_redirects_to_blob(self):
+        digest = 'ab' * 32
+        with tempfile.TemporaryDirectory() as tmp:
+            processed = Path(tmp)
+            (processed / '_blobs').mkdir()
+            (processed / '_blobs' / digest).write_bytes(b'PNGDATA')
+            (processed / 'variant').mkdir()
+            (processed / 'variant' / 'metadata.json').write_text(
+                json.dumps({'blobs': {'minimap.png': digest}}), encoding='utf-8')
+
+            with mock.patch.object(server, 'PROCESSED_MAPS_DIR', processed):
+                rv = self.client.get('/maps/variant/minimap.png')
+                self.assertEqual(rv.status_code, 302)
+                self.assertTrue(rv.headers['Location'].endswith(f'/blobs/{digest}/minimap.png'))
+
+                rv = self.client.get(f'/blobs/{digest}/minimap.png')
+                self.assertEqual(rv.status_code, 200)
+                self.assertEqual(rv.data, b'PNGDATA')
+                self.assertIn('image/png', rv.content_type)
+                self.assertIn('immutable', rv.headers['Cache-Control'])
+                rv.close()
+
+                self.assertEqual(self.client.get('/blobs/not-a-digest/minimap.png').status_code, 404)
+                self.assertEqual(self.client.get('/maps/variant/heightmap.bin').status_code, 404)
+
+    def test_overlay_tiles(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            processed = Path(tmp)
+            overlay_dir = processed / 'shaded' / 'overlays' / 'hillshade'
+            overlay_dir.mkdir(parents=True)
+            (overlay_dir / '0_1.png').write_bytes(b'PNGDATA')
+
+            with mock.patch.object(server, 'PROCESSED_MAPS_DIR', processed):
+                rv = self.client.get('/maps/shaded/overlays/hillshade/0_1.png')
+                self.assertEqual(rv.status_code, 200)
+                self.assertEqual(rv.data, b'PNGDATA')
+                self.assertEqual(rv.mimetype, 'image/png')
+                rv.close()
+
+                self.assertEqual(self.client.get('/maps/shaded/overlays/hillshade/1_1.png').status_code, 404)
+                self.assertEqual(self.client.get('/maps/shaded/overlays/contours/0_1.png').status_code, 404)
+                self.assertEqual(self.client.get('/maps/shaded/overlays/elevation/0_1.png').status_code, 404)
+
 
 if __name__ == '__main__':
     unittest.main()
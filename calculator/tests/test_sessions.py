@@ -0,0 +1,172 @@
+import json
+import threading
+import unittest
+from unittest import mock
+
+from calculator import server, sessions
+from calculator.sessions import SessionLimitError, SessionRegistry
+
+MAP = 'muttrah_city_2'
+
+
+def map_data():
+    return server.get_map_data(MAP)
+
+
+def read_event(chunks):
+    """Next SSE event (skipping retry/keepalive lines) as (event, id, data)."""
+    for chunk in chunks:
+        text = chunk.decode() if isinstance(chunk, bytes) else chunk
+        fields = dict(line.split(': ', 1) for line in text.strip().splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            return fields['event'], fields.get('id'), json.loads(fields['data'])
+    raise AssertionError('stream ended')
+
+
+class FireMissionSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.session = SessionRegistry().create(MAP, map_data())
+
+    def test_batch_is_one_version_with_solutions_for_every_pair(self):
+        version = self.session.apply([
+            {'op': 'set_mortar', 'name': 'M1', 'position': 'D6-5'},
+            {'op': 'set_mortar', 'name': 'M2', 'position': {'x': 900, 'y': 1100}},
+            {'op': 'add_target', 'position': 'F6-3', 'label': 'Bunker'},
+            {'op': 'add_target', 'position': 'E7-1'},
+        ])
+        self.assertEqual(version, 1)
+        _, payload = self.session.snapshot()
+        state = json.loads(payload)
+        self.assertEqual([m['name'] for m in state['mortars']], ['M1', 'M2'])
+        self.assertEqual(state['mortars'][0]['grid_ref'], 'D6-5-5')
+        self.assertEqual([t['id'] for t in state['targets']], [1, 2])
+        self.assertEqual(state['targets'][0]['label'], 'Bunker')
+        solution = state['targets'][0]['solutions']['M1']
+        self.assertTrue(solution['valid'])
+        self.assertIn('elevationMils', solution)
+
+    def test_invalid_batch_changes_nothing(self):
+        self.session.apply([{'op': 'add_target', 'position': 'F6-3'}])
+        for ops in ([{'op': 'clear_targets'}, {'op': 'explode'}],
+                    [{'op': 'remove_target', 'id': 99}],
+                    [{'op': 'add_target', 'position': 'Z99'}],
+                    [{'op': 'set_mortar', 'name': '', 'position': 'D6'}],
+                    [{'op': 'set_mortar', 'name': 'M1', 'position': {'x': float('nan'), 'y': 0}}],
+                    [{'op': 'add_target', 'position': {'x': 0, 'y': float('-inf')}}],
+                    []):
+            with self.subTest(ops=ops), self.assertRaises(ValueError):
+                self.session.apply(ops)
+        self.assertEqual(self.session.version, 1)
+        self.assertEqual(len(self.session.targets), 1)
+
+    def test_target_queue_operations(self):
+        self.session.apply([{'op': 'add_target', 'position': 'F6-3'}] * 3)
+        self.session.apply([{'op': 'remove_target', 'id': 2}, {'op': 'move_target', 'id': 3, 'position': 'A1-7'}])
+        self.assertEqual([t['id'] for t in self.session.targets], [1, 3])
+        self.assertEqual(self.session.targets[1]['x'], self.session.targets[1]['y'])
+        self.session.apply([{'op': 'clear_targets'}, {'op': 'add_target', 'position': 'F6-3'}])
+        self.assertEqual([t['id'] for t in self.session.targets], [4])
+
+    def test_state_computed_once_per_version(self):
+        self.session.apply([{'op': 'set_mortar', 'name': 'M1', 'position': 'D6-5'}])
+        first = self.session.snapshot()
+        self.assertIs(self.session.snapshot(), first)
+        self.session.apply([{'op': 'add_target', 'position': 'F6-3'}])
+        self.assertEqual(self.session.snapshot()[0], 2)
+        self.assertEqual(self.session.computations, 2)
+
+    def test_waiters_wake_on_change(self):
+        threading.Timer(0.05, self.session.apply, args=([{'op': 'clear_targets'}],)).start()
+        self.assertTrue(self.session.wait_for_change(0, timeout=5))
+        self.assertFalse(self.session.wait_for_change(1, timeout=0.01))
+
+    def test_subscriber_limit(self):
+        with mock.patch.object(sessions, 'MAX_SUBSCRIBERS', 2):
+            self.session.subscribe()
+            self.session.subscribe()
+            with self.assertRaises(SessionLimitError):
+                self.session.subscribe()
+            self.session.unsubscribe()
+            self.session.subscribe()
+
+
+class SessionRegistryTest(unittest.TestCase):
+    def test_limit_and_expiry(self):
+        registry = SessionRegistry(max_sessions=1, ttl=60)
+        first = registry.create(MAP, map_data())
+        with self.assertRaises(SessionLimitError):
+            registry.create(MAP, map_data())
+        first.last_activity -= 120
+        registry.create(MAP, map_data())
+        self.assertTrue(first.closed)
+        self.assertIsNone(registry.get(first.id))
+
+
+class SessionEndpointsTest(unittest.TestCase):
+    def setUp(self):
+        self.client = server.app.test_client()
+        patcher = mock.patch.object(server, 'session_registry', SessionRegistry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create(self, ops=None):
+        response = self.client.post(f'/maps/{MAP}/sessions', json={'ops': ops} if ops else {})
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()
+
+    def test_create_update_and_long_poll(self):
+        state = self.create([{'op': 'set_mortar', 'name': 'M1', 'position': 'D6-5'}])
+        self.assertEqual(state['version'], 1)
+        url = f"/sessions/{state['id']}"
+
+        self.assertEqual(self.client.get(f'{url}?since=1&wait=0').status_code, 204)
+        self.assertEqual(self.client.get(f'{url}?since=1&wait=nan').status_code, 400)
+        self.assertEqual(self.client.get(f'{url}?since=0').get_json()['version'], 1)
+
+        session = server.session_registry.get(state['id'])
+        threading.Timer(0.05, session.apply, args=([{'op': 'add_target', 'position': 'F6-3'}],)).start()
+        polled = self.client.get(f'{url}?since=1&wait=5').get_json()
+        self.assertEqual(polled['version'], 2)
+        self.assertTrue(polled['targets'][0]['solutions']['M1']['valid'])
+
+        response = self.client.post(f'{url}/ops', json={'ops': [{'op': 'clear_targets'}]})
+        self.assertEqual(response.get_json(), {'id': state['id'], 'version': 3})
+        self.assertEqual(self.client.post(f'{url}/ops', json={'ops': [{'op': 'nope'}]}).status_code, 400)
+        # A non-finite position is refused and the session keeps serving its state
+        nan_ops = '{"ops": [{"op": "set_mortar", "name": "M2", "position": {"x": NaN, "y": 0}}]}'
+        self.assertEqual(self.client.post(f'{url}/ops', data=nan_ops, content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.get(url).get_json()['version'], 3)
+
+    def test_event_stream_coalesces_bursts(self):
+        state = self.create()
+        session = server.session_registry.get(state['id'])
+        response = self.client.get(f"/sessions/{state['id']}/events", buffered=False)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        chunks = iter(response.response)
+        self.assertEqual(read_event(chunks)[:2], ('state', '0'))
+        self.assertEqual(session.subscribers, 1)
+
+        def burst():
+            for name in ('M1', 'M2', 'M3'):
+                session.apply([{'op': 'set_mortar', 'name': name, 'position': 'D6-5'}])
+        threading.Timer(0.02, burst).start()
+        event, event_id, data = read_event(chunks)
+        self.assertEqual((event, event_id), ('state', '3'))
+        self.assertEqual(len(data['mortars']), 3)
+
+        self.assertEqual(self.client.delete(f"/sessions/{state['id']}").status_code, 204)
+        self.assertEqual(read_event(chunks)[0], 'closed')
+        response.close()
+        self.assertEqual(session.subscribers, 0)
+
+    def test_unknown_session_and_map(self):
+        self.assertEqual(self.client.get('/sessions/nope').status_code, 404)
+        self.assertEqual(self.client.post('/sessions/nope/ops', json={'ops': []}).status_code, 404)
+        self.assertEqual(self.client.post('/maps/no_such_map/sessions', json={}).status_code, 404)
+        bad = self.client.post(f'/maps/{MAP}/sessions', json={'ops': [{'op': 'add_target'}]})
+        self.assertEqual(bad.status_code, 400)
+        self.assertEqual(len(server.session_registry), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
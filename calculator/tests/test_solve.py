@@ -0,0 +1,124 @@
+import io
+import json
+import math
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+import numpy as np
+
+from calculator import keypads, solve
+from calculator.ballistics import calculate_firing_solutions, solution_to_dict
+from calculator.heightmap import MapData, clear_cache
+from map_fixtures import write_hill_map
+
+
+class SolveTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.maps_dir = Path(tmp.name)
+        self.map_dir = write_hill_map(self.maps_dir)
+        self.addCleanup(clear_cache, self.map_dir)
+        self.map_data = MapData(self.map_dir)
+        self.solver = solve.Solver(self.map_data)
+
+    def _lines(self, requests):
+        return [json.dumps(r) for r in requests]
+
+    def test_matches_solution_to_dict(self):
+        pairs = [((100, 100), (600, 700)), ((1024, 1024), (1100, 1000)), ((0, 0), (2000, 2000)),
+                 ((500, 500), (500.2, 500.2))]
+        requests = [{'id': i, 'mortar': {'x': m[0], 'y': m[1]}, 'target': {'x': t[0], 'y': t[1]}}
+                    for i, (m, t) in enumerate(pairs)]
+        output, errors = self.solver.solve_lines(self._lines(requests))
+        self.assertEqual(errors, 0)
+
+        for i, ((mx, my), (tx, ty)) in enumerate(pairs):
+            mz = self.map_data.elevation_at(mx, my)
+            tz = self.map_data.elevation_at(tx, ty)
+            expected = solution_to_dict(calculate_firing_solutions(mx, my, mz, tx, ty, tz), ())
+            self.assertEqual(json.loads(output[i]), {'id': i, **expected})
+
+    def test_grid_refs_and_errors(self):
+        lines = self._lines([
+            {'id': 'a', 'mortar': 'D6-7', 'target': 'E6-5'},
+            {'id': 'b', 'mortar': 'Z99', 'target': 'A1-1'},
+            {'mortar': {'x': 'nope', 'y': 1}, 'target': 'A1-1'},
+            [1, 2],
+        ]) + ['not json']
+        output, errors = self.solver.solve_lines(lines)
+        self.assertEqual(errors, 4)
+        results = [json.loads(line) for line in output]
+        self.assertEqual(results[0]['id'], 'a')
+        self.assertIn('azimuth', results[0])
+        self.assertEqual(results[1], {'id': 'b', 'error': "Invalid grid reference: 'Z99'"})
+        self.assertIn('Invalid coordinates', results[2]['error'])
+        self.assertIn('JSON object', results[3]['error'])
+        self.assertIn('Invalid JSON', results[4]['error'])
+
+    def test_each_line_is_one_request(self):
+        # Together these lines form a valid array, but the first two are invalid on their own
+        a, b, c, d = self._lines([{'id': i, 'mortar': 'D6-7', 'target': 'E6-5'} for i in 'abcd'])
+        nan_mortar = '{"id": "e", "mortar": {"x": NaN, "y": 5}, "target": "E6-5"}'
+        output, errors = self.solver.solve_lines([f'{a},{b}', f'[{c}', f' {d}]', f'  {a} ', nan_mortar])
+        self.assertEqual(errors, 4)
+        results = [json.loads(line) for line in output]
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all('Invalid JSON' in r['error'] for r in results[:3]), results)
+        self.assertEqual(results[3]['id'], 'a')
+        self.assertIn('azimuth', results[3])
+        self.assertEqual(results[4], {'id': 'e', 'error': "Coordinates must be finite: {'x': nan, 'y': 5}"})
+
+    def test_grid_refs_use_keypad_table(self):
+        # The saved table rounds elevations, so its values differ from interpolation
+        tables = keypads.build_keypad_tables(self.map_data.heightmap, self.map_data.metadata)
+        keypads.save_keypad_tables(self.map_dir / keypads.KEYPADS_FILENAME, tables)
+        keypads.clear_cache(self.map_dir)
+        self.addCleanup(keypads.clear_cache, self.map_dir)
+        solver = solve.Solver(self.map_data)
+
+        output, _ = solver.solve_lines(self._lines([{'mortar': 'D6-7', 'target': 'E6-5-3'}]))
+        mortar_z = solver.keypads.lookup('D', 6, 7)['elevation']
+        target_z = solver.keypads.lookup('E', 6, 5, 3)['cell']['center']
+        self.assertEqual(mortar_z, round(mortar_z, 2))
+        self.assertAlmostEqual(json.loads(output[0])['heightDelta'], target_z - mortar_z, places=9)
+
+    def test_stream_chunking_preserves_order(self):
+        rng = np.random.default_rng(5)
+        requests = [{'id': i, 'mortar': {'x': float(x), 'y': float(y)}, 'target': 'G7-5'}
+                    for i, (x, y) in enumerate(rng.uniform(0, 2048, (25, 2)))]
+        text = '\n'.join(self._lines(requests)) + '\n\n'
+
+        outputs = []
+        for chunk_size in (1, 7, 1000):
+            sink = io.StringIO()
+            solved, errors = solve.solve_stream(self.solver, io.StringIO(text), sink, chunk_size)
+            self.assertEqual((solved, errors), (25, 0))
+            outputs.append(sink.getvalue())
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], outputs[2])
+        self.assertEqual([json.loads(line)['id'] for line in outputs[0].splitlines()], list(range(25)))
+
+    def test_decimals_rounds_output(self):
+        solver = solve.Solver(self.map_data, decimals=2)
+        output, _ = solver.solve_lines(self._lines([{'mortar': 'B2-1', 'target': 'C3-5'}]))
+        result = json.loads(output[0])
+        self.assertEqual(result['distance'], round(result['distance'], 2))
+        self.assertTrue(math.isfinite(result['azimuth']))
+
+    def test_main_with_files(self):
+        input_path = self.maps_dir / 'in.jsonl'
+        output_path = self.maps_dir / 'out.jsonl'
+        input_path.write_text('{"mortar": "B2-1", "target": "C3-9"}\n{"mortar": "B2-1"}\n', encoding='utf-8')
+        with unittest.mock.patch('sys.stderr', io.StringIO()) as stderr:
+            code = solve.main(['hill', str(input_path), '-o', str(output_path),
+                               '--maps-dir', str(self.maps_dir)])
+        self.assertEqual(code, 1)  # one error line
+        self.assertEqual(len(output_path.read_text(encoding='utf-8').splitlines()), 2)
+        self.assertIn('1 solutions, 1 errors', stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
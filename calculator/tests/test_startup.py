@@ -0,0 +1,69 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from calculator import map_index, server, startup
+
+
+class MapIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.processed = Path(self.tmp.name)
+        for name in ('bravo', 'alpha'):
+            (self.processed / name).mkdir()
+            (self.processed / name / 'metadata.json').write_text('{}', encoding='utf-8')
+        (self.processed / '_blobs').mkdir()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_index_round_trip(self):
+        index = map_index.save_map_index(self.processed)
+        self.assertEqual(index['count'], 2)
+        self.assertEqual([m['name'] for m in map_index.load_map_index(self.processed)], ['alpha', 'bravo'])
+
+    def test_stale_or_missing_index_is_ignored(self):
+        self.assertIsNone(map_index.load_map_index(self.processed))
+        map_index.save_map_index(self.processed)
+        (self.processed / 'charlie').mkdir()
+        self.assertIsNone(map_index.load_map_index(self.processed))
+        # Bundles are read-only, so the index is trusted without the check
+        self.assertEqual(len(map_index.load_map_index(self.processed, verify=False)), 2)
+
+        (self.processed / map_index.MAP_INDEX_FILENAME).write_text(json.dumps({'format_version': 99}))
+        self.assertIsNone(map_index.load_map_index(self.processed, verify=False))
+
+    def test_server_lists_indexed_maps(self):
+        map_index.save_map_index(self.processed)
+        with mock.patch.object(server, 'PROCESSED_MAPS_DIR', self.processed):
+            data = server.app.test_client().get('/maps/list').get_json()
+        self.assertEqual(data, {'count': 2, 'maps': [{'name': 'alpha', 'path': 'alpha'},
+                                                     {'name': 'bravo', 'path': 'bravo'}]})
+
+
+class StartupTest(unittest.TestCase):
+    def test_timer_phases(self):
+        timer = startup.StartupTimer()
+        timer.mark('imports')
+        self.assertTrue(timer.mark_once('first request'))
+        self.assertFalse(timer.mark_once('first request'))
+        names = [phase['phase'] for phase in timer.report()['phases']]
+        self.assertEqual(names[-2:], ['imports', 'first request'])
+        self.assertGreaterEqual(timer.total(), sum(s for n, s in timer.phases if n != 'launch'))
+
+    def test_bind_port_skips_busy_port(self):
+        first = startup.bind_port(start_port=18480, max_attempts=5)
+        self.assertIsNotNone(first)
+        try:
+            second = startup.bind_port(start_port=first.getsockname()[1], max_attempts=5)
+            self.assertIsNotNone(second)
+            self.assertNotEqual(second.getsockname()[1], first.getsockname()[1])
+            second.close()
+        finally:
+            first.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import unittest
+
+import numpy as np
+from werkzeug.datastructures import MIMEAccept
+
+from calculator import server, streaming
+
+COLUMNS = (('x', 'f'), ('count', 'H'), ('flag', 'B'))
+
+
+class StreamingFormatTest(unittest.TestCase):
+    def test_frames_round_trip(self):
+        chunks = [{'x': np.array([1.5, np.nan]), 'count': np.array([7, 65535]), 'flag': np.array([True, False])},
+                  {'x': np.array([]), 'count': np.array([]), 'flag': np.array([])},
+                  {'x': np.array([-2.0]), 'count': np.array([0]), 'flag': np.array([1])}]
+        data = b''.join(streaming.frame_stream(COLUMNS, chunks))
+        columns = streaming.decode_frames(data)
+        np.testing.assert_array_equal(columns['x'], np.array([1.5, np.nan, -2.0], dtype=np.float32))
+        self.assertEqual(columns['count'].dtype, np.uint16)
+        self.assertEqual(columns['count'].tolist(), [7, 65535, 0])
+        self.assertEqual(columns['flag'].tolist(), [1, 0, 1])
+
+        with self.assertRaises(ValueError):
+            streaming.decode_frames(data[:-streaming.ROW_COUNT.size])
+        with self.assertRaises(ValueError):
+            streaming.decode_frames(b'PRHM' + data[4:])
+
+    def test_json_and_ndjson(self):
+        chunks = [['1', '2'], [], ['3']]
+        document = ''.join(streaming.json_document({'map': 'adak'}, 'rows', chunks))
+        self.assertEqual(json.loads(document), {'map': 'adak', 'rows': [1, 2, 3]})
+        self.assertEqual(json.loads(''.join(streaming.json_document({}, 'rows', []))), {'rows': []})
+        self.assertEqual(''.join(streaming.ndjson_lines(chunks)), '1\n2\n3\n')
+
+    def test_negotiate(self):
+        self.assertEqual(streaming.negotiate(MIMEAccept()), streaming.JSON)
+        self.assertEqual(streaming.negotiate(MIMEAccept([('*/*', 1)])), streaming.JSON)
+        self.assertEqual(streaming.negotiate(MIMEAccept([(streaming.NDJSON, 1), (streaming.JSON, 0.5)])),
+                         streaming.NDJSON)
+        self.assertIsNone(streaming.negotiate(MIMEAccept([(streaming.FRAMES, 1)]),
+                                              (streaming.JSON, streaming.NDJSON)))
+
+
+class StreamingEndpointTest(unittest.TestCase):
+    MAP = 'muttrah_city_2'
+    TARGETS = ['F6-3', {'x': 900, 'y': 700}, 'D6-5']
+
+    def setUp(self):
+        if not (server.PROCESSED_MAPS_DIR / self.MAP / 'metadata.json').is_file():
+            self.skipTest(f'{self.MAP} not processed')
+        server.app.config['TESTING'] = True
+        self.client = server.app.test_client()
+
+    def post(self, path, body, accept=None):
+        return self.client.post(f'/maps/{self.MAP}/{path}', json=body,
+                                headers={'Accept': accept} if accept else {})
+
+    def test_solutions_in_every_format(self):
+        body = {'mortar': 'D6-5', 'targets': self.TARGETS}
+        document = self.post('solutions', body).get_json()
+        self.assertEqual(document['count'], 3)
+        self.assertEqual(document['solutions'][2]['status'], 'TOO_CLOSE')
+
+        rv = self.post('solutions', body, streaming.NDJSON)
+        self.assertEqual(rv.mimetype, streaming.NDJSON)
+        lines = [json.loads(line) for line in rv.get_data(as_text=True).splitlines()]
+        self.assertEqual(lines, document['solutions'])
+
+        rv = self.post('solutions', body, streaming.FRAMES)
+        columns = streaming.decode_frames(rv.get_data())
+        np.testing.assert_allclose(columns['elevation_mils'][:2],
+                                   [s['elevationMils'] for s in document['solutions'][:2]], rtol=1e-6)
+        self.assertEqual(columns['valid'].tolist(), [s['valid'] for s in document['solutions']])
+
+    def test_solutions_invalid_request(self):
+        for body in ({'mortar': 'D6-5'}, {'mortar': 'Z99', 'targets': ['F6-3']},
+                     {'mortar': 'D6-5', 'targets': ['F6-3'], 'decimals': -1}):
+            self.assertEqual(self.post('solutions', body).status_code, 400, body)
+        self.assertEqual(self.post('solutions', {'mortar': 'D6-5', 'targets': ['F6-3']}, 'text/csv').status_code, 406)
+        # Non-finite coordinates (NaN, or 1e400 overflowing to infinity)
+        for text in ('{"mortar": "D6-5", "targets": [{"x": NaN, "y": 700}]}',
+                     '{"mortar": {"x": 1e400, "y": 700}, "targets": ["F6-3"]}'):
+            rv = self.client.post(f'/maps/{self.MAP}/solutions', data=text, content_type='application/json')
+            self.assertEqual(rv.status_code, 400, text)
+
+    def test_grid_refs_streaming(self):
+        rv = self.post('grid-refs', {'refs': ['D6-5', 'bad']}, streaming.NDJSON)
+        lines = [json.loads(line) for line in rv.get_data(as_text=True).splitlines()]
+        self.assertEqual(lines[1], None)
+        columns = streaming.decode_frames(self.post('grid-refs', {'refs': ['D6-5', 'bad']}, streaming.FRAMES).get_data())
+        self.assertEqual(columns['valid'].tolist(), [1, 0])
+        self.assertAlmostEqual(float(columns['x'][0]), lines[0]['x'], places=3)
+
+        positions = {'positions': [lines[0]]}
+        self.assertEqual(self.post('grid-refs', positions, streaming.NDJSON).get_data(as_text=True), '"D6-5"\n')
+        self.assertEqual(self.post('grid-refs', positions, streaming.FRAMES).status_code, 406)
+
+
+if __name__ == '__main__':
+    unittest.main()
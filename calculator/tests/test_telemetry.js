@@ -0,0 +1,51 @@
+import assert from 'node:assert';
+import { decodeHeightmapCodec } from '../static/js/heightmap.js';
+import {
+  TELEMETRY_BATCH_SIZE, buildBeacon, configureTelemetry, flushTelemetry, recordMapLoad, reportMapOpen
+} from '../static/js/telemetry.js';
+
+// 5x4 heightmap.bin fixture (see test_heightmap.js)
+const CODEC_FIXTURE = 'UFJITQEAAAAFAAAABAAAAHjaY3Sz6pp1qU7451JViTmyZU57nV0yGTgFJRUYGRiBCAhBNIMCAPnmCHw=';
+
+const TIMINGS = {
+  source: 'bin',
+  phases: { fetch: 12.5, decompress: 3.1, reconstruct: 2.4, total: 18 },
+  transferBytes: 64,
+  heightmapBytes: 40
+};
+
+export async function runTelemetryTests() {
+  // Codec decoding reports its own phases
+  const phases = {};
+  const bytes = Buffer.from(CODEC_FIXTURE, 'base64');
+  await decodeHeightmapCodec(bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.byteLength), phases);
+  assert.deepStrictEqual(Object.keys(phases), ['decompress', 'reconstruct']);
+  assert.ok(phases.decompress >= 0 && phases.reconstruct >= 0);
+
+  const beacon = buildBeacon('muttrah_city_2', TIMINGS);
+  assert.strictEqual(beacon.map, 'muttrah_city_2');
+  assert.deepStrictEqual(beacon.phases, TIMINGS.phases);
+  assert.strictEqual(beacon.transferBytes, 64);
+
+  const sent = [];
+  configureTelemetry({ sampled: false, send: (endpoint, body) => sent.push([endpoint, JSON.parse(body)]) });
+  assert.strictEqual(recordMapLoad('muttrah_city_2', TIMINGS), false);
+  assert.strictEqual(flushTelemetry(), 0);
+
+  // Map opens are reported even when timings are not sampled
+  reportMapOpen('muttrah_city_2');
+  assert.deepStrictEqual(sent.splice(0), [['/maps/muttrah_city_2/open', {}]]);
+
+  // Sampled page load: batches of TELEMETRY_BATCH_SIZE, cache hits skipped
+  configureTelemetry({ sampled: true });
+  assert.strictEqual(recordMapLoad('muttrah_city_2', null), false);
+  for (let i = 0; i < TELEMETRY_BATCH_SIZE + 2; i++) {
+    assert.strictEqual(recordMapLoad('muttrah_city_2', TIMINGS), true);
+  }
+  assert.strictEqual(sent.length, 1);
+  assert.strictEqual(sent[0][0], '/telemetry');
+  assert.strictEqual(sent[0][1].beacons.length, TELEMETRY_BATCH_SIZE);
+  assert.strictEqual(flushTelemetry(), 2);
+  assert.strictEqual(sent[1][1].beacons.length, 2);
+  assert.strictEqual(flushTelemetry(), 0);
+}
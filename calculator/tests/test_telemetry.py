@@ -0,0 +1,80 @@
+import json
+import unittest
+from unittest import mock
+
+from calculator import server, telemetry
+from calculator.telemetry import TelemetryStore, parse_beacons
+
+
+def beacon(map_name='muttrah_city_2', total=100.0, **extra):
+    return {'map': map_name, 'source': 'bin',
+            'phases': {'fetch': total * 0.6, 'decompress': total * 0.3, 'total': total}, **extra}
+
+
+class TelemetryStoreTest(unittest.TestCase):
+    def test_percentiles_per_map_and_phase(self):
+        store = TelemetryStore()
+        for start in (1, 51):
+            store.record(parse_beacons({'beacons': [beacon(total=float(t), heightmapBytes=8_000_000)
+                                                    for t in range(start, start + 50)]}))
+        store.record(parse_beacons({'beacons': [beacon('adak', total=5000.0)]}))
+        store.record(parse_beacons({'beacons': [{**beacon('adak'), 'source': 'tiles'}]}))
+
+        summary = store.summary()
+        self.assertEqual(list(summary), ['adak', 'muttrah_city_2'])  # slowest p95 first
+        entry = summary['muttrah_city_2']
+        self.assertEqual(entry['beacons'], 100)
+        self.assertEqual(entry['sources'], {'bin': 100})
+        self.assertEqual(entry['phases']['total'], {'count': 100, 'p50': 50.0, 'p75': 75.0,
+                                                    'p95': 95.0, 'p99': 99.0, 'max': 100.0})
+        self.assertEqual(entry['heightmap_bytes']['p50'], 8_000_000)
+        self.assertEqual(summary['adak']['sources'], {'bin': 1, 'tiles': 1})
+        self.assertEqual(list(store.summary('adak')), ['adak'])
+        self.assertEqual(store.summary('missing'), {})
+
+    def test_series_keep_recent_samples_only(self):
+        store = TelemetryStore(samples_per_series=10)
+        store.record([telemetry.parse_beacon(beacon(total=float(t))) for t in range(50)])
+        total = store.summary()['muttrah_city_2']['phases']['total']
+        self.assertEqual((total['count'], total['p50']), (10, 44.0))
+
+    def test_invalid_beacons_rejected(self):
+        for body in (None, {}, {'beacons': []}, {'beacons': [beacon()] * (telemetry.MAX_BEACONS_PER_BATCH + 1)},
+                     {'beacons': [beacon('../etc')]}, {'beacons': [{'map': 'adak', 'phases': {}}]},
+                     {'beacons': [{'map': 'adak', 'phases': {'Total Time': 1}}]},
+                     {'beacons': [{'map': 'adak', 'phases': {'total': -1}}]},
+                     {'beacons': [{'map': 'adak', 'phases': {'total': True}}]},
+                     {'beacons': [beacon(memoryBytes='lots')]}):
+            with self.subTest(body=body), self.assertRaises(ValueError):
+                parse_beacons(body)
+
+
+class TelemetryEndpointTest(unittest.TestCase):
+    def setUp(self):
+        self.client = server.app.test_client()
+        patcher = mock.patch.object(server, 'telemetry_store', TelemetryStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_beacons_aggregated_with_server_metrics(self):
+        # sendBeacon posts a Blob, so the content type is not always JSON
+        body = json.dumps({'beacons': [beacon(), beacon(total=300.0), beacon('no_such_map')]})
+        response = self.client.post('/telemetry', data=body, content_type='text/plain')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json(), {'accepted': 2, 'dropped': 1})
+
+        data = self.client.get('/telemetry').get_json()
+        self.assertEqual(list(data['maps']), ['muttrah_city_2'])
+        self.assertEqual(data['maps']['muttrah_city_2']['phases']['total']['max'], 300.0)
+        self.assertIn('map_opens', data['server'])
+        self.assertIn('startup', data['server'])
+
+    def test_bad_batches_rejected(self):
+        response = self.client.post('/telemetry', data='not json')
+        self.assertEqual(response.status_code, 400)
+        oversized = json.dumps({'beacons': [beacon()], 'padding': 'x' * server.MAX_TELEMETRY_BYTES})
+        self.assertEqual(self.client.post('/telemetry', data=oversized).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from calculator import server, terrain
+from calculator.heightmap import get_elevation
+
+
+def _synthetic_map(resolution=65):
+    """Smooth hill in the middle of a flat 256m map."""
+    coords = np.linspace(-1, 1, resolution)
+    xx, yy = np.meshgrid(coords, coords)
+    heightmap = (40000 * np.exp(-4 * (xx ** 2 + yy ** 2))).astype(np.uint16)
+    metadata = {'map_size': 256, 'height_scale': 300}
+    return heightmap, metadata
+
+
+class TerrainAccelTest(unittest.TestCase):
+    def setUp(self):
+        self.heightmap, self.metadata = _synthetic_map()
+        self.arrays = terrain.build_terrain_arrays(self.heightmap, self.metadata)
+        self.accel = terrain.TerrainAccel(self.heightmap, self.metadata, self.arrays)
+
+    def test_pyramid_bounds_heightmap(self):
+        levels = terrain.build_minmax_pyramid(self.heightmap)
+        self.assertEqual(levels[-1][0].shape, (1, 1))
+        self.assertEqual(int(levels[-1][0][0, 0]), int(self.heightmap.min()))
+        self.assertEqual(int(levels[-1][1][0, 0]), int(self.heightmap.max()))
+
+    def test_stats_match_heightmap(self):
+        self.assertEqual(self.accel.stats['max'], int(self.heightmap.max()))
+        self.assertAlmostEqual(self.accel.stats['mean'], float(self.heightmap.mean()))
+
+    def test_region_min_max_is_conservative(self):
+        low, high = self.accel.region_min_max(100, 100, 150, 150)
+        samples = get_elevation(np.linspace(100, 150, 50), np.linspace(100, 150, 50),
+                                self.heightmap, 300, 256)
+        self.assertLessEqual(low, samples.min())
+        self.assertGreaterEqual(high, samples.max())
+
+    def test_flat_slope_is_zero(self):
+        self.assertEqual(float(self.accel.slope_at(0, 0)), 0.0)
+        self.assertGreater(float(self.accel.slope_at(80, 128)), 0.0)
+
+    def test_stale_file_is_rebuilt(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            terrain.save_terrain_arrays(Path(tmp) / terrain.ACCEL_FILENAME, self.arrays)
+            changed = self.heightmap.copy()
+            changed[0, 0] = 65535
+            accel = terrain.load_terrain_accel(Path(tmp), changed, self.metadata)
+            terrain.clear_cache(Path(tmp))
+            self.assertEqual(accel.stats['max'], 65535)
+
+
+class TerrainEndpointTest(unittest.TestCase):
+    def setUp(self):
+        server.app.config['TESTING'] = True
+        self.client = server.app.test_client()
+
+    def test_terrain_summary(self):
+        if not (server.PROCESSED_MAPS_DIR / 'adak').is_dir():
+            self.skipTest('processed map not available')
+        rv = self.client.get('/maps/adak/terrain')
+        self.assertEqual(rv.status_code, 200)
+        data = rv.get_json()
+        self.assertIn('stats', data)
+        self.assertLessEqual(data['stats']['min'], data['stats']['max'])
+
+    def test_terrain_unknown_map(self):
+        rv = self.client.get('/maps/this_map_does_not_exist/terrain')
+        self.assertEqual(rv.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
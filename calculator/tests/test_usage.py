@@ -0,0 +1,88 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from calculator import heightmap, heightmap_tiles, server
+from calculator.usage import MapUsageStats
+
+
+class MapUsageStatsTest(unittest.TestCase):
+    def test_counts_persist_across_restarts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'map_usage.json'
+            stats = MapUsageStats(path)
+            for name in ('adak', 'kashan_desert', 'kashan_desert', 'fools_road', 'kashan_desert', 'adak'):
+                stats.record(name)
+            stats.save()
+
+            reloaded = MapUsageStats(path)
+            self.assertEqual(reloaded.counts, {'adak': 2, 'kashan_desert': 3, 'fools_road': 1})
+            self.assertEqual(reloaded.last_used, 'adak')
+            self.assertEqual(reloaded.top(2), ['kashan_desert', 'adak'])
+
+    def test_corrupt_file_starts_empty(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'map_usage.json'
+            path.write_text('{not json', encoding='utf-8')
+            stats = MapUsageStats(path)
+            self.assertEqual(stats.counts, {})
+            self.assertIsNone(stats.last_used)
+
+    def test_in_memory_stats_never_write(self):
+        stats = MapUsageStats()
+        stats.record('adak')
+        stats.save()
+        self.assertEqual(stats.top(5), ['adak'])
+
+
+class UsageEndpointsTest(unittest.TestCase):
+    MAP = 'muttrah_city_2'
+
+    def setUp(self):
+        if not (server.PROCESSED_MAPS_DIR / self.MAP / 'metadata.json').is_file():
+            self.skipTest(f'{self.MAP} not processed')
+        server.app.config['TESTING'] = True
+        self.client = server.app.test_client()
+        patcher = mock.patch.object(server, 'usage_stats', MapUsageStats())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_open_signal_counts_as_use(self):
+        for path in ('metadata.json', 'heightmap.json.gz', 'heightmap/tiles'):
+            rv = self.client.get(f'/maps/{self.MAP}/{path}')
+            rv.close()
+        self.assertEqual(server.usage_stats.counts, {})
+
+        self.assertEqual(self.client.post(f'/maps/{self.MAP}/open').status_code, 204)
+        self.assertEqual(server.usage_stats.counts, {self.MAP: 1})
+        self.assertEqual(server.usage_stats.last_used, self.MAP)
+        self.assertEqual(self.client.post('/maps/this_map_does_not_exist/open').status_code, 404)
+
+    def test_index_preloads_last_used_map(self):
+        self.assertNotIn('Link', self.client.get('/').headers)
+
+        server.usage_stats.record(self.MAP)
+        link = self.client.get('/').headers['Link']
+        self.assertEqual(link, f'</maps/{self.MAP}/metadata.json>; rel=preload; as=fetch; crossorigin, '
+                               f'</maps/{self.MAP}/heightmap/tiles>; rel=preload; as=fetch; crossorigin')
+        # Fetching the preloaded files is not a use
+        for path in ('metadata.json', 'heightmap/tiles'):
+            rv = self.client.get(f'/maps/{self.MAP}/{path}')
+            rv.close()
+        self.assertEqual(server.usage_stats.counts, {self.MAP: 1})
+
+    def test_warm_cache_decodes_heightmap(self):
+        map_dir = server.PROCESSED_MAPS_DIR / self.MAP
+        heightmap.clear_cache(map_dir)
+        heightmap_tiles.clear_cache(map_dir)
+        self.addCleanup(heightmap_tiles.clear_cache, map_dir)
+        with tempfile.TemporaryDirectory() as tmp, mock.patch('builtins.print'), \
+                mock.patch.object(server, 'TILE_CACHE_DIR', Path(tmp)):
+            server.warm_cache([self.MAP, 'this_map_does_not_exist'])
+            self.assertEqual(len(list(Path(tmp).glob(f'{self.MAP}-*.npy'))), 1)
+        self.assertIn(str(map_dir), heightmap._heightmap_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
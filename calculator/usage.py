@@ -0,0 +1,92 @@
+"""
+Per-Map Usage Statistics
+
+Map popularity is heavily skewed, so the server counts how often each map
+is opened (the UI's POST /maps/<map>/open) and persists the counts as a
+small JSON file. At startup the most-used maps are
+pre-warmed and the index page preloads the last-used map's metadata and
+heightmap tile index.
+
+File format (map_usage.json):
+    {"counts": {"muttrah_city_2": 42, ...}, "last_used": "muttrah_city_2"}
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Minimum seconds between writes; counts are also flushed on shutdown
+SAVE_INTERVAL = 5.0
+
+
+class MapUsageStats:
+    """Thread-safe per-map access counter, optionally persisted to disk."""
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: JSON file to load from and save to, or None for in-memory only
+        """
+        self.path = Path(path) if path else None
+        self.counts: Dict[str, int] = {}
+        self.last_used: Optional[str] = None
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self._dirty = False
+        self.load()
+
+    def load(self) -> None:
+        """Load counts from disk; a missing or corrupt file starts from zero."""
+        if self.path is None or not self.path.is_file():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        counts = data.get('counts') or {}
+        with self._lock:
+            self.counts = {name: int(count) for name, count in counts.items() if isinstance(count, int)}
+            last_used = data.get('last_used')
+            self.last_used = last_used if isinstance(last_used, str) else None
+
+    def record(self, map_name: str) -> None:
+        """Count one access to a map (saved at most every SAVE_INTERVAL seconds)."""
+        with self._lock:
+            self.counts[map_name] = self.counts.get(map_name, 0) + 1
+            self.last_used = map_name
+            self._dirty = True
+            due = time.monotonic() - self._last_save >= SAVE_INTERVAL
+        if due:
+            self.save()
+
+    def top(self, n: int) -> List[str]:
+        """The n most-used map names, most used first (ties by name)."""
+        with self._lock:
+            ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+        return [name for name, _ in ranked[:n]]
+
+    def ranked(self) -> Dict[str, int]:
+        """All counts, most used first (ties by name)."""
+        with self._lock:
+            return dict(sorted(self.counts.items(), key=lambda item: (-item[1], item[0])))
+
+    def save(self) -> None:
+        """Write counts atomically (temp file + rename) if anything changed."""
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'counts': dict(self.counts), 'last_used': self.last_used}
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            tmp_path.write_text(json.dumps(data, indent=2, sort_keys=True), encoding='utf-8')
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[WARNING] Could not save map usage stats: {e}")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Build keypad / sub-keypad elevation lookup tables for processed maps.
+
+For every processed map this writes keypads.json.gz alongside the
+heightmap: elevations at every gridRefToXY position, plus centre/min/max
+elevation of every keypad (39×39) and sub-keypad (117×117) cell. The
+server exposes them at /maps/<map>/keypads; see calculator/keypads.py
+for the format.
+
+Usage:
+    python processor/build_keypad_tables.py              # all maps
+    python processor/build_keypad_tables.py adak kashan_desert
+"""
+
+import sys
+import time
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from calculator.heightmap import has_heightmap, load_heightmap, load_metadata  # noqa: E402
+from calculator.keypads import KEYPADS_FILENAME, build_keypad_tables, save_keypad_tables  # noqa: E402
+
+
+def build_keypad_table(map_dir: Path) -> int:
+    """Build keypads.json.gz for one processed map directory.
+
+    Returns:
+        Size of the written file in bytes
+    """
+    heightmap = load_heightmap(map_dir)
+    metadata = load_metadata(map_dir)
+    output_file = map_dir / KEYPADS_FILENAME
+    save_keypad_tables(output_file, build_keypad_tables(heightmap, metadata))
+    return output_file.stat().st_size
+
+
+def main(map_names):
+    processed_maps_dir = repo_root / 'processed_maps'
+
+    if not processed_maps_dir.is_dir():
+        print("ERROR: processed_maps directory not found")
+        print(f"Expected location: {processed_maps_dir}")
+        sys.exit(1)
+
+    if map_names:
+        map_dirs = [processed_maps_dir / name for name in map_names]
+    else:
+        map_dirs = sorted(p.parent for p in processed_maps_dir.glob('*/metadata.json') if has_heightmap(p.parent))
+
+    print(f"Building keypad lookup tables for {len(map_dirs)} maps...\n")
+
+    start = time.perf_counter()
+    total_size = 0
+    errors = 0
+    for map_dir in map_dirs:
+        try:
+            map_start = time.perf_counter()
+            size = build_keypad_table(map_dir)
+            total_size += size
+            print(f"  {map_dir.name:30} {size/1024:>8.1f}KB  ({time.perf_counter() - map_start:.2f}s)")
+        except (OSError, ValueError, KeyError) as e:
+            errors += 1
+            print(f"  {map_dir.name:30} ERROR: {e}")
+
+    print("\n" + "="*80)
+    print(f"Built {len(map_dirs) - errors} files, {total_size/1024/1024:.1f}MB total "
+          f"in {time.perf_counter() - start:.1f}s ({errors} errors)")
+    print("="*80)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Build the prebuilt map index (processed_maps/maps_index.json).
+
+The server answers /maps/list and counts maps at startup from this file
+instead of checking every map directory; see calculator/map_index.py.
+Re-run after adding or removing maps (process_one_map.py and the
+PyInstaller spec do this automatically).
+
+Usage:
+    python processor/build_map_index.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from calculator.map_index import MAP_INDEX_FILENAME, save_map_index  # noqa: E402
+
+
+def main():
+    processed_maps_dir = repo_root / 'processed_maps'
+
+    if not processed_maps_dir.is_dir():
+        print("ERROR: processed_maps directory not found")
+        print(f"Expected location: {processed_maps_dir}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    index = save_map_index(processed_maps_dir)
+
+    print("="*80)
+    print(f"Indexed {index['count']} maps in {processed_maps_dir / MAP_INDEX_FILENAME} "
+          f"({(time.perf_counter() - start) * 1000:.1f}ms)")
+    print("="*80)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Build hillshade and contour overlay tiles for processed maps.
+
+Ridges and valleys are hard to judge from the flat minimap. This script
+renders two transparent overlays from each map's heightmap, once, at build
+time:
+
+- hillshade: terrain lit from the north-west. Slopes facing the light are
+  brightened and slopes facing away are darkened. Flat ground is fully
+  transparent, so the minimap shows through.
+- contours: lines at a fixed elevation interval (every fifth line drawn
+  bolder), traced with marching squares.
+
+Both overlays reuse the map's height_scale (raw value → meters) and
+meters_per_pixel (gradient spacing). They have one image pixel per
+heightmap cell, cut into TILE_SIZE PNG tiles.
+
+Outputs in processed_maps/<map>/:
+    overlays/hillshade/<i>_<j>.png   - tile row i (from the north), column j
+    overlays/contours/<i>_<j>.png
+
+metadata.json's "overlays" entry records the tile layout and parameters.
+The server serves tiles at /maps/<map>/overlays/<layer>/<i>_<j>.png. The UI
+adds them as optional Leaflet layers.
+
+Usage:
+    python processor/build_overlays.py                       # all maps
+    python processor/build_overlays.py adak kashan_desert    # selected maps
+    python processor/build_overlays.py --contour-interval 5 --jobs 4
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from calculator.heightmap import has_heightmap, load_heightmap, load_metadata  # noqa: E402
+
+OVERLAYS_DIRNAME = 'overlays'
+LAYERS = ('hillshade', 'contours')
+
+# Image pixels per tile edge
+TILE_SIZE = 256
+
+# Cells rendered around a tile when re-rendering it alone (update_overlay_tiles)
+OVERLAY_MARGIN = 2
+
+# Light direction: degrees clockwise from north, degrees above the horizon
+LIGHT_AZIMUTH = 315.0
+LIGHT_ALTITUDE = 45.0
+
+# Strongest shading (alpha) on the steepest slopes
+HILLSHADE_MAX_ALPHA = 160
+
+# Automatic contour interval: the finest that keeps the map's relief
+# within MAX_CONTOUR_LEVELS lines
+CONTOUR_INTERVALS = (1, 2, 5, 10, 20, 25, 50, 100)
+MAX_CONTOUR_LEVELS = 40
+MAJOR_CONTOUR_EVERY = 5
+
+CONTOUR_COLOR = (110, 70, 30)
+CONTOUR_ALPHA = 150
+MAJOR_CONTOUR_ALPHA = 220
+
+# Points drawn along each contour segment (a segment spans at most one cell diagonal)
+SEGMENT_SAMPLES = 4
+
+# Marching squares: corner bits tl=8, tr=4, br=2, bl=1 → crossed edge pairs.
+# Saddles (5, 10) keep the two high corners apart.
+_EDGE_PAIRS = {
+    1: [('left', 'bottom')], 2: [('bottom', 'right')], 3: [('left', 'right')],
+    4: [('top', 'right')], 5: [('top', 'right'), ('left', 'bottom')],
+    6: [('top', 'bottom')], 7: [('top', 'left')], 8: [('top', 'left')],
+    9: [('top', 'bottom')], 10: [('top', 'left'), ('bottom', 'right')],
+    11: [('top', 'right')], 12: [('left', 'right')], 13: [('bottom', 'right')],
+    14: [('left', 'bottom')],
+}
+
+
+def elevation_meters(heightmap: np.ndarray, metadata: Dict) -> np.ndarray:
+    """Heightmap samples in meters (float32)."""
+    return heightmap.astype(np.float32) * np.float32(metadata['height_scale'] / 65535.0)
+
+
+def meters_per_pixel(metadata: Dict, resolution: int) -> float:
+    return metadata.get('meters_per_pixel') or metadata['map_size'] / (resolution - 1)
+
+
+def hillshade(elevations: np.ndarray, pixel_meters: float,
+              azimuth: float = LIGHT_AZIMUTH, altitude: float = LIGHT_ALTITUDE) -> np.ndarray:
+    """Illumination (0-1) of each heightmap cell; one value per cell, (res-1)².
+
+    The gradient of each cell is the mean of its two edge differences
+    per axis, so cell (r, c) is exactly the area between samples r..r+1 and
+    c..c+1 (row 0 north, column 0 west).
+    """
+    z = elevations.astype(np.float32)
+    dz_east = ((z[:-1, 1:] - z[:-1, :-1]) + (z[1:, 1:] - z[1:, :-1])) / np.float32(2 * pixel_meters)
+    dz_south = ((z[1:, :-1] - z[:-1, :-1]) + (z[1:, 1:] - z[:-1, 1:])) / np.float32(2 * pixel_meters)
+
+    az, alt = np.radians(azimuth), np.radians(altitude)
+    light_east = np.float32(np.sin(az) * np.cos(alt))
+    light_north = np.float32(np.cos(az) * np.cos(alt))
+    light_up = np.float32(np.sin(alt))
+    # Surface normal (-dz/dx_east, -dz/dy_north, 1) with dy_north = -dy_south
+    shade = (-dz_east * light_east + dz_south * light_north + light_up) / np.sqrt(dz_east ** 2 + dz_south ** 2 + 1)
+    return np.clip(shade, 0, 1)
+
+
+def hillshade_rgba(shade: np.ndarray, altitude: float = LIGHT_ALTITUDE) -> np.ndarray:
+    """Transparent overlay: white over lit slopes, black over shaded ones."""
+    flat = np.float32(np.sin(np.radians(altitude)))
+    lit = shade > flat
+    strength = np.where(lit, (shade - flat) / (1 - flat), (flat - shade) / flat)
+    rgba = np.zeros(shade.shape + (4,), dtype=np.uint8)
+    rgba[lit, :3] = 255
+    rgba[..., 3] = np.round(np.clip(strength, 0, 1) * HILLSHADE_MAX_ALPHA).astype(np.uint8)
+    return rgba
+
+
+def contour_interval(elevations: np.ndarray) -> float:
+    """Finest interval from CONTOUR_INTERVALS giving at most MAX_CONTOUR_LEVELS lines."""
+    relief = float(elevations.max() - elevations.min())
+    for interval in CONTOUR_INTERVALS:
+        if relief / interval <= MAX_CONTOUR_LEVELS:
+            return interval
+    return CONTOUR_INTERVALS[-1]
+
+
+def contour_levels(elevations: np.ndarray, interval: float) -> np.ndarray:
+    """Multiples of interval strictly inside the elevation range."""
+    low = np.floor(float(elevations.min()) / interval) + 1
+    high = np.ceil(float(elevations.max()) / interval) - 1
+    return np.arange(low, high + 1) * interval
+
+
+def trace_contours(elevations: np.ndarray, level: float) -> np.ndarray:
+    """Contour segments at one level (marching squares).
+
+    Returns:
+        (n, 4) float array of x0, y0, x1, y1 in sample coordinates
+        (x = column, y = row)
+    """
+    z = elevations
+    tl, tr, br, bl = z[:-1, :-1], z[:-1, 1:], z[1:, 1:], z[1:, :-1]
+    cell_min = np.minimum(np.minimum(tl, tr), np.minimum(br, bl))
+    cell_max = np.maximum(np.maximum(tl, tr), np.maximum(br, bl))
+    rows, cols = np.nonzero((cell_min < level) & (cell_max >= level))
+    if rows.size == 0:
+        return np.empty((0, 4))
+
+    corners = {name: corner[rows, cols].astype(np.float64)
+               for name, corner in (('tl', tl), ('tr', tr), ('br', br), ('bl', bl))}
+    case = ((corners['tl'] >= level) * 8 + (corners['tr'] >= level) * 4
+            + (corners['br'] >= level) * 2 + (corners['bl'] >= level))
+    x, y = cols.astype(np.float64), rows.astype(np.float64)
+
+    def crossing(a, b):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.clip(np.nan_to_num((level - a) / (b - a)), 0, 1)
+
+    def edge_point(edge, mask):
+        c = {name: values[mask] for name, values in corners.items()}
+        if edge == 'top':
+            return x[mask] + crossing(c['tl'], c['tr']), y[mask]
+        if edge == 'right':
+            return x[mask] + 1, y[mask] + crossing(c['tr'], c['br'])
+        if edge == 'bottom':
+            return x[mask] + crossing(c['bl'], c['br']), y[mask] + 1
+        return x[mask], y[mask] + crossing(c['tl'], c['bl'])
+
+    segments = []
+    for code, pairs in _EDGE_PAIRS.items():
+        mask = case == code
+        if not mask.any():
+            continue
+        for edge_a, edge_b in pairs:
+            x0, y0 = edge_point(edge_a, mask)
+            x1, y1 = edge_point(edge_b, mask)
+            segments.append(np.column_stack([x0, y0, x1, y1]))
+    return np.concatenate(segments) if segments else np.empty((0, 4))
+
+
+def rasterize_segments(segments: np.ndarray, shape) -> np.ndarray:
+    """Boolean mask of the image pixels (one per cell) the segments pass through."""
+    mask = np.zeros(shape, dtype=bool)
+    if len(segments) == 0:
+        return mask
+    t = np.linspace(0, 1, SEGMENT_SAMPLES)[:, None]
+    xs = segments[:, 0] + t * (segments[:, 2] - segments[:, 0])
+    ys = segments[:, 1] + t * (segments[:, 3] - segments[:, 1])
+    cols = np.clip(np.floor(xs).astype(np.intp), 0, shape[1] - 1)
+    rows = np.clip(np.floor(ys).astype(np.intp), 0, shape[0] - 1)
+    mask[rows.ravel(), cols.ravel()] = True
+    return mask
+
+
+def _thicken(mask: np.ndarray) -> np.ndarray:
+    """Grow a line mask by one pixel right and down (2 px lines)."""
+    thick = mask.copy()
+    thick[:, 1:] |= mask[:, :-1]
+    thick[1:, :] |= mask[:-1, :]
+    thick[1:, 1:] |= mask[:-1, :-1]
+    return thick
+
+
+def contours_rgba(elevations: np.ndarray, interval: float, levels: Optional[np.ndarray] = None) -> np.ndarray:
+    """Transparent overlay of contour lines, one pixel per heightmap cell.
+
+    levels defaults to contour_levels(elevations, interval); pass the whole
+    map's levels when rendering part of it.
+    """
+    shape = (elevations.shape[0] - 1, elevations.shape[1] - 1)
+    minor = np.zeros(shape, dtype=bool)
+    major = np.zeros(shape, dtype=bool)
+    if levels is None:
+        levels = contour_levels(elevations, interval)
+    for level in levels:
+        lines = rasterize_segments(trace_contours(elevations, level), shape)
+        if round(level / interval) % MAJOR_CONTOUR_EVERY == 0:
+            major |= lines
+        else:
+            minor |= lines
+    major = _thicken(major)
+
+    rgba = np.zeros(shape + (4,), dtype=np.uint8)
+    rgba[minor | major, :3] = CONTOUR_COLOR
+    rgba[minor, 3] = CONTOUR_ALPHA
+    rgba[major, 3] = MAJOR_CONTOUR_ALPHA
+    return rgba
+
+
+def write_tiles(rgba: np.ndarray, output_dir: Path, tile_size: int = TILE_SIZE) -> int:
+    """Cut an RGBA image into <i>_<j>.png tiles, replacing older tiles.
+
+    Edge tiles are padded with transparent pixels to the full tile size.
+
+    Returns:
+        Total size of the written tiles in bytes
+    """
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    output_dir.mkdir(parents=True)
+    tiles = -(-rgba.shape[0] // tile_size)
+    total = 0
+    for i in range(tiles):
+        for j in range(tiles):
+            part = rgba[i * tile_size:(i + 1) * tile_size, j * tile_size:(j + 1) * tile_size]
+            total += save_tile(part, output_dir / f'{i}_{j}.png', tile_size)
+    return total
+
+
+def save_tile(part: np.ndarray, path: Path, tile_size: int = TILE_SIZE) -> int:
+    """Write one tile's RGBA pixels, padded to the full tile size; returns the file size."""
+    tile = np.zeros((tile_size, tile_size, 4), dtype=np.uint8)
+    tile[:part.shape[0], :part.shape[1]] = part
+    Image.fromarray(tile, 'RGBA').save(path, 'PNG', optimize=False, compress_level=6)
+    return path.stat().st_size
+
+
+def update_metadata(map_dir: Path, overlays: Dict) -> None:
+    """Record the overlay tiles in metadata.json."""
+    metadata_path = map_dir / 'metadata.json'
+    metadata = json.loads(metadata_path.read_text(encoding='utf-8'))
+    metadata['overlays'] = overlays
+    with open(metadata_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+
+def build_overlays(map_dir: Path, interval: Optional[float] = None, tile_size: int = TILE_SIZE) -> Dict:
+    """Render and tile both overlays for one processed map (runs in a worker process).
+
+    Args:
+        map_dir: processed_maps/<map> directory
+        interval: Contour interval in meters (default: from the map's relief)
+        tile_size: Image pixels per tile edge
+
+    Returns:
+        Dict with 'image_size', 'tiles', 'interval', 'file_size_kb' and
+        per-phase 'timings'
+    """
+    start = time.perf_counter()
+    metadata = load_metadata(map_dir)
+    heightmap = load_heightmap(map_dir)
+    elevations = elevation_meters(heightmap, metadata)
+    timings = {'load': time.perf_counter() - start}
+
+    phase = time.perf_counter()
+    shade = hillshade_rgba(hillshade(elevations, meters_per_pixel(metadata, heightmap.shape[0])))
+    timings['hillshade'] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
+    interval = interval or contour_interval(elevations)
+    lines = contours_rgba(elevations, interval)
+    timings['contours'] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
+    size = 0
+    for layer, rgba in zip(LAYERS, (shade, lines)):
+        size += write_tiles(rgba, map_dir / OVERLAYS_DIRNAME / layer, tile_size)
+    timings['encode'] = time.perf_counter() - phase
+
+    image_size = heightmap.shape[0] - 1
+    tiles = -(-image_size // tile_size)
+    update_metadata(map_dir, {
+        'tile_size': tile_size,
+        'tiles': tiles,
+        'image_size': image_size,
+        'layers': list(LAYERS),
+        'hillshade': {'azimuth': LIGHT_AZIMUTH, 'altitude': LIGHT_ALTITUDE},
+        'contours': {'interval': interval, 'major_interval': interval * MAJOR_CONTOUR_EVERY},
+        'generated_at': datetime.utcnow().isoformat() + 'Z',
+    })
+    timings['total'] = time.perf_counter() - start
+    return {
+        'image_size': image_size,
+        'tiles': tiles,
+        'interval': interval,
+        'file_size_kb': round(size / 1024, 1),
+        'timings': timings,
+    }
+
+
+def update_overlay_tiles(map_dir: Path, heightmap: np.ndarray,
+                         bounds: List[Tuple[int, int, int, int]]) -> int:
+    """Re-render only the overlay tiles touching changed heightmap rectangles.
+
+    Used by patch_map.py after a partial heightmap change. Tiles keep the
+    layout and contour interval recorded in metadata.json, and match what
+    build_overlays() would write for the new heightmap.
+
+    Args:
+        map_dir: processed_maps/<map> directory
+        heightmap: The new heightmap
+        bounds: Changed sample rectangles (row0, col0, row1, col1), end-exclusive
+
+    Returns:
+        Number of tiles rewritten per layer (0 if the map has no overlays)
+    """
+    metadata = json.loads((map_dir / 'metadata.json').read_text(encoding='utf-8'))
+    overlays = metadata.get('overlays')
+    if not overlays or overlays['image_size'] != heightmap.shape[0] - 1:
+        return 0
+    tile_size, image_size = overlays['tile_size'], overlays['image_size']
+    interval = overlays['contours']['interval']
+    elevations = elevation_meters(heightmap, metadata)
+    pixel_meters = meters_per_pixel(metadata, heightmap.shape[0])
+    levels = contour_levels(elevations, interval)
+
+    # A sample is a corner of the cells above/left of it; contour pixels can
+    # spill one cell right/down and major lines are thickened by one more
+    tiles = set()
+    for row0, col0, row1, col1 in bounds:
+        r0, c0 = max(row0 - 1, 0), max(col0 - 1, 0)
+        r1, c1 = min(row1 + 2, image_size), min(col1 + 2, image_size)
+        tiles.update((i, j) for i in range(r0 // tile_size, (r1 - 1) // tile_size + 1)
+                     for j in range(c0 // tile_size, (c1 - 1) // tile_size + 1))
+
+    for i, j in sorted(tiles):
+        # Render the tile's cells plus OVERLAY_MARGIN cells around them, then crop
+        cell_r0, cell_c0 = i * tile_size, j * tile_size
+        cell_r1, cell_c1 = min(cell_r0 + tile_size, image_size), min(cell_c0 + tile_size, image_size)
+        win_r0, win_c0 = max(cell_r0 - OVERLAY_MARGIN, 0), max(cell_c0 - OVERLAY_MARGIN, 0)
+        window = elevations[win_r0:min(cell_r1 + OVERLAY_MARGIN, image_size) + 1,
+                            win_c0:min(cell_c1 + OVERLAY_MARGIN, image_size) + 1]
+        crop = (slice(cell_r0 - win_r0, cell_r1 - win_r0), slice(cell_c0 - win_c0, cell_c1 - win_c0))
+        shade = hillshade_rgba(hillshade(window, pixel_meters))
+        lines = contours_rgba(window, interval, levels)
+        for layer, rgba in zip(LAYERS, (shade, lines)):
+            save_tile(rgba[crop], map_dir / OVERLAYS_DIRNAME / layer / f'{i}_{j}.png', tile_size)
+    return len(tiles)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Build hillshade and contour overlay tiles')
+    parser.add_argument('maps', nargs='*', help='Map names (default: every processed map)')
+    parser.add_argument('--contour-interval', type=float, default=None,
+                        help='Contour interval in meters (default: chosen from each map\'s relief)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help='Parallel worker processes (default: CPU count)')
+    parser.add_argument('--processed-dir', type=Path, default=repo_root / 'processed_maps',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    processed_dir = args.processed_dir
+    if not processed_dir.is_dir():
+        print("ERROR: processed_maps directory not found")
+        print(f"Expected location: {processed_dir}")
+        sys.exit(1)
+
+    if args.maps:
+        map_dirs = [processed_dir / name for name in args.maps]
+    else:
+        map_dirs = sorted(p.parent for p in processed_dir.glob('*/metadata.json') if has_heightmap(p.parent))
+
+    print(f"Building overlays for {len(map_dirs)} maps with {args.jobs} workers...\n")
+    start = time.perf_counter()
+    errors = []
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {executor.submit(build_overlays, map_dir, args.contour_interval): map_dir.name
+                   for map_dir in map_dirs}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                errors.append(name)
+                print(f"  {name:30} ERROR: {e}")
+                continue
+            t = result['timings']
+            print(f"  {name:30} {result['tiles']}x{result['tiles']} tiles  {result['file_size_kb']:>8.1f}KB  "
+                  f"contours every {result['interval']:g}m  hillshade {t['hillshade']:.2f}s  "
+                  f"contours {t['contours']:.2f}s  encode {t['encode']:.2f}s  total {t['total']:.2f}s")
+
+    print("\n" + "="*80)
+    print(f"Built overlays for {len(map_dirs) - len(errors)}/{len(map_dirs)} maps "
+          f"in {time.perf_counter() - start:.1f}s")
+    print("="*80)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Build terrain acceleration structures for processed maps.
+
+For every processed_maps/<map>/heightmap.json.gz this writes terrain.npz
+alongside it, containing a min/max pyramid (fast conservative terrain
+rejection), a slope map and the heightmap stats. The server loads these
+lazily; see calculator/terrain.py for the format.
+
+Usage:
+    python processor/build_terrain_accel.py              # all maps
+    python processor/build_terrain_accel.py adak kashan_desert
+"""
+
+import sys
+import time
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from calculator.heightmap import has_heightmap, load_heightmap, load_metadata  # noqa: E402
+from calculator.terrain import ACCEL_FILENAME, build_terrain_arrays, save_terrain_arrays  # noqa: E402
+
+
+def build_terrain_accel(map_dir: Path) -> int:
+    """Build terrain.npz for one processed map directory.
+
+    Returns:
+        Size of the written file in bytes
+    """
+    heightmap = load_heightmap(map_dir)
+    metadata = load_metadata(map_dir)
+    output_file = map_dir / ACCEL_FILENAME
+    save_terrain_arrays(output_file, build_terrain_arrays(heightmap, metadata))
+    return output_file.stat().st_size
+
+
+def main(map_names):
+    processed_maps_dir = repo_root / 'processed_maps'
+
+    if not processed_maps_dir.is_dir():
+        print("ERROR: processed_maps directory not found")
+        print(f"Expected location: {processed_maps_dir}")
+        sys.exit(1)
+
+    if map_names:
+        map_dirs = [processed_maps_dir / name for name in map_names]
+    else:
+        map_dirs = sorted(p.parent for p in processed_maps_dir.glob('*/metadata.json') if has_heightmap(p.parent))
+
+    print(f"Building terrain acceleration structures for {len(map_dirs)} maps...\n")
+
+    start = time.perf_counter()
+    total_size = 0
+    errors = 0
+    for map_dir in map_dirs:
+        try:
+            map_start = time.perf_counter()
+            size = build_terrain_accel(map_dir)
+            total_size += size
+            print(f"  {map_dir.name:30} {size/1024:>8.1f}KB  ({time.perf_counter() - map_start:.2f}s)")
+        except (OSError, ValueError) as e:
+            errors += 1
+            print(f"  {map_dir.name:30} ERROR: {e}")
+
+    print("\n" + "="*80)
+    print(f"Built {len(map_dirs) - errors} files, {total_size/1024/1024:.1f}MB total "
+          f"in {time.perf_counter() - start:.1f}s ({errors} errors)")
+    print("="*80)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -2,73 +2,350 @@
 """
 Compress heightmap JSON files with gzip for reduced distribution size.
 
-This script finds all heightmap.json files in processed_maps/ and creates
-compressed .json.gz versions using gzip level 9 (maximum compression).
+This script finds all heightmap.json files in processed_maps/ and replaces
+each with a compressed heightmap.json.gz. Files are streamed from disk in
+chunks, never read whole, and compressed in parallel worker processes.
+Output is reproducible: the gzip header carries no timestamp.
+
+--sweep compresses every map's heightmap JSON with several gzip/zlib levels
+and the other stdlib codecs (bz2, lzma) without writing anything. It
+reports the total size, compress speed and decompress speed of each
+setting, then recommends a gzip level. The UI decompresses
+heightmap.json.gz with the browser's gzip support, so only gzip is
+deployable. The sweep reads heightmap.json, or the existing
+heightmap.json.gz when a map has already been compressed.
 
 Usage:
-    python compress_heightmaps.py
+    python processor/compress_heightmaps.py                    # all maps, level 6
+    python processor/compress_heightmaps.py adak --level 9 --jobs 4
+    python processor/compress_heightmaps.py --sweep            # size/speed report
+    python processor/compress_heightmaps.py --sweep --json sweep.json
 """
 
+import argparse
+import bz2
 import gzip
-import pathlib
+import json
+import lzma
+import os
+import shutil
 import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from calculator.blobs import resolve_map_file  # noqa: E402
+
+# Level used when not given with --level. On heightmap JSON, level 9 saves
+# only about 1% over level 6 but takes about twice as long (see --sweep).
+DEFAULT_LEVEL = 6
+
+# Bytes read from disk per step
+CHUNK_SIZE = 1 << 20
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Codec settings measured by --sweep: (codec, level)
+SWEEP_SETTINGS = [
+    ('gzip', 1), ('gzip', 3), ('gzip', 6), ('gzip', 9),
+    ('zlib', 6), ('zlib', 9),
+    ('bz2', 1), ('bz2', 9),
+    ('lzma', 0), ('lzma', 6),
+]
+
+# The recommended gzip level is the fastest within this fraction of the
+# smallest gzip output
+RECOMMEND_SIZE_TOLERANCE = 0.02
+
+
+@contextmanager
+def gzip_writer(output_file: Path, level: int = DEFAULT_LEVEL) -> Iterator[gzip.GzipFile]:
+    """Binary stream compressed into output_file (.gz) without a timestamp.
+
+    Writes to a temporary file that replaces output_file only when the
+    block completes, so readers never see a partial file.
+    """
+    tmp_file = output_file.with_name(f'{output_file.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp_file, 'wb') as raw:
+            with gzip.GzipFile(filename=output_file.stem, mode='wb', fileobj=raw, compresslevel=level,
+                               mtime=0) as dst:
+                yield dst
+        os.replace(tmp_file, output_file)
+    finally:
+        tmp_file.unlink(missing_ok=True)
+
+
+def compress_file(json_file: Path, level: int = DEFAULT_LEVEL) -> Tuple[int, int, float]:
+    """Stream heightmap.json into heightmap.json.gz and delete the original.
+
+    Returns:
+        (original size, compressed size, seconds)
+    """
+    start = time.perf_counter()
+    output_file = json_file.with_suffix('.json.gz')
+    with open(json_file, 'rb') as src, gzip_writer(output_file, level) as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    original_size = json_file.stat().st_size
+    json_file.unlink()
+    return original_size, output_file.stat().st_size, time.perf_counter() - start
+
+
+def _compressor(codec: str, level: int):
+    if codec == 'gzip':
+        return zlib.compressobj(level, zlib.DEFLATED, 31)
+    if codec == 'zlib':
+        return zlib.compressobj(level)
+    if codec == 'bz2':
+        return bz2.BZ2Compressor(level)
+    if codec == 'lzma':
+        return lzma.LZMACompressor(preset=level)
+    raise ValueError(f'Unknown codec: {codec}')
+
+
+def _decompressor(codec: str):
+    if codec == 'gzip':
+        return zlib.decompressobj(31)
+    if codec == 'zlib':
+        return zlib.decompressobj()
+    if codec == 'bz2':
+        return bz2.BZ2Decompressor()
+    return lzma.LZMADecompressor()
+
+
+def heightmap_json_source(map_dir: Path) -> Optional[Path]:
+    """heightmap.json, else the (possibly shared) heightmap.json.gz, else None."""
+    json_file = map_dir / 'heightmap.json'
+    if json_file.is_file():
+        return json_file
+    return resolve_map_file(map_dir, 'heightmap.json.gz')
+
+
+def iter_chunks(path: Path) -> Iterator[bytes]:
+    """Uncompressed heightmap JSON in CHUNK_SIZE pieces."""
+    with open(path, 'rb') as raw:
+        compressed = raw.read(2) == GZIP_MAGIC
+    with (gzip.open if compressed else open)(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def measure(source: Path, codec: str, level: int) -> Dict:
+    """Size and compress/decompress time of one codec setting on one file.
+
+    Only the codec calls are timed; reading the source is not.
+    """
+    compressor = _compressor(codec, level)
+    parts = []
+    original_size = 0
+    compress_time = 0.0
+    for chunk in iter_chunks(source):
+        original_size += len(chunk)
+        start = time.perf_counter()
+        parts.append(compressor.compress(chunk))
+        compress_time += time.perf_counter() - start
+    start = time.perf_counter()
+    parts.append(compressor.flush())
+    compress_time += time.perf_counter() - start
+    compressed = b''.join(parts)
+
+    decompressor = _decompressor(codec)
+    decompressed_size = 0
+    start = time.perf_counter()
+    for offset in range(0, len(compressed), CHUNK_SIZE):
+        decompressed_size += len(decompressor.decompress(compressed[offset:offset + CHUNK_SIZE]))
+    decompress_time = time.perf_counter() - start
+    if decompressed_size != original_size:
+        raise ValueError(f'{codec}-{level} round trip lost data')
 
-def compress_heightmaps():
-    """Compress all heightmap.json files in processed_maps directory."""
-    
-    processed_maps_dir = pathlib.Path('processed_maps')
-    
-    if not processed_maps_dir.is_dir():
+    return {
+        'original_size': original_size,
+        'compressed_size': len(compressed),
+        'compress_seconds': compress_time,
+        'decompress_seconds': decompress_time,
+    }
+
+
+def sweep_map(map_dir: Path, settings: List[Tuple[str, int]] = SWEEP_SETTINGS) -> Dict[str, Dict]:
+    """Measure every setting on one map (runs in a worker process).
+
+    Raises:
+        FileNotFoundError: If the map has no heightmap JSON
+    """
+    source = heightmap_json_source(map_dir)
+    if source is None:
+        raise FileNotFoundError(f'No heightmap.json or heightmap.json.gz in {map_dir}')
+    return {f'{codec}-{level}': measure(source, codec, level) for codec, level in settings}
+
+
+def summarize_sweep(results: Dict[str, Dict[str, Dict]]) -> Dict:
+    """Total each setting over all maps and pick the recommended gzip level.
+
+    Args:
+        results: {map name: sweep_map() result}
+
+    Returns:
+        Dict with per-setting 'totals' and 'recommended' ('gzip-<level>')
+    """
+    totals: Dict[str, Dict] = {}
+    for measurements in results.values():
+        for name, m in measurements.items():
+            total = totals.setdefault(name, dict.fromkeys(m, 0))
+            for key, value in m.items():
+                total[key] += value
+    for total in totals.values():
+        mb = total['original_size'] / 1024 / 1024
+        total['ratio'] = total['compressed_size'] / total['original_size'] if total['original_size'] else 0.0
+        total['compress_mb_s'] = mb / total['compress_seconds'] if total['compress_seconds'] else 0.0
+        total['decompress_mb_s'] = mb / total['decompress_seconds'] if total['decompress_seconds'] else 0.0
+
+    gzip_names = [name for name in totals if name.startswith('gzip-')]
+    recommended = None
+    if gzip_names:
+        smallest = min(totals[name]['compressed_size'] for name in gzip_names)
+        good = [name for name in gzip_names
+                if totals[name]['compressed_size'] <= smallest * (1 + RECOMMEND_SIZE_TOLERANCE)]
+        recommended = min(good, key=lambda name: totals[name]['compress_seconds'])
+    return {'totals': totals, 'recommended': recommended}
+
+
+def print_sweep(summary: Dict, map_count: int) -> None:
+    totals = summary['totals']
+    print(f"\n{'setting':10} {'size':>10} {'ratio':>7} {'compress':>12} {'decompress':>12}")
+    for name, total in totals.items():
+        print(f"{name:10} {total['compressed_size']/1024/1024:>8.1f}MB {total['ratio']*100:>6.1f}% "
+              f"{total['compress_mb_s']:>8.1f}MB/s {total['decompress_mb_s']:>8.1f}MB/s")
+
+    print("\n" + "="*80)
+    recommended = summary['recommended']
+    if recommended:
+        best = totals[recommended]
+        print(f"Recommended: --level {recommended.split('-')[1]} "
+              f"({best['compressed_size']/1024/1024:.1f}MB for {map_count} maps, "
+              f"{best['compress_mb_s']:.1f}MB/s)")
+        if 'gzip-9' in totals and recommended != 'gzip-9':
+            slowest = totals['gzip-9']
+            print(f"  vs level 9: {(best['compressed_size'] / slowest['compressed_size'] - 1) * 100:+.2f}% size, "
+                  f"{slowest['compress_seconds'] / best['compress_seconds']:.1f}x faster")
+        smallest = min(totals, key=lambda name: totals[name]['compressed_size'])
+        if not smallest.startswith('gzip-'):
+            print(f"  Smallest overall: {smallest} ({(totals[smallest]['compressed_size'] / best['compressed_size'] - 1) * 100:+.1f}%), "
+                  f"but browsers only decompress gzip")
+    print("="*80)
+
+
+def _run_parallel(func, map_dirs: List[Path], jobs: int, *args) -> Tuple[Dict[str, object], List[str]]:
+    """Run func(map_dir, *args) in worker processes; print errors as they come."""
+    results, errors = {}, []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(func, map_dir, *args): map_dir.name for map_dir in map_dirs}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except (OSError, ValueError, EOFError, zlib.error) as e:
+                errors.append(name)
+                print(f"  {name:30} ERROR: {e}")
+    return results, errors
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Compress heightmap.json files, or sweep codec settings')
+    parser.add_argument('maps', nargs='*', help='Map names (default: every processed map)')
+    parser.add_argument('--level', type=int, default=DEFAULT_LEVEL, choices=range(1, 10), metavar='1-9',
+                        help=f'gzip level (default: {DEFAULT_LEVEL})')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help='Parallel worker processes (default: CPU count)')
+    parser.add_argument('--sweep', action='store_true',
+                        help='Measure size and speed of several codecs/levels instead of compressing')
+    parser.add_argument('--json', type=Path, help='Write the sweep report to this file')
+    parser.add_argument('--processed-dir', type=Path, default=repo_root / 'processed_maps',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    processed_dir = args.processed_dir
+    if not processed_dir.is_dir():
         print("ERROR: processed_maps directory not found")
-        print(f"Expected location: {processed_maps_dir.absolute()}")
+        print(f"Expected location: {processed_dir.absolute()}")
         sys.exit(1)
-    
+
+    if args.sweep:
+        if args.maps:
+            map_dirs = [processed_dir / name for name in args.maps]
+        else:
+            map_dirs = sorted(p.parent for p in processed_dir.glob('*/metadata.json')
+                              if heightmap_json_source(p.parent) is not None)
+        print(f"Sweeping {len(SWEEP_SETTINGS)} codec settings over {len(map_dirs)} maps "
+              f"with {args.jobs} workers...")
+        results, errors = _run_parallel(sweep_map, map_dirs, args.jobs)
+        if not results:
+            print("WARNING: No heightmap JSON found")
+            sys.exit(1 if errors else 0)
+        summary = summarize_sweep(results)
+        print_sweep(summary, len(results))
+        if args.json:
+            args.json.write_text(json.dumps({**summary, 'maps': results}, indent=2), encoding='utf-8')
+            print(f"\nReport written to {args.json}")
+        if errors:
+            sys.exit(1)
+        return
+
     # Find all heightmap.json files
-    heightmap_files = list(processed_maps_dir.rglob('heightmap.json'))
-    
+    if args.maps:
+        heightmap_files = [processed_dir / name / 'heightmap.json' for name in args.maps
+                           if (processed_dir / name / 'heightmap.json').is_file()]
+    else:
+        heightmap_files = sorted(processed_dir.glob('*/heightmap.json'))
+
     if not heightmap_files:
         print("WARNING: No heightmap.json files found")
         sys.exit(0)
-    
+
     print(f"Found {len(heightmap_files)} heightmap files")
-    print("Compressing with gzip level 9 (maximum)...\n")
-    
+    print(f"Compressing with gzip level {args.level} using {args.jobs} workers...\n")
+
+    start = time.perf_counter()
     total_original_size = 0
     total_compressed_size = 0
-    
-    for json_file in heightmap_files:
-        # Read original file
-        original_data = json_file.read_text()
-        original_size = len(original_data)
-        
-        # Compress with gzip level 9
-        output_file = json_file.with_suffix('.json.gz')
-        with gzip.open(output_file, 'wt', compresslevel=9) as f:
-            f.write(original_data)
-        
-        compressed_size = output_file.stat().st_size
-        ratio = compressed_size / original_size
-        saved = (1 - ratio) * 100
-        
-        # Update totals
-        total_original_size += original_size
-        total_compressed_size += compressed_size
-        
-        # Delete original uncompressed file
-        json_file.unlink()
-        
-        # Print progress
-        map_name = json_file.parent.name
-        print(f"  {map_name:30} {original_size/1024/1024:>6.1f}MB -> {compressed_size/1024/1024:>6.1f}MB  (saved {saved:>5.1f}%)")
-    
+    errors = []
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {executor.submit(compress_file, json_file, args.level): json_file.parent.name
+                   for json_file in heightmap_files}
+        for future in as_completed(futures):
+            map_name = futures[future]
+            try:
+                original_size, compressed_size, seconds = future.result()
+            except OSError as e:
+                errors.append(map_name)
+                print(f"  {map_name:30} ERROR: {e}")
+                continue
+            total_original_size += original_size
+            total_compressed_size += compressed_size
+            saved = (1 - compressed_size / original_size) * 100 if original_size else 0.0
+            print(f"  {map_name:30} {original_size/1024/1024:>6.1f}MB -> {compressed_size/1024/1024:>6.1f}MB  "
+                  f"(saved {saved:>5.1f}%)  {seconds:.2f}s")
+
     # Print summary
     print("\n" + "="*80)
-    total_ratio = total_compressed_size / total_original_size
-    total_saved = (1 - total_ratio) * 100
-    print(f"Total: {total_original_size/1024/1024:.1f}MB -> {total_compressed_size/1024/1024:.1f}MB")
-    print(f"Overall compression: {total_saved:.1f}% savings")
+    if total_original_size:
+        total_saved = (1 - total_compressed_size / total_original_size) * 100
+        print(f"Total: {total_original_size/1024/1024:.1f}MB -> {total_compressed_size/1024/1024:.1f}MB")
+        print(f"Overall compression: {total_saved:.1f}% savings")
+    print(f"Elapsed: {time.perf_counter() - start:.1f}s")
     print("="*80)
-    print(f"\nCompressed {len(heightmap_files)} files successfully!")
+    print(f"\nCompressed {len(heightmap_files) - len(errors)} files successfully!")
+    if errors:
+        sys.exit(1)
+
 
 if __name__ == '__main__':
-    compress_heightmaps()
+    main()
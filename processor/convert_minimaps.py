@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Convert in-game DDS minimaps to PNG/WebP at several resolutions.
+
+PR minimaps (client.zip: hud/minimap/ingamemap.dds) already carry a full
+mipmap chain. Instead of decoding only the top level and resampling, this
+script slices every mip level out of the DDS directly and encodes each one,
+so smaller variants cost no resampling at all. Maps are converted in
+parallel worker processes with per-phase timing output.
+
+Outputs in processed_maps/<map>/:
+    minimap.png              - full resolution (same file the UI loads today)
+    minimap_<size>.png|webp  - smaller mip levels down to --min-size
+
+metadata.json's "minimap" entry is updated with the list of variants.
+
+Usage:
+    python processor/convert_minimaps.py                       # all maps with client.zip
+    python processor/convert_minimaps.py adak kashan_desert    # selected maps
+    python processor/convert_minimaps.py --format webp --jobs 4
+"""
+
+import argparse
+import io
+import json
+import os
+import struct
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+DDS_MAGIC = b'DDS '
+DDS_HEADER_SIZE = 128       # magic + 124-byte DDS_HEADER
+DX10_HEADER_SIZE = 20
+MINIMAP_DDS_PATH = 'hud/minimap/ingamemap.dds'
+
+# DDS pixel format flags
+DDPF_FOURCC = 0x4
+DDPF_RGB = 0x40
+DDPF_LUMINANCE = 0x20000
+
+# Bytes per 4x4 block for block-compressed formats
+FOURCC_BLOCK_SIZES = {
+    b'DXT1': 8, b'DXT2': 16, b'DXT3': 16, b'DXT4': 16, b'DXT5': 16,
+    b'ATI1': 8, b'BC4U': 8, b'BC4S': 8, b'ATI2': 16, b'BC5U': 16, b'BC5S': 16,
+}
+# DXGI formats 70-84 are BC1-BC5; 94-99 are BC6H/BC7
+DXGI_BLOCK_SIZES = {**{f: 8 for f in range(70, 73)}, **{f: 16 for f in range(73, 79)},
+                    **{f: 8 for f in range(79, 82)}, **{f: 16 for f in range(82, 85)},
+                    **{f: 16 for f in range(94, 100)}}
+
+
+class DdsInfo(NamedTuple):
+    """Fields of a DDS header needed to walk the mipmap chain."""
+    width: int
+    height: int
+    mipmap_count: int
+    data_offset: int
+    block_size: Optional[int]   # None for uncompressed formats
+    bits_per_pixel: int
+
+
+def read_dds_info(data: bytes) -> DdsInfo:
+    """Parse a DDS header.
+
+    Raises:
+        ValueError: If the data is not a supported DDS file
+    """
+    if len(data) < DDS_HEADER_SIZE or data[:4] != DDS_MAGIC:
+        raise ValueError('Not a DDS file')
+
+    height, width = struct.unpack_from('<2I', data, 12)
+    (mipmap_count,) = struct.unpack_from('<I', data, 28)
+    pf_flags, fourcc, bit_count = struct.unpack_from('<I4sI', data, 80)
+    data_offset = DDS_HEADER_SIZE
+
+    block_size = None
+    if pf_flags & DDPF_FOURCC:
+        if fourcc == b'DX10':
+            (dxgi_format,) = struct.unpack_from('<I', data, DDS_HEADER_SIZE)
+            block_size = DXGI_BLOCK_SIZES.get(dxgi_format)
+            data_offset += DX10_HEADER_SIZE
+            if block_size is None:
+                raise ValueError(f'Unsupported DXGI format: {dxgi_format}')
+        else:
+            block_size = FOURCC_BLOCK_SIZES.get(fourcc)
+            if block_size is None:
+                raise ValueError(f'Unsupported DDS fourcc: {fourcc!r}')
+    elif not pf_flags & (DDPF_RGB | DDPF_LUMINANCE) or bit_count % 8:
+        raise ValueError(f'Unsupported DDS pixel format flags: {pf_flags:#x}')
+
+    return DdsInfo(width, height, max(1, mipmap_count), data_offset, block_size, bit_count)
+
+
+def mip_level_size(info: DdsInfo, width: int, height: int) -> int:
+    """Size in bytes of one mip level."""
+    if info.block_size:
+        return max(1, (width + 3) // 4) * max(1, (height + 3) // 4) * info.block_size
+    return width * height * info.bits_per_pixel // 8
+
+
+def iter_mip_levels(data: bytes) -> List[Tuple[int, int, bytes]]:
+    """Split a DDS file into standalone single-level DDS files, one per mip.
+
+    Each returned blob has the original header with its size fields patched,
+    so Pillow's DDS decoder can read any level directly without resampling.
+
+    Returns:
+        List of (width, height, dds_bytes), largest level first
+    """
+    info = read_dds_info(data)
+    header = bytearray(data[:info.data_offset])
+    levels = []
+    offset = info.data_offset
+    width, height = info.width, info.height
+    for _ in range(info.mipmap_count):
+        size = mip_level_size(info, width, height)
+        if offset + size > len(data):
+            break
+        pitch = size if info.block_size else width * info.bits_per_pixel // 8
+        struct.pack_into('<3I', header, 12, height, width, pitch)
+        struct.pack_into('<I', header, 28, 1)
+        levels.append((width, height, bytes(header) + data[offset:offset + size]))
+        offset += size
+        width, height = max(1, width // 2), max(1, height // 2)
+    return levels
+
+
+def _drop_opaque_alpha(img: Image.Image) -> Image.Image:
+    """Convert RGBA to RGB when every pixel is opaque (smaller output files)."""
+    if img.mode == 'RGBA' and img.getchannel('A').getextrema() == (255, 255):
+        return img.convert('RGB')
+    return img
+
+
+def save_image(img: Image.Image, path: Path, optimize: bool, webp_quality: int) -> None:
+    """Encode one image as PNG or WebP based on the file suffix."""
+    if path.suffix == '.webp':
+        img.save(path, 'WEBP', quality=webp_quality, method=4)
+    else:
+        img.save(path, 'PNG', optimize=optimize, compress_level=9 if optimize else 6)
+
+
+def convert_minimap(dds_data: bytes, output_dir: Path, formats: List[str],
+                    min_size: int = 256, optimize: bool = False,
+                    webp_quality: int = 90) -> Dict:
+    """Write the full minimap plus smaller mip-level variants.
+
+    Args:
+        dds_data: Contents of ingamemap.dds
+        output_dir: processed_maps/<map> directory
+        formats: Variant formats to write ('png' and/or 'webp')
+        min_size: Smallest variant width to emit
+        optimize: Use slower, smaller PNG encoding
+        webp_quality: WebP quality (0-100)
+
+    Returns:
+        Dict with 'resolution', 'file_size_kb', 'variants' and per-phase
+        'timings' (decode/encode seconds)
+    """
+    timings = {'decode': 0.0, 'encode': 0.0}
+    variants = []
+    result = {}
+    for level, (width, height, level_dds) in enumerate(iter_mip_levels(dds_data)):
+        if level > 0 and width < min_size:
+            break
+
+        start = time.perf_counter()
+        img = _drop_opaque_alpha(Image.open(io.BytesIO(level_dds)).convert('RGBA'))
+        timings['decode'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        if level == 0:
+            path = output_dir / 'minimap.png'
+            save_image(img, path, optimize, webp_quality)
+            result['resolution'] = f"{width}x{height}"
+            result['file_size_kb'] = round(path.stat().st_size / 1024, 1)
+        else:
+            for fmt in formats:
+                path = output_dir / f'minimap_{width}.{fmt}'
+                save_image(img, path, optimize, webp_quality)
+                variants.append({
+                    'file': path.name,
+                    'resolution': f"{width}x{height}",
+                    'file_size_kb': round(path.stat().st_size / 1024, 1),
+                })
+        timings['encode'] += time.perf_counter() - start
+
+    result['variants'] = variants
+    result['timings'] = timings
+    return result
+
+
+def read_minimap_dds(client_zip: Path) -> Tuple[str, bytes]:
+    """Read ingamemap.dds from a client.zip.
+
+    Raises:
+        FileNotFoundError: If the zip has no in-game minimap
+    """
+    with zipfile.ZipFile(client_zip, 'r') as zf:
+        for name in zf.namelist():
+            if MINIMAP_DDS_PATH in name.lower():
+                return name, zf.read(name)
+    raise FileNotFoundError(f'{MINIMAP_DDS_PATH} not found in {client_zip}')
+
+
+def update_metadata(output_dir: Path, source_file: str, result: Dict) -> None:
+    """Record the converted minimap and its variants in metadata.json."""
+    metadata_path = output_dir / 'metadata.json'
+    if not metadata_path.is_file():
+        return
+    metadata = json.loads(metadata_path.read_text(encoding='utf-8'))
+    metadata['minimap'] = {
+        'source_file': source_file,
+        'resolution': result['resolution'],
+        'file_size_kb': result['file_size_kb'],
+        'variants': result['variants'],
+        'converted_at': datetime.utcnow().isoformat() + 'Z',
+    }
+    with open(metadata_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+
+def process_map(map_name: str, raw_dir: Path, processed_dir: Path, formats: List[str],
+                min_size: int, optimize: bool, webp_quality: int) -> Dict:
+    """Convert one map's minimap (runs in a worker process)."""
+    start = time.perf_counter()
+    source_file, dds_data = read_minimap_dds(raw_dir / map_name / 'client.zip')
+    read_time = time.perf_counter() - start
+
+    output_dir = processed_dir / map_name
+    output_dir.mkdir(parents=True, exist_ok=True)
+    result = convert_minimap(dds_data, output_dir, formats, min_size, optimize, webp_quality)
+    update_metadata(output_dir, source_file, result)
+
+    result['timings']['read'] = read_time
+    result['timings']['total'] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert DDS minimaps to PNG/WebP mip-level variants')
+    parser.add_argument('maps', nargs='*', help='Map names (default: every map with a client.zip)')
+    parser.add_argument('--format', choices=['png', 'webp', 'both'], default='both',
+                        help='Format of the smaller variants (default: both)')
+    parser.add_argument('--min-size', type=int, default=256,
+                        help='Smallest variant width in pixels (default: 256)')
+    parser.add_argument('--optimize', action='store_true',
+                        help='Slower, smaller PNG encoding')
+    parser.add_argument('--webp-quality', type=int, default=90)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help='Parallel worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).resolve().parent.parent
+    raw_dir = repo_root / 'raw_map_data'
+    processed_dir = repo_root / 'processed_maps'
+    formats = ['png', 'webp'] if args.format == 'both' else [args.format]
+
+    map_names = args.maps or sorted(p.parent.name for p in raw_dir.glob('*/client.zip'))
+    if not map_names:
+        print("WARNING: No client.zip files found in raw_map_data/")
+        sys.exit(0)
+
+    print(f"Converting {len(map_names)} minimaps with {args.jobs} workers...\n")
+    start = time.perf_counter()
+    errors = []
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {
+            executor.submit(process_map, name, raw_dir, processed_dir, formats,
+                            args.min_size, args.optimize, args.webp_quality): name
+            for name in map_names
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                errors.append(name)
+                print(f"  {name:30} ERROR: {e}")
+                continue
+            t = result['timings']
+            print(f"  {name:30} {result['resolution']:>10} +{len(result['variants'])} variants  "
+                  f"read {t['read']:.2f}s  decode {t['decode']:.2f}s  encode {t['encode']:.2f}s  "
+                  f"total {t['total']:.2f}s")
+
+    print("\n" + "="*80)
+    print(f"Converted {len(map_names) - len(errors)}/{len(map_names)} minimaps "
+          f"in {time.perf_counter() - start:.1f}s")
+    print("="*80)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Deduplicate identical map payloads into a content-addressed blob store.
+
+Variant maps (e.g. dovre / dovre_winter) frequently share the same
+heightmap or minimap. This hashes every payload file in processed_maps/,
+moves files shared by two or more maps into processed_maps/_blobs/<sha256>
+and records the reference in each map's metadata.json under "blobs".
+The server maps /maps/<map>/<file> to the shared blob, so clients download
+it once. See calculator/blobs.py for the layout.
+
+Usage:
+    python processor/dedup_blobs.py             # dedupe shared payloads
+    python processor/dedup_blobs.py --dry-run   # report only
+    python processor/dedup_blobs.py --all       # move every payload into the store
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from calculator.blobs import BLOBS_DIRNAME, blob_path, blob_references, content_digest  # noqa: E402
+
+# Payload files eligible for the store (metadata.json itself is never shared)
+PAYLOAD_PATTERNS = ('heightmap.json.gz', 'heightmap.bin', 'minimap.png', 'minimap_*.png', 'minimap_*.webp')
+
+
+def iter_payloads(map_dir: Path) -> List[Path]:
+    """Payload files present in a map directory."""
+    files = set()
+    for pattern in PAYLOAD_PATTERNS:
+        files.update(p for p in map_dir.glob(pattern) if p.is_file())
+    return sorted(files)
+
+
+def scan(processed_dir: Path) -> Dict[Tuple[str, str], List[Path]]:
+    """Group payload files by (filename, content digest)."""
+    groups = defaultdict(list)
+    for map_dir in sorted(processed_dir.iterdir()):
+        if map_dir.name == BLOBS_DIRNAME or not (map_dir / 'metadata.json').is_file():
+            continue
+        for path in iter_payloads(map_dir):
+            groups[(path.name, content_digest(path.read_bytes(), path.name))].append(path)
+    return groups
+
+
+def add_references(map_dir: Path, references: Dict[str, str]) -> None:
+    """Merge filename -> digest references into a map's metadata.json."""
+    metadata_path = map_dir / 'metadata.json'
+    metadata = json.loads(metadata_path.read_text(encoding='utf-8'))
+    metadata['blobs'] = {**blob_references(map_dir), **references}
+    with open(metadata_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+
+def dedup(processed_dir: Path, move_all: bool = False, dry_run: bool = False) -> Dict:
+    """Move shared payloads into the blob store.
+
+    Args:
+        processed_dir: processed_maps directory
+        move_all: Store every payload, not only those shared by 2+ maps
+        dry_run: Report what would happen without touching files
+
+    Returns:
+        Dict with blobs (stored), files (per-map copies removed) and saved_bytes
+    """
+    references = defaultdict(dict)
+    stats = {'blobs': 0, 'files': 0, 'saved_bytes': 0}
+
+    for (filename, digest), paths in sorted(scan(processed_dir).items()):
+        target = blob_path(processed_dir, digest)
+        if len(paths) < 2 and not move_all and not target.is_file():
+            continue
+        stats['blobs'] += 1
+        stats['files'] += len(paths)
+        stats['saved_bytes'] += sum(p.stat().st_size for p in paths[0 if target.is_file() else 1:])
+        print(f"  {filename:22} {digest[:12]}  {', '.join(p.parent.name for p in paths)}")
+        if dry_run:
+            continue
+
+        target.parent.mkdir(exist_ok=True)
+        if not target.is_file():
+            paths[0].replace(target)
+        for path in paths:
+            path.unlink(missing_ok=True)
+            references[path.parent][filename] = digest
+
+    for map_dir, refs in references.items():
+        add_references(map_dir, refs)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deduplicate identical map payloads into processed_maps/_blobs')
+    parser.add_argument('--all', action='store_true', help='Store every payload, not only shared ones')
+    parser.add_argument('--dry-run', action='store_true', help='Report duplicates without moving files')
+    args = parser.parse_args()
+
+    processed_dir = repo_root / 'processed_maps'
+    if not processed_dir.is_dir():
+        print("ERROR: processed_maps directory not found")
+        print(f"Expected location: {processed_dir}")
+        sys.exit(1)
+
+    print("Scanning processed maps for identical payloads...\n")
+    stats = dedup(processed_dir, move_all=args.all, dry_run=args.dry_run)
+
+    print("\n" + "="*80)
+    action = 'Would store' if args.dry_run else 'Stored'
+    print(f"{action} {stats['blobs']} blobs for {stats['files']} files, "
+          f"saving {stats['saved_bytes']/1024/1024:.1f}MB")
+    print("="*80)
+
+
+if __name__ == '__main__':
+    main()
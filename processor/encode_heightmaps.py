@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Encode processed heightmaps with the lossless predictive codec.
+
+For every processed_maps/<map>/heightmap.json.gz this writes heightmap.bin
+alongside it (see calculator/heightmap_codec.py for the format) and records
+its predictor as "heightmap_codec" in metadata.json. The web UI only
+requests heightmap.bin for maps whose metadata has that entry; the server
+prefers heightmap.bin whenever it exists. Both fall back to
+heightmap.json.gz.
+
+Usage:
+    python processor/encode_heightmaps.py                 # all maps
+    python processor/encode_heightmaps.py adak kashan_desert
+    python processor/encode_heightmaps.py --benchmark     # compare vs .json.gz, writes nothing
+"""
+
+import argparse
+import gzip
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from calculator.blobs import content_digest, resolve_map_file  # noqa: E402
+from calculator.heightmap_codec import (  # noqa: E402
+    CODEC_FILENAME, PREDICTORS, decode_heightmap, encode_heightmap, read_header,
+)
+
+
+def json_heightmap_path(map_dir: Path) -> Path:
+    """heightmap.json.gz for a map (per-map copy or shared blob)."""
+    path = resolve_map_file(map_dir, 'heightmap.json.gz')
+    if path is None:
+        raise FileNotFoundError(f'heightmap.json.gz not found in {map_dir}')
+    return path
+
+
+def encode_map(map_dir: Path, encoded_cache: Optional[Dict[str, bytes]] = None) -> dict:
+    """Write heightmap.bin for one processed map directory.
+
+    Args:
+        map_dir: Processed map directory
+        encoded_cache: Optional content digest -> encoded bytes, shared across
+            calls so identical heightmaps (map variants) are encoded once
+
+    Returns:
+        Dict with predictor, json_gz_size, codec_size (bytes) and reused
+    """
+    json_gz = json_heightmap_path(map_dir).read_bytes()
+    digest = content_digest(json_gz, 'heightmap.json.gz')
+    reused = encoded_cache is not None and digest in encoded_cache
+
+    if reused:
+        encoded = encoded_cache[digest]
+    else:
+        heightmap_data = json.loads(gzip.decompress(json_gz))
+        resolution = heightmap_data['resolution']
+        heightmap = np.array(heightmap_data['data'], dtype=np.uint16).reshape(resolution, resolution)
+        encoded = encode_heightmap(heightmap)
+        if not np.array_equal(decode_heightmap(encoded), heightmap):
+            raise ValueError('round-trip mismatch')
+        if encoded_cache is not None:
+            encoded_cache[digest] = encoded
+
+    (map_dir / CODEC_FILENAME).write_bytes(encoded)
+    record_codec(map_dir, read_header(encoded)[0])
+    return {
+        'predictor': read_header(encoded)[0],
+        'json_gz_size': len(json_gz),
+        'codec_size': len(encoded),
+        'reused': reused,
+    }
+
+
+def record_codec(map_dir: Path, predictor: str) -> None:
+    """Note heightmap.bin in metadata.json, so the UI knows it can fetch it."""
+    metadata_path = map_dir / 'metadata.json'
+    metadata = json.loads(metadata_path.read_text(encoding='utf-8'))
+    if metadata.get('heightmap_codec') == predictor:
+        return
+    metadata['heightmap_codec'] = predictor
+    with open(metadata_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+
+def benchmark_map(map_dir: Path) -> dict:
+    """Compare size and decode time of every predictor against .json.gz."""
+    json_gz = json_heightmap_path(map_dir).read_bytes()
+    start = time.perf_counter()
+    heightmap = np.array(json.loads(gzip.decompress(json_gz))['data'], dtype=np.uint16)
+    result = {'json_gz': (len(json_gz), time.perf_counter() - start)}
+    heightmap = heightmap.reshape(int(np.sqrt(heightmap.size)), -1)
+
+    for predictor in PREDICTORS:
+        encoded = encode_heightmap(heightmap, predictor)
+        start = time.perf_counter()
+        decoded = decode_heightmap(encoded)
+        elapsed = time.perf_counter() - start
+        if not np.array_equal(decoded, heightmap):
+            raise ValueError(f'{predictor}: round-trip mismatch')
+        result[predictor] = (len(encoded), elapsed)
+    return result
+
+
+def run_benchmark(map_dirs):
+    columns = ('json_gz',) + PREDICTORS
+    totals = {name: [0, 0.0] for name in columns}
+
+    print(f"{'Map':30}" + ''.join(f"{name:>20}" for name in columns))
+    for map_dir in map_dirs:
+        result = benchmark_map(map_dir)
+        for name in columns:
+            totals[name][0] += result[name][0]
+            totals[name][1] += result[name][1]
+        print(f"{map_dir.name:30}" + ''.join(
+            f"{result[name][0]/1024:>11.0f}KB {result[name][1]*1000:>4.0f}ms" for name in columns))
+
+    print("\n" + "="*80)
+    print(f"BENCHMARK SUMMARY ({len(map_dirs)} maps, size / total decode time)")
+    print("="*80)
+    base_size = totals['json_gz'][0]
+    for name in columns:
+        size, elapsed = totals[name]
+        print(f"  {name:10} {size/1024/1024:>8.1f}MB  {size/base_size*100:>5.1f}%  {elapsed:>7.2f}s")
+    print("="*80)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Encode heightmaps with the predictive codec (heightmap.bin)')
+    parser.add_argument('maps', nargs='*', help='Map names (default: all processed maps)')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Compare size and decode time of each predictor against .json.gz')
+    args = parser.parse_args()
+
+    processed_maps_dir = repo_root / 'processed_maps'
+    if not processed_maps_dir.is_dir():
+        print("ERROR: processed_maps directory not found")
+        print(f"Expected location: {processed_maps_dir}")
+        sys.exit(1)
+
+    if args.maps:
+        map_dirs = [processed_maps_dir / name for name in args.maps]
+    else:
+        map_dirs = sorted(p.parent for p in processed_maps_dir.glob('*/metadata.json')
+                          if resolve_map_file(p.parent, 'heightmap.json.gz'))
+
+    if args.benchmark:
+        run_benchmark(map_dirs)
+        return
+
+    print(f"Encoding {len(map_dirs)} heightmaps...\n")
+    start = time.perf_counter()
+    json_total = codec_total = errors = 0
+    encoded_cache = {}
+    for map_dir in map_dirs:
+        try:
+            result = encode_map(map_dir, encoded_cache)
+            json_total += result['json_gz_size']
+            codec_total += result['codec_size']
+            ratio = result['codec_size'] / result['json_gz_size'] * 100
+            print(f"  {map_dir.name:30} {result['predictor']:>9} "
+                  f"{result['json_gz_size']/1024:>8.0f}KB -> {result['codec_size']/1024:>6.0f}KB ({ratio:.0f}%)"
+                  f"{'  (identical to an earlier map, reused)' if result['reused'] else ''}")
+        except (OSError, ValueError, KeyError) as e:
+            errors += 1
+            print(f"  {map_dir.name:30} ERROR: {e}")
+
+    print("\n" + "="*80)
+    if json_total:
+        print(f"Encoded {len(map_dirs) - errors} heightmaps: {json_total/1024/1024:.1f}MB -> "
+              f"{codec_total/1024/1024:.1f}MB ({codec_total/json_total*100:.0f}%) "
+              f"in {time.perf_counter() - start:.1f}s ({errors} errors)")
+    print("="*80)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Apply a map patch incrementally: diff the new heightmapprimary.raw against
+the processed heightmap and rebuild only what the changed blocks affect.
+
+- Report: changed blocks, connected regions and a per grid square summary
+  ("terrain raised in F7 (up to 4.20 m over 12% of the square)")
+- terrain.npz: only the pyramid blocks and slope pixels touching a change
+  are recomputed (see update_terrain_arrays in calculator/terrain.py)
+- keypads.json.gz: only keypad / sub-keypad cells touching a change
+- overlays/: only the hillshade / contour tiles touching a change
+- heightmap.bin: re-encoded with the map's previous predictor (skips the
+  predictor search); heightmap.json.gz is rewritten
+- changes.json: the change record (calculator/heightmap_diff.py), so
+  clients can invalidate only the affected cached pieces
+
+A resolution change cannot be diffed; run process_one_map.py instead.
+
+Usage:
+    python processor/patch_map.py adak                    # report only, writes nothing
+    python processor/patch_map.py adak --apply
+    python processor/patch_map.py adak --raw patched/server.zip --apply
+    python processor/patch_map.py adak --raw heightmapprimary.raw --json
+"""
+
+import argparse
+import gzip
+import io
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from calculator.blobs import resolve_map_file  # noqa: E402
+from calculator.heightmap import clear_cache, load_heightmap, load_metadata  # noqa: E402
+from calculator.heightmap_codec import CODEC_FILENAME, encode_heightmap, read_header  # noqa: E402
+from calculator.heightmap_diff import BLOCK_SIZE, CHANGES_FILENAME, build_change_record, region_pixels  # noqa: E402
+from calculator import keypads, terrain  # noqa: E402
+
+
+def read_raw_heightmap(path: Path) -> np.ndarray:
+    """Heightmap from a map's server.zip or a bare heightmapprimary.raw."""
+    if path.suffix.lower() == '.zip':
+        from process_one_map import extract_heightmap_raw
+        return extract_heightmap_raw(path)
+    data = np.fromfile(path, dtype='<u2')
+    resolution = int(np.sqrt(data.size))
+    if resolution * resolution != data.size:
+        raise ValueError(f'{path} is not a square uint16 heightmap ({data.size} samples)')
+    return data.reshape(resolution, resolution)
+
+
+def _load_terrain_arrays(map_dir: Path, heightmap: np.ndarray) -> Optional[dict]:
+    """terrain.npz arrays if they belong to heightmap, else None."""
+    path = map_dir / terrain.ACCEL_FILENAME
+    if not path.is_file():
+        return None
+    with np.load(path) as data:
+        arrays = {key: data[key] for key in data.files}
+    if (int(arrays.get('format_version', -1)) != terrain.FORMAT_VERSION
+            or int(arrays.get('heightmap_crc32', -1)) != terrain.heightmap_checksum(heightmap)):
+        return None
+    return arrays
+
+
+def _load_keypad_tables(map_dir: Path, heightmap: np.ndarray) -> Optional[dict]:
+    """keypads.json.gz tables if they belong to heightmap, else None."""
+    path = map_dir / keypads.KEYPADS_FILENAME
+    if not path.is_file():
+        return None
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        tables = json.load(f)
+    if (tables.get('format_version') != keypads.FORMAT_VERSION
+            or tables.get('heightmap_crc32') != terrain.heightmap_checksum(heightmap)):
+        return None
+    return tables
+
+
+def write_heightmap_json_gz(heightmap: np.ndarray, path: Path) -> None:
+    """heightmap.json.gz in the layout written by process_one_map.py."""
+    resolution = heightmap.shape[0]
+    data = {
+        'resolution': resolution,
+        'width': resolution,
+        'height': resolution,
+        'format': 'uint16',
+        'data': heightmap.flatten().tolist(),
+        'compression': 'none'
+    }
+    from compress_heightmaps import gzip_writer
+    with gzip_writer(path) as raw, io.TextIOWrapper(raw, encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+
+
+def patch_map(map_dir: Path, heightmap: np.ndarray, apply: bool = False, block_size: int = BLOCK_SIZE) -> dict:
+    """Diff heightmap against a processed map and (optionally) update its files.
+
+    Returns:
+        The change record, plus 'updated': {filename: 'incremental' | 'full'}
+        when applied
+
+    Raises:
+        ValueError: If the resolution changed
+    """
+    old = load_heightmap(map_dir)
+    metadata = load_metadata(map_dir)
+    record = build_change_record(old, heightmap, metadata, block_size)
+    if not apply or not record['blocks']:
+        return record
+
+    heightmap = np.ascontiguousarray(heightmap, dtype=np.uint16)
+    bounds = [region_pixels(region['blocks'], heightmap.shape, block_size) for region in record['regions']]
+    updated = {}
+
+    arrays = _load_terrain_arrays(map_dir, old)
+    if arrays is None:
+        arrays, updated[terrain.ACCEL_FILENAME] = terrain.build_terrain_arrays(heightmap, metadata), 'full'
+    else:
+        arrays, updated[terrain.ACCEL_FILENAME] = terrain.update_terrain_arrays(
+            arrays, heightmap, metadata, bounds), 'incremental'
+    terrain.save_terrain_arrays(map_dir / terrain.ACCEL_FILENAME, arrays)
+
+    tables = _load_keypad_tables(map_dir, old)
+    if tables is None:
+        tables, updated[keypads.KEYPADS_FILENAME] = keypads.build_keypad_tables(heightmap, metadata), 'full'
+    else:
+        tables, updated[keypads.KEYPADS_FILENAME] = keypads.update_keypad_tables(
+            tables, heightmap, metadata, bounds), 'incremental'
+    keypads.save_keypad_tables(map_dir / keypads.KEYPADS_FILENAME, tables)
+
+    from build_overlays import OVERLAYS_DIRNAME, update_overlay_tiles
+    if update_overlay_tiles(map_dir, heightmap, bounds):
+        updated[OVERLAYS_DIRNAME] = 'incremental'
+
+    from encode_heightmaps import record_codec
+    codec_path = resolve_map_file(map_dir, CODEC_FILENAME)
+    predictor = read_header(codec_path.read_bytes())[0] if codec_path is not None else None
+    encoded = encode_heightmap(heightmap, predictor)
+    (map_dir / CODEC_FILENAME).write_bytes(encoded)
+    record_codec(map_dir, read_header(encoded)[0])
+    updated[CODEC_FILENAME] = 'full'
+    write_heightmap_json_gz(heightmap, map_dir / 'heightmap.json.gz')
+    updated['heightmap.json.gz'] = 'full'
+
+    with open(map_dir / CHANGES_FILENAME, 'w', encoding='utf-8') as f:
+        json.dump(record, f, indent=2)
+    clear_cache(map_dir)
+    terrain.clear_cache(map_dir)
+    keypads.clear_cache(map_dir)
+    return dict(record, updated=updated)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Diff a patched heightmap and rebuild only what changed.')
+    parser.add_argument('map', help='Processed map name')
+    parser.add_argument('--raw', type=Path,
+                        help='server.zip or heightmapprimary.raw (default: raw_map_data/<map>/server.zip)')
+    parser.add_argument('--apply', action='store_true', help='Update the processed files in place')
+    parser.add_argument('--block-size', type=int, default=BLOCK_SIZE, help='Comparison block edge in pixels')
+    parser.add_argument('--json', action='store_true', help='Print the change record as JSON')
+    parser.add_argument('--processed-dir', type=Path, default=repo_root / 'processed_maps', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    map_dir = args.processed_dir / args.map
+    raw_path = args.raw or repo_root / 'raw_map_data' / args.map / 'server.zip'
+    if not (map_dir / 'metadata.json').is_file():
+        print(f"ERROR: processed map not found: {map_dir}")
+        return 1
+    if not raw_path.is_file():
+        print(f"ERROR: raw heightmap not found: {raw_path}")
+        return 1
+
+    start = time.perf_counter()
+    try:
+        record = patch_map(map_dir, read_raw_heightmap(raw_path), args.apply, args.block_size)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 1
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(record, indent=2))
+        return 0
+
+    print("="*80)
+    if not record['blocks']:
+        print(f"{args.map}: heightmap unchanged ({elapsed:.2f}s)")
+        print("="*80)
+        return 0
+    total_blocks = (-(-record['resolution'] // record['block_size'])) ** 2
+    print(f"{args.map}: {record['changed_pixels']} samples changed in {len(record['blocks'])}/{total_blocks} "
+          f"blocks, {len(record['regions'])} regions")
+    for line in record['summary']:
+        print(f"  {line}")
+    if 'updated' in record:
+        print()
+        for filename, mode in record['updated'].items():
+            print(f"  {filename:20} {mode}")
+        print(f"  {CHANGES_FILENAME:20} written")
+        print("\nRun processor/validate_processed.py --update-catalog after checking the result.")
+    else:
+        print("\n(report only; re-run with --apply to update the processed files)")
+    print(f"Done in {elapsed:.2f}s")
+    print("="*80)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -122,16 +122,40 @@ if __name__ == '__main__':
     heightmap_json_path = out_dir / 'heightmap.json'
     convert_to_json(heightmap, heightmap_json_path)
     
-    # Compress heightmap to .gz format
+    # Compress heightmap to .gz format (streamed, reproducible; deletes the .json)
     print('Compressing heightmap...')
-    import gzip
-    original_data = heightmap_json_path.read_text()
-    with gzip.open(out_dir / 'heightmap.json.gz', 'wt', compresslevel=9) as f:
-        f.write(original_data)
-    # Delete uncompressed version
-    heightmap_json_path.unlink()
+    from compress_heightmaps import compress_file
+    compress_file(heightmap_json_path)
     print('Heightmap compressed to .json.gz')
     
     generate_metadata(map_name, heightmap, map_size, height_scale, out_dir / 'metadata.json')
 
+    print('Encoding heightmap.bin...')
+    from encode_heightmaps import encode_map
+    encode_map(out_dir)
+
+    print('Building terrain acceleration structures...')
+    from build_terrain_accel import build_terrain_accel
+    build_terrain_accel(out_dir)
+
+    print('Building keypad lookup tables...')
+    from build_keypad_tables import build_keypad_table
+    build_keypad_table(out_dir)
+
+    print('Building overlay tiles...')
+    from build_overlays import build_overlays
+    build_overlays(out_dir)
+
+    print('Updating map index...')
+    from build_map_index import save_map_index
+    save_map_index(processed_dir)
+
+    print('Validating processed output...')
+    from validate_processed import validate_map
+    report = validate_map(out_dir)
+    for message in report['errors']:
+        print('  ERROR:', message)
+    for message in report['warnings']:
+        print('  warning:', message)
+
     print('Done. Output directory:', out_dir)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Unit tests for build_overlays.py (hillshade and contour overlay tiles).
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Add processor directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from build_overlays import (  # noqa: E402
+    LIGHT_ALTITUDE, build_overlays, contour_levels, hillshade, hillshade_rgba, main, trace_contours,
+)
+
+from calculator.heightmap import clear_cache  # noqa: E402
+from calculator.heightmap_codec import encode_heightmap  # noqa: E402
+
+RESOLUTION = 301
+MAP_SIZE = 600
+
+
+def make_map(processed_dir: Path) -> Path:
+    """A processed map with a single hill in the middle."""
+    map_dir = processed_dir / 'hill'
+    map_dir.mkdir(parents=True)
+    coords = np.linspace(-1, 1, RESOLUTION)
+    xx, yy = np.meshgrid(coords, coords)
+    heightmap = (60000 * np.exp(-4 * (xx ** 2 + yy ** 2))).astype(np.uint16)
+    (map_dir / 'heightmap.bin').write_bytes(encode_heightmap(heightmap))
+    (map_dir / 'metadata.json').write_text(json.dumps({
+        'map_name': 'hill', 'map_size': MAP_SIZE, 'height_scale': 100,
+        'heightmap_resolution': RESOLUTION, 'meters_per_pixel': MAP_SIZE / (RESOLUTION - 1),
+    }), encoding='utf-8')
+    return map_dir
+
+
+def test_hillshade_lights_slopes_facing_north_west():
+    # Rising to the south-east: the slope faces the north-west light
+    ramp = np.add.outer(np.arange(5), np.arange(5)).astype(np.float32)
+    flat = np.zeros((5, 5), dtype=np.float32)
+    lit = hillshade(ramp, 1.0)
+    shaded = hillshade(-ramp, 1.0)
+    level = hillshade(flat, 1.0)
+    assert lit.shape == (4, 4)
+    assert np.allclose(level, np.sin(np.radians(LIGHT_ALTITUDE)))
+    assert (lit > level).all() and (shaded < level).all()
+
+    rgba = hillshade_rgba(np.stack([lit[0], level[0], shaded[0]]))
+    assert (rgba[0, :, :3] == 255).all() and (rgba[2, :, :3] == 0).all()
+    assert (rgba[1, :, 3] == 0).all() and (rgba[0, :, 3] > 0).all() and (rgba[2, :, 3] > 0).all()
+    print(" OK  Hillshade lights north-west slopes, flat ground transparent")
+
+
+def test_trace_contours_follows_level():
+    # Elevation equals the column index: every contour is a vertical line
+    plane = np.tile(np.arange(6, dtype=np.float32), (4, 1))
+    segments = trace_contours(plane, 2.5)
+    assert len(segments) == 3
+    assert np.allclose(segments[:, [0, 2]], 2.5)
+    assert sorted(segments[:, [1, 3]].min(axis=1)) == [0, 1, 2]
+    assert len(trace_contours(plane, 10)) == 0
+    assert list(contour_levels(plane, 2)) == [2, 4]
+    print(" OK  Marching squares traces contour segments at the level")
+
+
+def test_build_overlays_writes_tiles_and_metadata():
+    with tempfile.TemporaryDirectory() as tmp:
+        processed_dir = Path(tmp)
+        map_dir = make_map(processed_dir)
+        stale = map_dir / 'overlays' / 'contours' / '9_9.png'
+        stale.parent.mkdir(parents=True)
+        stale.write_bytes(b'old')
+
+        result = build_overlays(map_dir, tile_size=128)
+        assert result['image_size'] == RESOLUTION - 1 and result['tiles'] == 3
+        assert result['interval'] == 5
+        assert not stale.exists()
+        for layer in ('hillshade', 'contours'):
+            tiles = sorted(p.name for p in (map_dir / 'overlays' / layer).glob('*.png'))
+            assert len(tiles) == 9, tiles
+            with Image.open(map_dir / 'overlays' / layer / '2_2.png') as img:
+                assert img.size == (128, 128) and img.mode == 'RGBA'
+                # Padding past the image edge is transparent
+                assert img.getpixel((127, 127))[3] == 0
+
+        # The hill's summit is in the middle tile; contours ring it
+        with Image.open(map_dir / 'overlays' / 'contours' / '1_1.png') as img:
+            assert np.asarray(img)[..., 3].any()
+
+        overlays = json.loads((map_dir / 'metadata.json').read_text(encoding='utf-8'))['overlays']
+        assert overlays['tiles'] == 3 and overlays['tile_size'] == 128
+        assert overlays['layers'] == ['hillshade', 'contours']
+        assert overlays['contours'] == {'interval': 5, 'major_interval': 25}
+        clear_cache(map_dir)
+    print(" OK  Overlay tiles written, stale tiles removed, metadata updated")
+
+
+def test_cli_interval_and_workers():
+    with tempfile.TemporaryDirectory() as tmp:
+        processed_dir = Path(tmp)
+        map_dir = make_map(processed_dir)
+        main(['--processed-dir', str(processed_dir), '--jobs', '2', '--contour-interval', '25'])
+        overlays = json.loads((map_dir / 'metadata.json').read_text(encoding='utf-8'))['overlays']
+        assert overlays['contours']['interval'] == 25 and overlays['tiles'] == 2
+        assert len(list((map_dir / 'overlays' / 'hillshade').glob('*.png'))) == 4
+    print(" OK  CLI builds maps in worker processes")
+
+
+if __name__ == '__main__':
+    print("Running overlay tile tests...\n")
+
+    try:
+        test_hillshade_lights_slopes_facing_north_west()
+        test_trace_contours_follows_level()
+        test_build_overlays_writes_tiles_and_metadata()
+        test_cli_interval_and_workers()
+
+        print("\n" + "="*70)
+        print("All tests passed!")
+        print("="*70)
+
+    except AssertionError as e:
+        print(f"\nTest failed: {e}")
+        sys.exit(1)
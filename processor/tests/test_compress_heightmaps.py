@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Unit tests for compress_heightmaps.py (parallel compression and codec sweep).
+"""
+
+import gzip
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add processor directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from compress_heightmaps import (  # noqa: E402
+    SWEEP_SETTINGS, compress_file, main, summarize_sweep, sweep_map,
+)
+
+HEIGHTMAP_JSON = json.dumps({
+    'resolution': 65, 'width': 65, 'height': 65,
+    'data': [(x * 37 + y * 101) % 4096 for y in range(65) for x in range(65)],
+}).encode('utf-8')
+
+
+def make_map(processed_dir: Path, name: str, compressed: bool = False) -> Path:
+    map_dir = processed_dir / name
+    map_dir.mkdir(parents=True)
+    (map_dir / 'metadata.json').write_text(json.dumps({'map_name': name}), encoding='utf-8')
+    if compressed:
+        (map_dir / 'heightmap.json.gz').write_bytes(gzip.compress(HEIGHTMAP_JSON))
+    else:
+        (map_dir / 'heightmap.json').write_bytes(HEIGHTMAP_JSON)
+    return map_dir
+
+
+def test_compress_file_streams_and_is_reproducible():
+    with tempfile.TemporaryDirectory() as tmp:
+        outputs = []
+        for name in ('first', 'second'):
+            map_dir = make_map(Path(tmp), name)
+            original, compressed, _ = compress_file(map_dir / 'heightmap.json', level=6)
+            assert original == len(HEIGHTMAP_JSON)
+            assert not (map_dir / 'heightmap.json').exists()
+            output = (map_dir / 'heightmap.json.gz').read_bytes()
+            assert len(output) == compressed
+            assert gzip.decompress(output) == HEIGHTMAP_JSON
+            outputs.append(output)
+        assert outputs[0] == outputs[1]
+    print(" OK  Compressed output round-trips and carries no timestamp")
+
+
+def test_cli_compresses_in_parallel():
+    with tempfile.TemporaryDirectory() as tmp:
+        processed_dir = Path(tmp)
+        for name in ('adak', 'korengal'):
+            make_map(processed_dir, name)
+        main(['--processed-dir', str(processed_dir), '--jobs', '2', '--level', '1'])
+        for name in ('adak', 'korengal'):
+            assert gzip.decompress((processed_dir / name / 'heightmap.json.gz').read_bytes()) == HEIGHTMAP_JSON
+        assert not list(processed_dir.glob('*/heightmap.json*.tmp'))
+    print(" OK  CLI compresses maps in worker processes")
+
+
+def test_sweep_measures_every_setting():
+    with tempfile.TemporaryDirectory() as tmp:
+        processed_dir = Path(tmp)
+        raw = sweep_map(make_map(processed_dir, 'raw'))
+        packed = sweep_map(make_map(processed_dir, 'packed', compressed=True))
+        assert list(raw) == [f'{codec}-{level}' for codec, level in SWEEP_SETTINGS]
+        for name, m in packed.items():
+            assert m['original_size'] == len(HEIGHTMAP_JSON), name
+            assert m['compressed_size'] == raw[name]['compressed_size'], name
+
+        report = processed_dir / 'sweep.json'
+        main(['--processed-dir', str(processed_dir), '--sweep', '--jobs', '2', '--json', str(report)])
+        data = json.loads(report.read_text(encoding='utf-8'))
+        assert sorted(data['maps']) == ['packed', 'raw']
+        assert data['recommended'].startswith('gzip-')
+        # Nothing was written to the maps
+        assert (processed_dir / 'raw' / 'heightmap.json').is_file()
+        assert not (processed_dir / 'raw' / 'heightmap.json.gz').exists()
+    print(" OK  Sweep reads .json and .json.gz sources without writing")
+
+
+def test_recommendation_prefers_fast_levels_of_similar_size():
+    def m(size, seconds):
+        return {'original_size': 1000, 'compressed_size': size, 'compress_seconds': seconds,
+                'decompress_seconds': 0.1}
+
+    results = {'a': {'gzip-1': m(400, 0.1), 'gzip-6': m(305, 0.3), 'gzip-9': m(300, 0.6), 'lzma-6': m(200, 2.0)}}
+    summary = summarize_sweep(results)
+    assert summary['recommended'] == 'gzip-6'
+    assert summary['totals']['gzip-9']['ratio'] == 0.3
+    print(" OK  Recommends the fastest gzip level within 2% of the smallest")
+
+
+if __name__ == '__main__':
+    print("Running heightmap compression tests...\n")
+
+    try:
+        test_compress_file_streams_and_is_reproducible()
+        test_cli_compresses_in_parallel()
+        test_sweep_measures_every_setting()
+        test_recommendation_prefers_fast_levels_of_similar_size()
+
+        print("\n" + "="*70)
+        print("All tests passed!")
+        print("="*70)
+
+    except AssertionError as e:
+        print(f"\nTest failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Unit tests for convert_minimaps.py (DDS mip chain slicing and conversion).
+"""
+
+import io
+import json
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+# Add processor directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from PIL import Image
+
+from convert_minimaps import convert_minimap, iter_mip_levels, read_dds_info
+
+# Distinct solid colours (RGB565) per mip level: red, green, blue, white
+LEVEL_COLORS_565 = [0xF800, 0x07E0, 0x001F, 0xFFFF]
+LEVEL_COLORS_RGB = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 255)]
+
+
+def make_dxt1_dds(size: int, levels: int) -> bytes:
+    """Build a DXT1 DDS whose mip levels are each one solid colour."""
+    header = bytearray(128)
+    header[:4] = b'DDS '
+    struct.pack_into('<7I', header, 4, 124, 0x000A1007, size, size, 0, 0, levels)
+    struct.pack_into('<2I4s', header, 76, 32, 0x4, b'DXT1')
+    body = b''
+    width = size
+    for level in range(levels):
+        blocks = max(1, width // 4) ** 2
+        # color0 > color1 selects 4-colour mode; index 0 everywhere = color0
+        block = struct.pack('<2HI', LEVEL_COLORS_565[level], 0, 0)
+        body += block * blocks
+        width //= 2
+    return bytes(header) + body
+
+
+def test_read_dds_info():
+    info = read_dds_info(make_dxt1_dds(64, 3))
+    assert (info.width, info.height, info.mipmap_count) == (64, 64, 3)
+    assert info.block_size == 8
+    print(" OK  DDS header parsed")
+
+
+def test_iter_mip_levels_returns_each_level():
+    levels = iter_mip_levels(make_dxt1_dds(64, 4))
+    assert [w for w, _, _ in levels] == [64, 32, 16, 8]
+    for (width, height, level_dds), color in zip(levels, LEVEL_COLORS_RGB):
+        img = Image.open(io.BytesIO(level_dds)).convert('RGB')
+        assert img.size == (width, height)
+        assert img.getpixel((0, 0)) == color, f"level {width}: {img.getpixel((0, 0))}"
+    print(" OK  Mip levels decoded without resampling")
+
+
+def test_convert_minimap_writes_variants():
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+        result = convert_minimap(make_dxt1_dds(64, 4), out, ['png', 'webp'], min_size=16)
+        assert result['resolution'] == '64x64'
+        assert (out / 'minimap.png').is_file()
+        names = sorted(v['file'] for v in result['variants'])
+        assert names == ['minimap_16.png', 'minimap_16.webp', 'minimap_32.png', 'minimap_32.webp'], names
+        assert Image.open(out / 'minimap_32.png').getpixel((0, 0))[:3] == LEVEL_COLORS_RGB[1]
+        json.dumps(result)
+    print(" OK  Minimap variants written")
+
+
+def test_rejects_non_dds():
+    try:
+        read_dds_info(b'\x89PNG' + bytes(200))
+    except ValueError:
+        print(" OK  Non-DDS data rejected")
+        return
+    raise AssertionError('Expected ValueError for non-DDS data')
+
+
+if __name__ == '__main__':
+    print("Running minimap conversion tests...\n")
+
+    try:
+        test_read_dds_info()
+        test_iter_mip_levels_returns_each_level()
+        test_convert_minimap_writes_variants()
+        test_rejects_non_dds()
+
+        print("\n" + "="*70)
+        print("All tests passed!")
+        print("="*70)
+
+    except AssertionError as e:
+        print(f"\nTest failed: {e}")
+        sys.exit(1)
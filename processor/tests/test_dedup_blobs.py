@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Unit tests for dedup_blobs.py (content-addressed map payload store).
+"""
+
+import gzip
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add processor directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dedup_blobs import dedup  # noqa: E402
+
+from calculator.blobs import blob_path, content_digest, resolve_map_file  # noqa: E402
+
+HEIGHTMAP_JSON = b'{"resolution":2,"data":[1,2,3,4]}'
+
+
+def make_map(processed_dir: Path, name: str, minimap: bytes, mtime: float) -> Path:
+    """Create a processed map with a gzipped heightmap and a minimap."""
+    map_dir = processed_dir / name
+    map_dir.mkdir()
+    (map_dir / 'metadata.json').write_text(json.dumps({'map_name': name}), encoding='utf-8')
+    (map_dir / 'heightmap.json.gz').write_bytes(gzip.compress(HEIGHTMAP_JSON, mtime=mtime))
+    (map_dir / 'minimap.png').write_bytes(minimap)
+    return map_dir
+
+
+def test_gzip_digest_ignores_header_timestamp():
+    first = gzip.compress(HEIGHTMAP_JSON, mtime=1)
+    second = gzip.compress(HEIGHTMAP_JSON, mtime=2)
+    assert first != second
+    assert content_digest(first, 'heightmap.json.gz') == content_digest(second, 'heightmap.json.gz')
+    print(" OK  Gzip payloads hashed by content")
+
+
+def test_dedup_moves_shared_payloads_only():
+    with tempfile.TemporaryDirectory() as tmp:
+        processed_dir = Path(tmp)
+        dovre = make_map(processed_dir, 'dovre', b'summer', mtime=1)
+        winter = make_map(processed_dir, 'dovre_winter', b'winter', mtime=2)
+
+        stats = dedup(processed_dir)
+        assert stats['blobs'] == 1, stats
+        assert stats['files'] == 2, stats
+
+        # Shared heightmap moved to the store, distinct minimaps untouched
+        for map_dir in (dovre, winter):
+            assert not (map_dir / 'heightmap.json.gz').exists()
+            assert (map_dir / 'minimap.png').is_file()
+            resolved = resolve_map_file(map_dir, 'heightmap.json.gz')
+            assert resolved is not None and gzip.decompress(resolved.read_bytes()) == HEIGHTMAP_JSON
+
+        digest = json.loads((winter / 'metadata.json').read_text())['blobs']['heightmap.json.gz']
+        assert resolved == blob_path(processed_dir, digest)
+
+        # Re-running is a no-op; a new variant joins the existing blob
+        assert dedup(processed_dir)['blobs'] == 0
+        third = make_map(processed_dir, 'dovre_night', b'night', mtime=3)
+        assert dedup(processed_dir)['files'] == 1
+        assert not (third / 'heightmap.json.gz').exists()
+        assert resolve_map_file(third, 'heightmap.json.gz') == resolved
+    print(" OK  Shared payloads moved to blob store and referenced from metadata")
+
+
+def test_dry_run_leaves_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        processed_dir = Path(tmp)
+        maps = [make_map(processed_dir, name, b'same', mtime=0) for name in ('a', 'b')]
+        stats = dedup(processed_dir, dry_run=True)
+        assert stats['blobs'] == 2, stats
+        assert all((m / 'minimap.png').is_file() for m in maps)
+        assert not (processed_dir / '_blobs').exists()
+    print(" OK  Dry run reports without moving files")
+
+
+if __name__ == '__main__':
+    print("Running blob dedup tests...\n")
+
+    try:
+        test_gzip_digest_ignores_header_timestamp()
+        test_dedup_moves_shared_payloads_only()
+        test_dry_run_leaves_files()
+
+        print("\n" + "="*70)
+        print("All tests passed!")
+        print("="*70)
+
+    except AssertionError as e:
+        print(f"\nTest failed: {e}")
+        sys.exit(1)
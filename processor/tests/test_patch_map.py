@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Unit tests for patch_map.py (incremental rebuild after a heightmap patch).
+"""
+
+import gzip
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Add processor directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from build_overlays import build_overlays  # noqa: E402
+from patch_map import main, patch_map, read_raw_heightmap  # noqa: E402
+
+from calculator import keypads, terrain  # noqa: E402
+from calculator.heightmap import clear_cache, load_heightmap  # noqa: E402
+from calculator.heightmap_codec import encode_heightmap, read_header  # noqa: E402
+from validate_processed import validate_map  # noqa: E402
+
+RESOLUTION = 129
+MAP_SIZE = 1024
+
+
+def make_heightmap():
+    coords = np.linspace(-1, 1, RESOLUTION)
+    xx, yy = np.meshgrid(coords, coords)
+    return (30000 + 20000 * np.sin(3 * xx) * np.cos(2 * yy)).astype(np.uint16)
+
+
+def make_map(processed_dir: Path, heightmap: np.ndarray) -> Path:
+    """A processed map with heightmap files, terrain.npz and keypads.json.gz."""
+    map_dir = processed_dir / 'patched_map'
+    map_dir.mkdir(parents=True)
+    metadata = {'map_name': 'patched_map', 'map_size': MAP_SIZE, 'height_scale': 300,
+                'grid_scale': MAP_SIZE / 13, 'heightmap_resolution': RESOLUTION,
+                'meters_per_pixel': MAP_SIZE / (RESOLUTION - 1)}
+    (map_dir / 'metadata.json').write_text(json.dumps(metadata), encoding='utf-8')
+    document = {'resolution': RESOLUTION, 'width': RESOLUTION, 'height': RESOLUTION, 'format': 'uint16',
+                'data': heightmap.flatten().tolist(), 'compression': 'none'}
+    with gzip.open(map_dir / 'heightmap.json.gz', 'wt') as f:
+        json.dump(document, f, separators=(',', ':'))
+    (map_dir / 'heightmap.bin').write_bytes(encode_heightmap(heightmap, 'up'))
+    terrain.save_terrain_arrays(map_dir / 'terrain.npz', terrain.build_terrain_arrays(heightmap, metadata))
+    keypads.save_keypad_tables(map_dir / 'keypads.json.gz', keypads.build_keypad_tables(heightmap, metadata))
+    return map_dir
+
+
+def patched(heightmap):
+    new = heightmap.copy()
+    new[40:50, 90:100] += 500
+    return new
+
+
+def test_report_only_writes_nothing():
+    with tempfile.TemporaryDirectory() as tmp:
+        heightmap = make_heightmap()
+        map_dir = make_map(Path(tmp), heightmap)
+        before = {p.name: p.read_bytes() for p in map_dir.iterdir()}
+
+        record = patch_map(map_dir, patched(heightmap))
+        assert record['regions'] and 'updated' not in record, record
+        assert record['summary'][0].startswith('terrain raised in'), record['summary']
+        assert {p.name: p.read_bytes() for p in map_dir.iterdir()} == before
+        assert patch_map(map_dir, heightmap.copy())['blocks'] == []
+        clear_cache(map_dir)
+    print(" OK  Report-only run leaves the map untouched")
+
+
+def test_apply_matches_full_rebuild():
+    with tempfile.TemporaryDirectory() as tmp:
+        heightmap = make_heightmap()
+        new = patched(heightmap)
+        map_dir = make_map(Path(tmp), heightmap)
+        metadata = json.loads((map_dir / 'metadata.json').read_text())
+
+        record = patch_map(map_dir, new, apply=True, block_size=16)
+        assert record['updated']['terrain.npz'] == 'incremental', record['updated']
+        assert record['updated']['keypads.json.gz'] == 'incremental', record['updated']
+        assert np.array_equal(load_heightmap(map_dir), new)
+        assert read_header((map_dir / 'heightmap.bin').read_bytes())[0] == 'up'
+        assert json.loads((map_dir / 'metadata.json').read_text())['heightmap_codec'] == 'up'
+        # Reproducible gzip: no timestamp, default level
+        gz = (map_dir / 'heightmap.json.gz').read_bytes()
+        assert gz[4:8] == b'\0\0\0\0', gz[:10]
+        assert not list(map_dir.glob('*.tmp'))
+
+        with np.load(map_dir / 'terrain.npz') as data:
+            expected = terrain.build_terrain_arrays(new, metadata)
+            assert sorted(data.files) == sorted(expected)
+            for key in expected:
+                assert np.array_equal(data[key], expected[key]), key
+        with gzip.open(map_dir / 'keypads.json.gz', 'rt') as f:
+            assert json.load(f) == keypads._to_json(keypads.build_keypad_tables(new, metadata))
+
+        changes = json.loads((map_dir / 'changes.json').read_text())
+        assert changes['to_crc32'] == terrain.heightmap_checksum(new)
+        assert changes['blocks'] == record['blocks']
+        assert validate_map(map_dir)['errors'] == []
+        clear_cache(map_dir)
+    print(" OK  Incremental rebuild matches a full rebuild")
+
+
+def test_apply_updates_touched_overlay_tiles():
+    with tempfile.TemporaryDirectory() as tmp:
+        heightmap = make_heightmap()
+        new = patched(heightmap)
+        map_dir = make_map(Path(tmp) / 'patched', heightmap)
+        build_overlays(map_dir, tile_size=32)
+        before = {p.relative_to(map_dir): p.read_bytes() for p in (map_dir / 'overlays').rglob('*.png')}
+
+        record = patch_map(map_dir, new, apply=True)
+        assert record['updated']['overlays'] == 'incremental', record['updated']
+        after = {p.relative_to(map_dir): p.read_bytes() for p in (map_dir / 'overlays').rglob('*.png')}
+        changed = {path.name for path in before if before[path] != after[path]}
+        # Rows 40-49, columns 90-99 changed: only tile row 1, columns 2-3 (32 px tiles)
+        assert changed and changed <= {'1_2.png', '1_3.png'}, changed
+
+        # Same pixels as rebuilding every tile from the new heightmap
+        rebuilt = make_map(Path(tmp) / 'rebuilt', new)
+        interval = json.loads((map_dir / 'metadata.json').read_text())['overlays']['contours']['interval']
+        build_overlays(rebuilt, interval, tile_size=32)
+        for path in after:
+            assert np.array_equal(np.asarray(Image.open(map_dir / path)), np.asarray(Image.open(rebuilt / path))), path
+        clear_cache(map_dir)
+        clear_cache(rebuilt)
+    print(" OK  Patching re-renders only the overlay tiles it touches")
+
+
+def test_cli_raw_file_and_resolution_change():
+    with tempfile.TemporaryDirectory() as tmp:
+        processed_dir = Path(tmp)
+        heightmap = make_heightmap()
+        make_map(processed_dir, heightmap)
+
+        raw_path = processed_dir / 'heightmapprimary.raw'
+        patched(heightmap).astype('<u2').tofile(raw_path)
+        assert np.array_equal(read_raw_heightmap(raw_path), patched(heightmap))
+        args = ['patched_map', '--processed-dir', str(processed_dir), '--raw', str(raw_path)]
+        assert main(args + ['--apply']) == 0
+        assert (processed_dir / 'patched_map' / 'changes.json').is_file()
+        clear_cache(processed_dir / 'patched_map')
+
+        heightmap[:64, :64].astype('<u2').tofile(raw_path)
+        assert main(args) == 1
+        clear_cache(processed_dir / 'patched_map')
+    print(" OK  CLI reads bare .raw files and rejects resolution changes")
+
+
+if __name__ == '__main__':
+    print("Running incremental map patch tests...\n")
+
+    try:
+        test_report_only_writes_nothing()
+        test_apply_matches_full_rebuild()
+        test_apply_updates_touched_overlay_tiles()
+        test_cli_raw_file_and_resolution_change()
+
+        print("\n" + "="*70)
+        print("All tests passed!")
+        print("="*70)
+
+    except AssertionError as e:
+        print(f"\nTest failed: {e}")
+        sys.exit(1)
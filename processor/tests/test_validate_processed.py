@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Unit tests for validate_processed.py (processed map integrity validator).
+"""
+
+import gzip
+import json
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add processor directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from validate_processed import (  # noqa: E402
+    load_catalog, main, save_catalog, scan_heightmap_json, validate_map,
+)
+
+from calculator.heightmap_codec import encode_heightmap  # noqa: E402
+from calculator.terrain import build_terrain_arrays, heightmap_checksum, save_terrain_arrays  # noqa: E402
+
+RESOLUTION = 17
+MAP_SIZE = 512
+
+
+def make_heightmap(seed=0):
+    return np.random.default_rng(seed).integers(0, 65536, (RESOLUTION, RESOLUTION)).astype(np.uint16)
+
+
+def png_header(width, height):
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I4sII', 13, b'IHDR', width, height) + b'\x08\x02\x00\x00\x00'
+
+
+def make_map(processed_dir: Path, name: str = 'test_map', heightmap=None) -> Path:
+    """A processed map with every output validate_processed checks."""
+    heightmap = make_heightmap() if heightmap is None else heightmap
+    map_dir = processed_dir / name
+    map_dir.mkdir(parents=True)
+    metadata = {'map_name': name, 'map_size': MAP_SIZE, 'height_scale': 300, 'grid_scale': MAP_SIZE / 13,
+                'heightmap_resolution': RESOLUTION, 'meters_per_pixel': MAP_SIZE / (RESOLUTION - 1),
+                'heightmap_codec': 'paeth',
+                'minimap': {'resolution': '64x64', 'variants': [{'file': 'minimap_32.png', 'resolution': '32x32'}]}}
+    (map_dir / 'metadata.json').write_text(json.dumps(metadata), encoding='utf-8')
+    document = {'resolution': RESOLUTION, 'width': RESOLUTION, 'height': RESOLUTION, 'format': 'uint16',
+                'data': heightmap.flatten().tolist(), 'compression': 'none'}
+    with gzip.open(map_dir / 'heightmap.json.gz', 'wt') as f:
+        json.dump(document, f, separators=(',', ':'))
+    (map_dir / 'heightmap.bin').write_bytes(encode_heightmap(heightmap))
+    save_terrain_arrays(map_dir / 'terrain.npz', build_terrain_arrays(heightmap, metadata))
+    (map_dir / 'minimap.png').write_bytes(png_header(64, 64))
+    (map_dir / 'minimap_32.png').write_bytes(png_header(32, 32))
+    return map_dir
+
+
+def test_streaming_scan_matches_full_decode():
+    with tempfile.TemporaryDirectory() as tmp:
+        heightmap = make_heightmap(1)
+        map_dir = make_map(Path(tmp), heightmap=heightmap)
+        for chunk_size in (7, 64, 1 << 20):  # chunk boundaries inside numbers
+            header, count, low, high, crc = scan_heightmap_json(map_dir / 'heightmap.json.gz', chunk_size)
+            assert header == {'resolution': RESOLUTION, 'width': RESOLUTION, 'height': RESOLUTION,
+                              'format': 'uint16', 'compression': 'none'}, header
+            assert count == heightmap.size
+            assert (low, high) == (heightmap.min(), heightmap.max())
+            assert crc == heightmap_checksum(heightmap)
+    print(" OK  Streaming heightmap scan matches the full decode")
+
+
+def test_valid_map_passes():
+    with tempfile.TemporaryDirectory() as tmp:
+        report = validate_map(make_map(Path(tmp)))
+        assert report['errors'] == [] and report['warnings'] == [], report
+        assert set(report['files']) == {'metadata.json', 'heightmap.json.gz', 'heightmap.bin',
+                                        'terrain.npz', 'minimap.png', 'minimap_32.png'}
+    print(" OK  Consistent map passes every check")
+
+
+def test_broken_outputs_reported():
+    with tempfile.TemporaryDirectory() as tmp:
+        processed_dir = Path(tmp)
+
+        map_dir = make_map(processed_dir, 'truncated')
+        data = (map_dir / 'heightmap.json.gz').read_bytes()
+        (map_dir / 'heightmap.json.gz').write_bytes(data[:len(data) // 2])
+        assert any(e.startswith('heightmap.json.gz') for e in validate_map(map_dir)['errors'])
+
+        map_dir = make_map(processed_dir, 'wrong_resolution')
+        metadata = json.loads((map_dir / 'metadata.json').read_text())
+        metadata.update(heightmap_resolution=33, meters_per_pixel=MAP_SIZE / 32)
+        (map_dir / 'metadata.json').write_text(json.dumps(metadata))
+        errors = validate_map(map_dir)['errors']
+        assert any('resolution 17 != heightmap_resolution 33' in e for e in errors), errors
+
+        map_dir = make_map(processed_dir, 'mismatched_codec')
+        (map_dir / 'heightmap.bin').write_bytes(encode_heightmap(make_heightmap(2)))
+        report = validate_map(map_dir)
+        assert report['errors'] == ['heightmap.bin: samples differ from heightmap.json.gz'], report
+
+        map_dir = make_map(processed_dir, 'unlisted_codec')
+        metadata = json.loads((map_dir / 'metadata.json').read_text())
+        del metadata['heightmap_codec']
+        (map_dir / 'metadata.json').write_text(json.dumps(metadata))
+        report = validate_map(map_dir)
+        assert report['warnings'] == ['metadata.json: no heightmap_codec entry, the UI will not use heightmap.bin '
+                                      '(run encode_heightmaps.py)'], report
+
+        map_dir = make_map(processed_dir, 'stale')
+        (map_dir / 'heightmap.bin').unlink()
+        metadata = json.loads((map_dir / 'metadata.json').read_text())
+        save_terrain_arrays(map_dir / 'terrain.npz', build_terrain_arrays(make_heightmap(3), metadata))
+        del metadata['meters_per_pixel']
+        del metadata['heightmap_codec']
+        metadata['minimap']['resolution'] = '128x128'
+        (map_dir / 'metadata.json').write_text(json.dumps(metadata))
+        report = validate_map(map_dir)
+        assert report['errors'] == ['minimap.png: 64x64 != metadata resolution 128x128'], report
+        assert report['warnings'] == ['metadata.json: meters_per_pixel missing (derived 32)',
+                                      'terrain.npz: built from a different heightmap (stale)'], report
+    print(" OK  Corrupt, inconsistent and stale outputs reported")
+
+
+def test_catalog_detects_changed_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        processed_dir = Path(tmp)
+        map_dir = make_map(processed_dir)
+        assert load_catalog(processed_dir) is None
+        save_catalog(processed_dir, [validate_map(map_dir)])
+        entry = load_catalog(processed_dir)['maps']['test_map']
+
+        report = validate_map(map_dir, entry, use_catalog=True)
+        assert report['errors'] == [] and report['warnings'] == [], report
+
+        (map_dir / 'minimap_32.png').write_bytes(png_header(32, 32) + b'tampered')
+        (map_dir / 'terrain.npz').unlink()
+        report = validate_map(map_dir, entry, use_catalog=True)
+        assert report['errors'] == ['minimap_32.png: SHA-256 differs from catalog',
+                                    'terrain.npz: in catalog but missing'], report
+    print(" OK  Catalog checksums catch changed and missing files")
+
+
+def test_main_exit_status():
+    with tempfile.TemporaryDirectory() as tmp:
+        processed_dir = Path(tmp)
+        make_map(processed_dir, 'good')
+        args = ['--processed-dir', str(processed_dir), '--jobs', '1']
+        assert main(args + ['--update-catalog']) == 0
+        assert main(args) == 0
+
+        bad = make_map(processed_dir, 'bad')
+        (bad / 'metadata.json').write_text('{broken')
+        report_path = processed_dir / 'report.json'
+        assert main(args + ['--json', str(report_path)]) == 1
+        report = json.loads(report_path.read_text())
+        assert (report['failed'], report['warned']) == (1, 0), report
+    print(" OK  Exit status and JSON report")
+
+
+if __name__ == '__main__':
+    print("Running processed output validator tests...\n")
+
+    try:
+        test_streaming_scan_matches_full_decode()
+        test_valid_map_passes()
+        test_broken_outputs_reported()
+        test_catalog_detects_changed_files()
+        test_main_exit_status()
+
+        print("\n" + "="*70)
+        print("All tests passed!")
+        print("="*70)
+
+    except AssertionError as e:
+        print(f"\nTest failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Validate processed map outputs before they reach players.
+
+Checks every map directory in parallel worker processes:
+- metadata.json: required fields, grid_scale = map_size / 13,
+  meters_per_pixel = map_size / (resolution - 1), map name
+- heightmap.json.gz: gzip CRC and JSON structure, width/height/resolution
+  against metadata, value count and range. The file is decoded as a
+  stream (a chunk of numbers at a time), never as a full Python list.
+- heightmap.bin: decodes, and matches heightmap.json.gz (CRC32 of samples)
+- terrain.npz / keypads.json.gz: built from the current heightmap
+- minimap.png and its variants: PNG header dimensions (square, power of
+  two, matching metadata)
+- Shared blobs: referenced files exist and hash to their name
+- catalog.json: every file still has the SHA-256 recorded by the last
+  --update-catalog run
+
+Errors fail the run (exit code 1); warnings only fail it with --strict.
+
+Usage:
+    python processor/validate_processed.py                     # all maps
+    python processor/validate_processed.py adak korengal --jobs 4
+    python processor/validate_processed.py --json report.json  # machine-readable report
+    python processor/validate_processed.py --update-catalog    # record checksums of a good run
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from warnings import catch_warnings, simplefilter
+
+import numpy as np
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from calculator.blobs import blob_references, resolve_map_file  # noqa: E402
+from calculator.heightmap_codec import CODEC_FILENAME, decode_heightmap  # noqa: E402
+from calculator.keypads import KEYPADS_FILENAME  # noqa: E402
+from calculator.terrain import ACCEL_FILENAME, heightmap_checksum  # noqa: E402
+
+CATALOG_FILENAME = 'catalog.json'
+CATALOG_FORMAT_VERSION = 1
+
+# Decompressed bytes parsed per step when streaming heightmap.json.gz
+CHUNK_SIZE = 1 << 20
+
+# Fields before "data" in heightmap.json.gz are a few dozen bytes
+MAX_HEADER_BYTES = 64 * 1024
+
+# Relative tolerance for derived metadata values
+TOLERANCE = 1e-6
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+_DATA_START = re.compile(rb'"data"\s*:\s*\[')
+
+
+def _parse_integers(text: bytes) -> np.ndarray:
+    """Comma-separated integers to an int64 array (C parser, ~10x faster than split)."""
+    with catch_warnings():
+        simplefilter('error')
+        try:
+            values = np.fromstring(text, dtype=np.int64, sep=',')
+        except (ValueError, DeprecationWarning):
+            values = None
+    # fromstring stops at the first bad token; a short result means one was found
+    if values is None or values.size != text.count(b',') + 1:
+        raise ValueError('heightmap data contains a non-integer value')
+    return values
+
+
+def scan_heightmap_json(path: Path, chunk_size: int = CHUNK_SIZE) -> Tuple[dict, int, int, int, int]:
+    """Stream-decode a heightmap.json.gz without building the sample list.
+
+    Returns:
+        (header fields other than "data", sample count, min, max, CRC32 of
+        the samples as little-endian uint16 - same as heightmap_checksum)
+
+    Raises:
+        ValueError: If the JSON is malformed or a sample is not in 0-65535
+        OSError: If the gzip stream is corrupt or truncated
+    """
+    count, crc = 0, 0
+    low, high = 65535, 0
+    with gzip.open(path, 'rb') as f:
+        head = b''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                raise ValueError('no "data" array')
+            head += chunk
+            match = _DATA_START.search(head)
+            if match:
+                break
+            if len(head) > MAX_HEADER_BYTES:
+                raise ValueError('no "data" array in the header')
+        prefix, pending = head[:match.start()], head[match.end():]
+
+        carry = b''
+        while True:
+            end = pending.find(b']')
+            text = carry + (pending if end < 0 else pending[:end])
+            if end < 0:
+                cut = text.rfind(b',')
+                text, carry = (text[:cut], text[cut + 1:]) if cut >= 0 else (b'', text)
+            if text.strip():
+                values = _parse_integers(text)
+                if values.min() < 0 or values.max() > 65535:
+                    raise ValueError('heightmap value outside 0-65535')
+                count += values.size
+                low, high = min(low, int(values.min())), max(high, int(values.max()))
+                crc = zlib.crc32(values.astype('<u2').tobytes(), crc)
+            if end >= 0:
+                suffix = pending[end + 1:] + f.read()
+                break
+            pending = f.read(chunk_size)
+            if not pending:
+                raise ValueError('unterminated "data" array')
+
+    try:
+        header = json.loads(prefix + b'"data":[]' + suffix)
+    except ValueError as e:
+        raise ValueError(f'invalid JSON around the data array: {e}') from None
+    if not isinstance(header, dict):
+        raise ValueError('heightmap JSON is not an object')
+    header.pop('data')
+    return header, count, low, high, crc
+
+
+def png_size(path: Path) -> Tuple[int, int]:
+    """Width and height from a PNG's IHDR chunk.
+
+    Raises:
+        ValueError: If the file is not a PNG
+    """
+    with open(path, 'rb') as f:
+        header = f.read(24)
+    if len(header) < 24 or header[:8] != PNG_SIGNATURE or header[12:16] != b'IHDR':
+        raise ValueError('not a PNG file')
+    return struct.unpack('>II', header[16:24])
+
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_digest(path: Path, filename: str) -> str:
+    """Streaming equivalent of calculator.blobs.content_digest (gzip hashed decompressed)."""
+    if not filename.endswith('.gz'):
+        return file_sha256(path)
+    digest = hashlib.sha256()
+    with gzip.open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def map_files(map_dir: Path) -> Dict[str, Path]:
+    """Every file a map serves: per-map files plus blob references."""
+    files = {path.name: path for path in sorted(map_dir.iterdir())
+             if path.is_file() and not path.name.endswith('.tmp')}
+    for filename in blob_references(map_dir):
+        if filename not in files:
+            resolved = resolve_map_file(map_dir, filename)
+            if resolved is not None:
+                files[filename] = resolved
+    return files
+
+
+def _close(value: float, expected: float) -> bool:
+    return math.isclose(value, expected, rel_tol=TOLERANCE)
+
+
+def check_metadata(map_dir: Path, errors: List[str], warnings: List[str]) -> Optional[dict]:
+    try:
+        metadata = json.loads((map_dir / 'metadata.json').read_text(encoding='utf-8'))
+    except (OSError, ValueError) as e:
+        errors.append(f'metadata.json unreadable: {e}')
+        return None
+    if not isinstance(metadata, dict):
+        errors.append('metadata.json is not an object')
+        return None
+
+    for field in ('map_size', 'height_scale', 'heightmap_resolution'):
+        value = metadata.get(field)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            errors.append(f'metadata.json: {field} missing or not a positive number')
+    if errors:
+        return None
+
+    map_size = metadata['map_size']
+    resolution = metadata['heightmap_resolution']
+    if metadata.get('map_name') != map_dir.name:
+        warnings.append(f"metadata.json: map_name {metadata.get('map_name')!r} != directory name")
+    grid_scale = metadata.get('grid_scale')
+    if grid_scale is not None and not _close(grid_scale, map_size / 13):
+        errors.append(f'metadata.json: grid_scale {grid_scale} != map_size / 13 ({map_size / 13})')
+    if resolution < 2 or (resolution - 1) & (resolution - 2):
+        errors.append(f'metadata.json: heightmap_resolution {resolution} is not 2^n + 1')
+    else:
+        expected = map_size / (resolution - 1)
+        meters_per_pixel = metadata.get('meters_per_pixel')
+        if meters_per_pixel is None:
+            warnings.append(f'metadata.json: meters_per_pixel missing (derived {expected:g})')
+        elif not _close(meters_per_pixel, expected):
+            errors.append(f'metadata.json: meters_per_pixel {meters_per_pixel} != map_size / '
+                          f'(resolution - 1) ({expected:g})')
+    return metadata
+
+
+def check_heightmap(map_dir: Path, metadata: dict, errors: List[str], warnings: List[str]) -> Optional[int]:
+    """Validate the heightmap file(s); returns the samples' CRC32."""
+    resolution = metadata['heightmap_resolution']
+    checksum = None
+
+    json_path = resolve_map_file(map_dir, 'heightmap.json.gz')
+    if json_path is not None:
+        try:
+            header, count, _, _, checksum = scan_heightmap_json(json_path)
+        except (OSError, EOFError, ValueError) as e:
+            errors.append(f'heightmap.json.gz: {e}')
+        else:
+            for field in ('resolution', 'width', 'height'):
+                if header.get(field) != resolution:
+                    errors.append(f'heightmap.json.gz: {field} {header.get(field)} != '
+                                  f'heightmap_resolution {resolution}')
+            if header.get('format', 'uint16') != 'uint16':
+                errors.append(f"heightmap.json.gz: unsupported format {header.get('format')!r}")
+            if count != resolution * resolution:
+                errors.append(f'heightmap.json.gz: {count} samples, expected {resolution * resolution}')
+                checksum = None
+
+    codec_path = resolve_map_file(map_dir, CODEC_FILENAME)
+    if codec_path is not None:
+        try:
+            heightmap = decode_heightmap(codec_path.read_bytes())
+        except (ValueError, zlib.error) as e:
+            errors.append(f'{CODEC_FILENAME}: {e}')
+        else:
+            if heightmap.shape != (resolution, resolution):
+                errors.append(f'{CODEC_FILENAME}: shape {heightmap.shape} != heightmap_resolution {resolution}')
+            codec_checksum = heightmap_checksum(heightmap)
+            if checksum is not None and codec_checksum != checksum:
+                errors.append(f'{CODEC_FILENAME}: samples differ from heightmap.json.gz')
+            checksum = codec_checksum if checksum is None else checksum
+
+    if json_path is None and codec_path is None:
+        errors.append('no heightmap (heightmap.json.gz or heightmap.bin)')
+    if codec_path is not None and not metadata.get('heightmap_codec'):
+        warnings.append(f'metadata.json: no heightmap_codec entry, the UI will not use {CODEC_FILENAME} '
+                        '(run encode_heightmaps.py)')
+    elif codec_path is None and metadata.get('heightmap_codec'):
+        errors.append(f'metadata.json: heightmap_codec set but {CODEC_FILENAME} is missing')
+    return checksum
+
+
+def check_derived(map_dir: Path, checksum: int, errors: List[str], warnings: List[str]) -> None:
+    """terrain.npz and keypads.json.gz must come from the current heightmap.
+
+    Stale files are warnings: the server rebuilds them in memory.
+    """
+    accel_path = map_dir / ACCEL_FILENAME
+    if accel_path.is_file():
+        try:
+            with np.load(accel_path) as npz:
+                stored = int(npz['heightmap_crc32'])
+        except (OSError, ValueError, KeyError, zlib.error) as e:
+            errors.append(f'{ACCEL_FILENAME}: {e}')
+        else:
+            if stored != checksum:
+                warnings.append(f'{ACCEL_FILENAME}: built from a different heightmap (stale)')
+
+    keypads_path = map_dir / KEYPADS_FILENAME
+    if keypads_path.is_file():
+        try:
+            with gzip.open(keypads_path, 'rb') as f:
+                stored = json.load(f).get('heightmap_crc32')
+        except (OSError, EOFError, ValueError, AttributeError) as e:
+            errors.append(f'{KEYPADS_FILENAME}: {e}')
+        else:
+            if stored != checksum:
+                warnings.append(f'{KEYPADS_FILENAME}: built from a different heightmap (stale)')
+
+
+def check_minimaps(map_dir: Path, metadata: dict, errors: List[str], warnings: List[str]) -> None:
+    minimap_meta = metadata.get('minimap') if isinstance(metadata.get('minimap'), dict) else {}
+    minimap_path = resolve_map_file(map_dir, 'minimap.png')
+    if minimap_path is None:
+        if minimap_meta:
+            errors.append('metadata.json lists a minimap but minimap.png is missing')
+        return
+
+    try:
+        width, height = png_size(minimap_path)
+    except (OSError, ValueError) as e:
+        errors.append(f'minimap.png: {e}')
+        return
+    if width != height or width & (width - 1):
+        warnings.append(f'minimap.png: {width}x{height} is not a square power of two')
+    if minimap_meta.get('resolution') not in (None, f'{width}x{height}'):
+        errors.append(f"minimap.png: {width}x{height} != metadata resolution {minimap_meta['resolution']}")
+
+    for variant in minimap_meta.get('variants') or []:
+        name = variant.get('file', '') if isinstance(variant, dict) else ''
+        path = resolve_map_file(map_dir, name) if name else None
+        if path is None:
+            errors.append(f'minimap variant {name or variant!r} is missing')
+        elif name.endswith('.png'):
+            try:
+                size = '{}x{}'.format(*png_size(path))
+            except (OSError, ValueError) as e:
+                errors.append(f'{name}: {e}')
+                continue
+            if size != variant.get('resolution'):
+                errors.append(f"{name}: {size} != metadata resolution {variant.get('resolution')}")
+
+
+def check_blobs(map_dir: Path, errors: List[str]) -> None:
+    for filename, digest in blob_references(map_dir).items():
+        if (map_dir / filename).is_file():
+            continue
+        path = resolve_map_file(map_dir, filename)
+        if path is None:
+            errors.append(f'{filename}: shared blob {digest[:12]} is missing')
+            continue
+        try:
+            if blob_digest(path, filename) != digest:
+                errors.append(f'{filename}: shared blob {digest[:12]} content does not match its digest')
+        except (OSError, EOFError) as e:
+            errors.append(f'{filename}: shared blob {digest[:12]}: {e}')
+
+
+def check_catalog(files: Dict[str, dict], entry: Optional[dict], errors: List[str], warnings: List[str]) -> None:
+    if entry is None:
+        warnings.append('not in catalog.json (run with --update-catalog after checking)')
+        return
+    recorded = entry.get('files') or {}
+    for filename, info in sorted(recorded.items()):
+        if filename not in files:
+            errors.append(f'{filename}: in catalog but missing')
+        elif files[filename]['sha256'] != info.get('sha256'):
+            errors.append(f'{filename}: SHA-256 differs from catalog')
+    for filename in sorted(set(files) - set(recorded)):
+        warnings.append(f'{filename}: not in catalog')
+
+
+def validate_map(map_dir: Path, catalog_entry: Optional[dict] = None, use_catalog: bool = False) -> dict:
+    """Run every check on one processed map directory (runs in a worker process).
+
+    Returns:
+        Dict with map, errors, warnings, heightmap_crc32, files (name ->
+        sha256/bytes, the catalog entry format) and seconds
+    """
+    start = time.perf_counter()
+    map_dir = Path(map_dir)
+    errors: List[str] = []
+    warnings: List[str] = []
+    checksum = None
+
+    metadata = check_metadata(map_dir, errors, warnings)
+    if metadata is not None:
+        checksum = check_heightmap(map_dir, metadata, errors, warnings)
+        if checksum is not None:
+            check_derived(map_dir, checksum, errors, warnings)
+        check_minimaps(map_dir, metadata, errors, warnings)
+    check_blobs(map_dir, errors)
+
+    files = {name: {'sha256': file_sha256(path), 'bytes': path.stat().st_size}
+             for name, path in map_files(map_dir).items()}
+    if use_catalog:
+        check_catalog(files, catalog_entry, errors, warnings)
+
+    return {
+        'map': map_dir.name,
+        'errors': errors,
+        'warnings': warnings,
+        'heightmap_crc32': checksum,
+        'files': files,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def load_catalog(processed_dir: Path) -> Optional[dict]:
+    """catalog.json contents, or None if there is none yet."""
+    path = processed_dir / CATALOG_FILENAME
+    if not path.is_file():
+        return None
+    catalog = json.loads(path.read_text(encoding='utf-8'))
+    if catalog.get('format_version') != CATALOG_FORMAT_VERSION:
+        raise ValueError(f'{CATALOG_FILENAME}: unsupported format_version')
+    return catalog
+
+
+def save_catalog(processed_dir: Path, reports: List[dict], catalog: Optional[dict] = None) -> None:
+    """Record checksums of the maps in reports (other entries are kept)."""
+    maps = dict((catalog or {}).get('maps') or {})
+    for report in reports:
+        maps[report['map']] = {'heightmap_crc32': report['heightmap_crc32'], 'files': report['files']}
+    path = processed_dir / CATALOG_FILENAME
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps({'format_version': CATALOG_FORMAT_VERSION, 'maps': dict(sorted(maps.items()))},
+                              indent=1) + '\n', encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def validate_all(map_dirs: List[Path], catalog: Optional[dict], jobs: int) -> List[dict]:
+    """Validate maps in parallel; reports in completion order."""
+    use_catalog = catalog is not None
+    entries = (catalog or {}).get('maps') or {}
+    reports = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(validate_map, map_dir, entries.get(map_dir.name), use_catalog): map_dir
+                   for map_dir in map_dirs}
+        for future in as_completed(futures):
+            map_dir = futures[future]
+            try:
+                reports.append(future.result())
+            except Exception as e:  # a crashing check is a broken map, not a broken run
+                reports.append({'map': map_dir.name, 'errors': [f'validator crashed: {e!r}'],
+                                'warnings': [], 'heightmap_crc32': None, 'files': {}, 'seconds': 0.0})
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate processed map outputs')
+    parser.add_argument('maps', nargs='*', help='Map names (default: every processed map)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help='Parallel worker processes (default: CPU count)')
+    parser.add_argument('--json', metavar='PATH', help='Also write the report as JSON')
+    parser.add_argument('--strict', action='store_true', help='Fail on warnings too')
+    parser.add_argument('--update-catalog', action='store_true',
+                        help=f'Record file checksums in processed_maps/{CATALOG_FILENAME} '
+                             '(maps with errors are not recorded)')
+    parser.add_argument('--processed-dir', type=Path, default=repo_root / 'processed_maps',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    processed_dir = args.processed_dir
+    if not processed_dir.is_dir():
+        print("ERROR: processed_maps directory not found")
+        print(f"Expected location: {processed_dir}")
+        return 1
+
+    if args.maps:
+        map_dirs = [processed_dir / name for name in args.maps]
+    else:
+        map_dirs = sorted(p.parent for p in processed_dir.glob('*/metadata.json'))
+    try:
+        catalog = load_catalog(processed_dir)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}")
+        return 1
+
+    print(f"Validating {len(map_dirs)} maps with {args.jobs} workers"
+          f"{'' if catalog else ' (no catalog.json yet)'}...\n")
+    start = time.perf_counter()
+    reports = sorted(validate_all(map_dirs, catalog, args.jobs), key=lambda r: r['map'])
+    elapsed = time.perf_counter() - start
+
+    for report in reports:
+        status = 'FAIL' if report['errors'] else 'WARN' if report['warnings'] else 'OK'
+        print(f"  {report['map']:30} {status:4}  ({report['seconds']:.2f}s)")
+        for message in report['errors']:
+            print(f"      ERROR   {message}")
+        for message in report['warnings']:
+            print(f"      warning {message}")
+
+    failed = [r for r in reports if r['errors']]
+    warned = [r for r in reports if r['warnings'] and not r['errors']]
+    if args.update_catalog:
+        save_catalog(processed_dir, [r for r in reports if not r['errors']], catalog)
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            'maps': [{key: value for key, value in r.items() if key != 'files'} for r in reports],
+            'failed': len(failed), 'warned': len(warned), 'seconds': elapsed,
+        }, indent=2), encoding='utf-8')
+
+    print("\n" + "="*80)
+    print(f"Validated {len(reports)} maps in {elapsed:.1f}s: {len(reports) - len(failed) - len(warned)} OK, "
+          f"{len(warned)} with warnings, {len(failed)} failed")
+    if args.update_catalog:
+        print(f"Catalog updated: {processed_dir / CATALOG_FILENAME}")
+    print("="*80)
+    return 1 if failed or (args.strict and warned) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())